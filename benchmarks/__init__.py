@@ -0,0 +1,9 @@
+"""
+Benchmarks offline do Vox AI.
+
+Rodam sem rede: a base de conhecimento é sintética e o Supabase é substituído por um cliente
+falso em memória. Os resultados são gravados em JSON para comparação entre execuções.
+
+Uso:
+    python -m benchmarks.recuperacao --chunks 10000 --consultas 200
+"""
@@ -0,0 +1,297 @@
+"""
+Teste de carga do app Streamlit (vox_ai.py) com sessões simultâneas, totalmente offline.
+
+Cada sessão simulada é um `AppTest` executando o script real, e todas compartilham o mesmo
+processo (mesmos caches `st.cache_resource`/`st.cache_data` e o mesmo GIL), como as sessões de
+um processo Streamlit em produção. O Gemini e o Supabase são os serviços falsos de
+`benchmarks.servicos_fake`, com latência configurável.
+
+Para cada nível de concorrência (N sessões) são medidos:
+    - turno completo: duração do rerun que processa uma mensagem (texto ou áudio)
+    - TTFT: do envio da mensagem até o 1º chunk do streaming do Gemini
+    - rerun ocioso: rerun sem entrada nova (custo de redesenhar a página e o histórico)
+    - CPU e RSS do processo por sessão, e vazão (turnos/s)
+
+O resultado é a curva vazão x latência (JSON) e a maior concorrência que respeita o SLO de p95.
+
+Uso:
+    python -m benchmarks.carga_app --niveis 1,2,4,8 --turnos 3
+    python -m benchmarks.carga_app --niveis 1,4,16 --sem-digitacao --latencia-gemini-ms 800
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.kb_sintetica import gerar_kb_sintetica
+from benchmarks.recuperacao import _percentis, _versao_git
+from benchmarks.servicos_fake import ConfiguracaoFake, ServidorGeminiFake, ServidorPostgrestFake, variaveis_ambiente
+
+RAIZ = Path(__file__).resolve().parent.parent
+SCRIPT_APP = RAIZ / "vox_ai.py"
+DIRETORIO_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+CONVERSA_PADRAO = [
+    {"texto": "Como faço para retificar meu nome no cartório?"},
+    {"texto": "Preciso levar algum documento?"},
+    {"audio": True},
+    {"texto": "Onde encontro atendimento de saúde pelo SUS?"},
+    {"texto": "E se eu sofrer discriminação no atendimento?"},
+]
+
+# Tempo máximo de um rerun do AppTest (a digitação simulada de respostas longas leva segundos)
+TIMEOUT_RERUN_S = 120
+
+
+def _wav_silencioso(duracao_s: float = 0.5, taxa: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as arquivo:
+        arquivo.setnchannels(1)
+        arquivo.setsampwidth(2)
+        arquivo.setframerate(taxa)
+        arquivo.writeframes(b"\x00\x00" * int(duracao_s * taxa))
+    return buffer.getvalue()
+
+
+def _rss_atual_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # Fora do Linux, usa o pico (ru_maxrss em KB no Linux e em bytes no macOS)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _cpu_processo_s() -> float:
+    tempos = os.times()
+    return tempos.user + tempos.system
+
+
+def _instrumentar_streaming():
+    """
+    Envolve 'RespostaEmTela.adicionar' (src/app/ui.py) para registrar, no estado da sessão que
+    desenha a resposta, o instante em que o 1º trecho chegou à tela (base do TTFT). O pipeline
+    roda no laço de eventos do processo, fora da thread da sessão, por isso a medição é feita
+    no adaptador da interface.
+    """
+    from src.app.ui import RespostaEmTela
+
+    original = RespostaEmTela.adicionar
+
+    def _adicionar(self, trecho):
+        if not self.texto:
+            st.session_state["_carga_primeiro_chunk"] = time.perf_counter()
+        original(self, trecho)
+
+    return patch.object(RespostaEmTela, "adicionar", _adicionar)
+
+
+def simular_sessao(conversa: list[dict[str, Any]], indice_sessao: int) -> dict[str, list[float]]:
+    """
+    Executa uma sessão completa: abertura (boas-vindas) e os turnos da conversa, cada um seguido de
+    um rerun ocioso.
+
+    Returns:
+        dict[str, list[float]]: Amostras em ms de 'abertura', 'turno', 'ttft' e 'rerun_ocioso', e a
+            contagem de 'erros'.
+    """
+    amostras: dict[str, list[float]] = {"abertura": [], "turno": [], "ttft": [], "rerun_ocioso": [], "erros": []}
+    audio = _wav_silencioso()
+
+    at = AppTest.from_file(str(SCRIPT_APP), default_timeout=TIMEOUT_RERUN_S)
+    inicio = time.perf_counter()
+    at.run()
+    amostras["abertura"].append((time.perf_counter() - inicio) * 1000)
+
+    for numero, turno in enumerate(conversa):
+        if "audio" in turno:
+            at.audio_input[0].set_value((f"sessao{indice_sessao}-turno{numero}.wav", audio, "audio/wav"))
+        else:
+            at.chat_input[0].set_value(turno["texto"])
+
+        inicio = time.perf_counter()
+        at.run()
+        fim = time.perf_counter()
+        amostras["turno"].append((fim - inicio) * 1000)
+
+        primeiro_chunk = at.session_state["_carga_primeiro_chunk"] if "_carga_primeiro_chunk" in at.session_state else None
+        if primeiro_chunk and inicio <= primeiro_chunk <= fim:
+            amostras["ttft"].append((primeiro_chunk - inicio) * 1000)
+        if at.exception or at.error:
+            amostras["erros"].append(1)
+
+        if "audio" in turno:
+            at.audio_input[0].set_value(None)
+
+        inicio = time.perf_counter()
+        at.run()
+        amostras["rerun_ocioso"].append((time.perf_counter() - inicio) * 1000)
+
+    return amostras
+
+
+def executar_nivel(sessoes: int, conversa: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Dispara 'sessoes' sessões simultâneas e agrega as métricas do nível.
+    """
+    cpu_inicio = _cpu_processo_s()
+    rss_inicio = _rss_atual_mb()
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=sessoes, thread_name_prefix="sessao") as executor:
+        resultados = list(executor.map(simular_sessao, [conversa] * sessoes, range(sessoes)))
+
+    duracao_s = time.perf_counter() - inicio
+    agregado: dict[str, list[float]] = {}
+    for resultado in resultados:
+        for chave, valores in resultado.items():
+            agregado.setdefault(chave, []).extend(valores)
+
+    turnos = len(agregado["turno"])
+    return {
+        "sessoes": sessoes,
+        "duracao_s": round(duracao_s, 3),
+        "vazao_turnos_s": round(turnos / duracao_s, 3) if duracao_s else 0.0,
+        "turno_ms": _percentis(agregado["turno"]),
+        "ttft_ms": _percentis(agregado["ttft"]),
+        "rerun_ocioso_ms": _percentis(agregado["rerun_ocioso"]),
+        "abertura_ms": _percentis(agregado["abertura"]),
+        "erros": len(agregado["erros"]),
+        "cpu_s_por_sessao": round((_cpu_processo_s() - cpu_inicio) / sessoes, 3),
+        "cpu_utilizacao": round((_cpu_processo_s() - cpu_inicio) / duracao_s, 3) if duracao_s else 0.0,
+        "rss_mb_por_sessao": round((_rss_atual_mb() - rss_inicio) / sessoes, 2),
+        "rss_mb": round(_rss_atual_mb(), 1),
+    }
+
+
+def executar_carga(niveis: list[int], conversa: list[dict[str, Any]], chunks: int = 2000, latencia_gemini_ms: float = 300.0, latencia_supabase_ms: float = 20.0, intervalo_stream_ms: float = 40.0, taxa_429: float = 0.0, taxa_503: float = 0.0, sem_digitacao: bool = False, slo_p95_ms: float = 10_000.0) -> dict[str, Any]:
+    """
+    Sobe os serviços falsos, aponta o app para eles e executa os níveis de concorrência em sequência.
+
+    Returns:
+        dict[str, Any]: Relatório serializável em JSON com a curva vazão x latência.
+    """
+    kb = gerar_kb_sintetica(chunks)
+    config_gemini = ConfiguracaoFake(latencia_gemini_ms, taxa_429=taxa_429, taxa_503=taxa_503, intervalo_stream_ms=intervalo_stream_ms)
+    config_supabase = ConfiguracaoFake(latencia_supabase_ms, taxa_503=taxa_503)
+
+    with ExitStack() as pilha:
+        gemini = pilha.enter_context(ServidorGeminiFake(kb, config_gemini))
+        postgrest = pilha.enter_context(ServidorPostgrestFake(kb, config_supabase))
+        pilha.enter_context(patch.dict(os.environ, variaveis_ambiente(gemini, postgrest)))
+        # Sem snapshot local: a recuperação passa pelo PostgREST falso, como um deploy sem snapshot
+        pilha.enter_context(patch("src.core.db.retrieval.USAR_SNAPSHOT_KB", False))
+        pilha.enter_context(_instrumentar_streaming())
+        if sem_digitacao:
+            # Remove o efeito de digitação (9 ms por caractere) para medir só o custo do servidor
+            sem_pausa = lambda texto: iter([texto])  # noqa: E731
+            pilha.enter_context(patch("src.app.ui.stream_resposta", sem_pausa))
+
+        from src.core.cache import limpar_caches
+        from src.core.db.client import get_db_client
+        from src.core.genai import cliente_gemini
+
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        limpar_caches()
+        get_db_client.cache_clear()
+        cliente_gemini.cache_clear()
+
+        # Aquecimento: importações e caches do processo não entram na medição do 1º nível
+        executar_nivel(1, conversa[:1])
+
+        curva = []
+        for sessoes in niveis:
+            nivel = executar_nivel(sessoes, conversa)
+            curva.append(nivel)
+            print(
+                f"⏱️  N={sessoes:<3} vazão {nivel['vazao_turnos_s']:>6.2f} turnos/s | turno p50 {nivel['turno_ms']['p50']:>8.0f} ms "
+                f"p95 {nivel['turno_ms']['p95']:>8.0f} ms | TTFT p95 {nivel['ttft_ms']['p95']:>7.0f} ms | "
+                f"rerun ocioso p95 {nivel['rerun_ocioso_ms']['p95']:>6.0f} ms | CPU {nivel['cpu_utilizacao']:.2f} | erros {nivel['erros']}"
+            )
+
+        contadores = {"gemini": gemini.contadores, "supabase": postgrest.contadores}
+
+    dentro_slo = [nivel["sessoes"] for nivel in curva if nivel["turno_ms"]["p95"] <= slo_p95_ms and not nivel["erros"]]
+    return {
+        "metadados": {
+            "data": datetime.now(timezone.utc).isoformat(),
+            "git": _versao_git(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "streamlit": st.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {
+            "niveis": niveis,
+            "turnos_por_sessao": len(conversa),
+            "chunks_kb": chunks,
+            "latencia_gemini_ms": latencia_gemini_ms,
+            "latencia_supabase_ms": latencia_supabase_ms,
+            "intervalo_stream_ms": intervalo_stream_ms,
+            "taxa_429": taxa_429,
+            "taxa_503": taxa_503,
+            "sem_digitacao": sem_digitacao,
+            "slo_p95_ms": slo_p95_ms,
+        },
+        "curva": curva,
+        "capacidade_sessoes": max(dentro_slo) if dentro_slo else 0,
+        "requisicoes_servicos": {nome: {str(k): v for k, v in c.items()} for nome, c in contadores.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do vox_ai.py com sessões simultâneas e serviços falsos.")
+    parser.add_argument("--niveis", default="1,2,4,8", help="Níveis de concorrência (sessões simultâneas), separados por vírgula.")
+    parser.add_argument("--turnos", type=int, default=len(CONVERSA_PADRAO), help="Turnos por sessão (da conversa padrão).")
+    parser.add_argument("--conversa", type=Path, default=None, help='JSON com a lista de turnos: [{"texto": "..."}, {"audio": true}].')
+    parser.add_argument("--chunks", type=int, default=2000, help="Tamanho da KB sintética.")
+    parser.add_argument("--latencia-gemini-ms", type=float, default=300.0)
+    parser.add_argument("--latencia-supabase-ms", type=float, default=20.0)
+    parser.add_argument("--intervalo-stream-ms", type=float, default=40.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-503", type=float, default=0.0)
+    parser.add_argument("--sem-digitacao", action="store_true", help="Desliga o efeito de digitação da resposta.")
+    parser.add_argument("--slo-p95-ms", type=float, default=10_000.0, help="SLO de p95 do turno completo para a capacidade.")
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON de saída (padrão: benchmarks/resultados/<data>.json).")
+    args = parser.parse_args()
+
+    conversa = json.loads(args.conversa.read_text(encoding="utf-8")) if args.conversa else CONVERSA_PADRAO[: args.turnos]
+    niveis = [int(n) for n in args.niveis.split(",") if n.strip()]
+
+    relatorio = executar_carga(
+        niveis,
+        conversa,
+        args.chunks,
+        args.latencia_gemini_ms,
+        args.latencia_supabase_ms,
+        args.intervalo_stream_ms,
+        args.taxa_429,
+        args.taxa_503,
+        args.sem_digitacao,
+        args.slo_p95_ms,
+    )
+    print(f"📈 Capacidade estimada: {relatorio['capacidade_sessoes']} sessões simultâneas (turno p95 <= {args.slo_p95_ms:.0f} ms)")
+
+    saida = args.saida or DIRETORIO_RESULTADOS / f"carga-{datetime.now():%Y%m%d-%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"✅ Relatório gravado em {saida}")
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark do empacotamento de contexto (src/core/contexto.py) na expansão de um tópico.
+
+Cenários (MAX_CHUNCK chunks de um tópico por turno):
+    vetor_completo_texto -> chunks com o 'embedding' completo em texto, como o PostgREST devolvia
+                            antes: o turno baixa e converte TAMANHO_VETOR_SEMANTICO floats por chunk
+    prefixo_cacheado     -> chunks com o 'embedding_curto' já convertido em float32, como saem do
+                            cache de '_chunks_topico_db' (só TAMANHO_VETOR_CURTO dimensões baixadas)
+
+Para cada cenário são medidos p50/p95 de 'empacotar_contexto' e os bytes de vetores por turno.
+Com --limite-ms, o processo termina com erro se o p95 do 'prefixo_cacheado' passar do limite.
+
+Uso:
+    python -m benchmarks.empacotamento --repeticoes 200
+    python -m benchmarks.empacotamento --chunks 25 --limite-ms 5
+"""
+
+import argparse
+import sys
+import time
+from typing import Any
+
+import numpy as np
+
+from src.config import MAX_CHUNCK, TAMANHO_VETOR_CURTO
+from src.core.contexto import empacotar_contexto, vetor_numpy
+
+from benchmarks.kb_sintetica import gerar_consultas, gerar_kb_sintetica
+
+CENARIOS = ("vetor_completo_texto", "prefixo_cacheado")
+
+
+def _percentis(amostras_ms: list[float]) -> dict[str, float]:
+    valores = np.asarray(amostras_ms)
+    return {
+        "p50": round(float(np.percentile(valores, 50)), 4),
+        "p95": round(float(np.percentile(valores, 95)), 4),
+        "n": len(amostras_ms),
+    }
+
+
+def _texto_vetor(vetor: np.ndarray) -> str:
+    return "[" + ",".join(map(str, vetor.tolist())) + "]"
+
+
+def executar_benchmark(chunks: int = MAX_CHUNCK, repeticoes: int = 100, semente: int = 42) -> dict[str, Any]:
+    """
+    Mede o empacotamento de um tópico com 'chunks' candidatos nos dois cenários.
+
+    Returns:
+        dict[str, Any]: Relatório com latência (ms) e bytes de vetores por turno de cada cenário.
+    """
+    kb = gerar_kb_sintetica(chunks, total_topicos=1, semente=semente)
+    consulta = gerar_consultas(kb, 1, fracao_ruido=0.0)[0]["vetor"].tolist()
+
+    completos = [
+        {"kb_id": kb.kb_ids[i], "descricao": kb.descricoes[i], "embedding": _texto_vetor(kb.embeddings[i])}
+        for i in range(chunks)
+    ]
+    prefixos_texto = [_texto_vetor(kb.embeddings[i, :TAMANHO_VETOR_CURTO]) for i in range(chunks)]
+    cacheados = [
+        {"kb_id": kb.kb_ids[i], "descricao": kb.descricoes[i], "embedding_curto": vetor_numpy(prefixos_texto[i])}
+        for i in range(chunks)
+    ]
+
+    dados = {
+        "vetor_completo_texto": (completos, sum(len(c["embedding"]) for c in completos)),
+        "prefixo_cacheado": (cacheados, sum(len(texto) for texto in prefixos_texto)),
+    }
+
+    relatorio: dict[str, Any] = {"parametros": {"chunks": chunks, "repeticoes": repeticoes}, "cenarios": {}}
+    for nome in CENARIOS:
+        candidatos, bytes_vetores = dados[nome]
+        empacotar_contexto(candidatos, consulta)  # aquecimento
+        amostras = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            empacotar_contexto(candidatos, consulta)
+            amostras.append((time.perf_counter() - inicio) * 1000)
+        relatorio["cenarios"][nome] = {"latencia_ms": _percentis(amostras), "bytes_vetores_turno": bytes_vetores}
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark do empacotamento de contexto (MMR) na expansão de tópico.")
+    parser.add_argument("--chunks", type=int, default=MAX_CHUNCK, help="Chunks candidatos por turno.")
+    parser.add_argument("--repeticoes", type=int, default=100, help="Execuções medidas por cenário.")
+    parser.add_argument("--limite-ms", type=float, default=None, help="p95 máximo aceito para o cenário 'prefixo_cacheado'.")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    relatorio = executar_benchmark(args.chunks, args.repeticoes, args.semente)
+    for nome, dados in relatorio["cenarios"].items():
+        latencia = dados["latencia_ms"]
+        print(f"⏱️  {nome:<22} p50 {latencia['p50']:>8.3f} ms | p95 {latencia['p95']:>8.3f} ms | vetores/turno {dados['bytes_vetores_turno'] / 1024:>7.1f} KB")
+
+    p95 = relatorio["cenarios"]["prefixo_cacheado"]["latencia_ms"]["p95"]
+    if args.limite_ms is not None and p95 > args.limite_ms:
+        print(f"❌ p95 do empacotamento ({p95:.3f} ms) acima do limite de {args.limite_ms:.3f} ms.")
+        sys.exit(1)
@@ -0,0 +1,246 @@
+"""
+Base de conhecimento sintética e cliente Supabase falso para os benchmarks de recuperação.
+
+Os chunks são agrupados em tópicos: cada tópico tem um centróide aleatório e os embeddings dos
+seus chunks são o centróide somado a um ruído gaussiano. O tamanho dos tópicos segue uma cauda
+longa (poucos tópicos grandes, muitos pequenos), de modo que as consultas exercitam tanto a
+expansão por tópico quanto o fallback por fragmentos.
+"""
+
+import time
+from typing import Any
+
+import numpy as np
+
+from src.config import MODELO_SEMANTICO_NOME, TAMANHO_VETOR_CURTO, TAMANHO_VETOR_SEMANTICO
+from src.core.db.snapshot import SnapshotKB
+
+# Gera os embeddings em blocos para limitar a memória temporária em KBs grandes
+TAMANHO_BLOCO = 50_000
+
+VOCABULARIO = (
+    "direito saúde nome social retificação cartório documento atendimento sus processo "
+    "hormonização defensoria denúncia violência acolhimento emprego educação moradia "
+    "assistência benefício prazo endereço telefone serviço centro referência orientação"
+).split()
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+class KBSintetica:
+    """
+    Base de conhecimento sintética, com as mesmas colunas usadas pela recuperação
+    (kb_id, topico, eixo_tematico, descricao e embedding normalizado).
+    """
+
+    def __init__(self, embeddings: np.ndarray, topicos: list[str], descricoes: list[str], centroides: np.ndarray):
+        self.embeddings = embeddings
+        self.kb_ids = [f"bench-kb-{i:07d}" for i in range(len(topicos))]
+        self.topicos = topicos
+        self.eixos = ["Eixo sintético"] * len(topicos)
+        self.descricoes = descricoes
+        self.centroides = centroides
+        self.nomes_topicos = [f"Tópico {i:05d}" for i in range(len(centroides))]
+
+    def __len__(self) -> int:
+        return len(self.kb_ids)
+
+    @property
+    def bytes_embeddings(self) -> int:
+        return int(self.embeddings.nbytes)
+
+    def como_snapshot(self) -> SnapshotKB:
+        """
+        Expõe a KB como um 'SnapshotKB' em memória (mesma busca usada pelo app com o snapshot local).
+        """
+        manifesto = {
+            "versao": "benchmark",
+            "modelo": MODELO_SEMANTICO_NOME,
+            "dimensao": self.embeddings.shape[1],
+            "total": len(self),
+        }
+        metadados = {
+            "kb_id": self.kb_ids,
+            "topico": self.topicos,
+            "eixo_tematico": self.eixos,
+            "descricao": self.descricoes,
+        }
+        return SnapshotKB(manifesto, self.embeddings, metadados)
+
+    def top_k_exato(self, consulta: np.ndarray, k: int, threshold: float | None = None) -> list[str]:
+        """
+        Vizinhos exatos por similaridade de cosseno (referência do recall).
+        """
+        similaridades = self.embeddings @ consulta
+        k = min(k, len(similaridades))
+        melhores = np.argpartition(-similaridades, k - 1)[:k]
+        melhores = melhores[np.argsort(-similaridades[melhores])]
+        if threshold is not None:
+            melhores = melhores[similaridades[melhores] > threshold]
+        return [self.kb_ids[i] for i in melhores]
+
+
+def gerar_kb_sintetica(total_chunks: int, total_topicos: int | None = None, dimensao: int = TAMANHO_VETOR_SEMANTICO, dispersao: float = 0.9, caracteres_descricao: int = 400, semente: int = 42) -> KBSintetica:
+    """
+    Gera uma base de conhecimento sintética.
+
+    Args:
+        total_chunks (int): Quantidade de chunks.
+        total_topicos (int | None): Quantidade de tópicos (padrão: um a cada 20 chunks).
+        dimensao (int): Dimensão dos embeddings.
+        dispersao (float): Norma relativa do ruído somado ao centróide; maior = tópicos menos coesos.
+        caracteres_descricao (int): Tamanho aproximado do texto de cada chunk.
+        semente (int): Semente do gerador aleatório.
+
+    Returns:
+        KBSintetica: A base gerada.
+    """
+    rng = np.random.default_rng(semente)
+    total_topicos = total_topicos or max(1, total_chunks // 20)
+
+    centroides = _normalizar(rng.standard_normal((total_topicos, dimensao), dtype=np.float32))
+
+    # Cauda longa: pesos de Pareto definem a probabilidade de cada tópico
+    pesos = rng.pareto(1.2, total_topicos) + 1.0
+    indices_topicos = rng.choice(total_topicos, size=total_chunks, p=pesos / pesos.sum())
+
+    embeddings = np.empty((total_chunks, dimensao), dtype=np.float32)
+    desvio = dispersao / np.sqrt(dimensao)
+    for inicio in range(0, total_chunks, TAMANHO_BLOCO):
+        fim = min(inicio + TAMANHO_BLOCO, total_chunks)
+        bloco = centroides[indices_topicos[inicio:fim]] + rng.standard_normal((fim - inicio, dimensao), dtype=np.float32) * desvio
+        embeddings[inicio:fim] = _normalizar(bloco)
+
+    palavras = np.asarray(VOCABULARIO)
+    total_palavras = max(1, caracteres_descricao // 10)
+    sorteio = rng.integers(0, len(palavras), size=(total_chunks, total_palavras))
+    descricoes = [f"Chunk {i} do tópico {t}: " + " ".join(palavras[linha]) for i, (t, linha) in enumerate(zip(indices_topicos, sorteio))]
+
+    topicos = [f"Tópico {t:05d}" for t in indices_topicos]
+    return KBSintetica(embeddings, topicos, descricoes, centroides)
+
+
+def gerar_consultas(kb: KBSintetica, total: int, k: int = 10, dispersao: float = 0.7, fracao_ruido: float = 0.1, semente: int = 7) -> list[dict[str, Any]]:
+    """
+    Gera consultas rotuladas: a maioria parte do centróide de um tópico existente (ruído gaussiano),
+    e uma fração é ruído puro, sem tópico correspondente na KB.
+
+    Returns:
+        list[dict[str, Any]]: Consultas com 'vetor' (normalizado), 'topico' (ou None) e
+            'relevantes' (kb_ids do top-k exato).
+    """
+    rng = np.random.default_rng(semente)
+    dimensao = kb.embeddings.shape[1]
+    topicos_presentes = sorted({int(t.rsplit(" ", 1)[-1]) for t in kb.topicos})
+
+    consultas = []
+    for _ in range(total):
+        if rng.random() < fracao_ruido:
+            topico = None
+            vetor = rng.standard_normal(dimensao, dtype=np.float32)
+        else:
+            idx = int(rng.choice(topicos_presentes))
+            topico = kb.nomes_topicos[idx]
+            vetor = kb.centroides[idx] + rng.standard_normal(dimensao, dtype=np.float32) * (dispersao / np.sqrt(dimensao))
+        vetor = _normalizar(vetor.astype(np.float32))
+        consultas.append({"vetor": vetor, "topico": topico, "relevantes": kb.top_k_exato(vetor, k)})
+    return consultas
+
+
+class _Resposta:
+    def __init__(self, data: list[dict[str, Any]]):
+        self.data = data
+
+
+class _Execucao:
+    def __init__(self, cliente: "ClienteSupabaseFake", executar):
+        self._cliente = cliente
+        self._executar = executar
+
+    def execute(self) -> _Resposta:
+        self._cliente.simular_latencia()
+        return _Resposta(self._executar())
+
+
+class _ConsultaTabela:
+    """
+    Subconjunto encadeável do query builder do PostgREST usado pela recuperação: select().eq().limit().execute().
+    """
+
+    def __init__(self, cliente: "ClienteSupabaseFake", tabela: str):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._filtros: dict[str, Any] = {}
+        self._limite: int | None = None
+        self._colunas = ["kb_id", "descricao", "embedding"]
+
+    def select(self, colunas: str = "*") -> "_ConsultaTabela":
+        if colunas != "*":
+            self._colunas = [c.strip() for c in colunas.split(",")]
+        return self
+
+    def eq(self, coluna: str, valor: Any) -> "_ConsultaTabela":
+        self._filtros[coluna] = valor
+        return self
+
+    def limit(self, limite: int) -> "_ConsultaTabela":
+        self._limite = limite
+        return self
+
+    def execute(self) -> _Resposta:
+        self._cliente.simular_latencia()
+        if self._tabela != "knowledge_base" or set(self._filtros) != {"topico"}:
+            raise NotImplementedError(f"Consulta não suportada pelo cliente falso: {self._tabela} {self._filtros}")
+
+        kb = self._cliente.kb
+        indices = self._cliente.snapshot.indice_topicos.get(self._filtros["topico"], [])[: self._limite]
+        # O PostgREST devolve colunas 'vector'/'halfvec' como texto; o custo de conversão faz parte da medição
+        colunas = {
+            "kb_id": lambda i: kb.kb_ids[i],
+            "descricao": lambda i: kb.descricoes[i],
+            "embedding": lambda i: "[" + ",".join(map(str, kb.embeddings[i].tolist())) + "]",
+            "embedding_curto": lambda i: "[" + ",".join(map(str, kb.embeddings[i, :TAMANHO_VETOR_CURTO].tolist())) + "]",
+        }
+        return _Resposta([{coluna: colunas[coluna](i) for coluna in self._colunas} for i in indices])
+
+
+class ClienteSupabaseFake:
+    """
+    Substituto em memória do cliente Supabase para as chamadas da recuperação:
+    rpc('match_knowledge_base'), rpc('buscar_digesto_topico') e table('knowledge_base').select().eq().limit().
+
+    Args:
+        kb (KBSintetica): Base de conhecimento servida.
+        latencia_ms (float): Latência simulada por ida ao banco.
+        digestos (dict[str, dict] | None): Digestos por tópico, no formato da RPC 'buscar_digesto_topico'.
+    """
+
+    def __init__(self, kb: KBSintetica, latencia_ms: float = 0.0, digestos: dict[str, dict] | None = None):
+        self.kb = kb
+        self.snapshot = kb.como_snapshot()
+        self.latencia_ms = latencia_ms
+        self.digestos = digestos or {}
+        self.chamadas = 0
+
+    def simular_latencia(self) -> None:
+        self.chamadas += 1
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+
+    def rpc(self, nome: str, params: dict[str, Any]) -> _Execucao:
+        if nome == "match_knowledge_base":
+            return _Execucao(
+                self,
+                lambda: self.snapshot.buscar(params["query_embedding"], params["match_threshold"], params["match_count"], params.get("filter_topic")),
+            )
+        if nome == "buscar_digesto_topico":
+            digesto = self.digestos.get(params["alvo"])
+            return _Execucao(self, lambda: [digesto] if digesto else [])
+        raise NotImplementedError(f"RPC não suportada pelo cliente falso: {nome}")
+
+    def table(self, nome: str) -> _ConsultaTabela:
+        return _ConsultaTabela(self, nome)
@@ -0,0 +1,357 @@
+"""
+Micro-benchmark da recuperação de contexto (src/core/db/retrieval.py), totalmente offline.
+
+Cenários:
+    pipeline_supabase      -> 'recuperar_contexto_inteligente' contra o cliente Supabase falso
+    pipeline_snapshot      -> 'recuperar_contexto_inteligente' servida pelo snapshot local em memória
+    indice_exato           -> busca exata do 'SnapshotKB' (numpy), isolada
+    indice_prefixo_halfvec -> simulação da busca em dois estágios da 'match_knowledge_base'
+                              (prefixo halfvec + reordenação com o vetor completo)
+
+Para cada cenário são medidos p50/p95 da latência, tempo por estágio (votação, expansão e
+fallback), recall@k contra a busca exata e memória (pico do tracemalloc e RSS do processo).
+
+Uso:
+    python -m benchmarks.recuperacao --chunks 10000 --consultas 200
+    python -m benchmarks.recuperacao --chunks 100000 --comparar benchmarks/resultados/anterior.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+import numpy as np
+
+import src.core.db.retrieval as retrieval
+from src.config import LIMITE_TEMAS, SEMANTICA_THRESHOLD, TAMANHO_VETOR_CURTO, logger
+
+from benchmarks.kb_sintetica import ClienteSupabaseFake, KBSintetica, gerar_consultas, gerar_kb_sintetica
+
+DIRETORIO_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+CENARIOS = ("pipeline_supabase", "pipeline_snapshot", "indice_exato", "indice_prefixo_halfvec")
+
+# Funções de 'retrieval' cronometradas individualmente; o restante do tempo é a votação/orquestração
+ESTAGIOS = {
+    "buscar_referencias_db": "busca_inicial",
+    "buscar_digesto_topico": "digesto",
+    "buscar_chunks_por_topico": "expansao",
+    "empacotar_contexto": "empacotamento",
+}
+
+# Quantidade de consultas repetidas sob tracemalloc (que distorce a latência, por isso roda à parte)
+CONSULTAS_MEMORIA = 20
+
+
+def _percentis(amostras_ms: list[float]) -> dict[str, float]:
+    if not amostras_ms:
+        return {"p50": 0.0, "p95": 0.0, "media": 0.0, "n": 0}
+    valores = np.asarray(amostras_ms)
+    return {
+        "p50": round(float(np.percentile(valores, 50)), 4),
+        "p95": round(float(np.percentile(valores, 95)), 4),
+        "media": round(float(valores.mean()), 4),
+        "n": len(amostras_ms),
+    }
+
+
+def _recall(obtidos: list[str], relevantes: list[str]) -> float | None:
+    if not relevantes:
+        return None
+    return len(set(obtidos) & set(relevantes)) / len(relevantes)
+
+
+def _media(valores: list[float | None]) -> float | None:
+    validos = [v for v in valores if v is not None]
+    return round(float(np.mean(validos)), 4) if validos else None
+
+
+def _rss_maximo_mb() -> float:
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _medir_memoria(executar: Callable[[dict], Any], consultas: list[dict]) -> float:
+    """
+    Pico de memória alocada (MB) ao executar algumas consultas sob tracemalloc.
+    """
+    tracemalloc.start()
+    try:
+        for consulta in consultas[:CONSULTAS_MEMORIA]:
+            executar(consulta)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(pico / (1024 * 1024), 3)
+
+
+class _Cronometro:
+    """
+    Envolve as funções de 'retrieval' listadas em ESTAGIOS, acumulando o tempo de cada uma na consulta atual.
+    """
+
+    def __init__(self):
+        self.atual: dict[str, float] = {}
+
+    def envolver(self, nome: str, funcao: Callable) -> Callable:
+        estagio = ESTAGIOS[nome]
+
+        def _cronometrada(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                self.atual[estagio] = self.atual.get(estagio, 0.0) + (time.perf_counter() - inicio) * 1000
+
+        return _cronometrada
+
+
+def executar_pipeline(kb: KBSintetica, consultas: list[dict], usar_snapshot: bool, latencia_ms: float = 0.0) -> dict[str, Any]:
+    """
+    Cronometra 'recuperar_contexto_inteligente' (sem memória de sessão) sobre as consultas rotuladas.
+    """
+    cliente = ClienteSupabaseFake(kb, latencia_ms=latencia_ms)
+    snapshot = cliente.snapshot if usar_snapshot else None
+    cronometro = _Cronometro()
+
+    with ExitStack() as pilha:
+        pilha.enter_context(patch.object(retrieval.db_client, "get_db_client", return_value=cliente))
+        pilha.enter_context(patch.object(retrieval, "_snapshot_kb", return_value=snapshot))
+        for nome in ESTAGIOS:
+            pilha.enter_context(patch.object(retrieval, nome, cronometro.envolver(nome, getattr(retrieval, nome))))
+
+        def _executar(consulta: dict) -> tuple:
+            return retrieval.recuperar_contexto_inteligente(consulta["vetor"].tolist())
+
+        latencias = []
+        estagios: dict[str, list[float]] = {estagio: [] for estagio in ESTAGIOS.values()}
+        estagios["votacao_e_orquestracao"] = []
+        estrategias = Counter()
+        recalls = []
+        tokens = []
+
+        for consulta in consultas:
+            cronometro.atual = {}
+            inicio = time.perf_counter()
+            texto, fonte, ids = _executar(consulta)
+            total = (time.perf_counter() - inicio) * 1000
+
+            latencias.append(total)
+            for estagio, duracao in cronometro.atual.items():
+                estagios[estagio].append(duracao)
+            estagios["votacao_e_orquestracao"].append(total - sum(cronometro.atual.values()))
+            estrategias[fonte.split(":")[0].split(" (")[0]] += 1
+
+            usados = [item["kb_id"] for item in ids or [] if not item.get("descartado")]
+            recalls.append(_recall(usados, consulta["relevantes_threshold"]))
+            tokens.append(sum(item.get("tokens") or 0 for item in ids or [] if not item.get("descartado")))
+
+        pico_mb = _medir_memoria(_executar, consultas)
+
+    return {
+        "latencia_ms": _percentis(latencias),
+        "estagios_ms": {estagio: _percentis(valores) for estagio, valores in estagios.items() if valores},
+        "recall_contexto": _media(recalls),
+        "tokens_contexto_medio": _media(tokens),
+        "estrategias": dict(estrategias),
+        "chamadas_banco": cliente.chamadas,
+        "memoria_pico_mb": pico_mb,
+    }
+
+
+def executar_indice_exato(kb: KBSintetica, consultas: list[dict], k: int) -> dict[str, Any]:
+    """
+    Cronometra a busca exata em memória do 'SnapshotKB', sem threshold.
+    """
+    snapshot = kb.como_snapshot()
+
+    def _executar(consulta: dict) -> list[str]:
+        return [row["id"] for row in snapshot.buscar(consulta["vetor"], -1.0, k)]
+
+    latencias = []
+    recalls = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        obtidos = _executar(consulta)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        recalls.append(_recall(obtidos, consulta["relevantes"]))
+
+    return {
+        "latencia_ms": _percentis(latencias),
+        "recall_at_k": _media(recalls),
+        "memoria_pico_mb": _medir_memoria(_executar, consultas),
+        "bytes_indice": kb.bytes_embeddings,
+    }
+
+
+def executar_indice_prefixo(kb: KBSintetica, consultas: list[dict], k: int) -> dict[str, Any]:
+    """
+    Cronometra a simulação da busca em dois estágios: candidatos pelo prefixo em float16 e
+    reordenação exata pelo vetor completo (mesmo número de candidatos da 'match_knowledge_base').
+
+    O ruído dos embeddings sintéticos é isotrópico, ao contrário dos embeddings Matryoshka reais,
+    que concentram a informação no prefixo: o recall medido aqui é um limite inferior. A latência
+    também não representa o HNSW do Postgres (numpy não acelera float16).
+    """
+    prefixos = kb.embeddings[:, :TAMANHO_VETOR_CURTO].astype(np.float16)
+    normas = np.linalg.norm(prefixos.astype(np.float32), axis=1)
+    normas[normas == 0] = 1.0
+    prefixos = (prefixos / normas[:, None]).astype(np.float16)
+    n_candidatos = min(max(k * 4, 40), len(kb))
+
+    def _executar(consulta: dict) -> list[str]:
+        curta = consulta["vetor"][:TAMANHO_VETOR_CURTO].astype(np.float16)
+        similaridades = (prefixos @ curta).astype(np.float32)
+        candidatos = np.argpartition(-similaridades, n_candidatos - 1)[:n_candidatos]
+        reordenados = candidatos[np.argsort(-(kb.embeddings[candidatos] @ consulta["vetor"]))][:k]
+        return [kb.kb_ids[i] for i in reordenados]
+
+    latencias = []
+    recalls = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        obtidos = _executar(consulta)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        recalls.append(_recall(obtidos, consulta["relevantes"]))
+
+    return {
+        "latencia_ms": _percentis(latencias),
+        "recall_at_k": _media(recalls),
+        "memoria_pico_mb": _medir_memoria(_executar, consultas),
+        "bytes_indice": int(prefixos.nbytes),
+    }
+
+
+def _versao_git() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def executar_benchmark(chunks: int = 10_000, topicos: int | None = None, consultas: int = 200, k: int = LIMITE_TEMAS, latencia_ms: float = 0.0, cenarios: tuple[str, ...] = CENARIOS, semente: int = 42) -> dict[str, Any]:
+    """
+    Gera a KB sintética e as consultas rotuladas e executa os cenários pedidos.
+
+    Returns:
+        dict[str, Any]: Relatório serializável em JSON.
+    """
+    inicio = time.perf_counter()
+    kb = gerar_kb_sintetica(chunks, topicos, semente=semente)
+    lista_consultas = gerar_consultas(kb, consultas, k=k, semente=semente + 1)
+    for consulta in lista_consultas:
+        consulta["relevantes_threshold"] = kb.top_k_exato(consulta["vetor"], k, threshold=SEMANTICA_THRESHOLD)
+    geracao_s = time.perf_counter() - inicio
+
+    relatorio: dict[str, Any] = {
+        "metadados": {
+            "data": datetime.now(timezone.utc).isoformat(),
+            "git": _versao_git(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+        },
+        "parametros": {
+            "chunks": chunks,
+            "topicos": len(kb.centroides),
+            "consultas": consultas,
+            "k": k,
+            "threshold": SEMANTICA_THRESHOLD,
+            "latencia_banco_ms": latencia_ms,
+            "semente": semente,
+        },
+        "geracao_kb_s": round(geracao_s, 3),
+        "cenarios": {},
+    }
+
+    execucoes = {
+        "pipeline_supabase": lambda: executar_pipeline(kb, lista_consultas, usar_snapshot=False, latencia_ms=latencia_ms),
+        "pipeline_snapshot": lambda: executar_pipeline(kb, lista_consultas, usar_snapshot=True),
+        "indice_exato": lambda: executar_indice_exato(kb, lista_consultas, k),
+        "indice_prefixo_halfvec": lambda: executar_indice_prefixo(kb, lista_consultas, k),
+    }
+
+    nivel_original = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for nome in cenarios:
+            relatorio["cenarios"][nome] = execucoes[nome]()
+    finally:
+        logger.setLevel(nivel_original)
+
+    relatorio["rss_maximo_mb"] = _rss_maximo_mb()
+    return relatorio
+
+
+def comparar_relatorios(atual: dict[str, Any], anterior: dict[str, Any]) -> list[str]:
+    """
+    Compara p50/p95 e recall de cada cenário presente nos dois relatórios.
+
+    Returns:
+        list[str]: Linhas legíveis com as variações.
+    """
+    linhas = []
+    for nome, dados in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(nome)
+        if not antes:
+            continue
+        for percentil in ("p50", "p95"):
+            novo = dados["latencia_ms"][percentil]
+            velho = antes["latencia_ms"][percentil]
+            variacao = (novo - velho) / velho * 100 if velho else 0.0
+            linhas.append(f"{nome} {percentil}: {velho:.3f} -> {novo:.3f} ms ({variacao:+.1f}%)")
+        for chave in ("recall_at_k", "recall_contexto"):
+            if dados.get(chave) is not None and antes.get(chave) is not None:
+                linhas.append(f"{nome} {chave}: {antes[chave]:.4f} -> {dados[chave]:.4f}")
+    return linhas
+
+
+def _imprimir_resumo(relatorio: dict[str, Any]) -> None:
+    parametros = relatorio["parametros"]
+    print(f"📊 KB sintética: {parametros['chunks']} chunks, {parametros['topicos']} tópicos | {parametros['consultas']} consultas | k={parametros['k']}")
+    for nome, dados in relatorio["cenarios"].items():
+        latencia = dados["latencia_ms"]
+        recall = dados.get("recall_at_k", dados.get("recall_contexto"))
+        recall_txt = f"{recall:.3f}" if recall is not None else "-"
+        print(f"⏱️  {nome:<24} p50 {latencia['p50']:>9.3f} ms | p95 {latencia['p95']:>9.3f} ms | recall {recall_txt} | pico {dados['memoria_pico_mb']:.1f} MB")
+    print(f"💾 RSS máximo do processo: {relatorio['rss_maximo_mb']} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline da recuperação de contexto com KB sintética.")
+    parser.add_argument("--chunks", type=int, default=10_000, help="Tamanho da KB sintética (1k a 1M).")
+    parser.add_argument("--topicos", type=int, default=None, help="Quantidade de tópicos (padrão: chunks/20).")
+    parser.add_argument("--consultas", type=int, default=200, help="Quantidade de consultas rotuladas.")
+    parser.add_argument("-k", type=int, default=LIMITE_TEMAS, help="Tamanho do top-k (recall@k).")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência simulada por ida ao banco falso.")
+    parser.add_argument("--cenario", action="append", choices=CENARIOS, help="Executa apenas o cenário informado (pode repetir).")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", type=Path, default=None, help="Arquivo JSON de saída (padrão: benchmarks/resultados/<data>.json).")
+    parser.add_argument("--comparar", type=Path, default=None, help="Relatório JSON anterior para comparação.")
+    args = parser.parse_args()
+
+    relatorio = executar_benchmark(args.chunks, args.topicos, args.consultas, args.k, args.latencia_ms, tuple(args.cenario or CENARIOS), args.semente)
+    _imprimir_resumo(relatorio)
+
+    saida = args.saida or DIRETORIO_RESULTADOS / f"recuperacao-{datetime.now():%Y%m%d-%H%M%S}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"✅ Relatório gravado em {saida}")
+
+    if args.comparar:
+        print("-" * 50)
+        for linha in comparar_relatorios(relatorio, json.loads(args.comparar.read_text(encoding="utf-8"))):
+            print(f"🔁 {linha}")
@@ -0,0 +1,428 @@
+"""
+Replay de tráfego real para comparar latência, tokens e contexto entre duas versões do código
+ou duas configurações, antes de um rollout.
+
+Etapas:
+    exportar  -> amostra anonimizada dos prompts de 'chat_logs' (apenas dos últimos 12 meses,
+                 como na política de retenção da LGPD) em um arquivo de trace local
+    executar  -> reexecuta o trace (embedding -> recuperação -> geração) em duas variantes (A e B)
+                 e reporta as diferenças por etapa
+
+Cada variante roda em um subprocesso próprio, importando 'src' da raiz informada: a árvore atual
+ou um 'git worktree' de outra ref (--ref-a/--ref-b). Overrides de configuração (--config-a/--config-b)
+são aplicados em 'src.config' antes de importar o restante do app, de modo que também valem para
+os valores padrão de parâmetros (ex: CONTEXTO_ORCAMENTO_TOKENS).
+
+Uso:
+    python -m benchmarks.replay exportar --amostra 300
+    python -m benchmarks.replay executar --trace benchmarks/traces/trace.json --config-b '{"SEMANTICA_THRESHOLD": 0.6}'
+    python -m benchmarks.replay executar --trace benchmarks/traces/trace.json --ref-a main --backend real --concorrencia 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+RAIZ = Path(__file__).resolve().parent.parent
+DIRETORIO_TRACES = Path(__file__).resolve().parent / "traces"
+DIRETORIO_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+# Mesma janela do descarte semanal (supabase/migrations/20260603214500_setup_lgpd_cron.sql)
+RETENCAO_MESES = 12
+TAMANHO_PAGINA = 1000
+LIMITE_EXPORTACAO = 20_000
+ETAPAS = ("embedding", "recuperacao", "ttft", "geracao", "total")
+
+# Substituições aplicadas aos prompts exportados, na ordem (dados que a política pede para não coletar)
+PADROES_PII = [
+    (re.compile(r"https?://\S+"), "[URL]"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[EMAIL]"),
+    (re.compile(r"\b\d{3}\.?\d{3}\.?\d{3}-?\d{2}\b"), "[CPF]"),
+    (re.compile(r"(?:\+?55\s?)?\(?\b\d{2}\)?\s?9?\d{4}[-\s]?\d{4}\b"), "[TELEFONE]"),
+    (re.compile(r"\b\d{5}-?\d{3}\b"), "[CEP]"),
+    (re.compile(r"\d{6,}"), "[NUMERO]"),
+    (re.compile(r"\b((?i:meu nome (?:é|e)|me chamo|pode me chamar de))\s+[A-ZÀ-Ý][\wÀ-ÿ]*(?:\s+(?:(?:d[aeo]s?|e)\s+)?[A-ZÀ-Ý][\wÀ-ÿ]*)*"), r"\1 [NOME]"),
+]
+
+
+def anonimizar_prompt(prompt: str) -> str:
+    """
+    Remove dados pessoais identificáveis (e-mail, CPF, telefone, CEP, URLs, números longos e nomes
+    autodeclarados) de um prompt antes de gravá-lo no trace.
+    """
+    texto = prompt
+    for padrao, substituto in PADROES_PII:
+        texto = padrao.sub(substituto, texto)
+    return " ".join(texto.split())
+
+
+def _limite_retencao(agora: datetime | None = None) -> datetime:
+    return (agora or datetime.now(timezone.utc)) - timedelta(days=30 * RETENCAO_MESES)
+
+
+def exportar_trace(amostra: int, saida: Path, semente: int = 42) -> Path:
+    """
+    Exporta uma amostra anonimizada de prompts reais de 'chat_logs' para um trace local.
+    Não são exportados session_id, chat_id nem respostas; a data é reduzida ao mês.
+    """
+    sys.path.insert(0, str(RAIZ))
+    from supabase import create_client
+
+    from src.config import get_secret
+
+    print("🔌 Conectando ao Supabase...")
+    supabase = create_client(get_secret("supabase.url"), get_secret("supabase.key"))
+    limite = _limite_retencao()
+
+    registros = []
+    inicio = 0
+    while len(registros) < LIMITE_EXPORTACAO:
+        response = (
+            supabase.table("chat_logs")
+            .select("prompt, git_version, created_at")
+            .gte("created_at", limite.isoformat())
+            .order("created_at", desc=True)
+            .range(inicio, inicio + TAMANHO_PAGINA - 1)
+            .execute()
+        )
+        pagina = response.data or []
+        registros.extend(pagina)
+        if len(pagina) < TAMANHO_PAGINA:
+            break
+        inicio += TAMANHO_PAGINA
+
+    itens = {}
+    for row in registros:
+        prompt = anonimizar_prompt(row.get("prompt") or "")
+        if len(prompt) < 3:
+            continue
+        identificador = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        itens.setdefault(identificador, {"id": identificador, "prompt": prompt, "git_version": row.get("git_version"), "mes": (row.get("created_at") or "")[:7]})
+
+    random.seed(semente)
+    selecionados = random.sample(sorted(itens.values(), key=lambda item: item["id"]), min(amostra, len(itens)))
+
+    trace = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "fonte": "chat_logs",
+        "retencao_meses": RETENCAO_MESES,
+        "total": len(selecionados),
+        "itens": selecionados,
+    }
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(trace, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"✅ Trace com {len(selecionados)} prompts anonimizados (de {len(registros)} logs) gravado em {saida}")
+    return saida
+
+
+def carregar_trace(caminho: Path) -> list[dict[str, Any]]:
+    """
+    Lê o trace, descartando itens que já ultrapassaram a janela de retenção.
+    """
+    trace = json.loads(caminho.read_text(encoding="utf-8"))
+    limite = _limite_retencao().strftime("%Y-%m")
+    itens = [item for item in trace["itens"] if not item.get("mes") or item["mes"] >= limite]
+    if len(itens) < len(trace["itens"]):
+        print(f"🧹 {len(trace['itens']) - len(itens)} prompts fora da janela de retenção foram ignorados.")
+    return itens
+
+
+def _executar_worker(raiz: Path, trace: Path, config: dict[str, Any], concorrencia: int, sem_geracao: bool) -> list[dict[str, Any]]:
+    """
+    Executado no subprocesso de cada variante: importa 'src' de 'raiz', aplica os overrides e
+    reexecuta o trace. Só usa APIs estáveis do app, para funcionar também com refs antigas.
+    """
+    sys.path.insert(0, str(raiz))
+
+    import src.config as config_app
+
+    for nome, valor in config.items():
+        if not hasattr(config_app, nome):
+            raise SystemExit(f"❌ Configuração desconhecida em src.config: {nome}")
+        setattr(config_app, nome, valor)
+    # Sem snapshot local, para que as duas variantes passem pelo mesmo backend (refs antigas não têm a flag)
+    if os.environ.get("VOX_REPLAY_SEM_SNAPSHOT") and "USAR_SNAPSHOT_KB" not in config:
+        config_app.USAR_SNAPSHOT_KB = False
+
+    import logging
+
+    from google import genai
+    from google.genai import types
+
+    import src.core.genai as genai_app
+    from data.prompts.system_prompt import INSTRUCOES
+    from src.core.database import recuperar_contexto_inteligente
+
+    logging.disable(logging.INFO)
+
+    base_url = config_app.get_secret("GEMINI_BASE_URL")
+    client = genai.Client(
+        api_key=config_app.get_secret("GEMINI_API_KEY"),
+        http_options=types.HttpOptions(base_url=base_url) if base_url else None,
+    )
+
+    def _montar_prompt(prompt: str, contexto: str) -> str:
+        montar = getattr(genai_app, "montar_prompt", None)
+        if montar:
+            return montar(prompt, contexto)
+        # Formato anterior à extração de 'montar_prompt'
+        if not contexto:
+            return prompt
+        return (
+            f"Prompt do Usuário: {prompt}\n\n"
+            f"Contexto interno da sua base de conhecimento, que o usuário NÃO forneceu "
+            f"(use para embasar sua resposta): {contexto}\n\n"
+            f"Responda à pergunta do usuário com base no contexto fornecido."
+        )
+
+    def _replay(item: dict[str, Any]) -> dict[str, Any]:
+        resultado: dict[str, Any] = {"id": item["id"], "etapas_ms": {}, "tokens": {}}
+        inicio = time.perf_counter()
+        try:
+            t0 = time.perf_counter()
+            embedding = client.models.embed_content(
+                model=config_app.MODELO_SEMANTICO_NOME,
+                contents=item["prompt"],
+                config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=config_app.TAMANHO_VETOR_SEMANTICO),
+            ).embeddings[0].values
+            resultado["etapas_ms"]["embedding"] = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            contexto, fonte, ids = recuperar_contexto_inteligente(embedding)
+            resultado["etapas_ms"]["recuperacao"] = (time.perf_counter() - t0) * 1000
+            resultado["fonte"] = fonte
+            resultado["kb_ids"] = sorted(
+                str(i.get("kb_id") if isinstance(i, dict) else i) for i in ids or [] if not (isinstance(i, dict) and i.get("descartado"))
+            )
+
+            prompt_final = _montar_prompt(item["prompt"], contexto or "")
+            resultado["tokens"]["prompt_caracteres"] = len(prompt_final)
+
+            if not sem_geracao:
+                t0 = time.perf_counter()
+                uso = None
+                for chunk in client.models.generate_content_stream(
+                    model=config_app.GEMINI_MODEL_NAME,
+                    contents=prompt_final,
+                    config=types.GenerateContentConfig(system_instruction=INSTRUCOES),
+                ):
+                    resultado["etapas_ms"].setdefault("ttft", (time.perf_counter() - t0) * 1000)
+                    uso = chunk.usage_metadata or uso
+                resultado["etapas_ms"]["geracao"] = (time.perf_counter() - t0) * 1000
+                if uso:
+                    resultado["tokens"]["entrada"] = uso.prompt_token_count
+                    resultado["tokens"]["saida"] = uso.candidates_token_count
+        except Exception as e:
+            resultado["erro"] = f"{type(e).__name__}: {e}"
+        resultado["etapas_ms"]["total"] = (time.perf_counter() - inicio) * 1000
+        return resultado
+
+    itens = carregar_trace(trace)
+    with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+        return list(executor.map(_replay, itens))
+
+
+def _executar_variante(nome: str, raiz: Path, trace: Path, config: dict[str, Any], concorrencia: int, sem_geracao: bool, ambiente: dict[str, str]) -> list[dict[str, Any]]:
+    with tempfile.NamedTemporaryFile("r", suffix=".json") as saida:
+        comando = [
+            sys.executable, "-m", "benchmarks.replay", "_worker",
+            "--raiz", str(raiz), "--trace", str(trace.resolve()), "--config", json.dumps(config),
+            "--concorrencia", str(concorrencia), "--saida", saida.name,
+        ] + (["--sem-geracao"] if sem_geracao else [])
+        print(f"▶️  Variante {nome}: {raiz} {config or ''}")
+        subprocess.run(comando, cwd=RAIZ, env={**os.environ, **ambiente}, check=True)
+        return json.loads(Path(saida.name).read_text(encoding="utf-8"))
+
+
+def _percentis(valores: list[float]) -> dict[str, float | None]:
+    if not valores:
+        return {"p50": None, "p95": None}
+    ordenados = sorted(valores)
+    return {
+        "p50": round(ordenados[len(ordenados) // 2], 2),
+        "p95": round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 2),
+    }
+
+
+def _variacao(antes: float | None, depois: float | None) -> float | None:
+    if antes is None or depois is None or not antes:
+        return None
+    return round((depois - antes) / antes * 100, 1)
+
+
+def comparar_execucoes(resultados_a: list[dict[str, Any]], resultados_b: list[dict[str, Any]], exemplos: int = 10) -> dict[str, Any]:
+    """
+    Compara duas execuções do mesmo trace: latência por etapa, tokens e diferenças de contexto.
+    """
+    por_id_b = {r["id"]: r for r in resultados_b}
+    pares = [(a, por_id_b[a["id"]]) for a in resultados_a if a["id"] in por_id_b]
+    validos = [(a, b) for a, b in pares if "erro" not in a and "erro" not in b]
+
+    etapas = {}
+    for etapa in ETAPAS:
+        a = _percentis([r["etapas_ms"][etapa] for r, _ in validos if etapa in r["etapas_ms"]])
+        b = _percentis([r["etapas_ms"][etapa] for _, r in validos if etapa in r["etapas_ms"]])
+        etapas[etapa] = {"a": a, "b": b, "delta_p50_pct": _variacao(a["p50"], b["p50"]), "delta_p95_pct": _variacao(a["p95"], b["p95"])}
+
+    tokens = {}
+    for chave in ("prompt_caracteres", "entrada", "saida"):
+        soma_a = sum(a["tokens"].get(chave) or 0 for a, _ in validos)
+        soma_b = sum(b["tokens"].get(chave) or 0 for _, b in validos)
+        tokens[chave] = {"a": soma_a, "b": soma_b, "delta_pct": _variacao(soma_a, soma_b)}
+
+    jaccards = []
+    diferencas = []
+    for a, b in validos:
+        ids_a, ids_b = set(a.get("kb_ids", [])), set(b.get("kb_ids", []))
+        uniao = ids_a | ids_b
+        jaccards.append(len(ids_a & ids_b) / len(uniao) if uniao else 1.0)
+        if ids_a != ids_b or a.get("fonte") != b.get("fonte"):
+            diferencas.append(
+                {
+                    "id": a["id"],
+                    "fonte_a": a.get("fonte"),
+                    "fonte_b": b.get("fonte"),
+                    "apenas_a": sorted(ids_a - ids_b),
+                    "apenas_b": sorted(ids_b - ids_a),
+                }
+            )
+
+    return {
+        "prompts": len(pares),
+        "erros": {"a": sum("erro" in a for a, _ in pares), "b": sum("erro" in b for _, b in pares)},
+        "etapas_ms": etapas,
+        "tokens": tokens,
+        "contexto": {
+            "identicos": len(validos) - len(diferencas),
+            "diferentes": len(diferencas),
+            "jaccard_medio": round(sum(jaccards) / len(jaccards), 4) if jaccards else None,
+            "fonte_alterada": sum(d["fonte_a"] != d["fonte_b"] for d in diferencas),
+            "exemplos": diferencas[:exemplos],
+        },
+    }
+
+
+def _preparar_raiz(ref: str | None, pilha: ExitStack) -> Path:
+    """
+    Retorna a raiz do código da variante: a árvore atual ou um worktree temporário da ref.
+    """
+    if not ref:
+        return RAIZ
+    destino = Path(tempfile.mkdtemp(prefix="vox-replay-"))
+    subprocess.run(["git", "worktree", "add", "--detach", str(destino), ref], cwd=RAIZ, check=True, capture_output=True)
+
+    def _remover():
+        subprocess.run(["git", "worktree", "remove", "--force", str(destino)], cwd=RAIZ, capture_output=True)
+        shutil.rmtree(destino, ignore_errors=True)
+
+    pilha.callback(_remover)
+    return destino
+
+
+def executar_replay(trace: Path, ref_a: str | None, ref_b: str | None, config_a: dict, config_b: dict, backend: str, concorrencia: int, sem_geracao: bool, latencia_gemini_ms: float, latencia_supabase_ms: float) -> dict[str, Any]:
+    """
+    Reexecuta o trace nas variantes A e B, contra os serviços reais ou os falsos, e compara.
+    """
+    with ExitStack() as pilha:
+        ambiente: dict[str, str] = {}
+        if backend == "fake":
+            from benchmarks.kb_sintetica import gerar_kb_sintetica
+            from benchmarks.servicos_fake import ConfiguracaoFake, ServidorGeminiFake, ServidorPostgrestFake, variaveis_ambiente
+
+            kb = gerar_kb_sintetica(5000)
+            gemini = pilha.enter_context(ServidorGeminiFake(kb, ConfiguracaoFake(latencia_gemini_ms, intervalo_stream_ms=40.0)))
+            postgrest = pilha.enter_context(ServidorPostgrestFake(kb, ConfiguracaoFake(latencia_supabase_ms)))
+            ambiente = {**variaveis_ambiente(gemini, postgrest), "VOX_REPLAY_SEM_SNAPSHOT": "1"}
+
+        raiz_a = _preparar_raiz(ref_a, pilha)
+        raiz_b = _preparar_raiz(ref_b, pilha)
+        resultados_a = _executar_variante("A", raiz_a, trace, config_a, concorrencia, sem_geracao, ambiente)
+        resultados_b = _executar_variante("B", raiz_b, trace, config_b, concorrencia, sem_geracao, ambiente)
+
+    return {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "trace": str(trace),
+        "backend": backend,
+        "variantes": {"a": {"ref": ref_a or "árvore atual", "config": config_a}, "b": {"ref": ref_b or "árvore atual", "config": config_b}},
+        "concorrencia": concorrencia,
+        "comparacao": comparar_execucoes(resultados_a, resultados_b),
+    }
+
+
+def _imprimir_comparacao(relatorio: dict[str, Any]) -> None:
+    comparacao = relatorio["comparacao"]
+    print("-" * 50)
+    print(f"📊 {comparacao['prompts']} prompts | erros A={comparacao['erros']['a']} B={comparacao['erros']['b']}")
+    for etapa, dados in comparacao["etapas_ms"].items():
+        if dados["a"]["p50"] is None:
+            continue
+        print(
+            f"⏱️  {etapa:<12} p50 {dados['a']['p50']:>8.1f} -> {dados['b']['p50']:>8.1f} ms ({dados['delta_p50_pct']}%) | "
+            f"p95 {dados['a']['p95']:>8.1f} -> {dados['b']['p95']:>8.1f} ms ({dados['delta_p95_pct']}%)"
+        )
+    for chave, dados in comparacao["tokens"].items():
+        print(f"🔢 {chave:<18} {dados['a']} -> {dados['b']} ({dados['delta_pct']}%)")
+    contexto = comparacao["contexto"]
+    print(f"📚 Contexto: {contexto['identicos']} idênticos, {contexto['diferentes']} diferentes (Jaccard médio {contexto['jaccard_medio']}, fonte alterada em {contexto['fonte_alterada']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay de prompts reais para comparar duas versões/configurações.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    p_exportar = subparsers.add_parser("exportar", help="Exporta uma amostra anonimizada de chat_logs.")
+    p_exportar.add_argument("--amostra", type=int, default=300)
+    p_exportar.add_argument("--semente", type=int, default=42)
+    p_exportar.add_argument("--saida", type=Path, default=DIRETORIO_TRACES / f"trace-{datetime.now():%Y%m%d}.json")
+
+    p_executar = subparsers.add_parser("executar", help="Reexecuta o trace em duas variantes e compara.")
+    p_executar.add_argument("--trace", type=Path, required=True)
+    p_executar.add_argument("--ref-a", default=None, help="Ref git da variante A (padrão: árvore atual).")
+    p_executar.add_argument("--ref-b", default=None, help="Ref git da variante B (padrão: árvore atual).")
+    p_executar.add_argument("--config-a", type=json.loads, default={}, help="Overrides de src.config da variante A (JSON).")
+    p_executar.add_argument("--config-b", type=json.loads, default={}, help="Overrides de src.config da variante B (JSON).")
+    p_executar.add_argument("--backend", choices=("fake", "real"), default="fake", help="Serviços falsos (offline) ou reais (segredos do ambiente).")
+    p_executar.add_argument("--concorrencia", type=int, default=4)
+    p_executar.add_argument("--sem-geracao", action="store_true", help="Reexecuta apenas embedding e recuperação.")
+    p_executar.add_argument("--latencia-gemini-ms", type=float, default=300.0)
+    p_executar.add_argument("--latencia-supabase-ms", type=float, default=20.0)
+    p_executar.add_argument("--saida", type=Path, default=None)
+
+    p_worker = subparsers.add_parser("_worker")
+    p_worker.add_argument("--raiz", type=Path, required=True)
+    p_worker.add_argument("--trace", type=Path, required=True)
+    p_worker.add_argument("--config", type=json.loads, default={})
+    p_worker.add_argument("--concorrencia", type=int, default=4)
+    p_worker.add_argument("--sem-geracao", action="store_true")
+    p_worker.add_argument("--saida", type=Path, required=True)
+
+    args = parser.parse_args()
+
+    if args.comando == "exportar":
+        exportar_trace(args.amostra, args.saida, args.semente)
+    elif args.comando == "_worker":
+        resultados = _executar_worker(args.raiz, args.trace, args.config, args.concorrencia, args.sem_geracao)
+        args.saida.write_text(json.dumps(resultados, ensure_ascii=False), encoding="utf-8")
+    else:
+        relatorio = executar_replay(
+            args.trace, args.ref_a, args.ref_b, args.config_a, args.config_b, args.backend,
+            args.concorrencia, args.sem_geracao, args.latencia_gemini_ms, args.latencia_supabase_ms,
+        )
+        _imprimir_comparacao(relatorio)
+        saida = args.saida or DIRETORIO_RESULTADOS / f"replay-{datetime.now():%Y%m%d-%H%M%S}.json"
+        saida.parent.mkdir(parents=True, exist_ok=True)
+        saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✅ Relatório gravado em {saida}")
@@ -0,0 +1,29 @@
+"""
+Serviços falsos (Gemini e PostgREST/Supabase) para testes de carga offline e determinísticos.
+
+Os servidores rodam em threads do próprio processo (ou via `python -m benchmarks.servicos_fake`)
+e o app é apontado para eles pelas mesmas chaves lidas por `get_secret`:
+
+    GEMINI_BASE_URL=http://127.0.0.1:8081  GEMINI_API_KEY=fake
+    SUPABASE_URL=http://127.0.0.1:8082     SUPABASE_KEY=fake
+
+Latência, taxa de erros 429/503 e cadência do streaming são configuradas por `ConfiguracaoFake`.
+"""
+
+from benchmarks.servicos_fake.gemini import ServidorGeminiFake
+from benchmarks.servicos_fake.postgrest import ServidorPostgrestFake
+from benchmarks.servicos_fake.servidor import ConfiguracaoFake
+
+__all__ = ["ConfiguracaoFake", "ServidorGeminiFake", "ServidorPostgrestFake", "variaveis_ambiente"]
+
+
+def variaveis_ambiente(gemini: ServidorGeminiFake, postgrest: ServidorPostgrestFake) -> dict[str, str]:
+    """
+    Variáveis de ambiente que apontam o app (via `get_secret`) para os serviços falsos.
+    """
+    return {
+        "GEMINI_BASE_URL": gemini.url,
+        "GEMINI_API_KEY": "fake-gemini-key",
+        "SUPABASE_URL": postgrest.url,
+        "SUPABASE_KEY": "fake-supabase-key",
+    }
@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from benchmarks.kb_sintetica import gerar_kb_sintetica
+from benchmarks.servicos_fake import ConfiguracaoFake, ServidorGeminiFake, ServidorPostgrestFake, variaveis_ambiente
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sobe o Gemini e o PostgREST falsos para testes de carga offline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta-gemini", type=int, default=8081)
+    parser.add_argument("--porta-supabase", type=int, default=8082)
+    parser.add_argument("--chunks", type=int, default=5000, help="Tamanho da KB sintética servida.")
+    parser.add_argument("--latencia-gemini-ms", type=float, default=300.0, help="Latência até a resposta (ou 1º chunk) do Gemini.")
+    parser.add_argument("--latencia-supabase-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração de respostas 429 do Gemini.")
+    parser.add_argument("--taxa-503", type=float, default=0.0, help="Fração de respostas 503 (Gemini e Supabase).")
+    parser.add_argument("--intervalo-stream-ms", type=float, default=40.0, help="Intervalo entre chunks do streaming.")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    kb = gerar_kb_sintetica(args.chunks, semente=args.semente)
+    gemini = ServidorGeminiFake(
+        kb,
+        ConfiguracaoFake(args.latencia_gemini_ms, args.jitter_ms, args.taxa_429, args.taxa_503, args.intervalo_stream_ms, semente=args.semente),
+        args.host,
+        args.porta_gemini,
+    )
+    postgrest = ServidorPostgrestFake(
+        kb,
+        ConfiguracaoFake(args.latencia_supabase_ms, args.jitter_ms, taxa_503=args.taxa_503, semente=args.semente),
+        host=args.host,
+        porta=args.porta_supabase,
+    )
+
+    with gemini, postgrest:
+        print(f"🧪 Serviços falsos no ar (KB sintética com {len(kb)} chunks). Aponte o app com:")
+        for chave, valor in variaveis_ambiente(gemini, postgrest).items():
+            print(f"export {chave}={valor}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("🛑 Encerrando serviços falsos...")
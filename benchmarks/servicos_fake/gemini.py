@@ -0,0 +1,146 @@
+"""
+Servidor falso da API do Gemini (v1beta), no subconjunto usado pelo app via google-genai:
+
+    POST /v1beta/models/{modelo}:batchEmbedContents              -> client.models.embed_content
+    POST /v1beta/models/{modelo}:generateContent                  -> client.models.generate_content
+    POST /v1beta/models/{modelo}:streamGenerateContent?alt=sse    -> chat.send_message_stream
+
+Os embeddings são determinísticos (derivados do hash do texto). Se uma KB sintética for
+informada, cada texto é mapeado para o centróide de um dos seus tópicos, de modo que as buscas
+no PostgREST falso encontrem chunks relevantes.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any
+
+import numpy as np
+
+from benchmarks.kb_sintetica import VOCABULARIO, KBSintetica
+from benchmarks.servicos_fake.servidor import ConfiguracaoFake, ManipuladorBase, ServidorFake
+from src.config import TAMANHO_VETOR_SEMANTICO
+
+STATUS_ERRO = {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE", 400: "INVALID_ARGUMENT", 404: "NOT_FOUND"}
+
+
+def _semente_texto(texto: str) -> int:
+    return int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+
+
+def _textos(conteudo: dict[str, Any] | None) -> str:
+    return " ".join(parte.get("text", "") for parte in (conteudo or {}).get("parts", []))
+
+
+def _estimar_tokens(texto: str) -> int:
+    return max(1, len(texto) // 4) if texto else 0
+
+
+class ManipuladorGemini(ManipuladorBase):
+    server: "ServidorGeminiFake"
+
+    def do_POST(self) -> None:
+        corpo = self.ler_json() or {}
+        if not self.caminho.startswith("/v1beta/models/") or ":" not in self.caminho:
+            self.responder_erro(404, f"Rota não suportada pelo Gemini falso: {self.caminho}")
+            return
+
+        metodo = self.caminho.rsplit(":", 1)[1]
+        configuracao = self.server.configuracao
+
+        erro = configuracao.sortear_erro()
+        configuracao.aguardar_latencia()
+        if erro:
+            self.responder_erro(erro, "Erro injetado pelo Gemini falso.")
+            return
+
+        if metodo == "batchEmbedContents":
+            self.responder_json(200, {"embeddings": [self.server.embedding(r) for r in corpo.get("requests", [])]})
+        elif metodo == "generateContent":
+            self.responder_json(200, self.server.resposta(corpo, self.server.texto_resposta(corpo)))
+        elif metodo == "streamGenerateContent":
+            self.responder_stream(corpo)
+        else:
+            self.responder_erro(404, f"Método não suportado pelo Gemini falso: {metodo}")
+
+    def responder_erro(self, status: int, mensagem: str) -> None:
+        self.responder_json(status, {"error": {"code": status, "message": mensagem, "status": STATUS_ERRO.get(status, "UNKNOWN")}})
+
+    def responder_stream(self, corpo: dict[str, Any]) -> None:
+        """
+        Responde em Server-Sent Events, com 'intervalo_stream_ms' entre os chunks.
+        """
+        configuracao = self.server.configuracao
+        palavras = self.server.texto_resposta(corpo).split(" ")
+        passo = max(1, configuracao.palavras_por_chunk)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for inicio in range(0, len(palavras), passo):
+            if inicio and configuracao.intervalo_stream_ms:
+                time.sleep(configuracao.intervalo_stream_ms / 1000)
+            texto = " ".join(palavras[inicio : inicio + passo]) + (" " if inicio + passo < len(palavras) else "")
+            final = inicio + passo >= len(palavras)
+            evento = self.server.resposta(corpo, texto, final=final)
+            self.wfile.write(f"data: {json.dumps(evento, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+        self.server.registrar(200)
+
+
+class ServidorGeminiFake(ServidorFake):
+    """
+    Gemini falso em segundo plano.
+
+    Args:
+        kb (KBSintetica | None): KB cujos tópicos orientam os embeddings gerados.
+        configuracao (ConfiguracaoFake | None): Latência, erros e cadência do streaming.
+    """
+
+    def __init__(self, kb: KBSintetica | None = None, configuracao: ConfiguracaoFake | None = None, host: str = "127.0.0.1", porta: int = 0):
+        super().__init__(ManipuladorGemini, configuracao, host, porta)
+        self.kb = kb
+
+    def embedding(self, requisicao: dict[str, Any]) -> dict[str, list[float]]:
+        texto = _textos(requisicao.get("content"))
+        dimensao = int(requisicao.get("outputDimensionality") or TAMANHO_VETOR_SEMANTICO)
+        rng = np.random.default_rng(_semente_texto(texto))
+
+        if self.kb is not None and self.kb.embeddings.shape[1] == dimensao:
+            centroide = self.kb.centroides[_semente_texto(texto) % len(self.kb.centroides)]
+            vetor = centroide + rng.standard_normal(dimensao, dtype=np.float32) * (0.7 / np.sqrt(dimensao))
+        else:
+            vetor = rng.standard_normal(dimensao, dtype=np.float32)
+        vetor /= np.linalg.norm(vetor) or 1.0
+        return {"values": vetor.tolist()}
+
+    def texto_resposta(self, corpo: dict[str, Any]) -> str:
+        """
+        Resposta determinística a partir do último conteúdo enviado pelo usuário.
+        """
+        conteudos = corpo.get("contents") or []
+        ultimo = _textos(conteudos[-1]) if conteudos else ""
+        rng = np.random.default_rng(_semente_texto(ultimo))
+        palavras = rng.choice(VOCABULARIO, size=max(1, self.configuracao.palavras_resposta - 4))
+        return "Resposta simulada do Vox: " + " ".join(palavras) + "."
+
+    def resposta(self, corpo: dict[str, Any], texto: str, final: bool = True) -> dict[str, Any]:
+        prompt = " ".join(_textos(c) for c in corpo.get("contents") or [])
+        prompt += _textos((corpo.get("systemInstruction") or {}))
+        candidato: dict[str, Any] = {"content": {"role": "model", "parts": [{"text": texto}]}, "index": 0}
+        if final:
+            candidato["finishReason"] = "STOP"
+        tokens_prompt = _estimar_tokens(prompt)
+        tokens_resposta = _estimar_tokens(texto)
+        return {
+            "candidates": [candidato],
+            "usageMetadata": {
+                "promptTokenCount": tokens_prompt,
+                "candidatesTokenCount": tokens_resposta,
+                "totalTokenCount": tokens_prompt + tokens_resposta,
+            },
+            "modelVersion": "gemini-fake",
+        }
@@ -0,0 +1,238 @@
+"""
+Servidor falso do PostgREST (Supabase), no subconjunto usado pelo app via supabase-py:
+
+    GET    /rest/v1/{tabela}?select=...&coluna=eq.valor&limit=n   -> table().select().eq().limit()
+    POST   /rest/v1/{tabela}                                       -> table().insert()
+    PATCH  /rest/v1/{tabela}?coluna=eq.valor                       -> table().update()
+    DELETE /rest/v1/{tabela}?coluna=in.(a,b)                       -> table().delete()
+    POST   /rest/v1/rpc/match_knowledge_base                       -> rpc("match_knowledge_base")
+    POST   /rest/v1/rpc/buscar_digesto_topico                      -> rpc("buscar_digesto_topico")
+
+Os dados ficam em memória. A 'knowledge_base' é carregada de uma KB sintética e as colunas
+'vector' são devolvidas como texto, como no PostgREST real.
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Any
+
+from benchmarks.kb_sintetica import KBSintetica
+from benchmarks.servicos_fake.servidor import ConfiguracaoFake, ManipuladorBase, ServidorFake
+from src.config import TAMANHO_VETOR_CURTO
+
+PREFIXO_REST = "/rest/v1/"
+
+# Chave primária gerada no insert, quando ausente (mesmos nomes das tabelas reais)
+CHAVES_GERADAS = {"chat_logs": "chat_id", "user_reports": "id", "chat_logs_kb": "id"}
+
+PARAMETROS_RESERVADOS = {"select", "limit", "offset", "order", "on_conflict", "columns"}
+
+CATEGORIAS_PADRAO = [
+    {"id": 1, "label": "Informação incorreta"},
+    {"id": 2, "label": "Resposta ofensiva"},
+    {"id": 3, "label": "Outro"},
+]
+
+
+def _vetor_texto(valor: Any) -> Any:
+    if isinstance(valor, list):
+        return "[" + ",".join(map(str, valor)) + "]"
+    return valor
+
+
+def _comparar(valor: Any, operador: str, alvo: str) -> bool:
+    if operador == "is":
+        return {"null": valor is None, "true": valor is True, "false": valor is False}.get(alvo, False)
+    if operador == "in":
+        return str(valor) in {item.strip().strip('"') for item in alvo.strip("()").split(",")}
+    texto = str(valor).lower() if isinstance(valor, bool) else str(valor)
+    if operador == "eq":
+        return valor is not None and texto == alvo
+    if operador == "neq":
+        return valor is None or texto != alvo
+    if operador in ("gt", "gte", "lt", "lte"):
+        if valor is None:
+            return False
+        try:
+            esquerda, direita = float(valor), float(alvo)
+        except (TypeError, ValueError):
+            # Datas ISO 8601 no mesmo fuso comparam corretamente como texto
+            esquerda, direita = texto, alvo
+        return {"gt": esquerda > direita, "gte": esquerda >= direita, "lt": esquerda < direita, "lte": esquerda <= direita}[operador]
+    raise ValueError(f"Operador não suportado pelo PostgREST falso: {operador}")
+
+
+def _filtro(coluna: str, expressao: str):
+    negado = expressao.startswith("not.")
+    if negado:
+        expressao = expressao[len("not."):]
+    operador, _, alvo = expressao.partition(".")
+    return lambda row: _comparar(row.get(coluna), operador, alvo) != negado
+
+
+class ManipuladorPostgrest(ManipuladorBase):
+    server: "ServidorPostgrestFake"
+
+    def _processar(self, metodo: str) -> None:
+        if not self.caminho.startswith(PREFIXO_REST):
+            self.responder_erro(404, f"Rota não suportada pelo PostgREST falso: {self.caminho}")
+            return
+
+        # O corpo é sempre consumido, para não corromper a próxima requisição da conexão keep-alive
+        corpo = self.ler_json()
+        configuracao = self.server.configuracao
+        erro = configuracao.sortear_erro()
+        configuracao.aguardar_latencia()
+        if erro:
+            self.responder_erro(erro, "Erro injetado pelo PostgREST falso.")
+            return
+
+        recurso = self.caminho[len(PREFIXO_REST):]
+        try:
+            if recurso.startswith("rpc/") and metodo == "POST":
+                self.responder_json(200, self.server.executar_rpc(recurso[len("rpc/"):], corpo or {}))
+                return
+
+            filtros = [_filtro(coluna, valores[-1]) for coluna, valores in self.query.items() if coluna not in PARAMETROS_RESERVADOS]
+            retornar = "return=representation" in (self.headers.get("Prefer") or "")
+
+            if metodo == "GET":
+                linhas, total = self.server.selecionar(recurso, filtros, self.query)
+                cabecalhos = {"Content-Range": f"0-{max(len(linhas) - 1, 0)}/{total}"}
+                self.responder_json(200, linhas, cabecalhos)
+            elif metodo == "POST":
+                # upsert do supabase-py: 'Prefer: resolution=merge-duplicates' com '?on_conflict=<coluna>'
+                conflito = self.query["on_conflict"][-1] if "resolution=merge-duplicates" in (self.headers.get("Prefer") or "") and "on_conflict" in self.query else None
+                inseridas = self.server.inserir(recurso, corpo, conflito)
+                self.responder_json(201, inseridas if retornar else [])
+            elif metodo == "PATCH":
+                alteradas = self.server.atualizar(recurso, filtros, corpo or {})
+                self.responder_json(200, alteradas if retornar else [])
+            elif metodo == "DELETE":
+                removidas = self.server.remover(recurso, filtros)
+                self.responder_json(200, removidas if retornar else [])
+        except (KeyError, ValueError, NotImplementedError) as e:
+            self.responder_erro(400, str(e))
+
+    def responder_erro(self, status: int, mensagem: str) -> None:
+        self.responder_json(status, {"code": f"FAKE{status}", "message": mensagem, "details": None, "hint": None})
+
+    def do_GET(self) -> None:
+        self._processar("GET")
+
+    def do_POST(self) -> None:
+        self._processar("POST")
+
+    def do_PATCH(self) -> None:
+        self._processar("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._processar("DELETE")
+
+
+class ServidorPostgrestFake(ServidorFake):
+    """
+    PostgREST falso em segundo plano, com tabelas em memória.
+
+    Args:
+        kb (KBSintetica | None): KB sintética carregada na tabela 'knowledge_base'.
+        configuracao (ConfiguracaoFake | None): Latência e erros (apenas 'taxa_503' faz sentido aqui).
+        digestos (dict[str, dict] | None): Digestos por tópico servidos por 'buscar_digesto_topico'.
+    """
+
+    def __init__(self, kb: KBSintetica | None = None, configuracao: ConfiguracaoFake | None = None, digestos: dict[str, dict] | None = None, host: str = "127.0.0.1", porta: int = 0):
+        super().__init__(ManipuladorPostgrest, configuracao, host, porta)
+        self.kb = kb
+        self.snapshot = kb.como_snapshot() if kb is not None else None
+        self.digestos = digestos or {}
+        self.tabelas: dict[str, list[dict[str, Any]]] = {"report_categories": [dict(c) for c in CATEGORIAS_PADRAO]}
+        self._sequencias: dict[str, int] = {}
+        self._lock_tabelas = threading.Lock()
+
+    def _linhas_kb(self, query: dict[str, list[str]]) -> list[dict[str, Any]]:
+        if self.kb is None:
+            return []
+        # Atalho para o filtro por tópico (expansão de contexto), evitando varrer a KB inteira
+        expressao = query.get("topico", [""])[-1]
+        indices = self.snapshot.indice_topicos.get(expressao[len("eq."):], []) if expressao.startswith("eq.") else range(len(self.kb))
+        return [
+            {
+                "kb_id": self.kb.kb_ids[i],
+                "topico": self.kb.topicos[i],
+                "eixo_tematico": self.kb.eixos[i],
+                "descricao": self.kb.descricoes[i],
+                "ativo": True,
+                "embedding": self.kb.embeddings[i],
+                "embedding_curto": self.kb.embeddings[i, :TAMANHO_VETOR_CURTO],
+            }
+            for i in indices
+        ]
+
+    def selecionar(self, tabela: str, filtros: list, query: dict[str, list[str]]) -> tuple[list[dict[str, Any]], int]:
+        if tabela == "knowledge_base":
+            fonte = self._linhas_kb(query)
+        else:
+            with self._lock_tabelas:
+                fonte = [dict(row) for row in self.tabelas.get(tabela, [])]
+
+        linhas = [row for row in fonte if all(f(row) for f in filtros)]
+        total = len(linhas)
+
+        if "order" in query:
+            coluna, _, direcao = query["order"][-1].partition(".")
+            linhas.sort(key=lambda row: (row.get(coluna) is None, row.get(coluna)), reverse=direcao.startswith("desc"))
+
+        inicio = int(query.get("offset", ["0"])[-1])
+        limite = query.get("limit")
+        linhas = linhas[inicio : inicio + int(limite[-1])] if limite else linhas[inicio:]
+
+        colunas = [c.strip() for c in query.get("select", ["*"])[-1].split(",")]
+        if colunas != ["*"]:
+            linhas = [{c: row.get(c) for c in colunas} for row in linhas]
+        return [{chave: _vetor_texto(valor.tolist() if hasattr(valor, "tolist") else valor) for chave, valor in row.items()} for row in linhas], total
+
+    def inserir(self, tabela: str, dados: dict | list, conflito: str | None = None) -> list[dict[str, Any]]:
+        registros = dados if isinstance(dados, list) else [dados]
+        agora = datetime.now(timezone.utc).isoformat()
+        inseridas = []
+        with self._lock_tabelas:
+            destino = self.tabelas.setdefault(tabela, [])
+            for registro in registros:
+                linha = dict(registro)
+                chave = CHAVES_GERADAS.get(tabela)
+                if chave and chave not in linha:
+                    self._sequencias[tabela] = self._sequencias.get(tabela, 0) + 1
+                    linha[chave] = self._sequencias[tabela]
+                linha.setdefault("created_at", agora)
+                existente = next((row for row in destino if row.get(conflito) == linha.get(conflito)), None) if conflito else None
+                if existente is not None:
+                    existente.update(linha)
+                    inseridas.append(dict(existente))
+                    continue
+                destino.append(linha)
+                inseridas.append(dict(linha))
+        return inseridas
+
+    def atualizar(self, tabela: str, filtros: list, valores: dict[str, Any]) -> list[dict[str, Any]]:
+        with self._lock_tabelas:
+            alteradas = [row for row in self.tabelas.get(tabela, []) if all(f(row) for f in filtros)]
+            for row in alteradas:
+                row.update(valores)
+            return [dict(row) for row in alteradas]
+
+    def remover(self, tabela: str, filtros: list) -> list[dict[str, Any]]:
+        with self._lock_tabelas:
+            linhas = self.tabelas.get(tabela, [])
+            removidas = [row for row in linhas if all(f(row) for f in filtros)]
+            self.tabelas[tabela] = [row for row in linhas if not all(f(row) for f in filtros)]
+            return removidas
+
+    def executar_rpc(self, nome: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        if nome == "match_knowledge_base":
+            if self.snapshot is None:
+                return []
+            return self.snapshot.buscar(params["query_embedding"], params["match_threshold"], params["match_count"], params.get("filter_topic"))
+        if nome == "buscar_digesto_topico":
+            digesto = self.digestos.get(params["alvo"])
+            return [digesto] if digesto else []
+        raise NotImplementedError(f"RPC não suportada pelo PostgREST falso: {nome}")
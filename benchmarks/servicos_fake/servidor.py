@@ -0,0 +1,139 @@
+"""
+Base comum dos serviços falsos: servidor HTTP com threads, injeção de latência e de erros.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+
+class ConfiguracaoFake:
+    """
+    Comportamento simulado de um serviço falso.
+
+    Args:
+        latencia_ms (float): Latência fixa antes da resposta (ou do 1º chunk, no streaming).
+        jitter_ms (float): Variação aleatória somada à latência (uniforme entre 0 e jitter_ms).
+        taxa_429 (float): Fração das requisições respondidas com 429 (cota excedida).
+        taxa_503 (float): Fração das requisições respondidas com 503 (serviço indisponível).
+        intervalo_stream_ms (float): Intervalo entre chunks de uma resposta em streaming.
+        palavras_por_chunk (int): Palavras de texto em cada chunk do streaming.
+        palavras_resposta (int): Tamanho das respostas geradas, em palavras.
+        semente (int): Semente do sorteio de latência e erros (execuções reprodutíveis).
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, jitter_ms: float = 0.0, taxa_429: float = 0.0, taxa_503: float = 0.0, intervalo_stream_ms: float = 0.0, palavras_por_chunk: int = 8, palavras_resposta: int = 120, semente: int = 42):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_429 = taxa_429
+        self.taxa_503 = taxa_503
+        self.intervalo_stream_ms = intervalo_stream_ms
+        self.palavras_por_chunk = palavras_por_chunk
+        self.palavras_resposta = palavras_resposta
+        self._rng = random.Random(semente)
+        self._lock = threading.Lock()
+
+    def sortear(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def aguardar_latencia(self) -> None:
+        atraso = self.latencia_ms + (self.sortear() * self.jitter_ms if self.jitter_ms else 0.0)
+        if atraso:
+            time.sleep(atraso / 1000)
+
+    def sortear_erro(self) -> int | None:
+        """
+        Retorna o status HTTP de erro a ser injetado nesta requisição, ou None.
+        """
+        sorteio = self.sortear()
+        if sorteio < self.taxa_429:
+            return 429
+        if sorteio < self.taxa_429 + self.taxa_503:
+            return 503
+        return None
+
+
+class ManipuladorBase(BaseHTTPRequestHandler):
+    """
+    Handler com utilitários de JSON e métricas; o estado do serviço fica em 'self.server'.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Silencia o log de acesso padrão do http.server
+        pass
+
+    @property
+    def caminho(self) -> str:
+        return urlsplit(self.path).path
+
+    @property
+    def query(self) -> dict[str, list[str]]:
+        return parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+
+    def ler_json(self) -> Any:
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = self.rfile.read(tamanho) if tamanho else b""
+        return json.loads(corpo) if corpo else None
+
+    def responder_json(self, status: int, dados: Any, cabecalhos: dict[str, str] | None = None) -> None:
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+        self.server.registrar(status)
+
+
+class ServidorFake(ThreadingHTTPServer):
+    """
+    Servidor HTTP multi-thread executado em segundo plano, com contadores de requisições por status.
+    Pode ser usado como context manager:
+
+        with ServidorGeminiFake(kb=kb) as gemini:
+            os.environ["GEMINI_BASE_URL"] = gemini.url
+    """
+
+    daemon_threads = True
+
+    def __init__(self, manipulador: type[ManipuladorBase], configuracao: ConfiguracaoFake | None = None, host: str = "127.0.0.1", porta: int = 0):
+        super().__init__((host, porta), manipulador)
+        self.configuracao = configuracao or ConfiguracaoFake()
+        self.contadores: dict[int, int] = {}
+        self._lock_contadores = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def registrar(self, status: int) -> None:
+        with self._lock_contadores:
+            self.contadores[status] = self.contadores.get(status, 0) + 1
+
+    def iniciar(self) -> "ServidorFake":
+        self._thread = threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "ServidorFake":
+        return self.iniciar()
+
+    def __exit__(self, *exc) -> None:
+        self.parar()
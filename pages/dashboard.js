@@ -1,6 +1,5 @@
-
-const SUPABASE_URL_DEV = "__SUPABASE_URL_DEV__";
-const SUPABASE_ANON_KEY_DEV = "__SUPABASE_ANON_KEY_DEV__";
+// Estatísticas pré-calculadas, geradas no deploy por scripts/exportar_estatisticas_publicas.py
+const ESTATISTICAS_URL = "pages/estatisticas.json";
 
 function escapeHtml(unsafe) {
     if (unsafe == null) return '';
@@ -50,311 +49,374 @@ document.addEventListener('DOMContentLoaded', function () {
             });
     }
 
-    // Verificar se as credenciais do Supabase estão configuradas e válidas
-    let supabaseConfigured = false;
-    if (SUPABASE_URL_DEV && SUPABASE_ANON_KEY_DEV && 
-        !SUPABASE_URL_DEV.startsWith('__') && !SUPABASE_ANON_KEY_DEV.startsWith('__')) {
-        try {
-            new URL(SUPABASE_URL_DEV);
-            supabaseConfigured = true;
-        } catch (e) {
-            console.warn("URL do Supabase inválida:", e);
-        }
-    }
+    // Estatísticas da base e de desempenho: um único arquivo estático, sem consultas ao Supabase pelo navegador
+    fetch(ESTATISTICAS_URL, { headers: { 'Cache-Control': 'no-cache' } })
+        .then(response => {
+            if (!response.ok) throw new Error('Erro ao buscar estatisticas.json');
+            return response.json();
+        })
+        .then(estatisticas => {
+            renderizarBaseConhecimento((estatisticas.base_conhecimento && estatisticas.base_conhecimento.temas) || []);
+            renderizarDesempenho(estatisticas.desempenho, estatisticas.gerado_em);
+        })
+        .catch(error => {
+            // O arquivo só existe na página publicada (gerado pelo workflow de deploy)
+            console.warn("Estatísticas indisponíveis:", error);
+            const elCount = document.getElementById('kb-count');
+            if (elCount) elCount.innerHTML = '<span style="font-size:0.5em">Indisponível</span>';
+            const elVersion = document.getElementById('kb-version');
+            if (elVersion) elVersion.innerText = 'Indisponível';
+            const statsEl = document.getElementById('kb-health-stats');
+            if (statsEl) statsEl.innerHTML = '<p style="color: var(--text-secondary);">Estatísticas da base indisponíveis no momento.</p>';
+            const perfEl = document.getElementById('perf-stats');
+            if (perfEl) perfEl.innerHTML = '<p style="color: var(--text-secondary);">Métricas de desempenho indisponíveis no momento.</p>';
+        });
+});
+
+function renderizarBaseConhecimento(data) {
+    let totalChunks = 0;
+    let maxDate = 0;
+    const statsEl = document.getElementById('kb-health-stats');
+    
+    if (Array.isArray(data) && data.length > 0) {
+        const allTopics = [];
+        data.forEach(item => {
+            const qty = parseInt(item.quantidade) || 0;
+            totalChunks += qty;
+            if (item.tema) {
+                allTopics.push({ tema: item.tema, quantidade: qty });
+            }
+            if (item.modificado_em) {
+                const d = new Date(item.modificado_em).getTime();
+                if (d > maxDate) maxDate = d;
+            }
+        });
+
+        // Ordenar tópicos por quantidade decrescente
+        allTopics.sort((a, b) => b.quantidade - a.quantidade);
 
-    if (!supabaseConfigured) {
-        console.warn("Supabase não configurado ou indisponível localmente.");
+        // Calcular estatísticas rápidas
+        const totalTopicsCount = allTopics.length;
+        const highCoverageCount = allTopics.filter(t => t.quantidade >= 3).length;
+        const lowCoverageCount = allTopics.filter(t => t.quantidade <= 2).length;
+        const avgChunksPerTopic = totalTopicsCount > 0 ? (totalChunks / totalTopicsCount).toFixed(1) : 0;
+
+        // Atualizar Contagem
         const elCount = document.getElementById('kb-count');
-        if (elCount) elCount.innerHTML = '<span style="font-size:0.5em">Indisponível</span>';
+        if (elCount) elCount.innerText = totalChunks;
+
+        // Atualizar Versão
         const elVersion = document.getElementById('kb-version');
-        if (elVersion) elVersion.innerText = 'Indisponível';
-        const statsEl = document.getElementById('kb-health-stats');
-        if (statsEl) statsEl.innerHTML = '<p style="color: var(--text-secondary);">Métricas indisponíveis em ambiente local de desenvolvimento.</p>';
-        return;
-    }
+        if (elVersion) {
+            if (maxDate > 0) {
+                const lastDate = new Date(maxDate);
+                const versionString = `v${lastDate.getFullYear()}.${String(lastDate.getMonth() + 1).padStart(2, '0')}.${String(lastDate.getDate()).padStart(2, '0')}`;
+                elVersion.innerText = versionString;
+            } else {
+                elVersion.innerText = "v1.0.0";
+            }
+        }
 
-    const headers = {
-        'apikey': SUPABASE_ANON_KEY_DEV,
-        'Authorization': `Bearer ${SUPABASE_ANON_KEY_DEV}`,
-        'Content-Type': 'application/json'
-    };
-
-    // Buscar estatísticas agregadas da base de conhecimento
-    const urlStats = new URL(`${SUPABASE_URL_DEV}/rest/v1/knowledge_base_public_stats`);
-    urlStats.searchParams.set('select', 'tema,quantidade,modificado_em');
-
-    fetch(urlStats.toString(), {
-        method: 'GET',
-        headers: headers
-    })
-        .then(response => response.json())
-        .then(data => {
-            let totalChunks = 0;
-            let maxDate = 0;
-            const statsEl = document.getElementById('kb-health-stats');
-            
-            if (Array.isArray(data) && data.length > 0) {
-                const allTopics = [];
-                data.forEach(item => {
-                    const qty = parseInt(item.quantidade) || 0;
-                    totalChunks += qty;
-                    if (item.tema) {
-                        allTopics.push({ tema: item.tema, quantidade: qty });
-                    }
-                    if (item.modificado_em) {
-                        const d = new Date(item.modificado_em).getTime();
-                        if (d > maxDate) maxDate = d;
-                    }
+        // Atualizar Distribuição de Temas de forma interativa e concisa
+        if (statsEl) {
+            let currentFilter = 'all'; // 'all', 'high', 'low'
+            let searchQuery = '';
+            let visibleCardsCount = 12;
+            const cardsPerPage = 12;
+
+            // Estrutura básica dos controles
+            statsEl.innerHTML = `
+                <!-- Resumo Executivo da Base -->
+                <div class="kb-stats-summary">
+                    <div class="kb-stat-widget">
+                        <div class="stat-val">${totalTopicsCount}</div>
+                        <div class="stat-lbl">Tópicos Cadastrados</div>
+                    </div>
+                    <div class="kb-stat-widget">
+                        <div class="stat-val">${highCoverageCount}</div>
+                        <div class="stat-lbl">Alta Cobertura (3+)</div>
+                    </div>
+                    <div class="kb-stat-widget">
+                        <div class="stat-val">${lowCoverageCount}</div>
+                        <div class="stat-lbl">Baixa Cobertura (1-2)</div>
+                    </div>
+                    <div class="kb-stat-widget">
+                        <div class="stat-val">${avgChunksPerTopic}</div>
+                        <div class="stat-lbl">Média de Chunks</div>
+                    </div>
+                </div>
+
+                <!-- Barra de Ações (Filtro e Busca) -->
+                <div class="kb-controls-row">
+                    <div class="kb-search-container">
+                        <span class="kb-search-icon">🔍</span>
+                        <input type="text" id="kb-search" class="kb-search-input" placeholder="Buscar tópico por nome...">
+                    </div>
+                    <div class="kb-filter-tabs">
+                        <button class="kb-filter-tab active" data-filter="all">Todos (${totalTopicsCount})</button>
+                        <button class="kb-filter-tab" data-filter="high">Alta Cobertura (${highCoverageCount})</button>
+                        <button class="kb-filter-tab" data-filter="low">Baixa Cobertura (${lowCoverageCount})</button>
+                    </div>
+                </div>
+
+                <!-- Container para renderizar os tópicos -->
+                <div id="kb-results-container"></div>
+            `;
+
+            const resultsContainer = document.getElementById('kb-results-container');
+            const searchInput = document.getElementById('kb-search');
+            const filterTabs = document.querySelectorAll('.kb-filter-tab');
+
+            function renderResults() {
+                if (!resultsContainer) return;
+
+                // Aplicar filtros de busca e aba selecionada
+                let filtered = allTopics.filter(topic => {
+                    const matchesSearch = topic.tema.toLowerCase().includes(searchQuery.toLowerCase());
+                    if (!matchesSearch) return false;
+
+                    if (currentFilter === 'high') return topic.quantidade >= 3;
+                    if (currentFilter === 'low') return topic.quantidade <= 2;
+                    return true;
                 });
 
-                // Ordenar tópicos por quantidade decrescente
-                allTopics.sort((a, b) => b.quantidade - a.quantidade);
-
-                // Calcular estatísticas rápidas
-                const totalTopicsCount = allTopics.length;
-                const highCoverageCount = allTopics.filter(t => t.quantidade >= 3).length;
-                const lowCoverageCount = allTopics.filter(t => t.quantidade <= 2).length;
-                const avgChunksPerTopic = totalTopicsCount > 0 ? (totalChunks / totalTopicsCount).toFixed(1) : 0;
-
-                // Atualizar Contagem
-                const elCount = document.getElementById('kb-count');
-                if (elCount) elCount.innerText = totalChunks;
-
-                // Atualizar Versão
-                const elVersion = document.getElementById('kb-version');
-                if (elVersion) {
-                    if (maxDate > 0) {
-                        const lastDate = new Date(maxDate);
-                        const versionString = `v${lastDate.getFullYear()}.${String(lastDate.getMonth() + 1).padStart(2, '0')}.${String(lastDate.getDate()).padStart(2, '0')}`;
-                        elVersion.innerText = versionString;
-                    } else {
-                        elVersion.innerText = "v1.0.0";
-                    }
+                if (filtered.length === 0) {
+                    resultsContainer.innerHTML = '<p style="color: var(--text-secondary); text-align: center; padding: 2rem;">Nenhum tópico encontrado com os filtros selecionados.</p>';
+                    return;
                 }
 
-                // Atualizar Distribuição de Temas de forma interativa e concisa
-                if (statsEl) {
-                    let currentFilter = 'all'; // 'all', 'high', 'low'
-                    let searchQuery = '';
-                    let visibleCardsCount = 12;
-                    const cardsPerPage = 12;
-
-                    // Estrutura básica dos controles
-                    statsEl.innerHTML = `
-                        <!-- Resumo Executivo da Base -->
-                        <div class="kb-stats-summary">
-                            <div class="kb-stat-widget">
-                                <div class="stat-val">${totalTopicsCount}</div>
-                                <div class="stat-lbl">Tópicos Cadastrados</div>
-                            </div>
-                            <div class="kb-stat-widget">
-                                <div class="stat-val">${highCoverageCount}</div>
-                                <div class="stat-lbl">Alta Cobertura (3+)</div>
-                            </div>
-                            <div class="kb-stat-widget">
-                                <div class="stat-val">${lowCoverageCount}</div>
-                                <div class="stat-lbl">Baixa Cobertura (1-2)</div>
-                            </div>
-                            <div class="kb-stat-widget">
-                                <div class="stat-val">${avgChunksPerTopic}</div>
-                                <div class="stat-lbl">Média de Chunks</div>
-                            </div>
-                        </div>
-
-                        <!-- Barra de Ações (Filtro e Busca) -->
-                        <div class="kb-controls-row">
-                            <div class="kb-search-container">
-                                <span class="kb-search-icon">🔍</span>
-                                <input type="text" id="kb-search" class="kb-search-input" placeholder="Buscar tópico por nome...">
-                            </div>
-                            <div class="kb-filter-tabs">
-                                <button class="kb-filter-tab active" data-filter="all">Todos (${totalTopicsCount})</button>
-                                <button class="kb-filter-tab" data-filter="high">Alta Cobertura (${highCoverageCount})</button>
-                                <button class="kb-filter-tab" data-filter="low">Baixa Cobertura (${lowCoverageCount})</button>
-                            </div>
+                let html = '';
+
+                if (currentFilter === 'low') {
+                    // Apenas tópicos de baixa cobertura: renderizar em formato de Tags compactas
+                    html += `
+                        <div class="kb-section-header">Tópicos com Baixa Cobertura (${filtered.length})</div>
+                        <div class="kb-tags-container">
+                            ${filtered.map(t => `
+                                <div class="kb-topic-tag" title="${escapeHtml(t.tema)}">
+                                    <span>${escapeHtml(t.tema)}</span>
+                                    <span class="tag-count">${t.quantidade}</span>
+                                </div>
+                            `).join('')}
                         </div>
-
-                        <!-- Container para renderizar os tópicos -->
-                        <div id="kb-results-container"></div>
                     `;
-
-                    const resultsContainer = document.getElementById('kb-results-container');
-                    const searchInput = document.getElementById('kb-search');
-                    const filterTabs = document.querySelectorAll('.kb-filter-tab');
-
-                    function renderResults() {
-                        if (!resultsContainer) return;
-
-                        // Aplicar filtros de busca e aba selecionada
-                        let filtered = allTopics.filter(topic => {
-                            const matchesSearch = topic.tema.toLowerCase().includes(searchQuery.toLowerCase());
-                            if (!matchesSearch) return false;
-
-                            if (currentFilter === 'high') return topic.quantidade >= 3;
-                            if (currentFilter === 'low') return topic.quantidade <= 2;
-                            return true;
-                        });
-
-                        if (filtered.length === 0) {
-                            resultsContainer.innerHTML = '<p style="color: var(--text-secondary); text-align: center; padding: 2rem;">Nenhum tópico encontrado com os filtros selecionados.</p>';
-                            return;
-                        }
-
-                        let html = '';
-
-                        if (currentFilter === 'low') {
-                            // Apenas tópicos de baixa cobertura: renderizar em formato de Tags compactas
-                            html += `
-                                <div class="kb-section-header">Tópicos com Baixa Cobertura (${filtered.length})</div>
-                                <div class="kb-tags-container">
-                                    ${filtered.map(t => `
-                                        <div class="kb-topic-tag" title="${escapeHtml(t.tema)}">
-                                            <span>${escapeHtml(t.tema)}</span>
-                                            <span class="tag-count">${t.quantidade}</span>
+                } else if (currentFilter === 'high') {
+                    // Apenas tópicos de alta cobertura: renderizar em formato de cards com barra de progresso
+                    const paginated = filtered.slice(0, visibleCardsCount);
+                    html += `
+                        <div class="kb-section-header">Tópicos com Alta Cobertura (${filtered.length})</div>
+                        <div class="kb-health-grid">
+                            ${paginated.map(t => {
+                                const pct = totalChunks > 0 ? Math.round((t.quantidade / totalChunks) * 100) : 0;
+                                return `
+                                    <div class="kb-topic-card">
+                                        <div class="kb-topic-header">
+                                            <h4 class="kb-topic-title">${escapeHtml(t.tema)}</h4>
+                                            <span class="kb-topic-badge">${t.quantidade} ${t.quantidade === 1 ? 'chunk' : 'chunks'}</span>
                                         </div>
-                                    `).join('')}
-                                </div>
-                            `;
-                        } else if (currentFilter === 'high') {
-                            // Apenas tópicos de alta cobertura: renderizar em formato de cards com barra de progresso
-                            const paginated = filtered.slice(0, visibleCardsCount);
-                            html += `
-                                <div class="kb-section-header">Tópicos com Alta Cobertura (${filtered.length})</div>
-                                <div class="kb-health-grid">
-                                    ${paginated.map(t => {
-                                        const pct = totalChunks > 0 ? Math.round((t.quantidade / totalChunks) * 100) : 0;
-                                        return `
-                                            <div class="kb-topic-card">
-                                                <div class="kb-topic-header">
-                                                    <h4 class="kb-topic-title">${escapeHtml(t.tema)}</h4>
-                                                    <span class="kb-topic-badge">${t.quantidade} ${t.quantidade === 1 ? 'chunk' : 'chunks'}</span>
-                                                </div>
-                                                <div>
-                                                    <div class="kb-topic-bar-container">
-                                                        <div class="kb-topic-bar" style="width: ${pct}%"></div>
-                                                    </div>
-                                                    <div class="kb-topic-percentage">${pct}% do total</div>
-                                                </div>
+                                        <div>
+                                            <div class="kb-topic-bar-container">
+                                                <div class="kb-topic-bar" style="width: ${pct}%"></div>
                                             </div>
-                                        `;
-                                    }).join('')}
-                                </div>
-                            `;
-
-                            if (filtered.length > visibleCardsCount) {
-                                html += `
-                                    <div class="kb-pagination-container">
-                                        <button id="kb-btn-load-more" class="kb-load-more-btn">Carregar Mais Tópicos</button>
-                                    </div>
-                                `;
-                            }
-                        } else {
-                            // Aba "Todos": Dividir o espaço. Cards para os de Alta Cobertura (paginados) e Tags compactas para Baixa Cobertura
-                            const highList = filtered.filter(t => t.quantidade >= 3);
-                            const lowList = filtered.filter(t => t.quantidade <= 2);
-
-                            if (highList.length > 0) {
-                                const paginatedHigh = highList.slice(0, visibleCardsCount);
-                                html += `
-                                    <div class="kb-section-header">Tópicos com Alta Cobertura (${highList.length})</div>
-                                    <div class="kb-health-grid">
-                                        ${paginatedHigh.map(t => {
-                                            const pct = totalChunks > 0 ? Math.round((t.quantidade / totalChunks) * 100) : 0;
-                                            return `
-                                                <div class="kb-topic-card">
-                                                    <div class="kb-topic-header">
-                                                        <h4 class="kb-topic-title">${escapeHtml(t.tema)}</h4>
-                                                        <span class="kb-topic-badge">${t.quantidade} ${t.quantidade === 1 ? 'chunk' : 'chunks'}</span>
-                                                    </div>
-                                                    <div>
-                                                        <div class="kb-topic-bar-container">
-                                                            <div class="kb-topic-bar" style="width: ${pct}%"></div>
-                                                        </div>
-                                                        <div class="kb-topic-percentage">${pct}% do total</div>
-                                                    </div>
-                                                </div>
-                                            `;
-                                        }).join('')}
+                                            <div class="kb-topic-percentage">${pct}% do total</div>
+                                        </div>
                                     </div>
                                 `;
+                            }).join('')}
+                        </div>
+                    `;
 
-                                if (highList.length > visibleCardsCount) {
-                                    html += `
-                                        <div class="kb-pagination-container">
-                                            <button id="kb-btn-load-more" class="kb-load-more-btn">Carregar Mais Tópicos</button>
+                    if (filtered.length > visibleCardsCount) {
+                        html += `
+                            <div class="kb-pagination-container">
+                                <button id="kb-btn-load-more" class="kb-load-more-btn">Carregar Mais Tópicos</button>
+                            </div>
+                        `;
+                    }
+                } else {
+                    // Aba "Todos": Dividir o espaço. Cards para os de Alta Cobertura (paginados) e Tags compactas para Baixa Cobertura
+                    const highList = filtered.filter(t => t.quantidade >= 3);
+                    const lowList = filtered.filter(t => t.quantidade <= 2);
+
+                    if (highList.length > 0) {
+                        const paginatedHigh = highList.slice(0, visibleCardsCount);
+                        html += `
+                            <div class="kb-section-header">Tópicos com Alta Cobertura (${highList.length})</div>
+                            <div class="kb-health-grid">
+                                ${paginatedHigh.map(t => {
+                                    const pct = totalChunks > 0 ? Math.round((t.quantidade / totalChunks) * 100) : 0;
+                                    return `
+                                        <div class="kb-topic-card">
+                                            <div class="kb-topic-header">
+                                                <h4 class="kb-topic-title">${escapeHtml(t.tema)}</h4>
+                                                <span class="kb-topic-badge">${t.quantidade} ${t.quantidade === 1 ? 'chunk' : 'chunks'}</span>
+                                            </div>
+                                            <div>
+                                                <div class="kb-topic-bar-container">
+                                                    <div class="kb-topic-bar" style="width: ${pct}%"></div>
+                                                </div>
+                                                <div class="kb-topic-percentage">${pct}% do total</div>
+                                            </div>
                                         </div>
                                     `;
-                                }
-                            }
-
-                            if (lowList.length > 0) {
-                                html += `
-                                    <div class="kb-section-header" style="margin-top: 2.5rem;">Tópicos com Baixa Cobertura (${lowList.length})</div>
-                                    <div class="kb-tags-container">
-                                        ${lowList.map(t => `
-                                            <div class="kb-topic-tag" title="${escapeHtml(t.tema)}">
-                                                <span>${escapeHtml(t.tema)}</span>
-                                                <span class="tag-count">${t.quantidade}</span>
-                                            </div>
-                                        `).join('')}
-                                    </div>
-                                `;
-                            }
-                        }
-
-                        resultsContainer.innerHTML = html;
+                                }).join('')}
+                            </div>
+                        `;
 
-                        // Adicionar listener ao botão Carregar Mais
-                        const loadMoreBtn = document.getElementById('kb-btn-load-more');
-                        if (loadMoreBtn) {
-                            loadMoreBtn.addEventListener('click', () => {
-                                visibleCardsCount += cardsPerPage;
-                                renderResults();
-                            });
+                        if (highList.length > visibleCardsCount) {
+                            html += `
+                                <div class="kb-pagination-container">
+                                    <button id="kb-btn-load-more" class="kb-load-more-btn">Carregar Mais Tópicos</button>
+                                </div>
+                            `;
                         }
                     }
 
-                    // Ouvinte do campo de busca
-                    searchInput.addEventListener('input', (e) => {
-                        searchQuery = e.target.value;
-                        visibleCardsCount = cardsPerPage; // Resetar paginação
+                    if (lowList.length > 0) {
+                        html += `
+                            <div class="kb-section-header" style="margin-top: 2.5rem;">Tópicos com Baixa Cobertura (${lowList.length})</div>
+                            <div class="kb-tags-container">
+                                ${lowList.map(t => `
+                                    <div class="kb-topic-tag" title="${escapeHtml(t.tema)}">
+                                        <span>${escapeHtml(t.tema)}</span>
+                                        <span class="tag-count">${t.quantidade}</span>
+                                    </div>
+                                `).join('')}
+                            </div>
+                        `;
+                    }
+                }
+
+                resultsContainer.innerHTML = html;
+
+                // Adicionar listener ao botão Carregar Mais
+                const loadMoreBtn = document.getElementById('kb-btn-load-more');
+                if (loadMoreBtn) {
+                    loadMoreBtn.addEventListener('click', () => {
+                        visibleCardsCount += cardsPerPage;
                         renderResults();
                     });
+                }
+            }
 
-                    // Ouvinte de mudança de abas de filtro
-                    filterTabs.forEach(tab => {
-                        tab.addEventListener('click', () => {
-                            filterTabs.forEach(t => t.classList.remove('active'));
-                            tab.classList.add('active');
-                            currentFilter = tab.getAttribute('data-filter');
-                            visibleCardsCount = cardsPerPage; // Resetar paginação
-                            renderResults();
-                        });
-                    });
+            // Ouvinte do campo de busca
+            searchInput.addEventListener('input', (e) => {
+                searchQuery = e.target.value;
+                visibleCardsCount = cardsPerPage; // Resetar paginação
+                renderResults();
+            });
 
-                    // Primeira renderização
+            // Ouvinte de mudança de abas de filtro
+            filterTabs.forEach(tab => {
+                tab.addEventListener('click', () => {
+                    filterTabs.forEach(t => t.classList.remove('active'));
+                    tab.classList.add('active');
+                    currentFilter = tab.getAttribute('data-filter');
+                    visibleCardsCount = cardsPerPage; // Resetar paginação
                     renderResults();
-                }
-            } else {
-                // Dados vazios
-                const elCount = document.getElementById('kb-count');
-                if (elCount) elCount.innerText = "0";
-                
-                const elVersion = document.getElementById('kb-version');
-                if (elVersion) elVersion.innerText = "v1.0.0";
-                
-                if (statsEl) {
-                    statsEl.innerHTML = '<p style="color: var(--text-secondary);">Nenhum tema cadastrado na base de conhecimento.</p>';
-                }
-            }
-        })
-        .catch(error => {
-            console.error("Erro ao carregar estatísticas da base:", error);
-            const elCount = document.getElementById('kb-count');
-            if (elCount) elCount.innerHTML = '<span style="font-size:0.5em">Indisponível</span>';
-            const elVersion = document.getElementById('kb-version');
-            if (elVersion) elVersion.innerText = 'Online';
-            const statsEl = document.getElementById('kb-health-stats');
-            if (statsEl) statsEl.innerHTML = '<p style="color: #ef4444;">Falha ao carregar estatísticas da base.</p>';
-        });
-});
\ No newline at end of file
+                });
+            });
+
+            // Primeira renderização
+            renderResults();
+        }
+    } else {
+        // Dados vazios
+        const elCount = document.getElementById('kb-count');
+        if (elCount) elCount.innerText = "0";
+        
+        const elVersion = document.getElementById('kb-version');
+        if (elVersion) elVersion.innerText = "v1.0.0";
+        
+        if (statsEl) {
+            statsEl.innerHTML = '<p style="color: var(--text-secondary);">Nenhum tema cadastrado na base de conhecimento.</p>';
+        }
+    }
+}
+
+const NOMES_ETAPAS = {
+    'total': 'Turno completo',
+    'transcrever_audio': 'Transcrição de áudio',
+    'semantica': 'Busca semântica',
+    'semantica.embedding': 'Embedding da pergunta',
+    'semantica.recuperacao': 'Recuperação na KB',
+    'buscar_referencias_db': 'Busca vetorial',
+    'buscar_chunks_por_topico': 'Expansão de tópico',
+    'gerar_resposta.ttft': 'Primeiro token',
+    'gerar_resposta.modelo': 'Geração da resposta',
+    'gerar_resposta': 'Resposta exibida',
+    'salvar_log_chat': 'Registro do log'
+};
+
+function formatarMs(valor) {
+    if (valor == null) return '–';
+    return valor >= 1000 ? `${(valor / 1000).toFixed(1)} s` : `${Math.round(valor)} ms`;
+}
+
+function formatarPct(valor) {
+    return valor == null ? '–' : `${(valor * 100).toFixed(1)}%`;
+}
+
+function renderizarDesempenho(desempenho, geradoEm) {
+    const perfEl = document.getElementById('perf-stats');
+    if (!perfEl) return;
+
+    if (!desempenho || !desempenho.resumo || desempenho.resumo.turnos === 0) {
+        perfEl.innerHTML = '<p style="color: var(--text-secondary);">Ainda não há métricas de desempenho publicadas.</p>';
+        return;
+    }
+
+    const resumo = desempenho.resumo;
+    const resumo24h = desempenho.resumo_24h || {};
+    const latencias24h = resumo24h.latencias_ms || {};
+    const total24h = latencias24h.total || {};
+    const ttft24h = latencias24h['gerar_resposta.ttft'] || {};
+
+    // Etapas na ordem do turno, seguidas de qualquer etapa nova ainda sem nome amigável
+    const etapas = Object.keys(NOMES_ETAPAS).filter(e => resumo.latencias_ms[e])
+        .concat(Object.keys(resumo.latencias_ms).filter(e => !(e in NOMES_ETAPAS)));
+
+    const atualizado = geradoEm ? new Date(geradoEm).toLocaleString('pt-BR') : '–';
+
+    perfEl.innerHTML = `
+        <div class="kb-stats-summary">
+            <div class="kb-stat-widget">
+                <div class="stat-val">${resumo24h.turnos || 0}</div>
+                <div class="stat-lbl">Conversas (24h)</div>
+            </div>
+            <div class="kb-stat-widget">
+                <div class="stat-val">${formatarMs(total24h.p95)}</div>
+                <div class="stat-lbl">p95 do Turno (24h)</div>
+            </div>
+            <div class="kb-stat-widget">
+                <div class="stat-val">${formatarMs(ttft24h.p95)}</div>
+                <div class="stat-lbl">p95 do Primeiro Token (24h)</div>
+            </div>
+            <div class="kb-stat-widget">
+                <div class="stat-val">${formatarPct(resumo24h.taxa_erro)}</div>
+                <div class="stat-lbl">Taxa de Erro (24h)</div>
+            </div>
+        </div>
+
+        <div class="kb-section-header">Latência por etapa (últimos ${escapeHtml(desempenho.periodo_dias)} dias)</div>
+        <table class="perf-table">
+            <thead>
+                <tr><th>Etapa</th><th>p50</th><th>p95</th></tr>
+            </thead>
+            <tbody>
+                ${etapas.map(e => `
+                    <tr>
+                        <td>${escapeHtml(NOMES_ETAPAS[e] || e)}</td>
+                        <td>${formatarMs(resumo.latencias_ms[e].p50)}</td>
+                        <td>${formatarMs(resumo.latencias_ms[e].p95)}</td>
+                    </tr>
+                `).join('')}
+            </tbody>
+        </table>
+        <p class="perf-footnote">
+            ${resumo.turnos} conversas e ${formatarPct(resumo.taxa_erro)} de erros no período;
+            ${formatarPct(resumo.taxa_cache_tokens)} dos tokens de entrada servidos pelo cache do modelo.
+            Atualizado em ${escapeHtml(atualizado)}.
+        </p>
+    `;
+}
@@ -0,0 +1,132 @@
+"""
+Gera o JSON estático lido pelo dashboard público (index.html + pages/dashboard.js).
+
+Reúne a distribuição de temas da base de conhecimento (view 'knowledge_base_public_stats') e o rollup
+horário de uso e desempenho ('metricas_uso_hora', atualizado pelo pg_cron). Executado pelo workflow
+de deploy do GitHub Pages, para que cada visita ao dashboard leia um arquivo pronto em vez de
+consultar o Supabase pelo navegador.
+
+Uso:
+    python scripts/exportar_estatisticas_publicas.py [--dias 30] [--saida pages/estatisticas.json]
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from supabase import create_client
+
+caminho_raiz = str(Path(__file__).resolve().parent.parent)
+
+if caminho_raiz not in sys.path:
+    sys.path.append(caminho_raiz)
+
+from src.config import get_secret  # noqa: E402
+
+SUPABASE_URL = get_secret("supabase.url")
+SUPABASE_KEY = get_secret("supabase.key")
+
+ARQUIVO_SAIDA = Path(caminho_raiz) / "pages" / "estatisticas.json"
+TAMANHO_PAGINA = 1000
+# Horas com poucos turnos não têm percentis publicados (pouco significativos e mais fáceis de reidentificar)
+TURNOS_MINIMOS_PERCENTIS = 5
+
+
+def buscar_todos(consulta) -> list[dict]:
+    """
+    Executa uma consulta do supabase-py de forma paginada.
+    """
+    registros = []
+    inicio = 0
+    while True:
+        pagina = consulta.range(inicio, inicio + TAMANHO_PAGINA - 1).execute().data or []
+        registros.extend(pagina)
+        if len(pagina) < TAMANHO_PAGINA:
+            return registros
+        inicio += TAMANHO_PAGINA
+
+
+def resumir_desempenho(horas: list[dict]) -> dict:
+    """
+    Resume o período: totais exatos de turnos, erros e tokens, e percentis por etapa como média
+    dos percentis horários ponderada pelo número de turnos (aproximação, pois percentis não somam).
+    """
+    turnos = sum(h["turnos"] for h in horas)
+    erros = sum(h["erros"] for h in horas)
+    tokens_entrada = sum(h["tokens_entrada"] for h in horas)
+    tokens_cache = sum(h["tokens_cache"] for h in horas)
+
+    pesos: dict[str, dict[str, float]] = {}
+    for h in horas:
+        for etapa, valores in (h.get("latencias_ms") or {}).items():
+            acumulado = pesos.setdefault(etapa, {"p50": 0.0, "p95": 0.0, "turnos": 0})
+            acumulado["p50"] += valores["p50"] * h["turnos"]
+            acumulado["p95"] += valores["p95"] * h["turnos"]
+            acumulado["turnos"] += h["turnos"]
+
+    return {
+        "turnos": turnos,
+        "erros": erros,
+        "taxa_erro": round(erros / (turnos + erros), 4) if turnos + erros else None,
+        "taxa_cache_tokens": round(tokens_cache / tokens_entrada, 4) if tokens_entrada else None,
+        "latencias_ms": {
+            etapa: {"p50": round(v["p50"] / v["turnos"], 1), "p95": round(v["p95"] / v["turnos"], 1)}
+            for etapa, v in pesos.items()
+            if v["turnos"]
+        },
+    }
+
+
+def main(dias: int, saida: Path) -> None:
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        print("❌ Credenciais do Supabase ausentes (supabase.url / supabase.key).")
+        sys.exit(1)
+
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    print("📚 Lendo distribuição de temas da base de conhecimento...")
+    temas = buscar_todos(supabase.table("knowledge_base_public_stats").select("tema, quantidade, modificado_em").order("tema"))
+
+    print(f"📈 Lendo rollup horário dos últimos {dias} dias...")
+    inicio = (datetime.now(timezone.utc) - timedelta(days=dias)).replace(minute=0, second=0, microsecond=0)
+    linhas = buscar_todos(
+        supabase.table("metricas_uso_hora")
+        .select("hora, turnos, sessoes, erros, taxa_erro, latencias_ms, tokens_entrada, tokens_saida, tokens_cache, taxa_cache_tokens")
+        .gte("hora", inicio.isoformat())
+        .order("hora")
+    )
+
+    horas = []
+    for linha in linhas:
+        if linha["turnos"] < TURNOS_MINIMOS_PERCENTIS:
+            linha["latencias_ms"] = {}
+        horas.append(linha)
+
+    corte_24h = datetime.now(timezone.utc) - timedelta(hours=24)
+    estatisticas = {
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "base_conhecimento": {
+            "total_chunks": sum(int(t["quantidade"] or 0) for t in temas),
+            "temas": temas,
+        },
+        "desempenho": {
+            "periodo_dias": dias,
+            "resumo": resumir_desempenho(horas),
+            "resumo_24h": resumir_desempenho([h for h in horas if datetime.fromisoformat(h["hora"]) >= corte_24h]),
+            "horas": horas,
+        },
+    }
+
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(estatisticas, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    print(f"✅ {len(temas)} temas e {len(horas)} horas de métricas gravados em {saida} ({saida.stat().st_size / 1024:.1f} KB).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o JSON de estatísticas públicas do dashboard.")
+    parser.add_argument("--dias", type=int, default=30, help="Janela do histórico de desempenho.")
+    parser.add_argument("--saida", type=Path, default=ARQUIVO_SAIDA)
+    args = parser.parse_args()
+    main(args.dias, args.saida)
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from supabase import create_client
+
+caminho_raiz = str(Path(__file__).resolve().parent.parent)
+
+if caminho_raiz not in sys.path:
+    sys.path.append(caminho_raiz)
+
+from src.config import (  # noqa: E402
+    MODELO_SEMANTICO_NOME,
+    SNAPSHOT_KB_DIR,
+    TAMANHO_VETOR_SEMANTICO,
+    get_secret,
+)
+from src.core.contexto import converter_vetor  # noqa: E402
+from src.core.db.snapshot import (  # noqa: E402
+    ARQUIVO_EMBEDDINGS,
+    ARQUIVO_MANIFESTO,
+    ARQUIVO_METADADOS,
+    ARQUIVO_VERSAO_ATUAL,
+    calcular_sha256,
+    calcular_versao_kb,
+)
+
+SUPABASE_URL = get_secret("supabase.url")
+SUPABASE_KEY = get_secret("supabase.key")
+
+# Páginas menores que nos demais scripts, pois cada linha carrega o embedding completo
+TAMANHO_PAGINA = 200
+VERSOES_MANTIDAS = 3
+
+
+def buscar_kb_ativa(supabase) -> list[dict]:
+    """
+    Busca, de forma paginada, os chunks ativos da 'knowledge_base' que já possuem embedding.
+    """
+    registros = []
+    inicio = 0
+    while True:
+        response = (
+            supabase.table("knowledge_base")
+            .select("kb_id, topico, eixo_tematico, descricao, embedding, embedding_hash")
+            .eq("ativo", True)
+            .not_.is_("embedding", "null")
+            .order("kb_id")
+            .range(inicio, inicio + TAMANHO_PAGINA - 1)
+            .execute()
+        )
+        pagina = response.data or []
+        registros.extend(pagina)
+        if len(pagina) < TAMANHO_PAGINA:
+            return registros
+        inicio += TAMANHO_PAGINA
+
+
+def escrever_snapshot(registros: list[dict], diretorio: Path) -> str:
+    """
+    Grava uma nova versão do snapshot e só então aponta o arquivo 'ATUAL' para ela,
+    de forma que processos em execução nunca leiam uma versão pela metade.
+
+    Returns:
+        str: Nome da versão gravada.
+    """
+    matriz = np.zeros((len(registros), TAMANHO_VETOR_SEMANTICO), dtype=np.float32)
+    for i, row in enumerate(registros):
+        matriz[i] = converter_vetor(row["embedding"])
+
+    # Normaliza (L2) para que a similaridade de cosseno vire um produto escalar no carregamento
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+
+    metadados = {
+        coluna: [row.get(coluna) for row in registros]
+        for coluna in ("kb_id", "topico", "eixo_tematico", "descricao")
+    }
+
+    hash_conteudo = hashlib.sha256()
+    hash_conteudo.update(matriz.tobytes())
+    hash_conteudo.update(json.dumps(metadados, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    gerado_em = datetime.now(timezone.utc)
+    versao = f"{gerado_em:%Y%m%d%H%M%S}-{hash_conteudo.hexdigest()[:12]}"
+
+    pasta = diretorio / versao
+    pasta.mkdir(parents=True, exist_ok=True)
+    np.save(pasta / ARQUIVO_EMBEDDINGS, matriz)
+    (pasta / ARQUIVO_METADADOS).write_text(json.dumps(metadados, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+
+    manifesto = {
+        "versao": versao,
+        "gerado_em": gerado_em.isoformat(),
+        "modelo": MODELO_SEMANTICO_NOME,
+        "dimensao": TAMANHO_VETOR_SEMANTICO,
+        "total": len(registros),
+        "hash_conteudo": hash_conteudo.hexdigest(),
+        # Conferida no app contra a RPC 'versao_kb': o snapshot só é usado enquanto a KB não mudar
+        "versao_kb": calcular_versao_kb(registros),
+        "arquivos": {nome: calcular_sha256(pasta / nome) for nome in (ARQUIVO_EMBEDDINGS, ARQUIVO_METADADOS)},
+    }
+    (pasta / ARQUIVO_MANIFESTO).write_text(json.dumps(manifesto, indent=2), encoding="utf-8")
+
+    temporario = diretorio / f"{ARQUIVO_VERSAO_ATUAL}.tmp"
+    temporario.write_text(versao, encoding="utf-8")
+    os.replace(temporario, diretorio / ARQUIVO_VERSAO_ATUAL)
+    return versao
+
+
+def remover_versoes_antigas(diretorio: Path, manter: int) -> None:
+    """
+    Remove as versões mais antigas do snapshot, mantendo as 'manter' mais recentes.
+    """
+    versoes = sorted((p for p in diretorio.iterdir() if p.is_dir()), key=lambda p: p.name, reverse=True)
+    for pasta in versoes[manter:]:
+        for arquivo in pasta.iterdir():
+            arquivo.unlink()
+        pasta.rmdir()
+        print(f"🧹 Versão antiga removida: {pasta.name}")
+
+
+def exportar_snapshot(diretorio: Path = Path(caminho_raiz) / SNAPSHOT_KB_DIR, manter: int = VERSOES_MANTIDAS) -> None:
+    """
+    Exporta os chunks ativos da 'knowledge_base' para um snapshot versionado em disco,
+    carregado via memory-map pelo app (src/core/db/snapshot.py).
+
+    Args:
+        diretorio (Path): Diretório raiz dos snapshots.
+        manter (int): Quantidade de versões mantidas em disco.
+    """
+    print("🔌 Conectando ao Supabase...")
+    try:
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception as e:
+        print(f"❌ Erro de conexão. Verifique suas chaves. Detalhes: {e}")
+        sys.exit(1)
+
+    print("🔍 Buscando chunks ativos com embedding...")
+    registros = buscar_kb_ativa(supabase)
+    if not registros:
+        print("❌ Nenhum chunk ativo com embedding encontrado. Snapshot não gerado.")
+        sys.exit(1)
+
+    diretorio.mkdir(parents=True, exist_ok=True)
+    versao = escrever_snapshot(registros, diretorio)
+    print(f"✅ Snapshot {versao} gerado com {len(registros)} chunks em {diretorio}")
+
+    remover_versoes_antigas(diretorio, manter)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta a knowledge_base ativa para um snapshot local versionado.")
+    parser.add_argument("--saida", type=Path, default=Path(caminho_raiz) / SNAPSHOT_KB_DIR, help="Diretório raiz dos snapshots.")
+    parser.add_argument("--manter", type=int, default=VERSOES_MANTIDAS, help="Quantidade de versões mantidas em disco.")
+    args = parser.parse_args()
+
+    exportar_snapshot(args.saida, args.manter)
@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from supabase import create_client
+
+caminho_raiz = str(Path(__file__).resolve().parent.parent)
+
+if caminho_raiz not in sys.path:
+    sys.path.append(caminho_raiz)
+
+from src.config import (  # noqa: E402
+    GEMINI_MODEL_NAME,
+    get_secret,
+)
+from src.core.contexto import empacotar_contexto, estimar_tokens  # noqa: E402
+from src.core.genai import cliente_gemini  # noqa: E402
+
+SUPABASE_URL = get_secret("supabase.url")
+SUPABASE_KEY = get_secret("supabase.key")
+
+TAMANHO_PAGINA = 1000
+
+INSTRUCAO_DIGESTO = (
+    "Você receberá trechos da base de conhecimento do Vox AI sobre o tópico '{topico}'. "
+    "Reescreva-os como um único texto de referência, compacto e sem repetições, em português do Brasil. "
+    "Preserve TODOS os fatos: nomes de leis, órgãos, serviços, endereços, telefones, links, prazos e passos. "
+    "Não adicione informações que não estejam nos trechos. Retorne apenas o texto.\n\n"
+    "Trechos:\n{trechos}"
+)
+
+
+def calcular_hash_chunks(chunks: list[dict]) -> str:
+    """
+    Calcula o hash que versiona o digesto de um tópico.
+    Deve ser idêntico ao da função SQL 'public.hash_chunks_topico' (md5 de 'kb_id:descricao'
+    unidos por quebra de linha, ordenados por kb_id). Os dois lados ignoram chunks com descricao vazia.
+    """
+    validos = [c for c in chunks if c.get("descricao")]
+    linhas = [f"{c['kb_id']}:{c['descricao']}" for c in sorted(validos, key=lambda c: c["kb_id"])]
+    return hashlib.md5("\n".join(linhas).encode("utf-8")).hexdigest()
+
+
+def buscar_chunks_ativos(supabase) -> dict[str, list[dict]]:
+    """
+    Busca, de forma paginada, todos os chunks ativos da 'knowledge_base' agrupados por tópico.
+    """
+    por_topico: dict[str, list[dict]] = {}
+    inicio = 0
+    while True:
+        response = (
+            supabase.table("knowledge_base")
+            .select("kb_id, topico, descricao")
+            .eq("ativo", True)
+            .order("kb_id")
+            .range(inicio, inicio + TAMANHO_PAGINA - 1)
+            .execute()
+        )
+        registros = response.data or []
+        for row in registros:
+            if row.get("topico") and row.get("descricao"):
+                por_topico.setdefault(row["topico"], []).append(row)
+        if len(registros) < TAMANHO_PAGINA:
+            return por_topico
+        inicio += TAMANHO_PAGINA
+
+
+def condensar_com_ia(client, topico: str, texto: str) -> str:
+    """
+    Solicita ao Gemini a versão condensada dos trechos deduplicados de um tópico.
+    """
+    response = client.models.generate_content(
+        model=GEMINI_MODEL_NAME,
+        contents=INSTRUCAO_DIGESTO.format(topico=topico, trechos=texto),
+    )
+    return (response.text or "").strip()
+
+
+def gerar_digestos(topicos: list[str] | None = None, forcar: bool = False, sem_ia: bool = False) -> None:
+    """
+    Gera (ou atualiza) o digesto compacto de cada tópico da 'knowledge_base' e o grava na tabela
+    'knowledge_base_digests'. Tópicos cujo hash de chunks não mudou desde a última geração são pulados.
+
+    Args:
+        topicos (list[str] | None): Restringe a geração a estes tópicos.
+        forcar (bool): Regera os digestos mesmo que o hash não tenha mudado.
+        sem_ia (bool): Grava apenas a versão deduplicada, sem condensação pelo Gemini.
+    """
+    print("🔌 Conectando aos serviços...")
+    try:
+        client = None if sem_ia else cliente_gemini()
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception as e:
+        print(f"❌ Erro de conexão. Verifique suas chaves. Detalhes: {e}")
+        return
+
+    print("🔍 Buscando chunks ativos da 'knowledge_base'...")
+    por_topico = buscar_chunks_ativos(supabase)
+    if topicos:
+        por_topico = {t: c for t, c in por_topico.items() if t in topicos}
+
+    existentes = {
+        row["topico"]: row["hash_chunks"]
+        for row in (supabase.table("knowledge_base_digests").select("topico, hash_chunks").execute().data or [])
+    }
+
+    print(f"🚀 {len(por_topico)} tópicos encontrados.")
+    print("-" * 50)
+
+    gerados = 0
+    pulados = 0
+    erros = 0
+
+    for topico, chunks in sorted(por_topico.items()):
+        hash_chunks = calcular_hash_chunks(chunks)
+        if not forcar and existentes.get(topico) == hash_chunks:
+            print(f"⏭️  {topico}: digesto já atualizado.")
+            pulados += 1
+            continue
+
+        try:
+            # Remove quase-duplicatas preservando a ordem original (sem limite de tokens)
+            texto_deduplicado, proveniencia = empacotar_contexto(chunks, orcamento_tokens=sys.maxsize, lambda_mmr=1.0)
+            digesto = texto_deduplicado if sem_ia else condensar_com_ia(client, topico, texto_deduplicado)
+            if not digesto:
+                raise ValueError("O modelo retornou um digesto vazio.")
+
+            tokens_brutos = sum(estimar_tokens(c["descricao"]) for c in chunks)
+            tokens_digesto = estimar_tokens(digesto)
+
+            supabase.table("knowledge_base_digests").upsert(
+                {
+                    "topico": topico,
+                    "digesto": digesto,
+                    "hash_chunks": hash_chunks,
+                    "kb_ids": [item["kb_id"] for item in proveniencia],
+                    "tokens_estimados": tokens_digesto,
+                    "modelo": "deduplicacao" if sem_ia else GEMINI_MODEL_NAME,
+                    "gerado_em": datetime.now(timezone.utc).isoformat(),
+                },
+                on_conflict="topico",
+            ).execute()
+
+            print(f"✅ {topico}: {len(chunks)} chunks (~{tokens_brutos} tokens) -> digesto (~{tokens_digesto} tokens)")
+            gerados += 1
+
+        except Exception as e:
+            print(f"❌ ERRO no tópico '{topico}': {e}")
+            erros += 1
+
+    print("-" * 50)
+    print("🏁 Processo finalizado!")
+    print(f"✅ Gerados: {gerados}")
+    print(f"⏭️  Atualizados (pulados): {pulados}")
+    print(f"❌ Falhas: {erros}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os digestos compactos por tópico da base de conhecimento.")
+    parser.add_argument("--topico", action="append", help="Gera apenas para o tópico informado (pode repetir).")
+    parser.add_argument("--forcar", action="store_true", help="Regera mesmo que o hash dos chunks não tenha mudado.")
+    parser.add_argument("--sem-ia", action="store_true", help="Grava apenas a deduplicação, sem condensar com o Gemini.")
+    args = parser.parse_args()
+
+    gerar_digestos(args.topico, args.forcar, args.sem_ia)
@@ -1,8 +1,14 @@
+import argparse
+import hashlib
+import json
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from google.genai import types
+from google.genai.errors import APIError
 
 from supabase import create_client
 
@@ -16,82 +22,332 @@ from src.config import (  # noqa: E402
     TAMANHO_VETOR_SEMANTICO,
     get_secret,
 )
-from src.core.genai import configurar_api_gemini
+from src.core.contexto import estimar_tokens  # noqa: E402
+from src.core.genai import cliente_gemini  # noqa: E402
 
 SUPABASE_URL = get_secret("supabase.url")
 SUPABASE_KEY = get_secret("supabase.key")
 
-def reindexar() -> None:
+TAMANHO_PAGINA = 1000
+TAMANHO_LOTE_PADRAO = 50
+WORKERS_PADRAO = 4
+REQUISICOES_POR_SEGUNDO_PADRAO = 2.0
+MAX_TENTATIVAS = 5
+CHECKPOINT_PADRAO = Path(caminho_raiz) / ".reindexacao_checkpoint.json"
+
+# Preço de referência do gemini-embedding-001 (USD por 1 milhão de tokens de entrada)
+CUSTO_USD_POR_MILHAO_TOKENS = 0.15
+
+
+def calcular_hash_embedding(descricao: str) -> str:
     """
-    Busca registros da tabela 'knowledge_base' que estão sem embedding (nulo) 
-    e calcula/atualiza os mesmos usando o modelo Gemini Embedding.
+    Calcula o hash do conteúdo que origina um embedding (modelo, dimensão e texto), no formato
+    da coluna 'embedding_hash' (migration 'add_embedding_hash_to_knowledge_base').
     """
-    print("🔌 Conectando aos serviços...")
-    try:
-        client = configurar_api_gemini()
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    except Exception as e:
-        print(f"❌ Erro de conexão. Verifique suas chaves. Detalhes: {e}")
-        return
-    print("🔍 Buscando registros na tabela 'knowledge_base' sem embedding...")
+    conteudo = f"{MODELO_SEMANTICO_NOME}:{TAMANHO_VETOR_SEMANTICO}:{descricao}"
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
 
-    response = (
-        supabase.table("knowledge_base")
-        .select("kb_id, topico, descricao")
-        .is_("embedding", "null")
-        .execute()
+class LimitadorAdaptativo:
+    """
+    Limitador de taxa compartilhado entre os workers, no modelo AIMD (aumento aditivo,
+    redução multiplicativa): cada lote bem-sucedido aumenta um pouco a taxa permitida e
+    cada resposta de cota/indisponibilidade (429/503) a reduz pela metade.
+    """
+
+    def __init__(self, requisicoes_por_segundo: float, minimo: float = 0.2, maximo: float = 20.0):
+        self.taxa = requisicoes_por_segundo
+        self.minimo = minimo
+        self.maximo = maximo
+        self._proxima_liberacao = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        """Bloqueia até que a próxima requisição possa ser enviada respeitando a taxa atual."""
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(0.0, self._proxima_liberacao - agora)
+            self._proxima_liberacao = max(agora, self._proxima_liberacao) + 1 / self.taxa
+        if espera:
+            time.sleep(espera)
+
+    def sucesso(self) -> None:
+        with self._lock:
+            self.taxa = min(self.maximo, self.taxa + 0.1)
+
+    def limite_atingido(self) -> None:
+        with self._lock:
+            self.taxa = max(self.minimo, self.taxa / 2)
+
+
+class Checkpoint:
+    """
+    Registro em disco dos kb_ids já reindexados e do hash de conteúdo gravado para cada um,
+    permitindo retomar uma execução interrompida. Um registro só é pulado se o hash atual ainda
+    for o gravado: uma linha editada depois de entrar no checkpoint volta a ser reindexada.
+    """
+
+    def __init__(self, caminho: Path | None):
+        self.caminho = caminho
+        self.concluidos: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if caminho and caminho.exists():
+            concluidos = json.loads(caminho.read_text(encoding="utf-8")).get("concluidos", {})
+            # Checkpoints antigos (lista de kb_ids, sem hash) não dizem o que foi gravado: são ignorados
+            if isinstance(concluidos, dict):
+                self.concluidos = concluidos
+
+    def concluido(self, row: dict) -> bool:
+        return self.concluidos.get(row["kb_id"]) == row["hash_esperado"]
+
+    def registrar(self, hashes: dict[str, str]) -> None:
+        with self._lock:
+            self.concluidos.update(hashes)
+            if self.caminho:
+                self.caminho.write_text(json.dumps({"concluidos": dict(sorted(self.concluidos.items()))}), encoding="utf-8")
+
+    def limpar(self) -> None:
+        if self.caminho and self.caminho.exists():
+            self.caminho.unlink()
+
+
+def _buscar_paginado(consulta_por_pagina) -> list[dict]:
+    registros = []
+    inicio = 0
+    while True:
+        pagina = consulta_por_pagina(inicio, inicio + TAMANHO_PAGINA - 1).execute().data or []
+        registros.extend(pagina)
+        if len(pagina) < TAMANHO_PAGINA:
+            return registros
+        inicio += TAMANHO_PAGINA
+
+
+def buscar_registros_pendentes(supabase, tabela: str, forcar: bool = False) -> tuple[list[dict], dict[str, int]]:
+    """
+    Busca, de forma paginada, os registros da tabela que precisam de um novo embedding:
+    os que estão sem embedding (nulo), os com embedding de origem desconhecida ('embedding_hash'
+    nulo, ex: gerados antes da coluna existir) e os cujo 'embedding_hash' não corresponde mais ao
+    texto/modelo/dimensão atuais.
+
+    Returns:
+        tuple[list[dict], dict[str, int]]: Registros a reindexar e o delta por categoria
+            ('sem_embedding', 'sem_hash', 'alterados', 'atualizados').
+    """
+    registros = _buscar_paginado(
+        lambda inicio, fim: supabase.table(tabela).select("kb_id, topico, descricao, embedding_hash").order("kb_id").range(inicio, fim)
     )
-    registros = response.data
+    sem_embedding = {
+        row["kb_id"]
+        for row in _buscar_paginado(
+            lambda inicio, fim: supabase.table(tabela).select("kb_id").is_("embedding", "null").order("kb_id").range(inicio, fim)
+        )
+    }
 
-    total = len(registros)
-    if total == 0:
-        print("✅ Nenhum registro pendente (com embedding nulo) encontrado.")
-        return
+    delta = {"sem_embedding": 0, "sem_hash": 0, "alterados": 0, "atualizados": 0}
+    pendentes = []
+    for row in registros:
+        row["hash_esperado"] = calcular_hash_embedding(row.get("descricao", "") or "")
+        if row["kb_id"] in sem_embedding:
+            delta["sem_embedding"] += 1
+        elif not row.get("embedding_hash"):
+            delta["sem_hash"] += 1
+        elif forcar or row.get("embedding_hash") != row["hash_esperado"]:
+            delta["alterados"] += 1
+        else:
+            delta["atualizados"] += 1
+            continue
+        pendentes.append(row)
 
-    print(f"🚀 Encontrados {total} registros para reindexar.")
-    print("🧠 Usando modelo: gemini-embedding-001 (1536 dimensões)")
-    print("-" * 50)
+    return pendentes, delta
 
-    sucessos = 0
-    erros = 0
 
-    for i, row in enumerate(registros):
-        kb_id = row['kb_id']
-        descricao = row.get('descricao', '') or ''
+def _erro_transitorio(e: Exception) -> bool:
+    return isinstance(e, APIError) and e.code in (429, 500, 503)
 
-        texto_para_embeddar = f"{descricao}"
 
-        try:
-            print(f"[{i+1}/{total}] Processando {kb_id}...", end=" ")
+def processar_lote(client, supabase, tabela: str, lote: list[dict], limitador: LimitadorAdaptativo) -> list[str]:
+    """
+    Gera os embeddings de um lote inteiro em uma única chamada 'embed_content' e grava
+    o resultado (o banco deriva o prefixo curto) com uma única chamada à RPC
+    'atualizar_embeddings_lote'. Nada de upsert: a RPC só atualiza, por 'kb_id', as linhas
+    cuja 'descricao' e cujo 'embedding_hash' ainda são os lidos no início da execução, para
+    não sobrescrever um texto editado nem um embedding gravado por outra execução. Erros transitórios da API são repetidos com backoff exponencial,
+    reduzindo a taxa do limitador.
 
+    Returns:
+        list[str]: kb_ids efetivamente gravados, devolvidos pela RPC (linhas barradas pela guarda
+            ficam para a próxima execução).
+    """
+    textos = [row.get("descricao", "") or "" for row in lote]
+
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        limitador.aguardar()
+        try:
             result = client.models.embed_content(
                 model=MODELO_SEMANTICO_NOME,
-                contents=texto_para_embeddar,
+                contents=textos,
                 config=types.EmbedContentConfig(
                     task_type="RETRIEVAL_DOCUMENT",
                     output_dimensionality=TAMANHO_VETOR_SEMANTICO,
                 ),
             )
-            vetor = result.embeddings[0].values
+            limitador.sucesso()
+            break
+        except Exception as e:
+            if not _erro_transitorio(e) or tentativa == MAX_TENTATIVAS:
+                raise
+            limitador.limite_atingido()
+            time.sleep(2 ** tentativa)
 
-            data_update = {"embedding": vetor}
+    if len(result.embeddings) != len(lote):
+        raise ValueError(f"A API retornou {len(result.embeddings)} embeddings para {len(lote)} textos.")
 
-            # Preenche o campo 'embedding' apenas se ele for nulo, para evitar sobrescrever embeddings existentes
-            supabase.table('knowledge_base').update(data_update).eq('kb_id', kb_id).is_('embedding', 'null').execute()
+    linhas = [
+        {
+            "kb_id": row["kb_id"],
+            "descricao": row["descricao"],
+            # O prefixo 'embedding_curto' do 1º estágio da busca é derivado no banco (trigger 'preencher_embedding_curto')
+            "embedding": embedding.values,
+            "embedding_hash": row["hash_esperado"],
+            # Guarda de concorrência: a linha só é gravada se ainda estiver como foi lida
+            "embedding_hash_lido": row.get("embedding_hash"),
+        }
+        for row, embedding in zip(lote, result.embeddings)
+    ]
+    response = supabase.rpc("atualizar_embeddings_lote", {"tabela": tabela, "linhas": linhas}).execute()
+    return list(response.data or [])
 
-            print("✅ Salvo")
-            sucessos += 1
 
-            time.sleep(0.5)
+def reindexar(
+    tabela: str = "knowledge_base",
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    workers: int = WORKERS_PADRAO,
+    requisicoes_por_segundo: float = REQUISICOES_POR_SEGUNDO_PADRAO,
+    caminho_checkpoint: Path | None = CHECKPOINT_PADRAO,
+    dry_run: bool = False,
+    forcar: bool = False,
+) -> None:
+    """
+    Busca registros da tabela informada que estão sem embedding (nulo) ou cujo conteúdo mudou
+    desde o último embedding (hash divergente) e calcula/atualiza os mesmos usando o modelo
+    Gemini Embedding, em lotes processados por um pool limitado de workers. O progresso é
+    salvo em um checkpoint para que a execução possa ser retomada.
 
-        except Exception as e:
-            print(f"\n❌ ERRO no ID {kb_id}: {e}")
-            erros += 1
+    Args:
+        tabela (str): Tabela a ser reindexada ('knowledge_base' ou 'knowledge_base_etl').
+        tamanho_lote (int): Quantidade de textos enviados por chamada 'embed_content'.
+        workers (int): Número máximo de lotes processados em paralelo.
+        requisicoes_por_segundo (float): Taxa inicial do limitador adaptativo.
+        caminho_checkpoint (Path | None): Arquivo de checkpoint (None desativa a retomada).
+        dry_run (bool): Apenas exibe o delta e a estimativa de custo, sem chamar a API de embeddings.
+        forcar (bool): Reindexa todos os registros, ignorando o hash.
+    """
+    print("🔌 Conectando aos serviços...")
+    try:
+        client = cliente_gemini()
+        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception as e:
+        print(f"❌ Erro de conexão. Verifique suas chaves. Detalhes: {e}")
+        return
+    print(f"🔍 Comparando os hashes de conteúdo da tabela '{tabela}'...")
+
+    checkpoint = Checkpoint(None if dry_run else caminho_checkpoint)
+    pendentes, delta = buscar_registros_pendentes(supabase, tabela, forcar)
+    registros = [row for row in pendentes if not checkpoint.concluido(row)]
+
+    tokens_estimados = sum(estimar_tokens(row.get("descricao", "") or "") for row in registros)
+    print(
+        f"📊 Delta: {delta['sem_embedding']} sem embedding | {delta['sem_hash']} sem hash (origem desconhecida) | "
+        f"{delta['alterados']} com conteúdo alterado | "
+        f"{delta['atualizados']} já atualizados"
+    )
+    print(
+        f"💰 Estimativa: ~{tokens_estimados} tokens "
+        f"(~US$ {tokens_estimados / 1_000_000 * CUSTO_USD_POR_MILHAO_TOKENS:.4f})"
+    )
+
+    total = len(registros)
+    if total == 0:
+        print("✅ Nenhum registro pendente (sem embedding ou com hash divergente) encontrado.")
+        checkpoint.limpar()
+        return
+
+    if dry_run:
+        print("🧪 Dry-run: nenhum embedding foi gerado.")
+        return
+
+    if len(pendentes) > total:
+        print(f"⏯️  Retomando do checkpoint ({len(pendentes) - total} registros já concluídos com o conteúdo atual).")
 
+    lotes = [registros[i:i + tamanho_lote] for i in range(0, total, tamanho_lote)]
+
+    print(f"🚀 Encontrados {total} registros para reindexar em {len(lotes)} lotes de até {tamanho_lote}.")
+    print(f"🧠 Usando modelo: {MODELO_SEMANTICO_NOME} ({TAMANHO_VETOR_SEMANTICO} dimensões) com {workers} workers")
+    print("-" * 50)
+
+    limitador = LimitadorAdaptativo(requisicoes_por_segundo)
+    sucessos = 0
+    ignorados = 0
+    erros = 0
+    inicio = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futuros = {executor.submit(processar_lote, client, supabase, tabela, lote, limitador): lote for lote in lotes}
+
+        for futuro in as_completed(futuros):
+            lote = futuros[futuro]
+            try:
+                gravados = futuro.result()
+                # Só os ids gravados vão para o checkpoint: os barrados pela guarda são refeitos na próxima execução
+                hashes = {row["kb_id"]: row["hash_esperado"] for row in lote}
+                checkpoint.registrar({kb_id: hashes[kb_id] for kb_id in gravados})
+                sucessos += len(gravados)
+                ignorados += len(lote) - len(gravados)
+            except Exception as e:
+                print(f"\n❌ ERRO no lote {lote[0]['kb_id']}..{lote[-1]['kb_id']}: {e}")
+                erros += len(lote)
+
+            decorrido = time.monotonic() - inicio
+            vazao = sucessos / decorrido if decorrido else 0.0
+            restantes = total - sucessos - ignorados - erros
+            eta = restantes / vazao if vazao else 0.0
+            print(
+                f"[{sucessos + ignorados + erros}/{total}] {vazao:.1f} registros/s | "
+                f"taxa {limitador.taxa:.1f} req/s | ETA {eta:.0f}s"
+            )
+
+    decorrido = time.monotonic() - inicio
     print("-" * 50)
     print("🏁 Processo finalizado!")
     print(f"✅ Sucessos: {sucessos}")
+    print(f"⏭️  Alterados durante a execução (não gravados): {ignorados}")
     print(f"❌ Falhas: {erros}")
+    print(f"⏱️  Tempo total: {decorrido:.1f}s ({sucessos / decorrido if decorrido else 0:.1f} registros/s)")
+
+    if erros == 0 and ignorados == 0:
+        checkpoint.limpar()
+    else:
+        print("⏯️  Execute novamente para retomar, a partir do checkpoint, os registros que falharam ou mudaram durante a execução.")
+
 
 if __name__ == "__main__":
-    reindexar()
+    parser = argparse.ArgumentParser(description="Reindexa os embeddings da base de conhecimento em lotes.")
+    parser.add_argument("--tabela", default="knowledge_base", choices=["knowledge_base", "knowledge_base_etl"])
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_PADRAO, help="Textos por chamada embed_content.")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO, help="Lotes processados em paralelo.")
+    parser.add_argument("--rps", type=float, default=REQUISICOES_POR_SEGUNDO_PADRAO, help="Taxa inicial de requisições por segundo.")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PADRAO, help="Arquivo de checkpoint para retomada.")
+    parser.add_argument("--sem-checkpoint", action="store_true", help="Não lê nem grava checkpoint.")
+    parser.add_argument("--dry-run", action="store_true", help="Mostra o delta e o custo estimado sem gerar embeddings.")
+    parser.add_argument("--forcar", action="store_true", help="Reindexa todos os registros, ignorando o hash.")
+    args = parser.parse_args()
+
+    reindexar(
+        tabela=args.tabela,
+        tamanho_lote=args.lote,
+        workers=args.workers,
+        requisicoes_por_segundo=args.rps,
+        caminho_checkpoint=None if args.sem_checkpoint else args.checkpoint,
+        dry_run=args.dry_run,
+        forcar=args.forcar,
+    )
@@ -0,0 +1,43 @@
+"""
+Carimba a versão da aplicação em 'src/_versao.py' durante o build/deploy.
+
+Com o arquivo presente, 'git_version()' (src/utils.py) não precisa chamar o git nem ler o
+CHANGELOG.md em cada processo novo, o que encurta a inicialização no Hugging Face Space.
+O arquivo é gerado, não versionado (.gitignore).
+
+Uso:
+    python scripts/gerar_versao.py [--versao v3.4.0]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+caminho_raiz = str(Path(__file__).resolve().parent.parent)
+
+if caminho_raiz not in sys.path:
+    sys.path.append(caminho_raiz)
+
+from src.utils import calcular_versao  # noqa: E402
+
+ARQUIVO_VERSAO = Path(caminho_raiz) / "src" / "_versao.py"
+
+
+def main(versao: str | None) -> None:
+    versao = versao or calcular_versao()
+    if not versao:
+        print("❌ Não foi possível determinar a versão (sem tags no git nem versão no CHANGELOG.md).")
+        sys.exit(1)
+
+    ARQUIVO_VERSAO.write_text(
+        f'# Gerado por scripts/gerar_versao.py. Não edite nem versione este arquivo.\nVERSAO = "{versao}"\n',
+        encoding="utf-8",
+    )
+    print(f"✅ Versão {versao} gravada em {ARQUIVO_VERSAO}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera src/_versao.py com a versão da aplicação.")
+    parser.add_argument("--versao", help="Versão a carimbar (padrão: calculada pelas tags do git ou CHANGELOG).")
+    args = parser.parse_args()
+    main(args.versao)
@@ -0,0 +1,123 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from supabase import create_client
+
+caminho_raiz = str(Path(__file__).resolve().parent.parent)
+
+if caminho_raiz not in sys.path:
+    sys.path.append(caminho_raiz)
+
+from src.config import (  # noqa: E402
+    HNSW_EF_SEARCH,
+    TAMANHO_VETOR_CURTO,
+    TAMANHO_VETOR_SEMANTICO,
+    get_secret,
+)
+from src.core.contexto import converter_vetor  # noqa: E402
+from exportar_snapshot_kb import buscar_kb_ativa  # noqa: E402
+
+SUPABASE_URL = get_secret("supabase.url")
+SUPABASE_KEY = get_secret("supabase.key")
+
+RECALL_MINIMO = 0.95
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def top_k_exato(matriz: np.ndarray, consulta: np.ndarray, k: int) -> list[int]:
+    """Vizinhos exatos pelo vetor completo (referência do recall)."""
+    return list(np.argsort(-(matriz @ consulta))[:k])
+
+
+def top_k_dois_estagios(matriz: np.ndarray, prefixos: np.ndarray, consulta: np.ndarray, k: int) -> list[int]:
+    """
+    Simula localmente a busca de 'match_knowledge_base': candidatos pelo prefixo em float16
+    (sem a aproximação do HNSW) e reordenação exata com o vetor completo.
+    """
+    consulta_curta = _normalizar(consulta[:TAMANHO_VETOR_CURTO].astype(np.float16).astype(np.float32))
+    n_candidatos = max(k * 4, 40)
+    candidatos = np.argsort(-(prefixos @ consulta_curta))[:n_candidatos]
+    return list(candidatos[np.argsort(-(matriz[candidatos] @ consulta))][:k])
+
+
+def verificar_recall(amostras: int = 100, k: int = 10, semente: int = 42, ef_search: int = HNSW_EF_SEARCH) -> bool:
+    """
+    Mede o recall@k da busca em dois estágios (prefixo halfvec + reordenação) em relação à busca
+    exata pelo vetor completo, usando como consultas os próprios embeddings de chunks da KB.
+    Reporta o recall da simulação local e o da RPC 'match_knowledge_base' em produção (com HNSW),
+    além da latência da RPC.
+
+    Returns:
+        bool: True se o recall@k da RPC atingiu RECALL_MINIMO.
+    """
+    print("🔌 Conectando ao Supabase...")
+    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    print("🔍 Buscando embeddings da KB ativa...")
+    registros = buscar_kb_ativa(supabase)
+    if len(registros) <= k:
+        print("❌ KB pequena demais para medir o recall.")
+        return False
+
+    kb_ids = [row["kb_id"] for row in registros]
+    matriz = _normalizar(np.asarray([converter_vetor(row["embedding"]) for row in registros], dtype=np.float32))
+    prefixos = _normalizar(matriz[:, :TAMANHO_VETOR_CURTO].astype(np.float16).astype(np.float32))
+
+    random.seed(semente)
+    consultas = random.sample(range(len(registros)), min(amostras, len(registros)))
+
+    recall_local = []
+    recall_rpc = []
+    latencias_ms = []
+
+    for idx in consultas:
+        consulta = matriz[idx]
+        esperado = set(top_k_exato(matriz, consulta, k))
+        recall_local.append(len(esperado & set(top_k_dois_estagios(matriz, prefixos, consulta, k))) / k)
+
+        inicio = time.perf_counter()
+        response = supabase.rpc(
+            "match_knowledge_base",
+            {"query_embedding": consulta.tolist(), "match_threshold": -1.0, "match_count": k, "filter_topic": None, "ef_search": ef_search},
+        ).execute()
+        latencias_ms.append((time.perf_counter() - inicio) * 1000)
+
+        esperado_ids = {kb_ids[i] for i in esperado}
+        obtidos_ids = {row.get("kb_id") or row.get("id") for row in response.data or []}
+        recall_rpc.append(len(esperado_ids & obtidos_ids) / k)
+
+    latencias_ms.sort()
+    p95 = latencias_ms[min(len(latencias_ms) - 1, int(len(latencias_ms) * 0.95))]
+    bytes_completo = TAMANHO_VETOR_SEMANTICO * 4
+    bytes_curto = TAMANHO_VETOR_CURTO * 2
+
+    print("-" * 50)
+    print(f"📊 {len(consultas)} consultas | k={k} | ef_search={ef_search} | KB com {len(registros)} chunks")
+    print(f"🧪 Recall@{k} (simulação local, sem HNSW): {statistics.mean(recall_local):.3f}")
+    print(f"🗄️  Recall@{k} (RPC match_knowledge_base): {statistics.mean(recall_rpc):.3f}")
+    print(f"⏱️  Latência da RPC: p50 {statistics.median(latencias_ms):.1f} ms | p95 {p95:.1f} ms")
+    print(f"💾 Bytes por vetor indexado: {bytes_completo} (vector {TAMANHO_VETOR_SEMANTICO}) -> {bytes_curto} (halfvec {TAMANHO_VETOR_CURTO})")
+
+    aprovado = statistics.mean(recall_rpc) >= RECALL_MINIMO
+    print("✅ Recall dentro do esperado." if aprovado else f"❌ Recall abaixo de {RECALL_MINIMO}.")
+    return aprovado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o recall@k da busca vetorial em dois estágios.")
+    parser.add_argument("--amostras", type=int, default=100, help="Quantidade de consultas amostradas da KB.")
+    parser.add_argument("-k", type=int, default=10, help="Tamanho do top-k comparado.")
+    parser.add_argument("--ef-search", type=int, default=HNSW_EF_SEARCH, help="Valor de hnsw.ef_search repassado à RPC.")
+    args = parser.parse_args()
+
+    sys.exit(0 if verificar_recall(args.amostras, args.k, ef_search=args.ef_search) else 1)
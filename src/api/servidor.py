@@ -0,0 +1,374 @@
+"""
+Servidor assíncrono (ASGI) do Vox AI, sem Streamlit.
+
+Expõe o mesmo pipeline do app (src/core/pipeline.py: embedding -> recuperação -> geração -> log) para outros canais
+(ex: WhatsApp, Telegram) e para workers escaláveis horizontalmente. O estado da conversa fica no
+armazenamento de sessões (src/core/estado_sessao.py): com SESSAO_ARMAZENAMENTO 'sqlite' ou 'postgres',
+qualquer worker atende qualquer sessão. O padrão 'memoria' guarda o estado no próprio processo, então
+só serve para um único worker; com mais de um (API_WORKERS, de WEB_CONCURRENCY), o servidor não sobe.
+
+Chamadas ao Supabase: o Gemini é chamado pelo cliente assíncrono do google-genai, mas o Supabase segue
+com o cliente síncrono do core, em 'asyncio.to_thread' (recuperação, logs e estado das sessões). O
+cliente assíncrono do supabase exigiria duplicar em async toda a camada src/core/db, que o app Streamlit
+e os scripts usam de forma síncrona. As threads ficam limitadas por PRAZO_CHAMADAS_SIMULTANEAS e pelo
+prazo do turno (src/core/prazo.py), então uma RPC lenta não prende o event loop nem a fila de turnos.
+
+Autenticação: POST /v1/chat exige 'Authorization: Bearer <chave>', com uma das chaves do segredo
+'api.chaves' (separadas por vírgula), conferida antes de ler o corpo. Sem chaves configuradas, a rota
+responde 503. Para retomar uma sessão, o cliente envia o 'session_token' recebido no evento 'sessao':
+um HMAC (segredo 'api.segredo_sessao') do 'session_id' e da chave que o criou. Assim, uma chave não
+retoma sessões de outra nem sessões do app, cujo 'sid' nunca recebe token.
+
+Rotas:
+    - POST /v1/chat: {"mensagem": "...", "session_id": "...", "session_token": "..." (opcionais)} ->
+      resposta em SSE, com os eventos 'sessao' (session_id e session_token), 'token' (um por trecho),
+      'fim' (trace, fonte, tokens, durações e degradações pelo prazo do turno) ou 'erro';
+    - GET /health: o processo está de pé (liveness);
+    - GET /ready: o aquecimento terminou (readiness, src/core/aquecimento.py); 503 até lá.
+
+Cada worker atende no máximo API_CONCORRENCIA_MAX turnos ao mesmo tempo; quem não consegue uma vaga
+em API_FILA_ESPERA_S recebe 503 com 'Retry-After'. Execução, com o extra 'api' instalado (uv sync --extra api;
+o número de workers vem de WEB_CONCURRENCY, que o uvicorn também usa como '--workers'):
+
+    WEB_CONCURRENCY=4 VOX_SESSAO_ARMAZENAMENTO=postgres uvicorn src.api.servidor:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from collections.abc import AsyncIterator
+from functools import cache
+from typing import Any
+
+from src.config import (
+    API_CONCORRENCIA_MAX,
+    API_FILA_ESPERA_S,
+    API_MENSAGEM_MAX_CARACTERES,
+    API_WORKERS,
+    get_secret,
+    logger,
+)
+from src.core.aquecimento import estado_aquecimento, iniciar_aquecimento
+from src.core.estado_sessao import armazenamento_sessao, carregar_sessao, serializar_estado
+from src.core.pipeline import CallbacksPipeline, Turno, VoxPipeline
+from src.utils import git_version
+
+logger_api = logger.getChild("api")
+
+_vagas = asyncio.Semaphore(API_CONCORRENCIA_MAX)
+_turnos_em_andamento = 0
+_pipeline = VoxPipeline()
+# Turnos cujo cliente desconectou continuam até gravar o log; a referência evita que sejam coletados
+_turnos_em_segundo_plano: set[asyncio.Task] = set()
+
+
+@cache
+def _chaves_api() -> tuple[str, ...]:
+    """
+    Chaves aceitas no 'Authorization: Bearer' (segredo 'api.chaves', separadas por vírgula).
+    """
+    return tuple(chave.strip() for chave in get_secret("api.chaves").split(",") if chave.strip())
+
+
+@cache
+def _segredo_sessao() -> bytes:
+    """
+    Segredo dos tokens de sessão (segredo 'api.segredo_sessao'); vazio desativa a retomada de sessões.
+    """
+    return get_secret("api.segredo_sessao").encode()
+
+
+def autenticar(cabecalhos: list[tuple[bytes, bytes]]) -> str | None:
+    """
+    Confere o 'Authorization: Bearer <chave>' da requisição.
+
+    Returns:
+        str | None: A chave apresentada, se for uma das configuradas.
+    """
+    autorizacao = dict(cabecalhos).get(b"authorization", b"").decode("latin-1")
+    esquema, _, apresentada = autorizacao.partition(" ")
+    if esquema.lower() != "bearer" or not apresentada.strip():
+        return None
+    apresentada = apresentada.strip()
+    # Compara com todas as chaves, em tempo constante, para não vazar qual chegou perto
+    validas = [chave for chave in _chaves_api() if hmac.compare_digest(chave.encode(), apresentada.encode())]
+    return validas[0] if validas else None
+
+
+def token_sessao(chave: str, session_id: str) -> str | None:
+    """
+    Token que autoriza a 'chave' a retomar a sessão 'session_id', ou None sem 'api.segredo_sessao'.
+    """
+    segredo = _segredo_sessao()
+    if not segredo:
+        return None
+    cliente = hashlib.sha256(chave.encode()).hexdigest()
+    return hmac.new(segredo, f"{cliente}:{session_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def sessao_autorizada(chave: str, session_id: Any, token: Any) -> bool:
+    """
+    Indica se o 'token' enviado autoriza a 'chave' a retomar a sessão.
+    """
+    if not isinstance(session_id, str) or not isinstance(token, str):
+        return False
+    esperado = token_sessao(chave, session_id)
+    return esperado is not None and hmac.compare_digest(esperado, token)
+
+
+def evento_sse(nome: str, dados: dict[str, Any]) -> bytes:
+    """
+    Formata um evento Server-Sent Events.
+    """
+    return f"event: {nome}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n".encode()
+
+
+class CallbacksSSE(CallbacksPipeline):
+    """
+    Converte os eventos do pipeline em eventos SSE, entregues por uma fila asyncio.
+    """
+
+    def __init__(self):
+        self.fila: asyncio.Queue[tuple[str, dict[str, Any]] | None] = asyncio.Queue()
+
+    def ao_token(self, texto: str) -> None:
+        self.fila.put_nowait(("token", {"texto": texto}))
+
+    def ao_concluir(self, turno: Turno) -> None:
+        self.fila.put_nowait(("fim", {"trace_id": turno.trace.trace_id, "fonte": turno.fonte, "tokens": turno.tokens, "duracoes_ms": turno.trace.duracoes(), "degradacoes": turno.prazo.degradacoes}))
+
+    def ao_erro(self, turno: Turno) -> None:
+        self.fila.put_nowait(("erro", {"error_id": turno.error_id, "tipo": turno.tipo_erro}))
+
+
+class VagaTurno:
+    """
+    Vaga de concorrência de um turno. Fica ocupada até o turno terminar, mesmo quando o cliente
+    desconecta e o turno segue em segundo plano, e é devolvida uma única vez.
+    """
+
+    def __init__(self):
+        self.turno: asyncio.Task | None = None
+        self.devolvida = False
+
+    def devolver(self, *_: Any) -> None:
+        global _turnos_em_andamento
+        if self.devolvida:
+            return
+        self.devolvida = True
+        _turnos_em_andamento -= 1
+        _vagas.release()
+
+
+async def turno_chat(mensagem: str, sid: str | None = None, chave: str | None = None, vaga: VagaTurno | None = None) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """
+    Executa um turno de conversa no pipeline e entrega seus eventos na ordem, sem depender de HTTP.
+
+    Args:
+        mensagem (str): Pergunta do usuário.
+        sid (str | None): Sessão a retomar, já autorizada pelo chamador; desconhecida ou ausente, uma nova é criada.
+        chave (str | None): Chave do cliente; com ela, o evento 'sessao' leva o 'session_token'.
+        vaga (VagaTurno | None): Vaga de concorrência, devolvida quando a execução do pipeline termina.
+
+    Yields:
+        tuple[str, dict[str, Any]]: Nome e dados de cada evento ('sessao', 'token', 'fim' ou 'erro').
+    """
+    # O armazenamento pode ser síncrono (SQLite/Supabase): roda em uma thread para não bloquear o event loop
+    session_id, estado = await asyncio.to_thread(carregar_sessao, sid)
+    if estado is None:
+        # Uma sessão nova é registrada no banco enquanto o embedding da pergunta é gerado
+        _pipeline.iniciar_registro_sessao(session_id)
+        estado = serializar_estado({})
+    yield "sessao", {"session_id": session_id, "session_token": token_sessao(chave, session_id) if chave else None}
+
+    callbacks = CallbacksSSE()
+    turno = Turno(session_id, mensagem, estado["hist_exibir"], estado["memoria_recuperacao"], estado["orcamento_tokens"])
+    execucao = asyncio.create_task(_pipeline.executar(turno, callbacks))
+    _turnos_em_segundo_plano.add(execucao)
+    execucao.add_done_callback(_turnos_em_segundo_plano.discard)
+    execucao.add_done_callback(lambda _: callbacks.fila.put_nowait(None))
+    if vaga:
+        vaga.turno = execucao
+        execucao.add_done_callback(vaga.devolver)
+
+    while (evento := await callbacks.fila.get()) is not None:
+        yield evento
+    # Propaga falhas inesperadas do pipeline
+    await execucao
+
+
+async def _responder_json(send, status: int, corpo: dict[str, Any], cabecalhos: list[tuple[bytes, bytes]] | None = None) -> None:
+    dados = json.dumps(corpo, ensure_ascii=False, default=str).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json; charset=utf-8"), (b"content-length", str(len(dados)).encode()), *(cabecalhos or [])],
+    })
+    await send({"type": "http.response.body", "body": dados})
+
+
+async def _ler_corpo(receive, limite_bytes: int) -> bytes | None:
+    """
+    Lê o corpo da requisição; None se passar de 'limite_bytes' ou se o cliente desconectar.
+    """
+    corpo = b""
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            return None
+        corpo += mensagem.get("body", b"")
+        if len(corpo) > limite_bytes:
+            return None
+        if not mensagem.get("more_body"):
+            return corpo
+
+
+async def _transmitir_turno(receive, send, mensagem: str, sid: str | None, chave: str, vaga: VagaTurno) -> None:
+    """
+    Transmite os eventos do turno em SSE. Se o cliente desconectar, a transmissão para e o turno
+    termina em segundo plano (o log ainda é gravado), ainda ocupando a sua vaga.
+    """
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+    })
+
+    desconectado = asyncio.Event()
+
+    async def vigiar_desconexao() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        desconectado.set()
+
+    vigia = asyncio.create_task(vigiar_desconexao())
+    eventos = turno_chat(mensagem, sid, chave, vaga)
+    try:
+        async for nome, dados in eventos:
+            if desconectado.is_set():
+                logger_api.info("🔌 Cliente desconectou; o turno termina em segundo plano.")
+                break
+            await send({"type": "http.response.body", "body": evento_sse(nome, dados), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        await eventos.aclose()
+        vigia.cancel()
+
+
+async def _rota_chat(scope, receive, send) -> int:
+    global _turnos_em_andamento
+
+    # A credencial é conferida antes de ler o corpo: sem ela, a API não gasta nada com a requisição
+    if not _chaves_api():
+        logger_api.critical("❌ API sem chaves configuradas (segredo 'api.chaves'); /v1/chat recusada.")
+        await _responder_json(send, 503, {"erro": "API indisponível."})
+        return 503
+    chave = autenticar(scope["headers"])
+    if chave is None:
+        await _responder_json(send, 401, {"erro": "Credencial ausente ou inválida."}, [(b"www-authenticate", b"Bearer")])
+        return 401
+
+    corpo = await _ler_corpo(receive, API_MENSAGEM_MAX_CARACTERES * 4 + 1024)
+    try:
+        dados = json.loads(corpo) if corpo else None
+    except ValueError:
+        dados = None
+    mensagem = dados.get("mensagem") if isinstance(dados, dict) else None
+    if not isinstance(mensagem, str) or not mensagem.strip() or len(mensagem) > API_MENSAGEM_MAX_CARACTERES:
+        await _responder_json(send, 400, {"erro": f"Envie {{'mensagem': texto de até {API_MENSAGEM_MAX_CARACTERES} caracteres}}."})
+        return 400
+
+    sid = dados.get("session_id")
+    if sid is not None and not sessao_autorizada(chave, sid, dados.get("session_token")):
+        # Sem o token emitido para esta chave, nenhuma sessão é retomada (nem as do app)
+        await _responder_json(send, 403, {"erro": "Sessão não autorizada para esta credencial."})
+        return 403
+
+    try:
+        await asyncio.wait_for(_vagas.acquire(), timeout=API_FILA_ESPERA_S)
+    except TimeoutError:
+        logger_api.warning(f"🚦 Sem vaga para um novo turno ({API_CONCORRENCIA_MAX} em andamento).")
+        await _responder_json(send, 503, {"erro": "Servidor ocupado. Tente novamente em instantes."}, [(b"retry-after", b"1")])
+        return 503
+
+    _turnos_em_andamento += 1
+    vaga = VagaTurno()
+    try:
+        await _transmitir_turno(receive, send, mensagem.strip(), sid, chave, vaga)
+    finally:
+        # Com o turno ainda em segundo plano (cliente desconectou), a vaga só volta quando ele terminar
+        if vaga.turno is None or vaga.turno.done():
+            vaga.devolver()
+    return 200
+
+
+def erro_configuracao() -> str | None:
+    """
+    Confere se a configuração permite subir o worker.
+
+    Returns:
+        str | None: O motivo para não subir, ou None se estiver tudo certo.
+    """
+    backend = armazenamento_sessao().backend.nome
+    if API_WORKERS > 1 and backend == "memoria":
+        return (
+            f"{API_WORKERS} workers com o estado das sessões em '{backend}': cada worker teria o seu, e uma sessão "
+            "retomada falharia nos demais. Use SESSAO_ARMAZENAMENTO 'sqlite' ou 'postgres', ou um único worker."
+        )
+    return None
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "lifespan.startup":
+            erro = erro_configuracao()
+            if erro:
+                logger_api.critical(f"❌ {erro}")
+                await send({"type": "lifespan.startup.failed", "message": erro})
+                return
+            iniciar_aquecimento()
+            await send({"type": "lifespan.startup.complete"})
+        elif mensagem["type"] == "lifespan.shutdown":
+            # Grava os estados de sessão ainda pendentes antes de o worker sair
+            await asyncio.to_thread(armazenamento_sessao().descarregar)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    """
+    Aplicação ASGI do Vox AI.
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    inicio = time.perf_counter()
+    metodo, caminho = scope["method"], scope["path"]
+    if (metodo, caminho) == ("POST", "/v1/chat"):
+        status = await _rota_chat(scope, receive, send)
+    elif (metodo, caminho) == ("GET", "/health"):
+        status = 200
+        await _responder_json(send, status, {
+            "status": "ok",
+            "versao": git_version(),
+            "turnos_em_andamento": _turnos_em_andamento,
+            "concorrencia_max": API_CONCORRENCIA_MAX,
+        })
+    elif (metodo, caminho) == ("GET", "/ready"):
+        estado = estado_aquecimento()
+        status = 200 if estado["pronto"] else 503
+        await _responder_json(send, status, estado)
+    elif caminho in ("/v1/chat", "/health", "/ready"):
+        status = 405
+        await _responder_json(send, status, {"erro": "Método não permitido."})
+    else:
+        status = 404
+        await _responder_json(send, status, {"erro": "Rota não encontrada."})
+
+    logger_api.info(f"🌐 {metodo} {caminho} -> {status} em {(time.perf_counter() - inicio) * 1000:.1f} ms")
@@ -0,0 +1,108 @@
+"""
+Pacote de assets estáticos da interface, montado uma única vez por processo.
+
+Reúne o CSS minificado, o HTML da sidebar já pronto e a saudação. Cada reexecução do Streamlit
+apenas reutiliza o pacote cacheado com 'st.cache_resource', sem abrir arquivos nem refazer trabalho
+com strings.
+
+Em desenvolvimento (ASSETS_HOT_RELOAD), o pacote é remontado quando algum arquivo de origem muda
+(comparando o mtime), recarregando também os módulos de prompts (as instruções de sistema são lidas
+do módulo pelo core, em 'src.core.genai.instrucoes_sistema'). Os segredos não fazem parte do pacote:
+o core os lê com 'get_secret'.
+"""
+
+import importlib
+import os
+import re
+
+import streamlit as st
+
+from src.config import ASSETS_HOT_RELOAD, CSS_PATH, logger
+
+MODULOS_PROMPTS = ("data.prompts.ui_content", "data.prompts.system_prompt")
+ARQUIVOS_ORIGEM = (CSS_PATH, "data/prompts/ui_content.py", "data/prompts/system_prompt.py")
+
+
+class PacoteAssets:
+    """
+    Assets prontos para uso pela interface. Imutável: os atributos são definidos na criação.
+
+    Args:
+        css (str): CSS minificado.
+        sidebar_body (str): HTML minificado do conteúdo da sidebar.
+        sidebar_footer (str): HTML minificado do rodapé da sidebar.
+        saudacao (str): Mensagem de boas-vindas.
+    """
+
+    __slots__ = ("css_html", "sidebar_body", "sidebar_footer", "saudacao")
+
+    def __init__(self, css: str, sidebar_body: str, sidebar_footer: str, saudacao: str):
+        atributos = {
+            # Já embrulhado na tag <style>, pronto para o st.markdown
+            "css_html": f"<style>{css}</style>",
+            "sidebar_body": sidebar_body,
+            "sidebar_footer": sidebar_footer,
+            "saudacao": saudacao,
+        }
+        for nome, valor in atributos.items():
+            object.__setattr__(self, nome, valor)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("PacoteAssets é imutável.")
+
+
+def minificar_css(css: str) -> str:
+    """
+    Remove comentários e espaços desnecessários de um CSS.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minificar_html(html: str) -> str:
+    """
+    Junta o HTML em uma linha, removendo a indentação e os espaços entre tags.
+    Em uma linha só, o st.markdown também não confunde trechos indentados com blocos de código.
+    """
+    html = re.sub(r">\s+<", "><", html)
+    return re.sub(r"\s+", " ", html).strip()
+
+
+def _assinatura_arquivos() -> tuple[float, ...]:
+    """
+    mtime de cada arquivo de origem do pacote (0 para os ausentes).
+    """
+    return tuple(os.path.getmtime(caminho) if os.path.exists(caminho) else 0.0 for caminho in ARQUIVOS_ORIGEM)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _montar_pacote(assinatura: tuple[float, ...] | None) -> PacoteAssets:
+    """
+    Lê os arquivos e monta o pacote. 'assinatura' só participa da chave do cache: quando muda
+    (hot reload), o pacote é remontado e os módulos de prompts, recarregados.
+    """
+    modulos = [importlib.import_module(nome) for nome in MODULOS_PROMPTS]
+    if assinatura is not None:
+        modulos = [importlib.reload(modulo) for modulo in modulos]
+    ui_content = modulos[0]
+
+    with open(CSS_PATH, encoding="utf-8") as f:
+        css = minificar_css(f.read())
+
+    pacote = PacoteAssets(
+        css=css,
+        sidebar_body=minificar_html(ui_content.SIDEBAR_BODY),
+        sidebar_footer=minificar_html(ui_content.SIDEBAR_FOOTER),
+        saudacao=ui_content.SAUDACAO,
+    )
+    logger.info(f"📦 Pacote de assets montado (CSS com {len(css)} caracteres).")
+    return pacote
+
+
+def pacote_assets() -> PacoteAssets:
+    """
+    Retorna o pacote de assets do processo (remontado ao mudar algum arquivo, se ASSETS_HOT_RELOAD).
+    """
+    return _montar_pacote(_assinatura_arquivos() if ASSETS_HOT_RELOAD else None)
@@ -1,10 +1,13 @@
 import time
+from functools import lru_cache
 
 import streamlit as st
 
 from collections.abc import Iterator
-from src.config import CSS_PATH
+from src.app.assets import pacote_assets
+from src.config import HISTORICO_JANELA_MENSAGENS, HISTORICO_PAGINA_MENSAGENS, logger
 from src.core.database import salvar_report, get_categorias_erro, salvar_erro, excluir_dados_sessao
+from src.core.genai import cliente_gemini
 
 
 def configurar_pagina() -> None:
@@ -24,15 +27,55 @@ def configurar_pagina() -> None:
     )
 
 
-def carregar_css(path=CSS_PATH) -> None:
+def configurar_api_gemini():
     """
-    Carrega e injeta arquivos CSS estáticos na página para customização visual do Streamlit.
+    Retorna o cliente compartilhado da API do Google GenAI, guardando a referência no session_state.
+    Se o cliente não puder ser criado, exibe o erro e interrompe a execução da página.
+
+    Returns:
+        genai.Client: Cliente configurado do Gemini.
+    """
+    if "gemini_client" not in st.session_state:
+        try:
+            st.session_state.gemini_client = cliente_gemini()
+        except Exception as e:
+            logger.error(f"Erro ao configurar a API do Gemini: {e}")
+            st.error(f"Erro ao configurar a API do Gemini: {e}")
+            st.stop()
+
+    return st.session_state.gemini_client
+
+
+def inicializar_chat_modelo(estado_salvo: dict | None = None) -> list[dict]:
+    """
+    Inicializa o histórico da sessão ('hist_exibir'), o único armazenamento da conversa:
+    o chat do Gemini não fica na sessão e é reconstruído a partir dele a cada turno (src/core/pipeline.py).
+    Se a sessão foi retomada do armazenamento externo (src/core/estado_sessao.py), o histórico, a
+    memória de recuperação e o orçamento de tokens são reidratados do estado salvo.
 
     Args:
-        path (str): Caminho local do arquivo CSS.
+        estado_salvo (dict | None): Estado serializado da sessão, ou None para uma sessão nova.
+
+    Returns:
+        list[dict]: Histórico da conversa no estado de sessão.
+    """
+    if "hist_exibir" not in st.session_state:
+        estado_salvo = estado_salvo or {}
+        st.session_state.hist_exibir = list(estado_salvo.get("hist_exibir") or [])
+        st.session_state.memoria_recuperacao = dict(estado_salvo.get("memoria_recuperacao") or {})
+        st.session_state.orcamento_tokens = dict(estado_salvo.get("orcamento_tokens") or {})
+        if st.session_state.hist_exibir:
+            # A saudação já está no histórico retomado
+            st.session_state.primeira_vez = True
+
+    return st.session_state.hist_exibir
+
+
+def carregar_css() -> None:
+    """
+    Injeta o CSS estático (minificado e cacheado no pacote de assets) para customização visual do Streamlit.
     """
-    with open(path) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(pacote_assets().css_html, unsafe_allow_html=True)
 
 
 @st.dialog("🚩 Reportar Problema")
@@ -128,8 +171,11 @@ def carregar_sidebar(sidebar_content: str, sidebar_footer: str) -> None:
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🧹 Limpar conversa", use_container_width=True):
+                from src.core.estado_sessao import armazenamento_sessao
+
+                armazenamento_sessao().excluir(st.session_state.get("session_id", ""))
                 st.session_state.pop("hist_exibir", None)
-                st.session_state.pop("chat", None)
+                st.session_state.pop("memoria_recuperacao", None)
                 st.rerun()
         with col2:
             if st.button("🚩 Reportar", use_container_width=True):
@@ -139,9 +185,14 @@ def carregar_sidebar(sidebar_content: str, sidebar_footer: str) -> None:
             import time
             with st.spinner("Excluindo dados do servidor..."):
                 if excluir_dados_sessao(st.session_state.get("session_id", "")):
-                    st.session_state.pop("session_id", None)
+                    from src.core.estado_sessao import armazenamento_sessao
+                    from src.core.sessoes import registro_sessoes
+
+                    armazenamento_sessao().excluir(st.session_state.get("session_id", ""))
+                    registro_sessoes.remover(st.session_state.pop("session_id", None))
+                    st.query_params.pop("sid", None)
                     st.session_state.pop("hist_exibir", None)
-                    st.session_state.pop("chat", None)
+                    st.session_state.pop("memoria_recuperacao", None)
                     st.success("Dados excluídos com sucesso! 🛡️")
                     time.sleep(1.5)
                     st.rerun()
@@ -168,22 +219,111 @@ def stream_resposta(resposta: str) -> Iterator[str]:
         time.sleep(0.009)
 
 
+class RespostaEmTela:
+    """
+    Desenha, em um placeholder, a resposta do pipeline à medida que os trechos chegam,
+    com o efeito de digitação de 'stream_resposta'.
+    """
+
+    def __init__(self):
+        self.placeholder = st.empty()
+        self.texto = ""
+
+    def adicionar(self, trecho: str) -> None:
+        for letra in stream_resposta(trecho):
+            self.texto += letra
+            self.placeholder.markdown(self.texto)
+
+    def limpar(self) -> None:
+        self.placeholder.empty()
+
+
+def exibir_botao_audio(texto: str, indice: int) -> None:
+    """
+    Exibe o botão "🔊 Ouvir" de uma resposta do modelo e, quando clicado, o player com o áudio gerado.
+    A chave depende só da posição no histórico, então o botão desenhado junto com uma resposta nova
+    é o mesmo que o histórico desenha nas execuções seguintes. O áudio fica em 'audio_tts' na sessão,
+    que o registro de sessões (src/core/sessoes.py) esvazia quando ela fica ociosa.
+
+    Args:
+        texto (str): Texto da resposta.
+        indice (int): Posição da resposta em 'hist_exibir'.
+    """
+    from src.core.tracing import trace_turno
+    from src.utils import audio_cacheado, texto_para_audio
+
+    audios = st.session_state.setdefault("audio_tts", {})
+    if st.button("🔊 Ouvir", key=f"btn_audio_{indice}") and indice not in audios:
+        with trace_turno(st.session_state.get("session_id", "")):
+            # A saudação é igual para todos: seu áudio é sintetizado uma vez (já no aquecimento do processo)
+            audios[indice] = audio_cacheado(texto) if texto == pacote_assets().saudacao else texto_para_audio(texto)
+    if indice in audios:
+        st.audio(audios[indice], format="audio/mp3")
+
+
+@lru_cache(maxsize=256)
+def _markdown_congelado(mensagens: tuple[tuple[str, str], ...]) -> str:
+    """
+    Monta (uma única vez por página) o markdown de um bloco de mensagens antigas do histórico.
+    O histórico só cresce no fim, então o conteúdo de uma página fechada nunca muda.
+    """
+    blocos = []
+    for papel, texto in mensagens:
+        autor = "🤖 **Vox**" if papel == "model" else "🧑‍💻 **Você**"
+        blocos.append(f"{autor}\n\n{texto}")
+    return "\n\n---\n\n".join(blocos)
+
+
+def _alterar_paginas_historico(delta: int) -> None:
+    """
+    Callback dos botões de paginação do histórico.
+    """
+    paginas = st.session_state.get("historico_paginas_visiveis", 0) + delta
+    st.session_state.historico_paginas_visiveis = max(0, paginas)
+
+
 def exibir_historico_chat(historico_conversa: list) -> None:
     """
     Exibe o histórico de conversa com o avatar e estilização apropriados.
     Também adiciona o player de áudio para respostas da inteligência artificial.
+
+    Apenas as últimas HISTORICO_JANELA_MENSAGENS mensagens são desenhadas completas. As anteriores
+    ficam atrás do botão "Mostrar mensagens anteriores" e, quando abertas, aparecem em páginas de
+    HISTORICO_PAGINA_MENSAGENS mensagens, cada uma em um único bloco de markdown memoizado e sem
+    botão de áudio. Assim, o custo de cada execução e o DOM do navegador não crescem com a conversa.
     """
-    from src.utils import texto_para_audio
-    
-    for i, msg in enumerate(historico_conversa):
+    total = len(historico_conversa)
+    inicio_janela = max(0, total - HISTORICO_JANELA_MENSAGENS)
+
+    if inicio_janela:
+        # Páginas alinhadas a múltiplos do tamanho da página, para que só a última mude a cada turno
+        paginas = st.session_state.get("historico_paginas_visiveis", 0)
+        ultima_pagina = (inicio_janela - 1) // HISTORICO_PAGINA_MENSAGENS
+        primeira_pagina = max(0, ultima_pagina - paginas + 1) if paginas else ultima_pagina + 1
+        inicio_visivel = min(primeira_pagina * HISTORICO_PAGINA_MENSAGENS, inicio_janela)
+
+        if inicio_visivel:
+            st.button(
+                f"⬆️ Mostrar mensagens anteriores ({inicio_visivel})",
+                key="btn_historico_anteriores",
+                on_click=_alterar_paginas_historico,
+                args=(1,),
+            )
+        if paginas:
+            st.button("⬇️ Ocultar mensagens anteriores", key="btn_historico_ocultar", on_click=_alterar_paginas_historico, args=(-paginas,))
+
+        for inicio in range(inicio_visivel, inicio_janela, HISTORICO_PAGINA_MENSAGENS):
+            fim = min(inicio + HISTORICO_PAGINA_MENSAGENS, inicio_janela)
+            pagina = tuple((msg["role"], msg["parts"][0]) for msg in historico_conversa[inicio:fim])
+            with st.container(border=True):
+                st.markdown(_markdown_congelado(pagina))
+
+    for i in range(inicio_janela, total):
+        msg = historico_conversa[i]
         if msg["role"] == "model":
             with st.chat_message("assistant", avatar="🤖"):
                 st.markdown(msg["parts"][0], unsafe_allow_html=False)
-
-                chave_botao = f"btn_audio_{i}"
-                if st.button("🔊 Ouvir", key=chave_botao):
-                    audio_data = texto_para_audio(msg["parts"][0])
-                    st.audio(audio_data, format="audio/mp3")
+                exibir_botao_audio(msg["parts"][0], i)
         else:
             with st.chat_message("user", avatar="🧑‍💻"):
                 st.markdown(msg["parts"][0])
@@ -201,3 +341,36 @@ def exibir_mensagem_erro(error_id: str) -> None:
         """,
         icon="🚫",
     )
+
+
+def exibir_erro_geracao(tipo_erro: str, error_id: str) -> None:
+    """
+    Exibe a mensagem adequada a uma falha na geração da resposta.
+
+    Args:
+        tipo_erro (str): Classificação da falha ('classificar_erro_gemini'): 'seguranca', 'cota', 'indisponivel' ou 'geral'.
+        error_id (str): ID do erro registrado em 'error_logs'.
+    """
+    if tipo_erro == "seguranca":
+        st.error(
+            f"⚠️ **Essa pergunta não pode ser respondida pelo Vox.**\n\n"
+            f"Por razões de segurança e acolhimento, sua mensagem ativou nossas diretrizes de proteção e não pôde ser processada.\n\n"
+            f"*(Código do Erro: **{error_id}**)*",
+            icon="🚫"
+        )
+    elif tipo_erro == "cota":
+        st.error(
+            f"Olá! O Vox está recebendo muitas mensagens de carinho e dúvidas no momento, e atingimos nosso limite de processamento temporário da API do Google. "
+            f"Por favor, aguarde cerca de um minutinho e tente enviar sua mensagem novamente! 💜\n\n"
+            f"*(Código do Erro: **{error_id}**)*",
+            icon="⚠️"
+        )
+    elif tipo_erro == "indisponivel":
+        st.error(
+            f"Ops! Os servidores da inteligência artificial estão com uma demanda muito alta agora e temporariamente instáveis. "
+            f"Que tal respirar fundo, tomar uma água e tentar de novo em alguns instantes? Estarei aqui esperando! 🏳️‍🌈\n\n"
+            f"*(Código do Erro: **{error_id}**)*",
+            icon="⏳"
+        )
+    else:
+        exibir_mensagem_erro(error_id)
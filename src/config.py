@@ -1,7 +1,6 @@
 import logging
 import os
-
-import streamlit as st
+import sys
 
 # Configuração de Logging Centralizado
 logging.basicConfig(
@@ -17,29 +16,103 @@ logger = logging.getLogger("Vox AI")
 
 # Caminhos
 CSS_PATH = "static/css/style.css"
+SNAPSHOT_KB_DIR = "data/snapshot_kb"
 
 # Configurações de IA
 GEMINI_MODEL_NAME = "gemini-3.5-flash"
 GEMINI_MODEL_GATEKEEP = "gemini-3.1-flash-lite"
 MODELO_SEMANTICO_NOME = "gemini-embedding-001"
 TAMANHO_VETOR_SEMANTICO = 1536
+# Prefixo Matryoshka (halfvec) usado no 1º estágio da busca vetorial
+TAMANHO_VETOR_CURTO = 256
 
 # Config da KB
 SEMANTICA_THRESHOLD = 0.5
 LIMITE_TEMAS = 10
 MAX_CHUNCK = 25
+HNSW_EF_SEARCH = 80
+
+# Empacotamento de contexto (orçamento de tokens e seleção MMR)
+CONTEXTO_ORCAMENTO_TOKENS = 4000
+CONTEXTO_LAMBDA_MMR = 0.7
+CONTEXTO_LIMIAR_REDUNDANCIA = 0.92
+CONTEXTO_MAX_CHUNKS_FALLBACK = 5
+
+# Digestos offline por tópico (gerados por scripts/gerar_digestos.py)
+USAR_DIGESTOS_TOPICO = True
+
+# Snapshot local da KB (gerado por scripts/exportar_snapshot_kb.py)
+USAR_SNAPSHOT_KB = True
+SNAPSHOT_KB_IDADE_MAXIMA_HORAS = 24 * 7
+# Intervalo entre as conferências da versão do snapshot com a da KB no banco (RPC 'versao_kb')
+SNAPSHOT_KB_VERIFICACAO_S = 300
+
+# Memória de recuperação por sessão (reuso de contexto em perguntas de acompanhamento)
+MEMORIA_DISTANCIA_REUSO = 0.08
+
+# Orçamento brando de tokens por sessão (entrada + saída + raciocínio): ao ultrapassar, a sessão é sinalizada nos logs
+ORCAMENTO_TOKENS_SESSAO = 300_000
+
+# Sessões sem atividade por mais que o TTL têm a memória de recuperação liberada (varredura a cada intervalo)
+SESSAO_TTL_OCIOSA_S = 30 * 60
+SESSAO_VARREDURA_INTERVALO_S = 60
+
+# Estado das sessões fora do processo (src/core/estado_sessao.py), para retomar a conversa em outra réplica:
+# 'memoria' (padrão, uma réplica), 'sqlite' (réplicas no mesmo host) ou 'postgres' (tabela 'estado_sessoes')
+SESSAO_ARMAZENAMENTO = os.environ.get("VOX_SESSAO_ARMAZENAMENTO", "memoria").lower()
+SESSAO_SQLITE_CAMINHO = os.environ.get("VOX_SESSAO_SQLITE_CAMINHO", "data/estado_sessoes.sqlite3")
+SESSAO_ESTADO_TTL_S = 24 * 60 * 60
+# Gravações do estado agrupadas: cada sessão é gravada no máximo uma vez por intervalo
+SESSAO_COALESCER_S = 2.0
+
+# Cache em processo dos chunks e digestos por tópico e das categorias de denúncia (segundos)
+CACHE_TOPICO_TTL_S = 600
+CACHE_CATEGORIAS_TTL_S = 3600
+
+# Aquecimento do processo: tópicos mais usados (knowledge_base.kb_count) pré-carregados no cache
+AQUECIMENTO_TOPICOS = 5
+
+# Servidor assíncrono (src/api/servidor.py): turnos simultâneos por worker, espera máxima por uma vaga e tamanho da pergunta
+API_CONCORRENCIA_MAX = int(os.environ.get("VOX_API_CONCORRENCIA_MAX", "16"))
+# Workers do servidor: o uvicorn usa WEB_CONCURRENCY como padrão de '--workers'. Com mais de um, o estado das
+# sessões precisa ficar fora do processo (SESSAO_ARMAZENAMENTO 'sqlite' ou 'postgres')
+API_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+API_FILA_ESPERA_S = 5.0
+API_MENSAGEM_MAX_CARACTERES = 4000
+
+# Prazo de cada turno (src/core/prazo.py): SLO do tempo até o primeiro token e a parte reservada à geração.
+# A recuperação usa só o que sobra da reserva; a expansão do tópico só é tentada com PRAZO_MINIMO_EXPANSAO_S livres
+PRAZO_TTFT_S = float(os.environ.get("VOX_PRAZO_TTFT_S", "8"))
+PRAZO_RESERVA_GERACAO_S = 3.0
+PRAZO_MINIMO_EXPANSAO_S = 1.0
+# Consultas síncronas com prazo em andamento por processo; além disso, novas chamadas falham na hora
+PRAZO_CHAMADAS_SIMULTANEAS = 8
 
 # Configurações de UI
 PAGE_TITLE = 'Vox AI'
 PAGE_ICON = '🏳️‍🌈'
 
+# Histórico do chat: últimas mensagens desenhadas completas; as anteriores aparecem sob demanda, em páginas
+HISTORICO_JANELA_MENSAGENS = 20
+HISTORICO_PAGINA_MENSAGENS = 20
+
+# Remonta o pacote de assets (CSS, sidebar, prompts e segredos) quando os arquivos mudam; use só em desenvolvimento
+ASSETS_HOT_RELOAD = os.environ.get("VOX_ASSETS_HOT_RELOAD", "").lower() in ("1", "true")
+
 def get_secret(key: str, default: str = "") -> str:
     """
     Busca um segredo no st.secrets (Streamlit Cloud/Local secrets.toml)
     ou nas variáveis de ambiente (Docker/Cloud env vars).
+
+    O st.secrets só é consultado quando o processo é o app Streamlit (que já importou o
+    'streamlit'): o core, o servidor ASGI e os scripts não carregam o Streamlit.
     """
     # 1. Tenta buscar no Streamlit Secrets (Cloud ou Local secrets.toml)
     try:
+        if "streamlit" not in sys.modules:
+            raise LookupError("fora do app Streamlit")
+        import streamlit as st
+
         if key in st.secrets:
             return st.secrets[key]
         if "." in key:
@@ -0,0 +1,164 @@
+"""
+Aquecimento do processo antes de atender os usuários.
+
+Depois de um deploy ou de o Space acordar, o primeiro usuário pagaria a criação dos clientes, os
+primeiros handshakes TLS com o Gemini e o Supabase e os caches frios da KB. 'iniciar_aquecimento'
+dispara, uma única vez por processo e em segundo plano, as etapas abaixo, registrando a duração de
+cada uma nos logs:
+
+1. Clientes compartilhados do Gemini e do Supabase.
+2. Categorias de denúncia (cacheadas).
+3. Snapshot local da KB, quando habilitado, ou os tópicos mais usados (knowledge_base.kb_count).
+4. Um embedding descartável, para abrir a conexão com a API do Gemini.
+5. Etapas extras da interface que disparou o aquecimento (ex: o áudio da saudação, no app Streamlit).
+
+'estado_aquecimento' é o sinal de prontidão: 'pronto' fica True quando todas as etapas terminam
+(mesmo que alguma falhe; as falhas ficam em 'erros' e o app segue funcionando sem o cache).
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from google.genai import types
+
+from src.config import AQUECIMENTO_TOPICOS, MAX_CHUNCK, MODELO_SEMANTICO_NOME, TAMANHO_VETOR_SEMANTICO, USAR_DIGESTOS_TOPICO, USAR_SNAPSHOT_KB, logger
+from src.core.database import buscar_chunks_por_topico, buscar_digesto_topico, get_categorias_erro, get_db_client
+from src.core.db.snapshot import carregar_snapshot_kb
+from src.core.genai import cliente_gemini
+
+_estado: dict[str, Any] = {"iniciado": False, "pronto": False, "duracoes_ms": {}, "erros": {}}
+_lock_estado = threading.Lock()
+
+
+def _executar_etapa(nome: str, etapa: Callable[[], Any]) -> Any:
+    """
+    Executa uma etapa do aquecimento, registrando sua duração e, se falhar, o erro.
+    """
+    inicio = time.perf_counter()
+    try:
+        return etapa()
+    except Exception as e:
+        logger.warning(f"⚠️ Aquecimento: etapa '{nome}' falhou: {e}")
+        with _lock_estado:
+            _estado["erros"][nome] = str(e)
+        return None
+    finally:
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        with _lock_estado:
+            _estado["duracoes_ms"][nome] = duracao_ms
+        logger.info(f"🔥 Aquecimento: {nome} em {duracao_ms} ms")
+
+
+def topicos_mais_usados(limite: int = AQUECIMENTO_TOPICOS) -> list[str]:
+    """
+    Retorna os tópicos da KB mais usados nas respostas, somando o 'kb_count' dos seus chunks.
+
+    Args:
+        limite (int): Quantidade de tópicos.
+
+    Returns:
+        list[str]: Tópicos, do mais ao menos usado.
+    """
+    client = get_db_client()
+    if not client:
+        return []
+    response = (
+        client.table("knowledge_base")
+        .select("topico, kb_count")
+        .order("kb_count", desc=True, nullsfirst=False)
+        .limit(limite * 20)
+        .execute()
+    )
+    uso_por_topico: dict[str, float] = {}
+    for linha in response.data or []:
+        if linha.get("topico"):
+            uso_por_topico[linha["topico"]] = uso_por_topico.get(linha["topico"], 0) + float(linha.get("kb_count") or 0)
+    return sorted(uso_por_topico, key=uso_por_topico.get, reverse=True)[:limite]
+
+
+def _precarregar_topicos() -> list[str]:
+    """
+    Coloca no cache os chunks (e digestos) dos tópicos mais usados.
+    """
+    topicos = topicos_mais_usados()
+    for topico in topicos:
+        if USAR_DIGESTOS_TOPICO:
+            buscar_digesto_topico(topico)
+        buscar_chunks_por_topico(topico, limit=MAX_CHUNCK)
+    return topicos
+
+
+def _embedding_descartavel() -> None:
+    """
+    Gera um embedding qualquer, só para abrir a conexão (TLS) com a API do Gemini.
+    """
+    cliente_gemini().models.embed_content(
+        model=MODELO_SEMANTICO_NOME,
+        contents="aquecimento",
+        config=types.EmbedContentConfig(task_type="RETRIEVAL_QUERY", output_dimensionality=TAMANHO_VETOR_SEMANTICO),
+    )
+
+
+def aquecer(etapas_extras: dict[str, Callable[[], Any]] | None = None) -> dict[str, Any]:
+    """
+    Executa todas as etapas do aquecimento, na ordem, e marca o processo como pronto.
+
+    Args:
+        etapas_extras (dict[str, Callable[[], Any]] | None): Etapas próprias da interface, por nome,
+            executadas no fim (o core não conhece os assets da UI).
+
+    Returns:
+        dict[str, Any]: Estado final do aquecimento (ver 'estado_aquecimento').
+    """
+    inicio = time.perf_counter()
+    _executar_etapa("cliente_gemini", cliente_gemini)
+    _executar_etapa("cliente_supabase", get_db_client)
+    _executar_etapa("categorias_erro", get_categorias_erro)
+
+    snapshot = _executar_etapa("snapshot_kb", carregar_snapshot_kb) if USAR_SNAPSHOT_KB else None
+    if not snapshot:
+        # Sem snapshot, a KB vem do Supabase: os tópicos mais usados já ficam no cache
+        _executar_etapa("topicos_mais_usados", _precarregar_topicos)
+
+    _executar_etapa("embedding_descartavel", _embedding_descartavel)
+    for nome, etapa in (etapas_extras or {}).items():
+        _executar_etapa(nome, etapa)
+
+    with _lock_estado:
+        _estado["pronto"] = True
+        _estado["duracoes_ms"]["total"] = round((time.perf_counter() - inicio) * 1000, 1)
+    estado = estado_aquecimento()
+    logger.info(f"✅ Processo aquecido em {estado['duracoes_ms']['total']} ms (falhas: {list(estado['erros']) or 'nenhuma'}).")
+    return estado
+
+
+def iniciar_aquecimento(etapas_extras: dict[str, Callable[[], Any]] | None = None) -> None:
+    """
+    Dispara o aquecimento em segundo plano, uma única vez por processo. Chamadas seguintes não fazem nada.
+
+    Args:
+        etapas_extras (dict[str, Callable[[], Any]] | None): Etapas próprias da interface ('aquecer').
+    """
+    with _lock_estado:
+        if _estado["iniciado"]:
+            return
+        _estado["iniciado"] = True
+    threading.Thread(target=aquecer, args=(etapas_extras,), name="vox-aquecimento", daemon=True).start()
+
+
+def estado_aquecimento() -> dict[str, Any]:
+    """
+    Sinal de prontidão do processo.
+
+    Returns:
+        dict[str, Any]: 'iniciado', 'pronto', 'duracoes_ms' (por etapa e total) e 'erros' (por etapa).
+    """
+    with _lock_estado:
+        return {
+            "iniciado": _estado["iniciado"],
+            "pronto": _estado["pronto"],
+            "duracoes_ms": dict(_estado["duracoes_ms"]),
+            "erros": dict(_estado["erros"]),
+        }
@@ -0,0 +1,75 @@
+"""
+Cache em processo do core, sem depender do Streamlit.
+
+'cache_ttl' substitui o st.cache_data/st.cache_resource nos módulos de banco: guarda o resultado
+por chave de argumentos durante 'ttl_s' segundos, sem serializar o valor (quem chama não deve
+alterá-lo). Como no Streamlit, parâmetros com nome iniciado por '_' (ex: '_client') ficam fora
+da chave, e exceções não são cacheadas. Funciona igual no app, no servidor ASGI e nos scripts.
+"""
+
+import inspect
+import threading
+import time
+from collections.abc import Callable
+from functools import wraps
+from typing import Any
+
+_caches: list[Callable[..., Any]] = []
+
+
+def cache_ttl(ttl_s: float | None = None, max_entradas: int = 256) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorador de cache com expiração.
+
+    Args:
+        ttl_s (float | None): Validade de cada entrada, em segundos (None: até 'clear').
+        max_entradas (int): Máximo de entradas; ao passar dele, a mais antiga sai.
+
+    Returns:
+        Callable: Decorador. A função decorada ganha 'clear()', que esvazia o cache.
+    """
+
+    def decorador(funcao: Callable[..., Any]) -> Callable[..., Any]:
+        assinatura = inspect.signature(funcao)
+        ignorados = {nome for nome in assinatura.parameters if nome.startswith("_")}
+        entradas: dict[tuple, tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        def chave(args: tuple, kwargs: dict[str, Any]) -> tuple:
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            return tuple((nome, valor) for nome, valor in argumentos.arguments.items() if nome not in ignorados)
+
+        @wraps(funcao)
+        def envoltorio(*args: Any, **kwargs: Any) -> Any:
+            chave_chamada = chave(args, kwargs)
+            with lock:
+                entrada = entradas.get(chave_chamada)
+            if entrada and (ttl_s is None or time.monotonic() - entrada[0] < ttl_s):
+                return entrada[1]
+
+            valor = funcao(*args, **kwargs)
+            with lock:
+                entradas.pop(chave_chamada, None)
+                if len(entradas) >= max_entradas:
+                    entradas.pop(next(iter(entradas)))
+                entradas[chave_chamada] = (time.monotonic(), valor)
+            return valor
+
+        def clear() -> None:
+            with lock:
+                entradas.clear()
+
+        envoltorio.clear = clear
+        _caches.append(envoltorio)
+        return envoltorio
+
+    return decorador
+
+
+def limpar_caches() -> None:
+    """
+    Esvazia todos os caches criados com 'cache_ttl' (ex: entre testes).
+    """
+    for funcao in _caches:
+        funcao.clear()
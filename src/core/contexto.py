@@ -0,0 +1,269 @@
+"""
+Módulo de Empacotamento de Contexto do Vox AI.
+
+Fica entre a recuperação (`recuperar_contexto_inteligente`) e a geração (`gerar_resposta_stream`):
+recebe os chunks candidatos da base de conhecimento e decide quais deles entram no prompt,
+respeitando um orçamento de tokens e evitando fragmentos redundantes.
+
+Principais Responsabilidades:
+1. Estimar o tamanho em tokens de cada chunk.
+2. Selecionar os chunks por Maximal Marginal Relevance (MMR), equilibrando relevância e diversidade.
+   Os embeddings dos candidatos viram uma única matriz numpy, e as similaridades saem de um só produto
+   matricial. Basta o prefixo curto ('embedding_curto', TAMANHO_VETOR_CURTO dimensões), que é o que
+   a expansão de tópico baixa do banco.
+3. Aplicar o orçamento de tokens configurado e descartar quase-duplicatas.
+4. Registrar a proveniência (chunks usados/descartados e tokens economizados) na lista de IDs de referência.
+"""
+
+import json
+import math
+import re
+from typing import Any
+
+import numpy as np
+
+from src.config import (
+    CONTEXTO_LAMBDA_MMR,
+    CONTEXTO_LIMIAR_REDUNDANCIA,
+    CONTEXTO_ORCAMENTO_TOKENS,
+    logger,
+)
+
+SEPARADOR_CHUNKS = "\n---\n"
+
+# Aproximação usual para textos em português com os tokenizadores do Gemini (~4 caracteres por token)
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estima a quantidade de tokens de um texto a partir do número de caracteres.
+
+    Args:
+        texto (str): Texto a ser estimado.
+
+    Returns:
+        int: Quantidade aproximada de tokens (mínimo de 1 para textos não vazios).
+    """
+    if not texto:
+        return 0
+    return max(1, math.ceil(len(texto) / CARACTERES_POR_TOKEN))
+
+
+def converter_vetor(valor: Any) -> list[float] | None:
+    """
+    Normaliza um embedding vindo do banco de dados para lista de floats.
+    O PostgREST devolve colunas `vector` como string no formato '[0.1,0.2,...]'.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            return None
+    try:
+        return [float(v) for v in valor]
+    except (TypeError, ValueError):
+        return None
+
+
+def vetor_numpy(valor: Any) -> np.ndarray | None:
+    """
+    Converte um embedding (texto '[0.1,0.2,...]' do PostgREST, lista ou array) em um vetor float32.
+    Mais barato que 'converter_vetor' para vetores longos, pois não cria um float Python por posição.
+    """
+    if valor is None:
+        return None
+    try:
+        if isinstance(valor, str):
+            vetor = np.fromstring(valor.strip().strip("[]"), dtype=np.float32, sep=",")
+        else:
+            vetor = np.asarray(valor, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    return vetor if vetor.ndim == 1 and vetor.size else None
+
+
+def similaridade_cosseno(vetor_a: Any, vetor_b: Any) -> float:
+    """
+    Calcula a similaridade de cosseno entre dois vetores de mesma dimensão.
+
+    Returns:
+        float: Similaridade entre -1 e 1. Retorna 0.0 para vetores nulos ou incompatíveis.
+    """
+    if vetor_a is None or vetor_b is None or not len(vetor_a) or len(vetor_a) != len(vetor_b):
+        return 0.0
+
+    a = np.asarray(vetor_a, dtype=np.float64)
+    b = np.asarray(vetor_b, dtype=np.float64)
+    norma_a = np.linalg.norm(a)
+    norma_b = np.linalg.norm(b)
+
+    if not norma_a or not norma_b:
+        return 0.0
+
+    return float(a @ b / (norma_a * norma_b))
+
+
+def _matriz_embeddings(candidatos: list[dict[str, Any]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Monta a matriz normalizada (L2) dos embeddings dos candidatos ('embedding_curto' ou 'embedding').
+    Vetores de dimensões diferentes são cortados no menor prefixo comum (embeddings Matryoshka).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Matriz (N x dimensão) e máscara dos candidatos com embedding.
+    """
+    vetores = [vetor_numpy(c["embedding_curto"] if c.get("embedding_curto") is not None else c.get("embedding")) for c in candidatos]
+    dimensoes = [len(v) for v in vetores if v is not None]
+    if not dimensoes:
+        return np.zeros((len(candidatos), 0), dtype=np.float32), np.zeros(len(candidatos), dtype=bool)
+
+    dimensao = min(dimensoes)
+    matriz = np.zeros((len(candidatos), dimensao), dtype=np.float32)
+    for i, vetor in enumerate(vetores):
+        if vetor is not None:
+            matriz[i] = vetor[:dimensao]
+    normas = np.linalg.norm(matriz, axis=1)
+    com_vetor = normas > 0
+    matriz[com_vetor] /= normas[com_vetor, None]
+    return matriz, com_vetor
+
+
+def _palavras(texto: str) -> set[str]:
+    return set(re.findall(r"\w+", texto.lower()))
+
+
+def _similaridade_lexical(palavras_a: set[str], palavras_b: set[str]) -> float:
+    """
+    Similaridade de Jaccard entre os conjuntos de palavras, usada quando não há embeddings dos chunks.
+    """
+    if not palavras_a or not palavras_b:
+        return 0.0
+    return len(palavras_a & palavras_b) / len(palavras_a | palavras_b)
+
+
+def empacotar_contexto(
+    chunks: list[dict[str, Any]],
+    vetor_query: list[float] | None = None,
+    orcamento_tokens: int = CONTEXTO_ORCAMENTO_TOKENS,
+    max_chunks: int | None = None,
+    lambda_mmr: float = CONTEXTO_LAMBDA_MMR,
+) -> tuple[str, list[dict[str, Any]]]:
+    """
+    Seleciona, por Maximal Marginal Relevance, os chunks que cabem no orçamento de tokens.
+
+    A relevância de cada chunk é a similaridade retornada pela busca vetorial ou, na ausência dela,
+    a similaridade de cosseno entre o embedding do chunk e o prefixo de mesma dimensão da query. A
+    redundância usa os embeddings dos chunks quando disponíveis e, caso contrário, a sobreposição lexical.
+
+    Args:
+        chunks (list[dict[str, Any]]): Candidatos, em ordem de relevância, com 'descricao' e opcionalmente
+            'kb_id' (ou 'id'), 'similarity' e 'embedding_curto' (ou 'embedding').
+        vetor_query (list[float] | None): Embedding da pergunta do usuário.
+        orcamento_tokens (int): Limite estimado de tokens do contexto final.
+        max_chunks (int | None): Número máximo de chunks selecionados.
+        lambda_mmr (float): Peso da relevância frente à diversidade (1.0 ignora a diversidade).
+
+    Returns:
+        tuple[str, list[dict[str, Any]]]:
+            - O bloco de contexto com os chunks selecionados.
+            - A lista de proveniência: um item por chunk com 'kb_id', 'similarity' e 'tokens'. Chunks
+              descartados trazem 'descartado': True e o 'motivo' ('redundante', 'orcamento' ou 'limite').
+    """
+    candidatos = [c for c in chunks if c.get("descricao")]
+    if not candidatos:
+        return "", []
+
+    total = len(candidatos)
+    matriz, com_vetor = _matriz_embeddings(candidatos)
+    palavras = [_palavras(c["descricao"]) for c in candidatos]
+    tokens = [estimar_tokens(c["descricao"]) for c in candidatos]
+
+    relevancias = 1 - np.arange(total) / total  # sem sinal de relevância: preserva a ordem original do banco
+    consulta = vetor_numpy(vetor_query)
+    if consulta is not None and len(consulta) >= matriz.shape[1] > 0:
+        cossenos_query = matriz @ consulta[: matriz.shape[1]] / (np.linalg.norm(consulta[: matriz.shape[1]]) or 1.0)
+        relevancias = np.where(com_vetor, cossenos_query, relevancias)
+    for pos, chunk in enumerate(candidatos):
+        if chunk.get("similarity") is not None:
+            relevancias[pos] = float(chunk["similarity"])
+
+    # Similaridade de todos os pares com embedding em um único produto matricial
+    cossenos = matriz @ matriz.T
+
+    restantes = np.ones(total, dtype=bool)
+    redundancias = np.zeros(total)
+    selecionados: list[int] = []
+    descartados: dict[int, str] = {}
+    tokens_usados = 0
+
+    while restantes.any():
+        if max_chunks is not None and len(selecionados) >= max_chunks:
+            for idx in np.flatnonzero(restantes):
+                descartados[int(idx)] = "limite"
+            break
+
+        pontuacoes = np.where(restantes, lambda_mmr * relevancias - (1 - lambda_mmr) * redundancias, -np.inf)
+        melhor = int(np.argmax(pontuacoes))
+        restantes[melhor] = False
+
+        if selecionados and redundancias[melhor] >= CONTEXTO_LIMIAR_REDUNDANCIA:
+            descartados[melhor] = "redundante"
+            continue
+        if selecionados and tokens_usados + tokens[melhor] > orcamento_tokens:
+            descartados[melhor] = "orcamento"
+            continue
+
+        selecionados.append(melhor)
+        tokens_usados += tokens[melhor]
+        # Redundância incremental: máximo da similaridade com os já selecionados
+        similaridade_nova = np.where(com_vetor & com_vetor[melhor], cossenos[:, melhor], 0.0)
+        for idx in np.flatnonzero(restantes & ~(com_vetor & com_vetor[melhor])):
+            similaridade_nova[idx] = _similaridade_lexical(palavras[idx], palavras[melhor])
+        redundancias = np.maximum(redundancias, similaridade_nova)
+
+    proveniencia = []
+    for idx in selecionados + [i for i in range(total) if i in descartados]:
+        chunk = candidatos[idx]
+        item = {
+            "kb_id": chunk.get("kb_id") or chunk.get("id"),
+            "similarity": chunk.get("similarity"),
+            "tokens": tokens[idx],
+        }
+        if idx in descartados:
+            item["descartado"] = True
+            item["motivo"] = descartados[idx]
+        proveniencia.append(item)
+
+    texto = SEPARADOR_CHUNKS.join(candidatos[idx]["descricao"] for idx in selecionados)
+    return texto, proveniencia
+
+
+def resumir_empacotamento(proveniencia: list[dict[str, Any]] | None) -> dict[str, int]:
+    """
+    Consolida a lista de proveniência em contadores de chunks e tokens usados/descartados.
+    Chunks cortados apenas pelo limite de quantidade ('limite') não contam como economia,
+    pois já ficavam de fora do contexto antes do empacotamento.
+    """
+    resumo = {"chunks_usados": 0, "chunks_descartados": 0, "tokens_usados": 0, "tokens_economizados": 0}
+    for item in proveniencia or []:
+        if item.get("descartado"):
+            resumo["chunks_descartados"] += 1
+            if item.get("motivo") != "limite":
+                resumo["tokens_economizados"] += item.get("tokens") or 0
+        else:
+            resumo["chunks_usados"] += 1
+            resumo["tokens_usados"] += item.get("tokens") or 0
+    return resumo
+
+
+def registrar_empacotamento(fonte: str, proveniencia: list[dict[str, Any]] | None) -> None:
+    """
+    Emite no log o resumo do empacotamento de contexto de um turno.
+    """
+    resumo = resumir_empacotamento(proveniencia)
+    logger.info(
+        f"📦 Contexto empacotado ({fonte}): {resumo['chunks_usados']} chunks (~{resumo['tokens_usados']} tokens), "
+        f"{resumo['chunks_descartados']} descartados (~{resumo['tokens_economizados']} tokens economizados)."
+    )
@@ -13,5 +13,6 @@ from src.core.db.reports import salvar_report, get_categorias_erro
 from src.core.db.retrieval import (
     buscar_referencias_db,
     buscar_chunks_por_topico,
+    buscar_digesto_topico,
     recuperar_contexto_inteligente,
 )
@@ -1,9 +1,14 @@
-import streamlit as st
-from supabase import Client, create_client
+from functools import cache
+from typing import TYPE_CHECKING
+
 from src.config import get_secret, logger
 
-@st.cache_resource
-def get_db_client() -> Client | None:
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+@cache
+def get_db_client() -> "Client | None":
     """
     Retorna a instância singleton do cliente Supabase, configurado com as chaves do projeto.
     O recurso é cacheado para otimizar conexões.
@@ -12,6 +17,9 @@ def get_db_client() -> Client | None:
         Client | None: O cliente Supabase configurado, ou None se ocorrer um erro de conexão/credenciais.
     """
     try:
+        # Importado só na primeira chamada ao banco, para não pesar na inicialização do app
+        from supabase import create_client
+
         url = get_secret("supabase.url")
         key = get_secret("supabase.key")
 
@@ -21,5 +29,5 @@ def get_db_client() -> Client | None:
 
         return create_client(url, key)
     except Exception as e:
-        st.error(f"Erro ao conectar no banco de dados: {e}")
+        logger.error(f"❌ Erro ao conectar no banco de dados: {e}")
         return None
@@ -2,8 +2,10 @@ import uuid
 from typing import Any
 from src.config import logger
 import src.core.db.client as db_client
+from src.core.tracing import span
 
-def salvar_log_chat( session_id: str, git_version: str, prompt: str, response: str, lista_kb_ids: list | None = None, ) -> None:
+@span("salvar_log_chat")
+def salvar_log_chat( session_id: str, git_version: str, prompt: str, response: str, lista_kb_ids: list | None = None, trace_id: str | None = None, duracoes_ms: dict[str, float] | None = None, tokens: dict[str, Any] | None = None, ) -> None:
     """
     Grava o log da interação do usuário com o chat (prompt, resposta e metadados) 
     e vincula os fragmentos (chunks) da base de conhecimento consultados.
@@ -14,6 +16,10 @@ def salvar_log_chat( session_id: str, git_version: str, prompt: str, response: s
         prompt (str): Texto enviado pelo usuário.
         response (str): Resposta gerada pelo modelo de linguagem.
         lista_kb_ids (list | None): Lista de dicionários ou strings contendo IDs dos chunks de KB utilizados.
+            Itens marcados com 'descartado' pelo empacotamento de contexto não são vinculados ao log.
+        trace_id (str | None): Identificador do trace do turno (src/core/tracing.py).
+        duracoes_ms (dict[str, float] | None): Duração de cada etapa do turno, em ms.
+        tokens (dict[str, Any] | None): Tokens do turno ('entrada', 'saida', 'cache', 'raciocinio' e 'por_etapa').
     """
     client = db_client.get_db_client()
     if not client:
@@ -27,6 +33,20 @@ def salvar_log_chat( session_id: str, git_version: str, prompt: str, response: s
             "response": str(response),
             "git_version": git_version,
         }
+        if trace_id:
+            data_log["trace_id"] = trace_id
+        if duracoes_ms:
+            data_log["duracoes_ms"] = duracoes_ms
+        if tokens:
+            data_log.update(
+                {
+                    "tokens_entrada": tokens["entrada"],
+                    "tokens_saida": tokens["saida"],
+                    "tokens_cache": tokens["cache"],
+                    "tokens_raciocinio": tokens["raciocinio"],
+                    "tokens_por_etapa": tokens.get("por_etapa"),
+                }
+            )
 
         res = client.table("chat_logs").insert(data_log).execute()
 
@@ -40,6 +60,8 @@ def salvar_log_chat( session_id: str, git_version: str, prompt: str, response: s
             dados_relacao = []
             for item in lista_kb_ids:
                 if isinstance(item, dict):
+                    if item.get("descartado"):
+                        continue
                     kb_id = item.get("kb_id")
                     similarity = item.get("similarity")
                 else:
@@ -1,6 +1,8 @@
 from typing import Any
-from src.config import logger
+
+from src.config import CACHE_CATEGORIAS_TTL_S, logger
 import src.core.db.client as db_client
+from src.core.cache import cache_ttl
 
 def salvar_report( session_id: str, git_version: str, history_text: str, category_id: int, comment: str, ) -> bool:
     """
@@ -34,6 +36,15 @@ def salvar_report( session_id: str, git_version: str, history_text: str, categor
         logger.error(f"⚠️ Erro ao salvar report: {e}")
         return False
 
+@cache_ttl(CACHE_CATEGORIAS_TTL_S)
+def _categorias_erro_db(_client) -> list[dict[str, Any]]:
+    """
+    Consulta as categorias de denúncia, cacheadas por processo (mudam raramente). Erros são propagados.
+    """
+    response = _client.table("report_categories").select("id, label").execute()
+    return response.data if response.data else []
+
+
 def get_categorias_erro() -> list[dict[str, Any]]:
     """
     Recupera do banco de dados as categorias de problemas/erros disponíveis para denúncia.
@@ -45,8 +56,7 @@ def get_categorias_erro() -> list[dict[str, Any]]:
     try:
         if not client:
             return []
-        response = client.table("report_categories").select("id, label").execute()
-        return response.data if response.data else []
+        return _categorias_erro_db(client)
 
     except Exception as e:
         logger.error(f"⚠️ Erro ao buscar categorias: {e}")
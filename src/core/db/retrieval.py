@@ -1,39 +1,67 @@
 from typing import Any
-from src.config import (LIMITE_TEMAS, MAX_CHUNCK, SEMANTICA_THRESHOLD, TAMANHO_VETOR_SEMANTICO, logger)
+
+from src.config import (CACHE_TOPICO_TTL_S, CONTEXTO_MAX_CHUNKS_FALLBACK, HNSW_EF_SEARCH, LIMITE_TEMAS, MAX_CHUNCK, MEMORIA_DISTANCIA_REUSO, PRAZO_MINIMO_EXPANSAO_S, SEMANTICA_THRESHOLD, TAMANHO_VETOR_SEMANTICO, USAR_DIGESTOS_TOPICO, USAR_SNAPSHOT_KB, logger)
+from src.core.cache import cache_ttl
+from src.core.contexto import empacotar_contexto, estimar_tokens, registrar_empacotamento, similaridade_cosseno, vetor_numpy
 import src.core.db.client as db_client
+from src.core.db.snapshot import SnapshotKB, carregar_snapshot_kb
+from src.core.prazo import PrazoTurno, executar_com_prazo
+from src.core.tracing import span
 
-def buscar_referencias_db(vector_embedding: list[float], threshold: float = SEMANTICA_THRESHOLD, limit: int = LIMITE_TEMAS, filter_topic: str | None = None, ) -> list[dict[str, Any]]:
+def _snapshot_kb() -> SnapshotKB | None:
+    """
+    Retorna o snapshot local da KB quando habilitado e válido; None indica que o Supabase deve ser consultado.
+    """
+    return carregar_snapshot_kb() if USAR_SNAPSHOT_KB else None
+
+
+@span("buscar_referencias_db")
+def buscar_referencias_db(vector_embedding: list[float], threshold: float = SEMANTICA_THRESHOLD, limit: int = LIMITE_TEMAS, filter_topic: str | None = None, ef_search: int = HNSW_EF_SEARCH, prazo: PrazoTurno | None = None, ) -> list[dict[str, Any]]:
     """
     Busca correspondências por similaridade de cosseno na tabela 'knowledge_base' do Supabase.
+    Quando há um snapshot local válido da KB, a busca é feita nele, sem ida ao banco.
+    Com um prazo, a RPC espera no máximo o tempo que resta para a recuperação; se estourar, o turno
+    segue sem recuperação.
 
     Args:
         vector_embedding (list[float]): Vetor numérico correspondente ao embedding da query.
         threshold (float): Limite de similaridade mínima desejado.
         limit (int): Número máximo de resultados a retornar.
         filter_topic (str | None): Filtro opcional por nome do tópico.
+        ef_search (int): Tamanho da lista de candidatos do HNSW (hnsw.ef_search); maior = mais recall, mais latência.
+        prazo (PrazoTurno | None): Prazo do turno (src/core/prazo.py).
 
     Returns:
         list[dict[str, Any]]: Lista de dicionários contendo os dados dos chunks encontrados.
     """
+    if len(vector_embedding) != TAMANHO_VETOR_SEMANTICO:
+        logger.error(
+            f"⚠️ Erro de Dimensão: O vetor gerado tem {len(vector_embedding)} dimensões, mas o banco espera {TAMANHO_VETOR_SEMANTICO}."
+        )
+        return []
+
+    snapshot = _snapshot_kb()
+    if snapshot:
+        resultados = snapshot.buscar(vector_embedding, threshold, limit, filter_topic)
+        if not resultados:
+            logger.info("⚠️ Nenhum match encontrado no snapshot da KB com esse threshold.")
+        return resultados
+
     client = db_client.get_db_client()
     if not client:
         logger.error("⚠️ Erro: Cliente Supabase não inicializado.")
         return []
     try:
-        if len(vector_embedding) != TAMANHO_VETOR_SEMANTICO:
-            logger.error(
-                f"⚠️ Erro de Dimensão: O vetor gerado tem {len(vector_embedding)} dimensões, mas o banco espera {TAMANHO_VETOR_SEMANTICO}."
-            )
-            return []
-
         params = {
             "query_embedding": vector_embedding,
             "match_threshold": threshold,
             "match_count": limit,
             "filter_topic": filter_topic,
+            "ef_search": ef_search,
         }
 
-        response = client.rpc("match_knowledge_base", params).execute()
+        consulta = client.rpc("match_knowledge_base", params)
+        response = executar_com_prazo(prazo.restante_recuperacao(), consulta.execute) if prazo else consulta.execute()
 
         if response.data:
             return response.data
@@ -42,72 +70,190 @@ def buscar_referencias_db(vector_embedding: list[float], threshold: float = SEMA
         return []
 
     except Exception as e:
+        if prazo and isinstance(e, TimeoutError):
+            prazo.degradar("recuperacao", "busca vetorial no Supabase sem resposta")
+            return []
         logger.critical(f"❌ Erro CRÍTICO na busca vetorial (Supabase): {e}")
         return []
 
-def buscar_chunks_por_topico(topico_alvo: str, limit: int = 30) -> list[dict[str, Any]]:
+@cache_ttl(CACHE_TOPICO_TTL_S)
+def _chunks_topico_db(_client, topico_alvo: str, limit: int) -> list[dict[str, Any]]:
+    """
+    Consulta os chunks de um tópico no Supabase. Cacheado por processo: os tópicos mais consultados
+    deixam de ir ao banco a cada turno. Erros são propagados, para não ficarem no cache.
+
+    Só o prefixo 'embedding_curto' (TAMANHO_VETOR_CURTO dimensões) é baixado, e não o vetor completo:
+    ele basta para o MMR do empacotamento. O texto do PostgREST é convertido em float32 uma única vez,
+    antes de entrar no cache.
+    """
+    response = (
+        _client.table("knowledge_base")
+        .select("kb_id, descricao, embedding_curto")
+        .eq("topico", topico_alvo)
+        .limit(limit)
+        .execute()
+    )
+    return [{**row, "embedding_curto": vetor_numpy(row.get("embedding_curto"))} for row in response.data or []]
+
+
+@cache_ttl(CACHE_TOPICO_TTL_S)
+def _digesto_topico_db(_client, topico_alvo: str) -> dict[str, Any] | None:
+    """
+    Consulta o digesto válido de um tópico no Supabase, com o mesmo cache de '_chunks_topico_db'.
+    """
+    response = _client.rpc("buscar_digesto_topico", {"alvo": topico_alvo}).execute()
+    if response.data and response.data[0].get("digesto"):
+        return response.data[0]
+    return None
+
+
+@span("buscar_chunks_por_topico")
+def buscar_chunks_por_topico(topico_alvo: str, limit: int = 30, prazo: PrazoTurno | None = None) -> list[dict[str, Any]]:
     """
     Recupera todos os chunks de texto associados a um determinado tópico cadastrado.
+    O prefixo curto do embedding de cada chunk ('embedding_curto', float32) também é retornado para a
+    seleção MMR do empacotamento de contexto.
+    Os resultados do Supabase ficam em cache no processo por CACHE_TOPICO_TTL_S segundos.
 
     Args:
         topico_alvo (str): Nome do tópico que se deseja filtrar.
         limit (int): Número máximo de registros a obter.
+        prazo (PrazoTurno | None): Prazo do turno; a consulta espera no máximo o tempo que resta para a recuperação.
 
     Returns:
-        list[dict[str, Any]]: Lista contendo IDs e descrições dos chunks do tópico.
+        list[dict[str, Any]]: Lista contendo IDs, descrições e prefixos dos embeddings dos chunks do tópico.
+
+    Raises:
+        TimeoutError: Se a consulta estourar o prazo (a expansão é cortada e o chamador usa os top-K chunks).
     """
+    snapshot = _snapshot_kb()
+    if snapshot:
+        return snapshot.chunks_por_topico(topico_alvo, limit)
+
     client = db_client.get_db_client()
     if not client:
         return []
     try:
-        response = (
-            client.table("knowledge_base")
-            .select("kb_id, descricao")
-            .eq("topico", topico_alvo)
-            .limit(limit)
-            .execute()
-        )
-        return response.data if response.data else []
+        if prazo:
+            return executar_com_prazo(prazo.restante_recuperacao(), _chunks_topico_db, client, topico_alvo, limit)
+        return _chunks_topico_db(client, topico_alvo, limit)
     except Exception as e:
+        if prazo and isinstance(e, TimeoutError):
+            prazo.degradar("expansao_topico", f"chunks do tópico '{topico_alvo}' sem resposta")
+            raise
         logger.error(f"❌ Erro ao buscar tópico completo: {e}")
         return []
 
-def recuperar_contexto_inteligente(vector_embedding: list[float]) -> tuple[str | None, str, list[dict[str, Any]] | None]:
+def buscar_digesto_topico(topico_alvo: str, prazo: PrazoTurno | None = None) -> dict[str, Any] | None:
+    """
+    Recupera o digesto compacto de um tópico, gerado offline por 'scripts/gerar_digestos.py'.
+    A função RPC só retorna o digesto se o hash dos chunks ativos do tópico ainda for o mesmo
+    usado na sua geração, ou seja, digestos obsoletos são ignorados (com atraso de até
+    CACHE_TOPICO_TTL_S segundos, por causa do cache em processo).
+
+    Args:
+        topico_alvo (str): Nome do tópico vencedor.
+        prazo (PrazoTurno | None): Prazo do turno, como em 'buscar_chunks_por_topico'.
+
+    Returns:
+        dict[str, Any] | None: Dicionário com 'topico', 'digesto', 'kb_ids' e 'hash_chunks', ou None se
+            não houver digesto válido.
+
+    Raises:
+        TimeoutError: Se a consulta estourar o prazo.
+    """
+    client = db_client.get_db_client()
+    if not client:
+        return None
+    try:
+        if prazo:
+            digesto = executar_com_prazo(prazo.restante_recuperacao(), _digesto_topico_db, client, topico_alvo)
+        else:
+            digesto = _digesto_topico_db(client, topico_alvo)
+        if digesto:
+            return digesto
+        logger.info(f"📚 Nenhum digesto atualizado para o tópico '{topico_alvo}'. Usando chunks brutos.")
+        return None
+    except Exception as e:
+        if prazo and isinstance(e, TimeoutError):
+            prazo.degradar("expansao_topico", f"digesto do tópico '{topico_alvo}' sem resposta")
+            raise
+        logger.error(f"❌ Erro ao buscar digesto do tópico: {e}")
+        return None
+
+def _reutilizar_memoria(memoria: dict[str, Any]) -> tuple[str, str, list[dict[str, Any]] | None]:
+    """
+    Devolve o contexto armazenado na memória de recuperação da sessão.
+    A lista de IDs é copiada para que o chamador não altere o estado guardado.
+    """
+    ids = memoria.get("ids")
+    return memoria["contexto"], memoria["fonte"], [dict(item) for item in ids] if ids else ids
+
+
+def _atualizar_memoria(memoria: dict[str, Any] | None, vector_embedding: list[float], topico: str | None, contexto: str, fonte: str, ids: list[dict[str, Any]] | None) -> None:
+    """
+    Registra o resultado da recuperação atual na memória da sessão, caso ela tenha sido fornecida.
+    """
+    if memoria is None:
+        return
+
+    memoria.update(
+        {
+            "vetor": list(vector_embedding),
+            "topico": topico,
+            "contexto": contexto,
+            "fonte": fonte,
+            "ids": [dict(item) for item in ids] if ids else ids,
+        }
+    )
+
+
+def recuperar_contexto_inteligente(vector_embedding: list[float], memoria: dict[str, Any] | None = None, prazo: PrazoTurno | None = None) -> tuple[str | None, str, list[dict[str, Any]] | None]:
     """
     Decide estrategicamente e executa a melhor busca de contexto no banco de dados.
     Caso um tópico apareça 3x ou mais nos top-K chunks similares, expande a busca para recuperar
     todos os chunks daquele tópico (estratégia vencedora). Caso contrário, faz um fallback dos top-5 chunks.
+    Na expansão, o digesto offline do tópico é servido no lugar dos chunks brutos sempre que estiver
+    atualizado (`USAR_DIGESTOS_TOPICO`). Em ambos os casos o contexto passa pelo empacotador (orçamento de tokens + MMR), e os chunks
+    descartados ficam registrados na lista de IDs com 'descartado': True.
+
+    Quando uma memória de recuperação da sessão é fornecida, o contexto do turno anterior é reutilizado
+    sem consultar o Supabase se a nova query estiver a até `MEMORIA_DISTANCIA_REUSO` (distância de cosseno)
+    da anterior, e a expansão do tópico é reaproveitada quando a votação elege o mesmo tópico.
+
+    Com um prazo, a expansão do tópico só é tentada se restarem ao menos `PRAZO_MINIMO_EXPANSAO_S`
+    para a recuperação, e uma expansão que estoura o prazo cai no fallback dos top-K chunks.
 
     Args:
         vector_embedding (list[float]): Vetor numérico do embedding da query.
+        memoria (dict[str, Any] | None): Memória de recuperação da sessão (ex: st.session_state.memoria_recuperacao).
+            É atualizada in-place com o resultado do turno.
+        prazo (PrazoTurno | None): Prazo do turno (src/core/prazo.py).
 
     Returns:
         tuple[str | None, str, list[dict[str, Any]] | None]:
-            - O nome do tópico ou a estratégia de similaridade adotada.
             - O bloco consolidado de texto de contexto para instruir o modelo.
+            - O nome do tópico ou a estratégia de similaridade adotada.
             - A lista de dicionários mapeando IDs e a similaridade dos chunks utilizados.
     """
+    if memoria and memoria.get("vetor") is not None and memoria.get("contexto"):
+        distancia = 1 - similaridade_cosseno(vector_embedding, memoria["vetor"])
+        if distancia <= MEMORIA_DISTANCIA_REUSO:
+            logger.info(f"♻️ Memória de recuperação: query próxima da anterior (distância {distancia:.3f}). Reutilizando contexto.")
+            return _reutilizar_memoria(memoria)
+
     client = db_client.get_db_client()
-    if not client:
+    if not client and not _snapshot_kb():
         logger.error("⚠️ Erro: Cliente Supabase não inicializado.")
         return None, "Erro DB", None
     
-    resultados_iniciais = buscar_referencias_db(vector_embedding, SEMANTICA_THRESHOLD, LIMITE_TEMAS, None)
+    resultados_iniciais = buscar_referencias_db(vector_embedding, SEMANTICA_THRESHOLD, LIMITE_TEMAS, None, prazo=prazo)
     
     if not resultados_iniciais:
         return None, "Nenhuma referencia encontrada na base de conhecimento.", None
 
-    def _gerar_fallback_top5() -> tuple[list[str], list[dict[str, Any]]]:
-        top_5 = resultados_iniciais[:5]
-        contexto = [item["descricao"] for item in top_5]
-        ids_usados = []
-        
-        for item in top_5:
-            kid = item.get("kb_id") or item.get("id")
-            if kid:
-                ids_usados.append({"kb_id": kid, "similarity": item.get("similarity")})
-        
-        return contexto, ids_usados
+    def _gerar_fallback_top5() -> tuple[str, list[dict[str, Any]]]:
+        return empacotar_contexto(resultados_iniciais, vector_embedding, max_chunks=CONTEXTO_MAX_CHUNKS_FALLBACK)
 
     contagem_topicos = {}
 
@@ -116,38 +262,63 @@ def recuperar_contexto_inteligente(vector_embedding: list[float]) -> tuple[str |
         if topico:
             contagem_topicos[topico] = contagem_topicos.get(topico, 0) + 1
 
-    contexto_final = []
+    texto_contexto = ""
     lista_ids_usados = []
     fonte_origem = "Busca por similaridade (Fragmentos)"
 
     if not contagem_topicos:
-        contexto_final, lista_ids_usados = _gerar_fallback_top5()
-        return "\n---\n".join(contexto_final), fonte_origem, lista_ids_usados
+        texto_contexto, lista_ids_usados = _gerar_fallback_top5()
+        registrar_empacotamento(fonte_origem, lista_ids_usados)
+        _atualizar_memoria(memoria, vector_embedding, None, texto_contexto, fonte_origem, lista_ids_usados)
+        return texto_contexto, fonte_origem, lista_ids_usados
 
     topico_vencedor = max(contagem_topicos, key=contagem_topicos.get)
     votos = contagem_topicos[topico_vencedor]
+    topico_expandido = None
 
     if votos >= 3:
-        logger.info(f"🚀 Estratégia: Contexto Expandido para o tópico '{topico_vencedor}'")
-        
-        try:
-            dados = buscar_chunks_por_topico(topico_vencedor, limit=MAX_CHUNCK)
+        if memoria and memoria.get("topico") == topico_vencedor and memoria.get("contexto"):
+            logger.info(f"♻️ Memória de recuperação: tópico '{topico_vencedor}' já expandido nesta sessão. Reutilizando contexto.")
+            memoria["vetor"] = list(vector_embedding)
+            return _reutilizar_memoria(memoria)
+
+        if prazo and prazo.restante_recuperacao() < PRAZO_MINIMO_EXPANSAO_S:
+            # Primeira degradação do prazo: o tópico não é expandido, ficam os top-K chunks
+            prazo.degradar("expansao_topico", f"menos de {PRAZO_MINIMO_EXPANSAO_S:.1f} s livres para a recuperação")
+            fonte_origem = f"Busca por similaridade (Prazo, Vencedor: {topico_vencedor})"
+            texto_contexto, lista_ids_usados = _gerar_fallback_top5()
+        else:
+            logger.info(f"🚀 Estratégia: Contexto Expandido para o tópico '{topico_vencedor}'")
+
+            try:
+                digesto = buscar_digesto_topico(topico_vencedor, prazo=prazo) if USAR_DIGESTOS_TOPICO else None
+                if digesto:
+                    texto_contexto = digesto["digesto"]
+                    lista_ids_usados = [{"kb_id": kid, "similarity": None} for kid in digesto.get("kb_ids") or []]
+                    fonte_origem = f"Digesto do Tópico: {topico_vencedor}"
+                    logger.info(f"📚 Digesto do tópico '{topico_vencedor}' servido (~{estimar_tokens(texto_contexto)} tokens).")
+                    _atualizar_memoria(memoria, vector_embedding, topico_vencedor, texto_contexto, fonte_origem, lista_ids_usados)
+                    return texto_contexto, fonte_origem, lista_ids_usados
 
-            contexto_final = [row["descricao"] for row in dados]
-            for row in dados:
-                kid = row.get("kb_id") or row.get("id")
-                if kid:
-                    lista_ids_usados.append({"kb_id": kid, "similarity": None})
+                dados = buscar_chunks_por_topico(topico_vencedor, limit=MAX_CHUNCK, prazo=prazo)
 
-            fonte_origem = f"Contexto Completo: {topico_vencedor}"
+                texto_contexto, lista_ids_usados = empacotar_contexto(dados, vector_embedding)
+                fonte_origem = f"Contexto Completo: {topico_vencedor}"
+                topico_expandido = topico_vencedor
 
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao expandir contexto: {e}. Usando fallback.")
-            contexto_final, lista_ids_usados = _gerar_fallback_top5()
+            except TimeoutError:
+                # Degradação já registrada por quem estourou o prazo
+                fonte_origem = f"Busca por similaridade (Prazo, Vencedor: {topico_vencedor})"
+                texto_contexto, lista_ids_usados = _gerar_fallback_top5()
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao expandir contexto: {e}. Usando fallback.")
+                texto_contexto, lista_ids_usados = _gerar_fallback_top5()
 
     else:
         logger.info(f"🔍 Estratégia: Tópicos mistos (Vencedor '{topico_vencedor}')")
         fonte_origem = f"Tópicos mistos (Vencedor: {topico_vencedor})"
-        contexto_final, lista_ids_usados = _gerar_fallback_top5()
+        texto_contexto, lista_ids_usados = _gerar_fallback_top5()
 
-    return "\n---\n".join(contexto_final), fonte_origem, lista_ids_usados
+    registrar_empacotamento(fonte_origem, lista_ids_usados)
+    _atualizar_memoria(memoria, vector_embedding, topico_expandido, texto_contexto, fonte_origem, lista_ids_usados)
+    return texto_contexto, fonte_origem, lista_ids_usados
@@ -21,7 +21,7 @@ def salvar_sessao(session_id: str) -> None:
 def excluir_dados_sessao(session_id: str) -> bool:
     """
     Exclui permanentemente todos os registros vinculados ao session_id 
-    nas tabelas chat_logs_kb, chat_logs, user_reports, error_logs e sessions 
+    nas tabelas chat_logs_kb, chat_logs, user_reports, error_logs, estado_sessoes e sessions 
     para cumprir o Art. 18 da LGPD.
     """
     client = db_client.get_db_client()
@@ -44,7 +44,10 @@ def excluir_dados_sessao(session_id: str) -> bool:
         # 4. Deleta os logs de erro
         client.table("error_logs").delete().eq("session_id", session_id).execute()
         
-        # 5. Deleta a sessão em si
+        # 5. Deleta o estado salvo da conversa (armazenamento 'postgres' de src/core/estado_sessao.py)
+        client.table("estado_sessoes").delete().eq("session_id", session_id).execute()
+
+        # 6. Deleta a sessão em si
         client.table("sessions").delete().eq("session_id", session_id).execute()
         
         logger.info(f"Dados da sessão {session_id} foram excluídos permanentemente (LGPD Art. 18).")
@@ -0,0 +1,258 @@
+"""
+Snapshot local e versionado da 'knowledge_base', gerado offline por 'scripts/exportar_snapshot_kb.py'.
+
+Estrutura em disco (SNAPSHOT_KB_DIR):
+    ATUAL                      -> nome da versão em uso
+    <versao>/manifest.json     -> versão, data de geração, modelo, dimensão, versão da KB e sha256 dos arquivos
+    <versao>/embeddings.npy    -> matriz float32 (N x dimensão) com embeddings normalizados (L2)
+    <versao>/metadados.json    -> colunas kb_id, topico, eixo_tematico e descricao
+
+Os embeddings são abertos com memory-map: a leitura é zero-cópia e vários processos na mesma
+máquina compartilham o page cache. Se o snapshot estiver ausente, corrompido ou obsoleto,
+as funções de recuperação voltam a consultar o Supabase.
+
+Obsoleto quer dizer que a 'versao_kb' do manifesto (hash do conteúdo exportado, ver 'calcular_versao_kb')
+difere da devolvida pela RPC 'versao_kb' do banco, conferida a cada SNAPSHOT_KB_VERIFICACAO_S. A idade
+(SNAPSHOT_KB_IDADE_MAXIMA_HORAS) é só um limite de segurança para quando o banco não responde.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from src.config import (
+    MODELO_SEMANTICO_NOME,
+    SNAPSHOT_KB_DIR,
+    SNAPSHOT_KB_IDADE_MAXIMA_HORAS,
+    SNAPSHOT_KB_VERIFICACAO_S,
+    TAMANHO_VETOR_CURTO,
+    TAMANHO_VETOR_SEMANTICO,
+    logger,
+)
+import src.core.db.client as db_client
+from src.core.cache import cache_ttl
+
+ARQUIVO_VERSAO_ATUAL = "ATUAL"
+ARQUIVO_MANIFESTO = "manifest.json"
+ARQUIVO_EMBEDDINGS = "embeddings.npy"
+ARQUIVO_METADADOS = "metadados.json"
+
+
+def calcular_sha256(caminho: Path) -> str:
+    """
+    Calcula o sha256 de um arquivo em blocos, sem carregá-lo inteiro em memória.
+    """
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def calcular_versao_kb(registros: Iterable[dict[str, Any]]) -> str:
+    """
+    Calcula a versão do conteúdo da KB exportado para o snapshot.
+    Deve ser idêntica à da função SQL 'public.versao_kb' (md5 das linhas
+    'kb_id:topico:eixo_tematico:md5(descricao):embedding_hash' dos chunks ativos com embedding,
+    unidas por quebra de linha e ordenadas por kb_id).
+    """
+    linhas = [
+        ":".join(
+            (
+                row["kb_id"],
+                row.get("topico") or "",
+                row.get("eixo_tematico") or "",
+                hashlib.md5((row.get("descricao") or "").encode("utf-8")).hexdigest(),
+                row.get("embedding_hash") or "",
+            )
+        )
+        for row in sorted(registros, key=lambda r: r["kb_id"])
+    ]
+    return hashlib.md5("\n".join(linhas).encode("utf-8")).hexdigest()
+
+
+class SnapshotKB:
+    """
+    Visão somente leitura de uma versão do snapshot da base de conhecimento.
+    Oferece as mesmas consultas usadas na recuperação de contexto (busca vetorial e chunks por tópico).
+    """
+
+    def __init__(self, manifesto: dict[str, Any], embeddings: np.ndarray, metadados: dict[str, list]):
+        self.manifesto = manifesto
+        self.versao = manifesto["versao"]
+        self.embeddings = embeddings
+        self.kb_ids = metadados["kb_id"]
+        self.topicos = metadados["topico"]
+        self.eixos = metadados["eixo_tematico"]
+        self.descricoes = metadados["descricao"]
+
+        self.indice_topicos: dict[str, list[int]] = {}
+        for idx, topico in enumerate(self.topicos):
+            if topico:
+                self.indice_topicos.setdefault(topico, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.kb_ids)
+
+    def buscar(self, vector_embedding: list[float], threshold: float, limit: int, filter_topic: str | None = None) -> list[dict[str, Any]]:
+        """
+        Busca exata por similaridade de cosseno, no mesmo formato de retorno da RPC 'match_knowledge_base'.
+        """
+        consulta = np.asarray(vector_embedding, dtype=np.float32)
+        norma = np.linalg.norm(consulta)
+        if not norma:
+            return []
+
+        if filter_topic:
+            indices = np.asarray(self.indice_topicos.get(filter_topic, []), dtype=np.int64)
+            if not len(indices):
+                return []
+            similaridades = self.embeddings[indices] @ (consulta / norma)
+        else:
+            indices = None
+            similaridades = self.embeddings @ (consulta / norma)
+
+        candidatos = np.flatnonzero(similaridades > threshold)
+        if not len(candidatos):
+            return []
+
+        if len(candidatos) > limit:
+            candidatos = candidatos[np.argpartition(-similaridades[candidatos], limit - 1)[:limit]]
+        candidatos = candidatos[np.argsort(-similaridades[candidatos])]
+
+        resultados = []
+        for pos in candidatos:
+            idx = int(indices[pos]) if indices is not None else int(pos)
+            resultados.append(
+                {
+                    "id": self.kb_ids[idx],
+                    "topico": self.topicos[idx],
+                    "eixo_tematico": self.eixos[idx],
+                    "descricao": self.descricoes[idx],
+                    "similarity": float(similaridades[pos]),
+                }
+            )
+        return resultados
+
+    def chunks_por_topico(self, topico_alvo: str, limit: int) -> list[dict[str, Any]]:
+        """
+        Retorna os chunks de um tópico no mesmo formato de 'buscar_chunks_por_topico'. O prefixo
+        'embedding_curto' é uma view do memory-map, sem cópia.
+        """
+        return [
+            {"kb_id": self.kb_ids[idx], "descricao": self.descricoes[idx], "embedding_curto": self.embeddings[idx, :TAMANHO_VETOR_CURTO]}
+            for idx in self.indice_topicos.get(topico_alvo, [])[:limit]
+        ]
+
+
+def abrir_snapshot(diretorio: str | Path = SNAPSHOT_KB_DIR, verificar_integridade: bool = True) -> SnapshotKB | None:
+    """
+    Abre a versão atual do snapshot em disco, validando modelo, dimensão, idade e integridade.
+    A conferência com a versão da KB no banco fica em 'carregar_snapshot_kb'.
+
+    Args:
+        diretorio (str | Path): Diretório raiz dos snapshots.
+        verificar_integridade (bool): Confere o sha256 dos arquivos contra o manifesto.
+
+    Returns:
+        SnapshotKB | None: O snapshot pronto para consulta, ou None se ausente/obsoleto/inválido.
+    """
+    raiz = Path(diretorio)
+    arquivo_atual = raiz / ARQUIVO_VERSAO_ATUAL
+    if not arquivo_atual.exists():
+        logger.info("🗂️ Snapshot da KB não encontrado. Usando o Supabase.")
+        return None
+
+    try:
+        pasta = raiz / arquivo_atual.read_text(encoding="utf-8").strip()
+        manifesto = json.loads((pasta / ARQUIVO_MANIFESTO).read_text(encoding="utf-8"))
+
+        if manifesto.get("modelo") != MODELO_SEMANTICO_NOME or manifesto.get("dimensao") != TAMANHO_VETOR_SEMANTICO:
+            logger.warning(
+                f"⚠️ Snapshot da KB {manifesto.get('versao')} foi gerado com outro modelo/dimensão. Usando o Supabase."
+            )
+            return None
+
+        gerado_em = datetime.fromisoformat(manifesto["gerado_em"])
+        idade_horas = (datetime.now(timezone.utc) - gerado_em).total_seconds() / 3600
+        if idade_horas > SNAPSHOT_KB_IDADE_MAXIMA_HORAS:
+            logger.warning(f"⚠️ Snapshot da KB {manifesto['versao']} está obsoleto ({idade_horas:.0f}h). Usando o Supabase.")
+            return None
+
+        if verificar_integridade:
+            for nome, sha256 in manifesto["arquivos"].items():
+                if calcular_sha256(pasta / nome) != sha256:
+                    logger.error(f"❌ Snapshot da KB {manifesto['versao']} corrompido ({nome}). Usando o Supabase.")
+                    return None
+
+        embeddings = np.load(pasta / ARQUIVO_EMBEDDINGS, mmap_mode="r")
+        metadados = json.loads((pasta / ARQUIVO_METADADOS).read_text(encoding="utf-8"))
+
+        if embeddings.shape != (manifesto["total"], TAMANHO_VETOR_SEMANTICO) or len(metadados["kb_id"]) != manifesto["total"]:
+            logger.error(f"❌ Snapshot da KB {manifesto['versao']} inconsistente com o manifesto. Usando o Supabase.")
+            return None
+
+        snapshot = SnapshotKB(manifesto, embeddings, metadados)
+        logger.info(f"🗂️ Snapshot da KB {snapshot.versao} carregado ({len(snapshot)} chunks, memory-mapped).")
+        return snapshot
+
+    except Exception as e:
+        logger.error(f"❌ Erro ao abrir o snapshot da KB: {e}. Usando o Supabase.")
+        return None
+
+
+@cache_ttl(3600)
+def _snapshot_em_disco() -> SnapshotKB | None:
+    """
+    Snapshot aberto do disco, compartilhado pelo processo. Reaberto a cada hora, para que uma nova
+    versão (ou a expiração da atual) seja percebida sem reiniciar o app.
+    """
+    return abrir_snapshot()
+
+
+@cache_ttl(SNAPSHOT_KB_VERIFICACAO_S)
+def versao_kb_banco() -> str | None:
+    """
+    Versão atual da KB no banco (RPC 'versao_kb'), ou None se o banco não responder. A falha também
+    fica em cache, para que um Supabase fora do ar não custe uma chamada a cada turno.
+    """
+    client = db_client.get_db_client()
+    if not client:
+        return None
+    try:
+        versao = client.rpc("versao_kb", {}).execute().data
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível conferir a versão da KB no banco: {e}")
+        return None
+    return versao if isinstance(versao, str) else None
+
+
+def carregar_snapshot_kb() -> SnapshotKB | None:
+    """
+    Retorna o snapshot da KB se ele corresponder à versão da KB no banco. Sem resposta do banco,
+    vale o snapshot em disco, dentro do limite de idade.
+    """
+    snapshot = _snapshot_em_disco()
+    if not snapshot:
+        return None
+
+    versao_banco = versao_kb_banco()
+    if versao_banco and not _snapshot_confere(snapshot.versao, snapshot.manifesto.get("versao_kb"), versao_banco):
+        return None
+    return snapshot
+
+
+@cache_ttl(SNAPSHOT_KB_VERIFICACAO_S)
+def _snapshot_confere(versao_snapshot: str, versao_kb_snapshot: str | None, versao_banco: str) -> bool:
+    """
+    Compara as versões da KB (cacheado para avisar a divergência uma vez, e não a cada consulta).
+    """
+    if versao_kb_snapshot == versao_banco:
+        return True
+    logger.warning(f"⚠️ Snapshot da KB {versao_snapshot} difere da KB no banco (versão {versao_banco[:12]}). Usando o Supabase.")
+    return False
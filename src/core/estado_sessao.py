@@ -0,0 +1,385 @@
+"""
+Armazenamento externo do estado das sessões.
+
+O estado compacto de cada sessão (histórico 'hist_exibir', memória de recuperação e orçamento de
+tokens) é serializado em JSON e guardado por 'session_id' fora do processo do Streamlit, para que
+o usuário continue a conversa em outra réplica ou depois de um deploy. O 'session_id' viaja na URL
+(parâmetro 'sid') assinado com um HMAC do segredo 'sessao.segredo_url' ('assinar_sid'), e o estado é
+reidratado por 'inicializar_chat_modelo' (src/app/ui.py). Um 'sid' sem assinatura válida nunca retoma
+a conversa; sem o segredo configurado, o app não põe o 'sid' na URL.
+
+Backends (SESSAO_ARMAZENAMENTO):
+    - 'memoria': dicionário do processo (padrão; uma réplica, perde tudo ao reiniciar);
+    - 'sqlite': arquivo local (SESSAO_SQLITE_CAMINHO), para várias réplicas em um mesmo host;
+    - 'postgres': tabela 'estado_sessoes' no Supabase, para réplicas em hosts diferentes.
+
+As gravações passam por 'GravadorCoalescido': cada turno apenas agenda o estado, e uma thread grava
+a versão mais recente de cada sessão a cada SESSAO_COALESCER_S segundos. Estados sem atualização
+por SESSAO_ESTADO_TTL_S expiram.
+"""
+
+import atexit
+import copy
+import hashlib
+import hmac
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from src.config import (
+    SESSAO_ARMAZENAMENTO,
+    SESSAO_COALESCER_S,
+    SESSAO_ESTADO_TTL_S,
+    SESSAO_SQLITE_CAMINHO,
+    SESSAO_VARREDURA_INTERVALO_S,
+    get_secret,
+    logger,
+)
+
+VERSAO_ESTADO = 1
+
+
+def serializar_estado(session_state: Any) -> dict[str, Any]:
+    """
+    Extrai o estado compacto da sessão que deve sobreviver a réplicas e reinícios.
+
+    Args:
+        session_state (Any): st.session_state (ou mapeamento equivalente).
+
+    Returns:
+        dict[str, Any]: Estado serializável em JSON.
+    """
+    memoria = dict(session_state.get("memoria_recuperacao") or {})
+    if memoria.get("vetor") is not None:
+        # Precisão de float32 basta para a distância de reuso e reduz o JSON à metade
+        memoria["vetor"] = [round(float(v), 7) for v in memoria["vetor"]]
+    return {
+        "versao": VERSAO_ESTADO,
+        "hist_exibir": list(session_state.get("hist_exibir") or []),
+        "memoria_recuperacao": memoria,
+        "orcamento_tokens": dict(session_state.get("orcamento_tokens") or {}),
+    }
+
+
+class ArmazenamentoSessao(ABC):
+    """
+    Interface dos backends de estado de sessão.
+    """
+
+    nome = "base"
+
+    @abstractmethod
+    def carregar(self, session_id: str) -> dict[str, Any] | None:
+        """Estado da sessão, ou None se não existir ou tiver expirado."""
+
+    @abstractmethod
+    def salvar(self, session_id: str, estado: dict[str, Any]) -> None:
+        """Grava (ou substitui) o estado da sessão e renova a validade."""
+
+    @abstractmethod
+    def excluir(self, session_id: str) -> None:
+        """Remove o estado da sessão."""
+
+    @abstractmethod
+    def expirar(self) -> int:
+        """Remove os estados vencidos e retorna quantos foram removidos."""
+
+
+class ArmazenamentoMemoria(ArmazenamentoSessao):
+    """
+    Estado das sessões em um dicionário do processo. Guarda cópias serializadas, como os demais backends.
+    """
+
+    nome = "memoria"
+
+    def __init__(self, ttl_s: float = SESSAO_ESTADO_TTL_S):
+        self.ttl_s = ttl_s
+        self._estados: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def carregar(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            registro = self._estados.get(session_id)
+        if not registro or registro[0] < time.time():
+            return None
+        return json.loads(registro[1])
+
+    def salvar(self, session_id: str, estado: dict[str, Any]) -> None:
+        with self._lock:
+            self._estados[session_id] = (time.time() + self.ttl_s, json.dumps(estado, ensure_ascii=False))
+
+    def excluir(self, session_id: str) -> None:
+        with self._lock:
+            self._estados.pop(session_id, None)
+
+    def expirar(self) -> int:
+        agora = time.time()
+        with self._lock:
+            expirados = [sid for sid, (expira_em, _) in self._estados.items() if expira_em < agora]
+            for session_id in expirados:
+                del self._estados[session_id]
+        return len(expirados)
+
+
+class ArmazenamentoSQLite(ArmazenamentoSessao):
+    """
+    Estado das sessões em um arquivo SQLite local, compartilhado pelas réplicas de um mesmo host.
+    """
+
+    nome = "sqlite"
+
+    def __init__(self, caminho: str | Path = SESSAO_SQLITE_CAMINHO, ttl_s: float = SESSAO_ESTADO_TTL_S):
+        self.ttl_s = ttl_s
+        Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(str(caminho), check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock, self._conexao:
+            # WAL: leitores de outras réplicas não bloqueiam a gravação
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS estado_sessoes ("
+                "session_id TEXT PRIMARY KEY, dados TEXT NOT NULL, atualizado_em REAL NOT NULL, expira_em REAL NOT NULL)"
+            )
+            self._conexao.execute("CREATE INDEX IF NOT EXISTS estado_sessoes_expira_em_idx ON estado_sessoes (expira_em)")
+
+    def carregar(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT dados FROM estado_sessoes WHERE session_id = ? AND expira_em > ?", (session_id, time.time())
+            ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def salvar(self, session_id: str, estado: dict[str, Any]) -> None:
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "INSERT INTO estado_sessoes (session_id, dados, atualizado_em, expira_em) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET dados = excluded.dados, atualizado_em = excluded.atualizado_em, expira_em = excluded.expira_em",
+                (session_id, json.dumps(estado, ensure_ascii=False), agora, agora + self.ttl_s),
+            )
+
+    def excluir(self, session_id: str) -> None:
+        with self._lock, self._conexao:
+            self._conexao.execute("DELETE FROM estado_sessoes WHERE session_id = ?", (session_id,))
+
+    def expirar(self) -> int:
+        with self._lock, self._conexao:
+            return self._conexao.execute("DELETE FROM estado_sessoes WHERE expira_em < ?", (time.time(),)).rowcount
+
+
+class ArmazenamentoPostgres(ArmazenamentoSessao):
+    """
+    Estado das sessões na tabela 'estado_sessoes' do Supabase, compartilhado por réplicas em hosts diferentes.
+    Estados expirados também são apagados pelo pg_cron (migração 'create_table_estado_sessoes').
+    """
+
+    nome = "postgres"
+
+    def __init__(self, ttl_s: float = SESSAO_ESTADO_TTL_S):
+        self.ttl_s = ttl_s
+
+    @staticmethod
+    def _cliente():
+        from src.core.database import get_db_client
+
+        cliente = get_db_client()
+        if not cliente:
+            raise RuntimeError("Cliente Supabase não inicializado.")
+        return cliente
+
+    def carregar(self, session_id: str) -> dict[str, Any] | None:
+        resposta = (
+            self._cliente().table("estado_sessoes")
+            .select("dados")
+            .eq("session_id", session_id)
+            .gt("expira_em", datetime.now(timezone.utc).isoformat())
+            .limit(1)
+            .execute()
+        )
+        return resposta.data[0]["dados"] if resposta.data else None
+
+    def salvar(self, session_id: str, estado: dict[str, Any]) -> None:
+        agora = datetime.now(timezone.utc)
+        self._cliente().table("estado_sessoes").upsert(
+            {
+                "session_id": session_id,
+                "dados": estado,
+                "atualizado_em": agora.isoformat(),
+                "expira_em": (agora + timedelta(seconds=self.ttl_s)).isoformat(),
+            },
+            on_conflict="session_id",
+        ).execute()
+
+    def excluir(self, session_id: str) -> None:
+        self._cliente().table("estado_sessoes").delete().eq("session_id", session_id).execute()
+
+    def expirar(self) -> int:
+        resposta = self._cliente().table("estado_sessoes").delete().lt("expira_em", datetime.now(timezone.utc).isoformat()).execute()
+        return len(resposta.data or [])
+
+
+class GravadorCoalescido:
+    """
+    Agrupa as gravações de estado: 'salvar' só agenda, e a versão mais recente de cada sessão é
+    gravada no backend a cada 'intervalo_s' segundos, em segundo plano. Leituras enxergam o que
+    ainda está pendente, e o que restar é gravado ao encerrar o processo.
+
+    Args:
+        backend (ArmazenamentoSessao): Backend de destino.
+        intervalo_s (float): Intervalo entre gravações.
+    """
+
+    def __init__(self, backend: ArmazenamentoSessao, intervalo_s: float = SESSAO_COALESCER_S):
+        self.backend = backend
+        self.intervalo_s = intervalo_s
+        self._pendentes: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._ultima_expiracao = time.monotonic()
+        atexit.register(self.descarregar)
+
+    def carregar(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            pendente = self._pendentes.get(session_id)
+        if pendente is not None:
+            return copy.deepcopy(pendente)
+        try:
+            return self.backend.carregar(session_id)
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao carregar o estado da sessão ({self.backend.nome}): {e}")
+            return None
+
+    def salvar(self, session_id: str, estado: dict[str, Any]) -> None:
+        with self._lock:
+            self._pendentes[session_id] = estado
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._gravar_periodicamente, name="vox-estado-sessoes", daemon=True)
+                self._thread.start()
+
+    def excluir(self, session_id: str) -> None:
+        with self._lock:
+            self._pendentes.pop(session_id, None)
+        try:
+            self.backend.excluir(session_id)
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao excluir o estado da sessão ({self.backend.nome}): {e}")
+
+    def descarregar(self) -> int:
+        """
+        Grava agora todos os estados pendentes.
+
+        Returns:
+            int: Quantidade de sessões gravadas.
+        """
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        for session_id, estado in pendentes.items():
+            try:
+                self.backend.salvar(session_id, estado)
+            except Exception as e:
+                logger.error(f"⚠️ Erro ao gravar o estado da sessão {session_id} ({self.backend.nome}): {e}")
+        return len(pendentes)
+
+    def _gravar_periodicamente(self) -> None:
+        while True:
+            time.sleep(self.intervalo_s)
+            self.descarregar()
+            if time.monotonic() - self._ultima_expiracao >= SESSAO_VARREDURA_INTERVALO_S:
+                self._ultima_expiracao = time.monotonic()
+                try:
+                    expirados = self.backend.expirar()
+                    if expirados:
+                        logger.info(f"🧹 {expirados} estado(s) de sessão expirado(s) removido(s) ({self.backend.nome}).")
+                except Exception as e:
+                    logger.error(f"⚠️ Erro ao expirar estados de sessão ({self.backend.nome}): {e}")
+
+
+BACKENDS = {"memoria": ArmazenamentoMemoria, "sqlite": ArmazenamentoSQLite, "postgres": ArmazenamentoPostgres}
+
+
+@cache
+def armazenamento_sessao() -> GravadorCoalescido:
+    """
+    Cria (uma única vez por processo) o armazenamento de estado configurado em SESSAO_ARMAZENAMENTO.
+    """
+    backend = BACKENDS.get(SESSAO_ARMAZENAMENTO)
+    if backend is None:
+        logger.warning(f"⚠️ SESSAO_ARMAZENAMENTO '{SESSAO_ARMAZENAMENTO}' desconhecido. Usando 'memoria'.")
+        backend = ArmazenamentoMemoria
+    logger.info(f"💾 Estado das sessões em '{backend.nome}'.")
+    return GravadorCoalescido(backend())
+
+
+def carregar_sessao(session_id: str | None) -> tuple[str, dict[str, Any] | None]:
+    """
+    Carrega o estado salvo de uma sessão já autorizada pelo chamador; sem estado, cria uma nova.
+    Identificadores desconhecidos ou malformados são ignorados (a sessão nova recebe um UUID próprio).
+
+    Args:
+        session_id (str | None): Sessão a carregar (ex: autorizada pelo 'session_token' da API).
+
+    Returns:
+        tuple[str, dict[str, Any] | None]: 'session_id' e o estado salvo (None para sessão nova).
+    """
+    if session_id:
+        try:
+            session_id = str(uuid.UUID(session_id))
+        except ValueError:
+            session_id = None
+    estado = armazenamento_sessao().carregar(session_id) if session_id else None
+    if estado is not None:
+        logger.info(f"♻️ Sessão {session_id} retomada do armazenamento ({len(estado.get('hist_exibir') or [])} mensagens).")
+        return session_id, estado
+    return str(uuid.uuid4()), None
+
+
+@cache
+def _segredo_url() -> bytes:
+    """
+    Segredo das assinaturas do 'sid' da URL (segredo 'sessao.segredo_url'); vazio desativa a retomada pelo link.
+    """
+    return get_secret("sessao.segredo_url").encode()
+
+
+def _assinatura(session_id: str, segredo: bytes) -> str:
+    return hmac.new(segredo, f"sid:{session_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def assinar_sid(session_id: str) -> str | None:
+    """
+    Valor do parâmetro 'sid' da URL: o 'session_id' e um HMAC dele ('<session_id>.<assinatura>').
+
+    Returns:
+        str | None: O 'sid' assinado, ou None sem 'sessao.segredo_url' (o 'sid' não deve ir para a URL).
+    """
+    segredo = _segredo_url()
+    if not segredo:
+        return None
+    return f"{session_id}.{_assinatura(session_id, segredo)}"
+
+
+def retomar_sessao(sid: str | None) -> tuple[str, dict[str, Any] | None]:
+    """
+    Retoma a sessão indicada na URL, se o 'sid' tiver assinatura válida e a sessão tiver estado salvo;
+    senão, cria uma nova. Só o 'session_id' não basta: quem vê um link sem a assinatura não lê a conversa.
+
+    Args:
+        sid (str | None): Valor do parâmetro 'sid' da URL (gerado por 'assinar_sid').
+
+    Returns:
+        tuple[str, dict[str, Any] | None]: 'session_id' e o estado salvo (None para sessão nova).
+    """
+    session_id, _, assinatura = (sid or "").rpartition(".")
+    segredo = _segredo_url()
+    if not (segredo and session_id and hmac.compare_digest(_assinatura(session_id, segredo), assinatura)):
+        if sid:
+            logger.warning("🔒 'sid' da URL sem assinatura válida; uma nova sessão foi criada.")
+        return carregar_sessao(None)
+    return carregar_sessao(session_id)
@@ -1,183 +1,212 @@
-import os
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from functools import cache
 
-import streamlit as st
 from google import genai
 from google.genai import types
+from google.genai.errors import APIError
 
-from data.prompts.system_prompt import INSTRUCOES
-from src.app.ui import stream_resposta
+import data.prompts.system_prompt as system_prompt
 from src.config import GEMINI_MODEL_NAME, get_secret, logger
+from src.core.prazo import PrazoTurno
+from src.core.tracing import registrar_span, span
+from src.core.uso_tokens import registrar_uso
 
 
-def configurar_api_gemini() -> genai.Client:
+@cache
+def cliente_gemini() -> genai.Client:
     """
-    Configura e inicializa o cliente da API do Google GenAI utilizando a chave armazenada.
-    Armazena a instância no session_state do Streamlit como recurso persistente.
+    Cria (uma única vez por processo) o cliente da API do Google GenAI, compartilhado por todas as
+    sessões para reaproveitar as conexões HTTP já abertas.
 
     Returns:
         genai.Client: Cliente configurado do Gemini.
     """
-    if "gemini_client" not in st.session_state:
-        try:
-            st.session_state.gemini_client = genai.Client(
-                api_key=get_secret("GEMINI_API_KEY")
-            )
-            logger.info("API Gemini configurada com sucesso.")
-        except Exception as e:
-            logger.error(f"Erro ao configurar a API do Gemini: {e}")
-            st.error(f"Erro ao configurar a API do Gemini: {e}")
-            st.stop()
+    # Permite apontar o app para outro endpoint (ex: o Gemini falso de benchmarks/servicos_fake)
+    base_url = get_secret("GEMINI_BASE_URL")
+    cliente = genai.Client(
+        api_key=get_secret("GEMINI_API_KEY"),
+        http_options=types.HttpOptions(base_url=base_url) if base_url else None,
+    )
+    logger.info("API Gemini configurada com sucesso.")
+    return cliente
 
-    return st.session_state.gemini_client
 
+def instrucoes_sistema() -> str:
+    """
+    Instruções de sistema do Vox (data/prompts/system_prompt.py). Lidas do módulo a cada chat, para
+    acompanhar o recarregamento dos prompts em desenvolvimento (ASSETS_HOT_RELOAD).
+    """
+    return system_prompt.INSTRUCOES
 
-def inicializar_chat_modelo():
+
+def historico_para_gemini(historico: list[dict]) -> list[types.Content]:
     """
-    Inicializa a sessão de chat conversacional com o modelo Gemini, definindo
-    as diretrizes de comportamento do assistente.
+    Converte o histórico da sessão no histórico do chat do Gemini. As mensagens do modelo antes da
+    primeira pergunta (saudação) ficam de fora, como antes, e as perguntas entram sem o contexto da KB
+    anexado no seu turno, que não é repetido nos turnos seguintes.
+
+    Args:
+        historico (list[dict]): Mensagens no formato de 'hist_exibir' ({"role": ..., "parts": [...]}).
 
     Returns:
-        st.session_state.chat: Instância ativa do chat no estado de sessão.
+        list[types.Content]: Histórico para 'client.chats.create'.
     """
-    if "hist_exibir" not in st.session_state:
-        st.session_state.hist_exibir = []
+    conteudos = []
+    for msg in historico:
+        if not conteudos and msg["role"] != "user":
+            continue
+        conteudos.append(types.Content(role=msg["role"], parts=[types.Part.from_text(text=str(parte)) for parte in msg["parts"]]))
+    return conteudos
 
-    if "chat" not in st.session_state:
-        client = configurar_api_gemini()
 
-        sys_config = types.GenerateContentConfig(
-            system_instruction=INSTRUCOES,
-        )
+def criar_chat(historico: list[dict]):
+    """
+    Cria o chat assíncrono do Gemini para um turno, com o histórico reconstruído a partir do da sessão.
 
-        st.session_state.chat = client.chats.create(
-            model=GEMINI_MODEL_NAME,
-            config=sys_config,
-            history=[],
-        )
+    Args:
+        historico (list[dict]): Mensagens anteriores ao turno, no formato de 'hist_exibir'.
 
-    return st.session_state.chat
+    Returns:
+        AsyncChat: Chat do Gemini pronto para 'send_message_stream'.
+    """
+    return cliente_gemini().aio.chats.create(
+        model=GEMINI_MODEL_NAME,
+        config=types.GenerateContentConfig(system_instruction=instrucoes_sistema()),
+        history=historico_para_gemini(historico),
+    )
 
 
-def gerar_resposta(chat, prompt: str, info_adicional: str) -> str:
+def montar_prompt(prompt: str, info_adicional: str, sem_kb: bool = False) -> str:
     """
-    Gera a resposta do assistente Vox AI a partir do prompt do usuário e do contexto fornecido,
-    realizando o streaming de texto e capturando erros amigavelmente.
+    Monta o prompt enviado ao modelo, anexando o contexto recuperado da base de conhecimento.
+    Também usado pela ferramenta de replay (benchmarks/replay.py), para que as comparações
+    reflitam exatamente o prompt de produção.
 
     Args:
-        chat: Instância ativa do chat conversacional do Gemini.
         prompt (str): Texto da pergunta do usuário.
         info_adicional (str): Informações de contexto recuperadas da base de dados.
+        sem_kb (bool): A recuperação foi cortada pelo prazo do turno (src/core/prazo.py); o modelo é
+            avisado de que responde sem a base de conhecimento.
 
     Returns:
-        str: Resposta final gerada pelo modelo de linguagem.
-    """
-    msg_placeholder = st.empty()
-
-    with st.spinner("🧠 Thinking about it..."):
-        try:
-            full_prompt_for_model = prompt
-            if info_adicional:
-                full_prompt_for_model = (
-                    f"Prompt do Usuário: {prompt}\n\n"
-                    f"Contexto interno da sua base de conhecimento, que o usuário NÃO forneceu "
-                    f"(use para embasar sua resposta): {info_adicional}\n\n"
-                    f"Responda à pergunta do usuário com base no contexto fornecido."
-                )
-
-            resposta = ""
-            for chunk in chat.send_message_stream(full_prompt_for_model):
-                if chunk.text:
-                    resposta += chunk.text
-
-            msg_placeholder.write_stream(stream_resposta(resposta))
-            return resposta
-        except Exception as e:
-            msg_placeholder.empty()
-            sess_id = st.session_state.get("session_id", "Unknown")
-            git_ver = st.session_state.get("git_version_str", "Unknown")
-
-            # Evita circular imports importando no escopo do handler
+        str: Prompt final para o modelo.
+    """
+    if sem_kb:
+        return (
+            f"Prompt do Usuário: {prompt}\n\n"
+            f"Aviso interno: a base de conhecimento não pôde ser consultada a tempo neste turno. "
+            f"Responda com cuidado e avise brevemente o usuário de que esta resposta não foi conferida na base do Vox."
+        )
+    if not info_adicional:
+        return prompt
+    return (
+        f"Prompt do Usuário: {prompt}\n\n"
+        f"Contexto interno da sua base de conhecimento, que o usuário NÃO forneceu "
+        f"(use para embasar sua resposta): {info_adicional}\n\n"
+        f"Responda à pergunta do usuário com base no contexto fornecido."
+    )
+
+
+async def gerar_resposta_stream(chat, prompt_modelo: str, prazo: PrazoTurno | None = None) -> AsyncIterator[str]:
+    """
+    Gera a resposta do Vox em streaming, sem interface: entrega cada trecho de texto assim que chega,
+    registrando no turno atual o tempo até o primeiro token, a duração e os tokens da chamada.
+    Os erros são propagados para quem consome o stream (ver 'classificar_erro_gemini').
+
+    Args:
+        chat: Chat assíncrono do Gemini ('criar_chat').
+        prompt_modelo (str): Prompt final, já com o contexto ('montar_prompt').
+        prazo (PrazoTurno | None): Prazo do turno; limita a espera pelo primeiro token ('timeout_geracao').
+
+    Yields:
+        str: Trechos da resposta, na ordem.
+
+    Raises:
+        TimeoutError: Se o primeiro token não chegar no prazo.
+    """
+    with span("gerar_resposta"):
+        inicio = time.perf_counter()
+        primeiro = True
+        uso = None
+        limite_ttft = inicio + prazo.timeout_geracao() if prazo else None
+
+        def restante_ttft() -> float | None:
+            return limite_ttft - time.perf_counter() if limite_ttft and primeiro else None
+
+        # Abrir a chamada (conexão e envio) também conta para o prazo do primeiro token
+        respostas = aiter(await asyncio.wait_for(chat.send_message_stream(prompt_modelo), restante_ttft()))
+        while True:
+            # Só a espera pelo primeiro token é limitada; depois dele, a resposta corre até o fim
+            timeout_s = restante_ttft()
             try:
-                from src.utils import git_version
-                git_ver = git_version() or git_ver
-            except Exception:
-                pass
-
-            from src.core.db.logs import salvar_erro
-            error_id = salvar_erro(sess_id, git_ver, e)
-            
-            from google.genai.errors import APIError
-
-            is_safety = False
-            is_quota = False
-            is_unavailable = False
-
-            # Tenta classificação estruturada usando os atributos do erro da API
-            if isinstance(e, APIError):
-                if e.code == 429:
-                    is_quota = True
-                elif e.code == 503:
-                    is_unavailable = True
-                elif e.code == 400 and ("safety" in str(e).lower() or "blocked" in str(e).lower()):
-                    is_safety = True
-
-            # Fallback por correspondência de string para compatibilidade e robustez
-            if not (is_safety or is_quota or is_unavailable):
-                err_msg = str(e).lower()
-                if "safety" in err_msg or "blocked" in err_msg:
-                    is_safety = True
-                elif "resourceexhausted" in err_msg or "429" in err_msg or "quota" in err_msg:
-                    is_quota = True
-                elif "503" in err_msg or "serviceunavailable" in err_msg or "overloaded" in err_msg:
-                    is_unavailable = True
-
-            if is_safety:
-                st.error(
-                    f"⚠️ **Essa pergunta não pode ser respondida pelo Vox.**\n\n"
-                    f"Por razões de segurança e acolhimento, sua mensagem ativou nossas diretrizes de proteção e não pôde ser processada.\n\n"
-                    f"*(Código do Erro: **{error_id}**)*",
-                    icon="🚫"
-                )
-            elif is_quota:
-                st.error(
-                    f"Olá! O Vox está recebendo muitas mensagens de carinho e dúvidas no momento, e atingimos nosso limite de processamento temporário da API do Google. "
-                    f"Por favor, aguarde cerca de um minutinho e tente enviar sua mensagem novamente! 💜\n\n"
-                    f"*(Código do Erro: **{error_id}**)*",
-                    icon="⚠️"
-                )
-            elif is_unavailable:
-                st.error(
-                    f"Ops! Os servidores da inteligência artificial estão com uma demanda muito alta agora e temporariamente instáveis. "
-                    f"Que tal respirar fundo, tomar uma água e tentar de novo em alguns instantes? Estarei aqui esperando! 🏳️‍🌈\n\n"
-                    f"*(Código do Erro: **{error_id}**)*",
-                    icon="⏳"
-                )
-            else:
-                from src.app.ui import exibir_mensagem_erro
-                exibir_mensagem_erro(error_id)
-            st.stop()
+                chunk = await asyncio.wait_for(anext(respostas), timeout_s)
+            except StopAsyncIteration:
+                break
+            # O uso acumulado do turno vem no último chunk que o trouxer
+            uso = chunk.usage_metadata or uso
+            if chunk.text:
+                if primeiro:
+                    registrar_span("gerar_resposta.ttft", (time.perf_counter() - inicio) * 1000)
+                    primeiro = False
+                yield chunk.text
+        registrar_span("gerar_resposta.modelo", (time.perf_counter() - inicio) * 1000)
+        registrar_uso("gerar_resposta", GEMINI_MODEL_NAME, uso)
+
+
+def classificar_erro_gemini(erro: Exception) -> str:
+    """
+    Classifica uma falha da geração para a interface escolher a mensagem ao usuário.
+
+    Args:
+        erro (Exception): Exceção capturada.
 
+    Returns:
+        str: 'seguranca' (bloqueio de conteúdo), 'cota' (429), 'indisponivel' (503 ou prazo do turno) ou 'geral'.
+    """
+    # O primeiro token não chegou no prazo do turno (src/core/prazo.py)
+    if isinstance(erro, TimeoutError):
+        return "indisponivel"
+
+    # Tenta classificação estruturada usando os atributos do erro da API
+    if isinstance(erro, APIError):
+        if erro.code == 429:
+            return "cota"
+        if erro.code == 503:
+            return "indisponivel"
+        if erro.code == 400 and ("safety" in str(erro).lower() or "blocked" in str(erro).lower()):
+            return "seguranca"
+
+    # Fallback por correspondência de string para compatibilidade e robustez
+    err_msg = str(erro).lower()
+    if "safety" in err_msg or "blocked" in err_msg:
+        return "seguranca"
+    if "resourceexhausted" in err_msg or "429" in err_msg or "quota" in err_msg:
+        return "cota"
+    if "503" in err_msg or "serviceunavailable" in err_msg or "overloaded" in err_msg:
+        return "indisponivel"
+    return "geral"
+
+
+@span("transcrever_audio")
 def transcrever_audio(audio_file) -> str | None:
     """
     Realiza a transcrição de um arquivo de áudio de voz para texto utilizando o modelo Gemini.
+    Os erros da API são propagados para a interface.
 
     Args:
         audio_file (BytesIO): Arquivo de áudio (geralmente MP3/WAV) gravado no frontend.
 
     Returns:
-        str | None: O texto transcrito ou None em caso de erro na API de áudio.
+        str | None: O texto transcrito.
     """
-    client = configurar_api_gemini()
-
-    try:
-        response = client.models.generate_content(
-            model=GEMINI_MODEL_NAME,
-            contents=[
-                "Transcreva este áudio para português do Brasil. Retorne apenas o texto transcrito.",
-                types.Part.from_bytes(data=audio_file.read(), mime_type="audio/mp3"),
-            ],
-        )
-        return response.text
-    except Exception as e:
-        st.error(f"Erro na transcrição: {e}")
-        return None
+    response = cliente_gemini().models.generate_content(
+        model=GEMINI_MODEL_NAME,
+        contents=[
+            "Transcreva este áudio para português do Brasil. Retorne apenas o texto transcrito.",
+            types.Part.from_bytes(data=audio_file.read(), mime_type="audio/mp3"),
+        ],
+    )
+    registrar_uso("transcrever_audio", GEMINI_MODEL_NAME, response.usage_metadata)
+    return response.text
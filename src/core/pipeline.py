@@ -0,0 +1,371 @@
+"""
+Pipeline de um turno de conversa do Vox AI, independente de interface.
+
+'VoxPipeline' executa, em um laço asyncio, as etapas do turno (objetos 'Etapa'):
+
+1. EtapaNormalizacao: limpa a pergunta (Unicode NFC, sem caracteres de controle e espaços repetidos).
+2. EtapaEmbedding e 3. EtapaRecuperacao, agrupadas no span 'semantica': embedding da pergunta e
+   contexto da KB, já empacotado por src/core/contexto.py dentro da recuperação.
+4. EtapaMontagem: prompt com o contexto e chat do Gemini reconstruído do histórico.
+5. EtapaGeracao: resposta em streaming.
+6. EtapaPersistencia: tokens do turno, estado da sessão (src/core/estado_sessao.py) e log do turno.
+
+Cada turno tem um prazo (src/core/prazo.py) repassado ao embedding, à recuperação e à geração: quando
+uma etapa estoura, o turno perde a expansão do tópico e depois a KB, mas a resposta ainda sai no prazo.
+
+O que não depende da resposta corre em paralelo: o registro de uma sessão nova no banco corre junto
+com o embedding (os logs só são gravados depois dele, por causa das chaves estrangeiras), e a gravação
+do log corre depois que a interface já recebeu a resposta completa ('ao_concluir').
+
+A interface entra apenas por 'CallbacksPipeline'. Para o Streamlit, cujo script roda em threads
+síncronas, 'TurnoEmSegundoPlano' executa o pipeline no laço de eventos do processo e entrega os
+eventos por uma fila à thread do script, que desenha o histórico enquanto o embedding está em voo.
+"""
+
+import asyncio
+import queue
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections.abc import Coroutine, Iterator
+from concurrent.futures import Future
+from functools import cache
+from typing import Any
+
+from src.config import logger
+from src.core.database import salvar_erro, salvar_log_chat, salvar_sessao
+from src.core.estado_sessao import armazenamento_sessao, serializar_estado
+from src.core.genai import classificar_erro_gemini, criar_chat, gerar_resposta_stream, montar_prompt
+from src.core.prazo import PrazoTurno
+from src.core.semantica import buscar_contexto, gerar_embedding
+from src.core.tracing import Trace, span, trace_turno
+from src.core.uso_tokens import contabilizar_turno
+from src.utils import git_version
+
+# Fonte registrada quando o prazo do turno cortou a recuperação
+FONTE_SEM_KB = "Sem contexto da KB (prazo do turno)"
+
+
+class Turno:
+    """
+    Estado de um turno, preenchido pelas etapas do pipeline.
+
+    Args:
+        session_id (str): Sessão do usuário.
+        prompt (str): Pergunta do usuário.
+        historico (list[dict]): Mensagens anteriores ao turno, no formato de 'hist_exibir' (não é alterado).
+        memoria (dict[str, Any]): Memória de recuperação da sessão (atualizada no lugar).
+        orcamento (dict[str, Any]): Orçamento de tokens da sessão (atualizado no lugar).
+        trace (Trace | None): Trace já iniciado pela interface (ex: durante a transcrição do áudio).
+        prazo (PrazoTurno | None): Prazo do turno (padrão: um novo, contado a partir daqui).
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        prompt: str,
+        historico: list[dict] | None = None,
+        memoria: dict[str, Any] | None = None,
+        orcamento: dict[str, Any] | None = None,
+        trace: Trace | None = None,
+        prazo: PrazoTurno | None = None,
+    ):
+        self.session_id = session_id
+        self.prompt = prompt
+        self.historico = list(historico or [])
+        self.memoria = memoria if memoria is not None else {}
+        self.orcamento = orcamento if orcamento is not None else {}
+        self.trace = trace
+        self.prazo = prazo or PrazoTurno()
+        self.registro_sessao: asyncio.Future | None = None
+
+        self.vetor: list[float] | None = None
+        self.fonte: str | None = None
+        self.contexto: str | None = None
+        self.ids_referencia: list[dict[str, Any]] | None = None
+        self.prompt_modelo: str | None = None
+        self.chat = None
+        self.resposta = ""
+        self.tokens: dict[str, Any] | None = None
+        self.historico_final: list[dict] | None = None
+        self.error_id: str | None = None
+        self.tipo_erro: str | None = None
+
+
+class CallbacksPipeline:
+    """
+    Pontos de extensão da interface. Por padrão, não fazem nada.
+    """
+
+    def ao_token(self, texto: str) -> None:
+        """Um trecho da resposta chegou."""
+
+    def ao_concluir(self, turno: Turno) -> None:
+        """A resposta está completa; o log do turno ainda será gravado."""
+
+    def ao_erro(self, turno: Turno) -> None:
+        """A geração falhou; 'turno.error_id' e 'turno.tipo_erro' estão preenchidos."""
+
+
+class Etapa(ABC):
+    """
+    Etapa do pipeline. 'span', se definido, mede a etapa no trace do turno.
+    """
+
+    nome = "etapa"
+    span: str | None = None
+
+    @abstractmethod
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        """Executa a etapa, lendo e preenchendo o 'turno'."""
+
+
+class EtapaSequencial(Etapa):
+    """
+    Executa etapas em ordem, medidas juntas em um único span.
+
+    Args:
+        nome (str): Nome do grupo (e do span).
+        etapas (list[Etapa]): Etapas do grupo.
+    """
+
+    def __init__(self, nome: str, etapas: list[Etapa]):
+        self.nome = self.span = nome
+        self.etapas = etapas
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        for etapa in self.etapas:
+            await _executar_etapa(etapa, turno, callbacks)
+
+
+class EtapaNormalizacao(Etapa):
+    nome = "normalizacao"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        texto = unicodedata.normalize("NFC", turno.prompt)
+        texto = "".join(c for c in texto if c in "\n\t" or unicodedata.category(c)[0] != "C")
+        turno.prompt = re.sub(r"[ \t]+", " ", texto).strip()
+
+
+class EtapaEmbedding(Etapa):
+    nome = "embedding"
+    span = "semantica.embedding"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        turno.vetor = await gerar_embedding(turno.prompt, turno.prazo)
+
+
+class EtapaRecuperacao(Etapa):
+    nome = "recuperacao"
+    span = "semantica.recuperacao"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        if turno.vetor is None:
+            return
+        turno.fonte, turno.contexto, turno.ids_referencia = await buscar_contexto(turno.vetor, turno.memoria, turno.prazo)
+        turno.trace.fonte = turno.fonte
+
+
+class EtapaMontagem(Etapa):
+    nome = "montagem"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        sem_kb = "recuperacao" in turno.prazo.degradacoes
+        if sem_kb:
+            turno.fonte = turno.trace.fonte = FONTE_SEM_KB
+        turno.prompt_modelo = montar_prompt(turno.prompt, turno.contexto or "", sem_kb=sem_kb)
+        # O chat é reconstruído do histórico, sem a pergunta deste turno (enviada com o contexto)
+        turno.chat = criar_chat(turno.historico)
+
+
+class EtapaGeracao(Etapa):
+    nome = "geracao"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        async for texto in gerar_resposta_stream(turno.chat, turno.prompt_modelo, turno.prazo):
+            turno.resposta += texto
+            callbacks.ao_token(texto)
+
+
+class EtapaPersistencia(Etapa):
+    nome = "persistencia"
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline) -> None:
+        turno.historico_final = [
+            *turno.historico,
+            {"role": "user", "parts": [turno.prompt]},
+            {"role": "model", "parts": [turno.resposta]},
+        ]
+        turno.tokens = contabilizar_turno(turno.trace, turno.orcamento)
+        # Gravação agrupada em segundo plano; o turno não espera o armazenamento
+        armazenamento_sessao().salvar(
+            turno.session_id,
+            serializar_estado({"hist_exibir": turno.historico_final, "memoria_recuperacao": turno.memoria, "orcamento_tokens": turno.orcamento}),
+        )
+        callbacks.ao_concluir(turno)
+
+        if turno.registro_sessao is not None:
+            await turno.registro_sessao
+        try:
+            await asyncio.to_thread(
+                salvar_log_chat,
+                turno.session_id,
+                git_version(),
+                turno.prompt,
+                turno.resposta,
+                turno.ids_referencia,
+                trace_id=turno.trace.trace_id,
+                duracoes_ms=turno.trace.duracoes(),
+                tokens=turno.tokens,
+            )
+        except Exception as e_log:
+            logger.error(f"Falha silenciosa ao registrar log de conversa: {e_log}", exc_info=True)
+
+
+async def _executar_etapa(etapa: Etapa, turno: Turno, callbacks: CallbacksPipeline) -> None:
+    if etapa.span:
+        with span(etapa.span):
+            await etapa.executar(turno, callbacks)
+    else:
+        await etapa.executar(turno, callbacks)
+
+
+class VoxPipeline:
+    """
+    Executa os turnos de conversa, do texto da pergunta ao log gravado.
+
+    Args:
+        etapas (list[Etapa] | None): Etapas do turno, em ordem (padrão: as do módulo).
+    """
+
+    def __init__(self, etapas: list[Etapa] | None = None):
+        self.etapas = etapas or [
+            EtapaNormalizacao(),
+            EtapaSequencial("semantica", [EtapaEmbedding(), EtapaRecuperacao()]),
+            EtapaMontagem(),
+            EtapaGeracao(),
+            EtapaPersistencia(),
+        ]
+        self._registros: dict[str, asyncio.Future] = {}
+
+    def iniciar_registro_sessao(self, session_id: str) -> asyncio.Future:
+        """
+        Registra uma sessão nova no banco em segundo plano (deve ser chamado no laço do pipeline).
+        Os turnos da sessão esperam o registro antes de gravar logs.
+        """
+        registro = self._registros.get(session_id)
+        if registro is None:
+            registro = asyncio.ensure_future(asyncio.to_thread(salvar_sessao, session_id))
+            self._registros[session_id] = registro
+            registro.add_done_callback(lambda _: self._registros.pop(session_id, None))
+        return registro
+
+    async def executar(self, turno: Turno, callbacks: CallbacksPipeline | None = None) -> Turno:
+        """
+        Executa um turno. Falhas na recuperação deixam o turno sem contexto da KB; falhas na geração
+        são registradas em 'error_logs' e entregues por 'ao_erro'.
+
+        Args:
+            turno (Turno): Turno a executar.
+            callbacks (CallbacksPipeline | None): Interface que acompanha o turno.
+
+        Returns:
+            Turno: O mesmo turno, preenchido.
+        """
+        callbacks = callbacks or CallbacksPipeline()
+        turno.registro_sessao = self._registros.get(turno.session_id)
+        with trace_turno(turno.session_id, turno.trace) as trace:
+            turno.trace = trace
+            try:
+                for etapa in self.etapas:
+                    await _executar_etapa(etapa, turno, callbacks)
+            except Exception as e:
+                if turno.registro_sessao is not None:
+                    await turno.registro_sessao
+                turno.error_id = await asyncio.to_thread(salvar_erro, turno.session_id, git_version(), e)
+                turno.tipo_erro = classificar_erro_gemini(e)
+                callbacks.ao_erro(turno)
+        return turno
+
+
+@cache
+def pipeline_padrao() -> VoxPipeline:
+    """
+    Pipeline compartilhado pelas sessões do processo.
+    """
+    return VoxPipeline()
+
+
+@cache
+def laco_do_processo() -> asyncio.AbstractEventLoop:
+    """
+    Laço de eventos do processo (uma thread dedicada), onde o app Streamlit executa os turnos.
+    Um único laço mantém válidas as conexões do cliente assíncrono do Gemini entre os turnos.
+    """
+    laco = asyncio.new_event_loop()
+    threading.Thread(target=laco.run_forever, name="vox-pipeline", daemon=True).start()
+    return laco
+
+
+def submeter(corrotina: Coroutine) -> Future:
+    """
+    Agenda uma corrotina no laço do processo, a partir de qualquer thread.
+    """
+    return asyncio.run_coroutine_threadsafe(corrotina, laco_do_processo())
+
+
+def registrar_sessao_em_segundo_plano(session_id: str) -> None:
+    """
+    Registra uma sessão nova no banco sem bloquear a thread que chamou.
+    """
+    laco_do_processo().call_soon_threadsafe(pipeline_padrao().iniciar_registro_sessao, session_id)
+
+
+class CallbacksFila(CallbacksPipeline):
+    """
+    Repassa os eventos do pipeline a outra thread por uma fila: ('token', texto), ('fim', turno) ou ('erro', turno).
+    """
+
+    def __init__(self):
+        self.fila: queue.Queue[tuple[str, Any]] = queue.Queue()
+
+    def ao_token(self, texto: str) -> None:
+        self.fila.put(("token", texto))
+
+    def ao_concluir(self, turno: Turno) -> None:
+        self.fila.put(("fim", turno))
+
+    def ao_erro(self, turno: Turno) -> None:
+        self.fila.put(("erro", turno))
+
+
+class TurnoEmSegundoPlano:
+    """
+    Dispara um turno no laço do processo e entrega seus eventos à thread que o consome.
+
+    Args:
+        turno (Turno): Turno a executar.
+        pipeline (VoxPipeline | None): Pipeline (padrão: 'pipeline_padrao').
+    """
+
+    def __init__(self, turno: Turno, pipeline: VoxPipeline | None = None):
+        self.turno = turno
+        self._callbacks = CallbacksFila()
+        self.futuro = submeter((pipeline or pipeline_padrao()).executar(turno, self._callbacks))
+
+    def eventos(self) -> Iterator[tuple[str, Any]]:
+        """
+        Eventos do turno, até 'fim' ou 'erro'. Exceções inesperadas do pipeline são propagadas.
+        """
+        while True:
+            try:
+                evento = self._callbacks.fila.get(timeout=0.05)
+            except queue.Empty:
+                if self.futuro.done():
+                    self.futuro.result()
+                    return
+                continue
+            yield evento
+            if evento[0] in ("fim", "erro"):
+                return
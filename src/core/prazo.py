@@ -0,0 +1,113 @@
+"""
+Prazo de um turno de conversa do Vox AI.
+
+Cada turno recebe um 'PrazoTurno' (SLO de PRAZO_TTFT_S segundos até o primeiro token), repassado às
+etapas que podem demorar. Cada chamada externa usa como timeout o que resta do orçamento, e a
+recuperação só usa o que sobra depois da reserva da geração (PRAZO_RESERVA_GERACAO_S). Quando uma
+etapa estoura, o turno degrada de propósito, em ordem:
+
+1. sem expansão do tópico: o contexto fica com os top-K chunks da busca vetorial;
+2. sem recuperação: o turno segue sem contexto da KB, e o prompt avisa o modelo ('montar_prompt').
+
+Cada degradação é registrada no log com o trace do turno. Assim, a latência da cauda fica limitada
+pelo prazo, em vez de depender de uma RPC lenta do Supabase ou do Gemini.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Any, Callable
+
+from src.config import PRAZO_CHAMADAS_SIMULTANEAS, PRAZO_RESERVA_GERACAO_S, PRAZO_TTFT_S, logger
+from src.core.tracing import trace_atual
+
+
+class PrazoTurno:
+    """
+    Orçamento de tempo de um turno, contado a partir da criação.
+
+    Args:
+        ttft_s (float): Prazo até o primeiro token da resposta, em segundos.
+        reserva_geracao_s (float): Parte do prazo reservada à geração (a recuperação não a consome).
+    """
+
+    def __init__(self, ttft_s: float = PRAZO_TTFT_S, reserva_geracao_s: float = PRAZO_RESERVA_GERACAO_S):
+        self.ttft_s = ttft_s
+        self.reserva_geracao_s = reserva_geracao_s
+        self.fim = time.monotonic() + ttft_s
+        self.degradacoes: list[str] = []
+
+    def restante(self) -> float:
+        """
+        Segundos até o fim do prazo (negativo se já passou).
+        """
+        return self.fim - time.monotonic()
+
+    def restante_recuperacao(self) -> float:
+        """
+        Segundos disponíveis para o embedding e a recuperação, sem invadir a reserva da geração.
+        """
+        return self.restante() - self.reserva_geracao_s
+
+    def timeout_geracao(self) -> float:
+        """
+        Timeout até o primeiro token. A geração tem sempre ao menos a reserva: se a recuperação atrasou,
+        ela já foi cortada, e falhar o turno inteiro seria pior que estourar o SLO.
+        """
+        return max(self.restante(), self.reserva_geracao_s)
+
+    def degradar(self, etapa: str, motivo: str) -> None:
+        """
+        Registra (e leva ao log) uma degradação deliberada do turno.
+
+        Args:
+            etapa (str): O que foi cortado (ex: 'expansao_topico', 'recuperacao').
+            motivo (str): Por quê, para o log.
+        """
+        self.degradacoes.append(etapa)
+        trace = trace_atual()
+        trace_id = trace.trace_id if trace else None
+        logger.warning(
+            f"⏳ Prazo do turno: '{etapa}' cortada ({motivo}); restam {self.restante() * 1000:.0f} ms de {self.ttft_s * 1000:.0f} ms | trace: {trace_id}"
+        )
+
+
+@cache
+def _executor_chamadas() -> ThreadPoolExecutor:
+    """
+    Threads das chamadas síncronas com prazo. Uma chamada que estoura continua até terminar, mas o
+    turno não espera por ela.
+    """
+    return ThreadPoolExecutor(max_workers=PRAZO_CHAMADAS_SIMULTANEAS, thread_name_prefix="vox-prazo")
+
+
+# Uma vaga por thread do executor: nenhuma chamada fica na fila atrás de chamadas já vencidas
+_vagas_chamadas = threading.BoundedSemaphore(PRAZO_CHAMADAS_SIMULTANEAS)
+
+
+def executar_com_prazo(timeout_s: float, funcao: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Executa uma chamada síncrona (ex: RPC do Supabase, cujo cliente não aceita timeout por chamada)
+    esperando no máximo 'timeout_s' segundos. Se as PRAZO_CHAMADAS_SIMULTANEAS vagas estiverem
+    ocupadas (ex: Supabase travado), a chamada falha na hora, sem ser enviada.
+
+    Raises:
+        TimeoutError: Se a chamada não terminar no prazo ou não houver vaga.
+    """
+    if timeout_s <= 0:
+        raise TimeoutError("prazo esgotado antes da chamada")
+    if not _vagas_chamadas.acquire(blocking=False):
+        logger.warning(f"🚦 Chamadas com prazo saturadas ({PRAZO_CHAMADAS_SIMULTANEAS} em andamento); chamada descartada.")
+        raise TimeoutError("sem vaga para a chamada")
+    # O contexto é copiado para que os spans da chamada continuem no trace do turno
+    contexto = contextvars.copy_context()
+    try:
+        futuro = _executor_chamadas().submit(contexto.run, funcao, *args, **kwargs)
+    except BaseException:
+        _vagas_chamadas.release()
+        raise
+    # A vaga só volta quando a chamada termina, mesmo que o turno já tenha desistido dela
+    futuro.add_done_callback(lambda _: _vagas_chamadas.release())
+    return futuro.result(timeout=timeout_s)
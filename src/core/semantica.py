@@ -7,12 +7,19 @@ SDK do Google GenAI e consulta o banco de dados Supabase/PostgreSQL (via pgvecto
 os chunks de conhecimento mais similares e relevantes.
 
 Principais Responsabilidades:
-1. Conectar e autenticar no cliente da API Gemini.
-2. Enviar a query do usuário para gerar o embedding correspondente.
-3. Chamar a função de banco de dados para buscar e classificar o contexto inteligente.
-4. Tratar erros específicos da API (como cota e indisponibilidade) de forma resiliente.
+1. Enviar a query do usuário para gerar o embedding correspondente (cliente assíncrono do Gemini).
+2. Chamar a função de banco de dados para buscar e classificar o contexto inteligente, em uma
+   thread, já que o cliente do Supabase é síncrono.
+3. Tratar erros específicos da API (como cota e indisponibilidade) de forma resiliente: sem
+   embedding ou sem contexto, o turno segue sem a KB.
+4. Respeitar o prazo do turno (src/core/prazo.py): as duas etapas usam só o tempo que resta para a
+   recuperação e, se ele acabar, o turno segue sem a KB (degradação registrada no log).
+
+As duas funções são usadas pelas etapas de embedding e de recuperação do pipeline (src/core/pipeline.py).
 """
 
+import asyncio
+import copy
 from typing import Any
 
 from google.genai import types
@@ -20,63 +27,97 @@ from google.genai.errors import APIError
 
 from src.config import MODELO_SEMANTICO_NOME, TAMANHO_VETOR_SEMANTICO, logger
 from src.core.database import recuperar_contexto_inteligente
-from src.core.genai import configurar_api_gemini
+from src.core.genai import cliente_gemini
+from src.core.prazo import PrazoTurno
+from src.core.uso_tokens import registrar_uso
 
 
-def semantica(prompt: str) -> tuple[str | None, str | None, list[dict[str, Any]] | None]:
+async def gerar_embedding(prompt: str, prazo: PrazoTurno | None = None) -> list[float] | None:
     """
-    Gera o embedding vetorial para a pergunta do usuário e busca o contexto correspondente
-    e relevante na base de dados de conhecimento do projeto.
+    Gera o embedding vetorial da pergunta do usuário.
 
     Args:
         prompt (str): Pergunta ou texto enviado pelo usuário.
+        prazo (PrazoTurno | None): Prazo do turno; a chamada usa como timeout o tempo que resta para a recuperação.
 
     Returns:
-        tuple[str | None, str | None, list[dict[str, Any]] | None]: Uma tupla contendo:
-            - str | None: Nome do tópico vencedor ou estratégia de busca mapeada (ex: 'fallback_top5').
-            - str | None: Bloco textual de contexto consolidado para alimentar o prompt de IA.
-            - list[dict[str, Any]] | None: Lista de correspondências detalhadas (IDs, notas) para auditoria.
+        list[float] | None: Vetor da pergunta, ou None se a API falhar ou o prazo acabar.
     """
+    timeout_s = prazo.restante_recuperacao() if prazo else None
+    if timeout_s is not None and timeout_s <= 0:
+        prazo.degradar("recuperacao", "prazo esgotado antes do embedding")
+        return None
     try:
-        # 1. Configura e recupera o cliente da API do Gemini
-        client = configurar_api_gemini()
-
-        if not client:
-            logger.warning("⚠️ Cliente Gemini não disponível para geração de embeddings semânticos.")
-            return None, None, None
-
-        # 2. Solicita a geração do embedding vetorial utilizando o modelo semântico
-        #    A configuração define a tarefa como RETRIEVAL_QUERY e restringe as dimensões.
-        response = client.models.embed_content(
-            model=MODELO_SEMANTICO_NOME,
-            contents=prompt,
-            config=types.EmbedContentConfig(
-                task_type="RETRIEVAL_QUERY",
-                output_dimensionality=TAMANHO_VETOR_SEMANTICO,
+        # A configuração define a tarefa como RETRIEVAL_QUERY e restringe as dimensões às da KB
+        response = await asyncio.wait_for(
+            cliente_gemini().aio.models.embed_content(
+                model=MODELO_SEMANTICO_NOME,
+                contents=prompt,
+                config=types.EmbedContentConfig(
+                    task_type="RETRIEVAL_QUERY",
+                    output_dimensionality=TAMANHO_VETOR_SEMANTICO,
+                    http_options=types.HttpOptions(timeout=int(timeout_s * 1000)) if timeout_s else None,
+                ),
             ),
+            timeout_s,
         )
+    except APIError as e:
+        # Tratamento estruturado de erros da API Gemini (erros de rede, limites, etc.)
+        logger.error(f"❌ Erro de API do Gemini ao gerar embedding semântico (Código HTTP: {e.code}): {e}")
+        return None
+    except Exception as e:
+        if prazo and isinstance(e, TimeoutError):
+            prazo.degradar("recuperacao", "embedding da pergunta sem resposta")
+            return None
+        logger.error(f"❌ Erro inesperado na geração do embedding semântico: {e}")
+        return None
 
-        # 3. Extrai o vetor gerado a partir da primeira resposta de embedding
-        vetor_prompt = response.embeddings[0].values
+    # A API de embeddings do Gemini não informa o uso; sem ele, a entrada é estimada pelo texto
+    registrar_uso("semantica.embedding", MODELO_SEMANTICO_NOME, getattr(response, "usage_metadata", None), texto_entrada=prompt)
+    return response.embeddings[0].values
 
-        # 4. Executa a busca inteligente de similaridade no banco de dados (pgvector)
-        #    Decide estrategicamente entre a expansão do tópico completo ou o fallback dos top-5 chunks.
-        texto_contexto, fonte_identificadora, lista_ids = (
-            recuperar_contexto_inteligente(vetor_prompt)
-        )
 
-        # Retorna os dados caso um contexto válido tenha sido recuperado com sucesso
-        if texto_contexto:
-            return fonte_identificadora, texto_contexto, lista_ids
+async def buscar_contexto(
+    vetor_prompt: list[float], memoria: dict[str, Any] | None = None, prazo: PrazoTurno | None = None
+) -> tuple[str | None, str | None, list[dict[str, Any]] | None]:
+    """
+    Busca na base de conhecimento o contexto relevante para o vetor da pergunta.
 
-        return None, None, None
+    Args:
+        vetor_prompt (list[float]): Embedding da pergunta ('gerar_embedding').
+        memoria (dict[str, Any] | None): Memória de recuperação da sessão, usada para reaproveitar
+            o contexto em perguntas de acompanhamento; só é atualizada se a recuperação terminar.
+        prazo (PrazoTurno | None): Prazo do turno, repassado às consultas da recuperação.
 
-    except APIError as e:
-        # Tratamento estruturado de erros da API Gemini (erros de rede, limites, etc.)
-        logger.error(
-            f"❌ Erro de API do Gemini ao gerar embedding semântico (Código HTTP: {e.code}): {e}"
-        )
+    Returns:
+        tuple[str | None, str | None, list[dict[str, Any]] | None]: Uma tupla contendo:
+            - str | None: Nome do tópico vencedor ou estratégia de busca mapeada (ex: 'fallback_top5').
+            - str | None: Bloco textual de contexto consolidado para alimentar o prompt de IA.
+            - list[dict[str, Any]] | None: Lista de correspondências detalhadas (IDs, notas) para auditoria.
+    """
+    timeout_s = prazo.restante_recuperacao() if prazo else None
+    if timeout_s is not None and timeout_s <= 0:
+        prazo.degradar("recuperacao", "prazo esgotado depois do embedding")
         return None, None, None
+    try:
+        # Decide estrategicamente entre a expansão do tópico completo ou o fallback dos top-5 chunks.
+        # Cada consulta já respeita o prazo; o timeout externo só cobre o que não é consulta (ex: criar o cliente).
+        # A thread trabalha sobre uma cópia da memória: se for abandonada pelo prazo, não sobrescreve depois
+        # a memória que o turno seguinte já estiver usando
+        memoria_turno = copy.deepcopy(memoria) if memoria is not None else None
+        texto_contexto, fonte_identificadora, lista_ids = await asyncio.wait_for(
+            asyncio.to_thread(recuperar_contexto_inteligente, vetor_prompt, memoria_turno, prazo), timeout_s
+        )
+        if memoria is not None:
+            memoria.update(memoria_turno)
     except Exception as e:
-        logger.error(f"❌ Erro inesperado na geração do embedding semântico: {e}")
+        if prazo and isinstance(e, TimeoutError):
+            prazo.degradar("recuperacao", "recuperação de contexto além do prazo")
+            return None, None, None
+        logger.error(f"❌ Erro inesperado na recuperação de contexto: {e}")
         return None, None, None
+
+    # Retorna os dados caso um contexto válido tenha sido recuperado com sucesso
+    if texto_contexto:
+        return fonte_identificadora, texto_contexto, lista_ids
+    return None, None, None
@@ -0,0 +1,156 @@
+"""
+Registro das sessões ativas do processo.
+
+O estado de cada sessão é compacto: o histórico único ('hist_exibir'), do qual o chat do Gemini é
+reconstruído a cada turno (src/core/genai.py), a memória de recuperação e os áudios da sessão. O
+registro guarda a última atividade de cada sessão e, passado SESSAO_TTL_OCIOSA_S sem atividade,
+libera os recursos descartáveis dela (a memória de recuperação, com o vetor da última query e o
+contexto montado, e os áudios sintetizados para as respostas) e a esquece. Isso cobre o caso comum
+de o usuário apenas fechar a aba.
+
+O registro só mantém referências aos recursos descartáveis, que ele precisa esvaziar. Dos demais
+(ex: o histórico) guarda apenas o tamanho estimado na última atividade, sem impedir que sejam
+coletados quando a sessão do Streamlit termina.
+
+'metricas_sessoes' expõe a quantidade de sessões e a memória estimada por sessão.
+"""
+
+import sys
+import threading
+import time
+from typing import Any
+
+from src.config import SESSAO_TTL_OCIOSA_S, SESSAO_VARREDURA_INTERVALO_S, logger
+
+
+def estimar_bytes(objeto: Any) -> int:
+    """
+    Estima a memória ocupada por um objeto e pelo que ele contém (dicts, listas, tuplas e strings).
+
+    Args:
+        objeto (Any): Objeto a medir.
+
+    Returns:
+        int: Tamanho aproximado, em bytes.
+    """
+    vistos: set[int] = set()
+    pendentes = [objeto]
+    total = 0
+    while pendentes:
+        atual = pendentes.pop()
+        if id(atual) in vistos:
+            continue
+        vistos.add(id(atual))
+        total += sys.getsizeof(atual)
+        if isinstance(atual, dict):
+            pendentes.extend(atual.keys())
+            pendentes.extend(atual.values())
+        elif isinstance(atual, (list, tuple, set)):
+            pendentes.extend(atual)
+    return total
+
+
+# Recursos esvaziados quando a sessão expira (o histórico é preservado)
+RECURSOS_DESCARTAVEIS = ("memoria_recuperacao", "audio_tts")
+
+
+class RegistroSessoes:
+    """
+    Última atividade e recursos de cada sessão do processo, com expiração por inatividade.
+    Seguro para uso concorrente (cada sessão do Streamlit roda em sua própria thread).
+
+    Args:
+        descartaveis (tuple[str, ...]): Recursos esvaziados na expiração; só deles o registro guarda referência.
+    """
+
+    def __init__(self, descartaveis: tuple[str, ...] = RECURSOS_DESCARTAVEIS):
+        self.descartaveis = descartaveis
+        self._sessoes: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ultima_varredura = time.monotonic()
+
+    def tocar(self, session_id: str, **recursos: Any) -> None:
+        """
+        Registra atividade na sessão e os recursos que ela mantém em memória.
+
+        Args:
+            session_id (str): Sessão do usuário.
+            **recursos: Objetos da sessão (ex: hist_exibir=..., memoria_recuperacao=...). Os descartáveis
+                são esvaziados quando a sessão expira; dos demais, só o tamanho estimado entra nas métricas.
+        """
+        preservados = {nome: estimar_bytes(recurso) for nome, recurso in recursos.items() if nome not in self.descartaveis}
+        with self._lock:
+            sessao = self._sessoes.setdefault(session_id, {"recursos": {}, "bytes_preservados": {}})
+            sessao["ultima_atividade"] = time.monotonic()
+            sessao["recursos"].update({nome: recurso for nome, recurso in recursos.items() if nome in self.descartaveis})
+            sessao["bytes_preservados"].update(preservados)
+
+    def remover(self, session_id: str) -> None:
+        """
+        Esquece uma sessão (ex: dados excluídos pelo usuário).
+        """
+        with self._lock:
+            self._sessoes.pop(session_id, None)
+
+    def expirar(self, ttl_s: float = SESSAO_TTL_OCIOSA_S) -> list[str]:
+        """
+        Libera os recursos descartáveis das sessões ociosas há mais de 'ttl_s' e as esquece.
+
+        Args:
+            ttl_s (float): Tempo máximo sem atividade, em segundos.
+
+        Returns:
+            list[str]: Sessões expiradas.
+        """
+        limite = time.monotonic() - ttl_s
+        with self._lock:
+            expiradas = {sid: sessao for sid, sessao in self._sessoes.items() if sessao["ultima_atividade"] < limite}
+            for session_id in expiradas:
+                del self._sessoes[session_id]
+            self._ultima_varredura = time.monotonic()
+
+        for sessao in expiradas.values():
+            for recurso in sessao["recursos"].values():
+                if hasattr(recurso, "clear"):
+                    recurso.clear()
+        if expiradas:
+            logger.info(f"🧹 {len(expiradas)} sessão(ões) ociosa(s) há mais de {ttl_s:.0f}s liberada(s).")
+        return list(expiradas)
+
+    def expirar_se_devido(self, intervalo_s: float = SESSAO_VARREDURA_INTERVALO_S) -> list[str]:
+        """
+        Executa 'expirar' no máximo uma vez a cada 'intervalo_s' segundos (chamado a cada execução do app)
+        e registra as métricas de memória das sessões no log.
+        """
+        if time.monotonic() - self._ultima_varredura < intervalo_s:
+            return []
+        expiradas = self.expirar()
+        logger.info(f"📊 Sessões: {self.metricas()}")
+        return expiradas
+
+    def metricas(self) -> dict[str, Any]:
+        """
+        Quantidade de sessões e memória estimada dos recursos registrados.
+
+        Returns:
+            dict[str, Any]: 'sessoes', 'bytes_total', 'bytes_medio' e 'bytes_maximo' por sessão.
+        """
+        with self._lock:
+            sessoes = [(dict(sessao["recursos"]), sum(sessao["bytes_preservados"].values())) for sessao in self._sessoes.values()]
+        tamanhos = [estimar_bytes(recursos) + preservados for recursos, preservados in sessoes]
+        return {
+            "sessoes": len(tamanhos),
+            "bytes_total": sum(tamanhos),
+            "bytes_medio": round(sum(tamanhos) / len(tamanhos)) if tamanhos else 0,
+            "bytes_maximo": max(tamanhos, default=0),
+        }
+
+
+registro_sessoes = RegistroSessoes()
+
+
+def metricas_sessoes() -> dict[str, Any]:
+    """
+    Métricas de memória por sessão do processo (ver 'RegistroSessoes.metricas').
+    """
+    return registro_sessoes.metricas()
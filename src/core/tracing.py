@@ -0,0 +1,157 @@
+"""
+Tracing leve por turno de conversa.
+
+Cada turno (pergunta do usuário -> resposta) recebe um 'trace_id', propagado por contextvars para
+todas as etapas chamadas dentro dele, sem precisar passá-lo como parâmetro. As etapas são medidas
+com 'span', que funciona como context manager ou decorador:
+
+    with trace_turno(session_id) as trace:
+        with span("semantica"):
+            ...
+        salvar_log_chat(..., trace_id=trace.trace_id, duracoes_ms=trace.duracoes())
+
+Cada span é exportado como uma linha de log estruturada (JSON) e, se OTEL_EXPORTER_OTLP_ENDPOINT
+estiver configurado e o OpenTelemetry instalado, também como span OTLP. Fora de um turno, 'span'
+não faz nada.
+"""
+
+import json
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import cache
+from typing import Any, Iterator
+
+from src.config import get_secret, logger
+
+logger_tracing = logger.getChild("tracing")
+
+
+class Trace:
+    """
+    Estado de um turno: identificadores e duração acumulada de cada etapa.
+
+    Args:
+        session_id (str): Sessão do usuário dona do turno.
+    """
+
+    def __init__(self, session_id: str):
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.inicio = time.perf_counter()
+        self.spans: list[tuple[str, float]] = []
+        # Preenchidos pelo turno: tokens de cada chamada ao Gemini (src/core/uso_tokens.py) e fonte da recuperação
+        self.uso_tokens: list[dict[str, Any]] = []
+        self.fonte: str | None = None
+
+    def registrar(self, nome: str, duracao_ms: float, **atributos: Any) -> None:
+        """
+        Registra a duração de uma etapa e a exporta como log estruturado.
+        """
+        self.spans.append((nome, duracao_ms))
+        evento = {"trace_id": self.trace_id, "session_id": self.session_id, "span": nome, "duracao_ms": round(duracao_ms, 1), **atributos}
+        logger_tracing.info(f"⏱️ {json.dumps(evento, ensure_ascii=False, default=str)}")
+
+    def duracoes(self) -> dict[str, float]:
+        """
+        Duração de cada etapa do turno, em ms (etapas repetidas são somadas), mais o total até agora.
+        """
+        duracoes: dict[str, float] = {}
+        for nome, duracao_ms in self.spans:
+            duracoes[nome] = round(duracoes.get(nome, 0.0) + duracao_ms, 1)
+        duracoes["total"] = round((time.perf_counter() - self.inicio) * 1000, 1)
+        return duracoes
+
+
+_trace_atual: ContextVar[Trace | None] = ContextVar("vox_trace_atual", default=None)
+
+
+def trace_atual() -> Trace | None:
+    """
+    Retorna o trace do turno em andamento no contexto atual, se houver.
+    """
+    return _trace_atual.get()
+
+
+@cache
+def _tracer_otlp():
+    """
+    Cria (uma única vez) o tracer OTLP, se houver endpoint configurado e o OpenTelemetry instalado.
+    """
+    endpoint = get_secret("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not endpoint:
+        return None
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("⚠️ OTEL_EXPORTER_OTLP_ENDPOINT definido, mas o OpenTelemetry não está instalado. Spans apenas no log.")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "vox-ai"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces")))
+    logger.info(f"📡 Exportação OTLP de spans habilitada ({endpoint}).")
+    return provider.get_tracer("vox-ai")
+
+
+@contextmanager
+def trace_turno(session_id: str, trace: Trace | None = None) -> Iterator[Trace]:
+    """
+    Abre o trace de um turno de conversa no contexto atual e o encerra na saída.
+
+    Args:
+        session_id (str): Sessão do usuário dona do turno.
+        trace (Trace | None): Trace já iniciado em outra thread (ex: a transcrição do áudio na thread
+            do Streamlit), continuado aqui; sem ele, um novo é criado.
+
+    Yields:
+        Trace: Trace do turno.
+    """
+    trace = trace or Trace(session_id)
+    token = _trace_atual.set(trace)
+    tracer = _tracer_otlp()
+    contexto_otlp = tracer.start_as_current_span("turno", attributes={"vox.trace_id": trace.trace_id, "vox.session_id": session_id}) if tracer else nullcontext()
+    try:
+        with contexto_otlp:
+            yield trace
+    finally:
+        _trace_atual.reset(token)
+
+
+@contextmanager
+def span(nome: str, **atributos: Any) -> Iterator[None]:
+    """
+    Mede uma etapa do turno atual. Pode ser usado como context manager ou decorador.
+
+    Args:
+        nome (str): Nome da etapa (ex: 'buscar_referencias_db').
+        **atributos: Atributos extras exportados junto com o span.
+    """
+    trace = _trace_atual.get()
+    if trace is None:
+        yield
+        return
+
+    tracer = _tracer_otlp()
+    contexto_otlp = tracer.start_as_current_span(nome, attributes={"vox.trace_id": trace.trace_id, **atributos}) if tracer else nullcontext()
+    inicio = time.perf_counter()
+    try:
+        with contexto_otlp:
+            yield
+    except BaseException as e:
+        atributos["erro"] = type(e).__name__
+        raise
+    finally:
+        trace.registrar(nome, (time.perf_counter() - inicio) * 1000, **atributos)
+
+
+def registrar_span(nome: str, duracao_ms: float, **atributos: Any) -> None:
+    """
+    Registra no turno atual uma etapa medida manualmente (ex: tempo até o primeiro token).
+    """
+    trace = _trace_atual.get()
+    if trace is not None:
+        trace.registrar(nome, duracao_ms, **atributos)
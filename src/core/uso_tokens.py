@@ -0,0 +1,124 @@
+"""
+Contabilização de tokens consumidos nas chamadas ao Gemini.
+
+Cada chamada (embedding, transcrição e geração) registra o 'usage_metadata' no trace do turno atual
+(src/core/tracing.py). Ao fim do turno, 'contabilizar_turno' soma os tokens do turno, atualiza o
+agregado em memória por modelo e por estratégia de recuperação e o orçamento da sessão, que tem um
+limite brando (ORCAMENTO_TOKENS_SESSAO): ao ser ultrapassado, a sessão é sinalizada, mas não bloqueada.
+"""
+
+import threading
+from typing import Any
+
+from src.config import ORCAMENTO_TOKENS_SESSAO, logger
+from src.core.contexto import estimar_tokens
+from src.core.tracing import Trace, trace_atual
+
+CAMPOS_TOKENS = ("entrada", "saida", "cache", "raciocinio")
+
+# Agregado do processo: (modelo, estratégia) -> chamadas e tokens
+_agregado: dict[tuple[str, str], dict[str, int]] = {}
+_lock_agregado = threading.Lock()
+
+
+def tokens_do_uso(uso: Any) -> dict[str, int]:
+    """
+    Converte o 'usage_metadata' de uma resposta do Gemini nos contadores do Vox.
+
+    Args:
+        uso (Any): 'usage_metadata' da resposta (campos ausentes contam como zero).
+
+    Returns:
+        dict[str, int]: Tokens de entrada, saída, cache e raciocínio.
+    """
+    return {
+        "entrada": getattr(uso, "prompt_token_count", None) or 0,
+        "saida": getattr(uso, "candidates_token_count", None) or 0,
+        "cache": getattr(uso, "cached_content_token_count", None) or 0,
+        "raciocinio": getattr(uso, "thoughts_token_count", None) or 0,
+    }
+
+
+def registrar_uso(etapa: str, modelo: str, uso: Any = None, texto_entrada: str | None = None) -> None:
+    """
+    Registra no trace do turno atual os tokens de uma chamada ao Gemini.
+    Quando a API não informa o uso (ex: embeddings), a entrada é estimada a partir de 'texto_entrada'.
+
+    Args:
+        etapa (str): Etapa do turno (ex: 'gerar_resposta').
+        modelo (str): Modelo chamado.
+        uso (Any): 'usage_metadata' da resposta, se houver.
+        texto_entrada (str | None): Texto enviado, usado para estimar a entrada na falta de 'uso'.
+    """
+    trace = trace_atual()
+    if trace is None:
+        return
+
+    tokens = tokens_do_uso(uso)
+    registro: dict[str, Any] = {"etapa": etapa, "modelo": modelo, **tokens}
+    if uso is None and texto_entrada is not None:
+        registro["entrada"] = estimar_tokens(texto_entrada)
+        registro["estimado"] = True
+    trace.uso_tokens.append(registro)
+
+
+def estrategia_da_fonte(fonte: str | None) -> str:
+    """
+    Reduz a 'fonte_origem' da recuperação à estratégia, sem o nome do tópico
+    (ex: 'Contexto Completo: Saúde' -> 'Contexto Completo').
+    """
+    if not fonte:
+        return "Sem contexto"
+    return fonte.split(":", 1)[0].split(" (", 1)[0].strip()
+
+
+def contabilizar_turno(trace: Trace, orcamento_sessao: dict[str, Any]) -> dict[str, Any]:
+    """
+    Fecha a contabilidade de tokens de um turno: soma o turno, atualiza o agregado por modelo e
+    estratégia de recuperação e o orçamento da sessão.
+
+    Args:
+        trace (Trace): Trace do turno, com os usos registrados e a 'fonte' da recuperação.
+        orcamento_sessao (dict[str, Any]): Estado do orçamento da sessão (atualizado no lugar).
+
+    Returns:
+        dict[str, Any]: Tokens do turno ('entrada', 'saida', 'cache', 'raciocinio' e 'por_etapa').
+    """
+    totais = {campo: sum(registro[campo] for registro in trace.uso_tokens) for campo in CAMPOS_TOKENS}
+    por_etapa: dict[str, dict[str, int]] = {}
+    for registro in trace.uso_tokens:
+        etapa = por_etapa.setdefault(registro["etapa"], dict.fromkeys(CAMPOS_TOKENS, 0))
+        for campo in CAMPOS_TOKENS:
+            etapa[campo] += registro[campo]
+
+    estrategia = estrategia_da_fonte(trace.fonte)
+    with _lock_agregado:
+        for registro in trace.uso_tokens:
+            agregado = _agregado.setdefault((registro["modelo"], estrategia), {"chamadas": 0, **dict.fromkeys(CAMPOS_TOKENS, 0)})
+            agregado["chamadas"] += 1
+            for campo in CAMPOS_TOKENS:
+                agregado[campo] += registro[campo]
+
+    total_turno = totais["entrada"] + totais["saida"] + totais["raciocinio"]
+    orcamento_sessao["tokens"] = orcamento_sessao.get("tokens", 0) + total_turno
+    orcamento_sessao["turnos"] = orcamento_sessao.get("turnos", 0) + 1
+    if orcamento_sessao["tokens"] > ORCAMENTO_TOKENS_SESSAO and not orcamento_sessao.get("excedido"):
+        orcamento_sessao["excedido"] = True
+        logger.warning(
+            f"💸 Sessão {trace.session_id} ultrapassou o orçamento brando de tokens "
+            f"({orcamento_sessao['tokens']} > {ORCAMENTO_TOKENS_SESSAO} em {orcamento_sessao['turnos']} turnos)."
+        )
+
+    logger.info(f"🔢 Tokens do turno ({estrategia}): {totais} | sessão: {orcamento_sessao['tokens']}")
+    return {**totais, "por_etapa": por_etapa}
+
+
+def resumo_uso_tokens() -> list[dict[str, Any]]:
+    """
+    Retorna o agregado de tokens do processo por modelo e estratégia, do mais caro para o mais barato.
+    """
+    with _lock_agregado:
+        linhas = [{"modelo": modelo, "estrategia": estrategia, **valores} for (modelo, estrategia), valores in _agregado.items()]
+    for linha in linhas:
+        linha["media_entrada"] = round(linha["entrada"] / linha["chamadas"], 1) if linha["chamadas"] else 0.0
+    return sorted(linhas, key=lambda linha: linha["entrada"] + linha["saida"] + linha["raciocinio"], reverse=True)
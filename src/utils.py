@@ -3,14 +3,13 @@ import json
 import os
 import re
 import subprocess
-
-import streamlit as st
-from gtts import gTTS
+from functools import cache, lru_cache
 
 from src.config import logger
+from src.core.tracing import span
 
 
-@st.cache_data
+@cache
 def get_current_branch() -> str:
     """
     Retorna o nome da branch Git atual de forma segura.
@@ -32,7 +31,7 @@ def get_version_from_changelog() -> str:
         changelog_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "CHANGELOG.md")
         with open(changelog_path, "r", encoding="utf-8") as f:
             content = f.read()
-            match = re.search(r"## \[([\d\.]+)\]", content)
+            match = re.search(r"^## \[?v?(\d+(?:\.\d+)+)", content, re.MULTILINE)
             if match:
                 return f"v{match.group(1)}"
     except Exception as e:
@@ -40,11 +39,10 @@ def get_version_from_changelog() -> str:
     return ""
 
 
-@st.cache_data
-def git_version() -> str:
+def calcular_versao() -> str:
     """
-    Obtém a versão atual do git baseada em tags ou no CHANGELOG.
-    O resultado é cacheado para evitar chamadas de subprocesso repetitivas.
+    Calcula a versão atual a partir das tags do git ou, na falta delas, do CHANGELOG.
+    Usada por scripts/gerar_versao.py no build e como fallback de 'git_version'.
     """
     try:
         current_branch = get_current_branch()
@@ -63,6 +61,22 @@ def git_version() -> str:
     
     return f"{last_tag}"
 
+
+@cache
+def git_version() -> str:
+    """
+    Obtém a versão da aplicação. Usa a versão carimbada no build (src/_versao.py, gerado por
+    scripts/gerar_versao.py) e só recorre ao git/CHANGELOG quando o arquivo não existe.
+    O resultado é cacheado para evitar chamadas de subprocesso repetitivas.
+    """
+    try:
+        from src._versao import VERSAO
+
+        return VERSAO
+    except ImportError:
+        return calcular_versao()
+
+
 def limpeza_texto(texto: str) -> str:
     """
     Sanitiza uma string de texto removendo caracteres especiais e símbolos,
@@ -78,6 +92,21 @@ def limpeza_texto(texto: str) -> str:
     texto_limpo = re.sub(r'[^\w\s,.:;!?áéíóúàèìòùâêîôûãõçÁÉÍÓÚÀÈÌÒÙÂÊÎÔÛÃÕÇ]', '', texto)
     return texto_limpo
 
+@lru_cache(maxsize=8)
+def audio_cacheado(texto: str) -> bytes:
+    """
+    Áudio (MP3) de um texto fixo, como a saudação, sintetizado uma única vez por processo.
+
+    Args:
+        texto (str): O texto que será falado.
+
+    Returns:
+        bytes: Conteúdo do arquivo de áudio.
+    """
+    return texto_para_audio(texto).getvalue()
+
+
+@span("texto_para_audio")
 def texto_para_audio(texto: str) -> io.BytesIO:
     """
     Converte um bloco de texto escrito em um áudio falado utilizando gTTS (Google Text-to-Speech).
@@ -88,6 +117,9 @@ def texto_para_audio(texto: str) -> io.BytesIO:
     Returns:
         io.BytesIO: Um buffer em memória contendo o arquivo de áudio gerado (MP3).
     """
+    # Importado só no primeiro "Ouvir", para não pesar na inicialização do app
+    from gtts import gTTS
+
     texto_tratado = limpeza_texto(texto)
 
     if not texto_tratado.strip():
@@ -0,0 +1,60 @@
+-- Digestos compactos por tópico da base de conhecimento, gerados offline por scripts/gerar_digestos.py.
+-- Cada digesto é versionado pelo hash dos chunks ativos do tópico que o originaram.
+
+  create table "public"."knowledge_base_digests" (
+    "topico" text not null,
+    "digesto" text not null,
+    "hash_chunks" text not null,
+    "kb_ids" text[] not null default '{}'::text[],
+    "tokens_estimados" integer,
+    "modelo" text,
+    "gerado_em" timestamp with time zone default now()
+      );
+
+
+alter table "public"."knowledge_base_digests" enable row level security;
+
+CREATE UNIQUE INDEX knowledge_base_digests_pkey ON public.knowledge_base_digests USING btree (topico);
+
+alter table "public"."knowledge_base_digests" add constraint "knowledge_base_digests_pkey" PRIMARY KEY using index "knowledge_base_digests_pkey";
+
+set check_function_bodies = off;
+
+-- Hash dos chunks ativos de um tópico (mesma fórmula usada em scripts/gerar_digestos.py)
+CREATE OR REPLACE FUNCTION public.hash_chunks_topico(alvo text)
+ RETURNS text
+ LANGUAGE sql
+ STABLE
+AS $function$
+  select md5(coalesce(string_agg(kb_id || ':' || descricao, E'\n' order by kb_id collate "C"), ''))
+  from public.knowledge_base
+  where topico = alvo
+  and ativo is true;
+$function$
+;
+
+-- Retorna o digesto do tópico apenas se ele ainda corresponde aos chunks atuais (não obsoleto)
+CREATE OR REPLACE FUNCTION public.buscar_digesto_topico(alvo text)
+ RETURNS TABLE(topico text, digesto text, kb_ids text[], hash_chunks text)
+ LANGUAGE sql
+ STABLE
+AS $function$
+  select d.topico, d.digesto, d.kb_ids, d.hash_chunks
+  from public.knowledge_base_digests d
+  where d.topico = alvo
+  and d.hash_chunks = public.hash_chunks_topico(alvo);
+$function$
+;
+
+
+grant delete on table "public"."knowledge_base_digests" to "service_role";
+
+grant insert on table "public"."knowledge_base_digests" to "service_role";
+
+grant select on table "public"."knowledge_base_digests" to "service_role";
+
+grant update on table "public"."knowledge_base_digests" to "service_role";
+
+grant execute on function "public"."hash_chunks_topico"(text) to "service_role";
+
+grant execute on function "public"."buscar_digesto_topico"(text) to "service_role";
@@ -0,0 +1,43 @@
+-- Hash do conteúdo que originou cada embedding: sha256('<modelo>:<dimensão>:<descricao>').
+-- Permite que scripts/gerar_embedding.py reprocesse apenas os chunks cujo texto ou modelo mudou.
+
+alter table "public"."knowledge_base" add column "embedding_hash" text;
+
+alter table "public"."knowledge_base_etl" add column "embedding_hash" text;
+
+-- Sem backfill: não há como saber de qual 'descricao' cada embedding existente foi gerado, e marcá-los
+-- como atualizados esconderia os vetores defasados. Com 'embedding_hash' nulo, a primeira execução de
+-- scripts/gerar_embedding.py refaz (e grava o hash de) todas as linhas com embedding.
+
+set check_function_bodies = off;
+
+-- Grava em massa os embeddings gerados por scripts/gerar_embedding.py. Só atualiza a linha se a
+-- 'descricao' ainda for a mesma que foi embeddada, evitando sobrescrever edições feitas durante a execução.
+CREATE OR REPLACE FUNCTION public.atualizar_embeddings_lote(tabela text, linhas jsonb)
+ RETURNS integer
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+  atualizados integer;
+BEGIN
+  IF tabela NOT IN ('knowledge_base', 'knowledge_base_etl') THEN
+    RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+  END IF;
+
+  EXECUTE format(
+    'update public.%I as kb
+     set embedding = l.embedding::public.vector,
+         embedding_hash = l.embedding_hash
+     from jsonb_to_recordset($1) as l(kb_id text, descricao text, embedding text, embedding_hash text)
+     where kb.kb_id = l.kb_id
+     and kb.descricao = l.descricao',
+    tabela
+  ) USING linhas;
+
+  GET DIAGNOSTICS atualizados = ROW_COUNT;
+  RETURN atualizados;
+END;
+$function$
+;
+
+grant execute on function "public"."atualizar_embeddings_lote"(text, jsonb) to "service_role";
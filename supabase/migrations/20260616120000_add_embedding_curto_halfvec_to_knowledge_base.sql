@@ -0,0 +1,85 @@
+-- Busca em dois estágios (Matryoshka): o gemini-embedding-001 concentra a informação nas primeiras
+-- dimensões, então um prefixo truncado de 256 dimensões em halfvec serve como primeiro filtro barato.
+-- O HNSW passa a indexar apenas esse prefixo e o vetor completo (1536) só é usado para reordenar os candidatos.
+
+alter table "public"."knowledge_base" add column "embedding_curto" public.halfvec(256);
+
+alter table "public"."knowledge_base_etl" add column "embedding_curto" public.halfvec(256);
+
+update "public"."knowledge_base"
+set embedding_curto = public.subvector(embedding, 1, 256)::public.halfvec(256)
+where embedding is not null;
+
+update "public"."knowledge_base_etl"
+set embedding_curto = public.subvector(embedding, 1, 256)::public.halfvec(256)
+where embedding is not null
+and public.vector_dims(embedding) = 1536;
+
+CREATE INDEX idx_kb_embedding_curto ON public.knowledge_base USING hnsw (embedding_curto public.halfvec_cosine_ops);
+
+-- O índice HNSW do vetor completo deixa de ser necessário: a reordenação roda só sobre os candidatos
+drop index if exists "public"."idx_kb_embedding";
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.match_knowledge_base(query_embedding public.vector, match_threshold double precision, match_count integer, filter_topic text DEFAULT NULL::text)
+ RETURNS TABLE(id text, topico text, eixo_tematico text, descricao text, similarity double precision)
+ LANGUAGE plpgsql
+AS $function$BEGIN
+    return query
+    with candidatos as (
+      -- 1º estágio: vizinhos aproximados pelo prefixo halfvec (índice idx_kb_embedding_curto)
+      select
+        knowledge_base.kb_id,
+        knowledge_base.topico,
+        knowledge_base.eixo_tematico,
+        knowledge_base.descricao,
+        knowledge_base.embedding
+      from knowledge_base
+      where (filter_topic is null or knowledge_base.topico = filter_topic)
+      and knowledge_base.ativo is true
+      order by knowledge_base.embedding_curto <=> public.subvector(query_embedding, 1, 256)::public.halfvec(256)
+      limit greatest(match_count * 4, 40)
+    )
+    -- 2º estágio: reordenação exata com o vetor completo
+    select
+      candidatos.kb_id,
+      candidatos.topico,
+      candidatos.eixo_tematico,
+      candidatos.descricao,
+      1 - (candidatos.embedding <=> query_embedding) as similarity
+    from candidatos
+    where 1 - (candidatos.embedding <=> query_embedding) > match_threshold
+    order by candidatos.embedding <=> query_embedding
+    limit match_count;
+  END;$function$
+;
+
+-- Grava em massa os embeddings completos e o prefixo curto gerados por scripts/gerar_embedding.py
+CREATE OR REPLACE FUNCTION public.atualizar_embeddings_lote(tabela text, linhas jsonb)
+ RETURNS integer
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+  atualizados integer;
+BEGIN
+  IF tabela NOT IN ('knowledge_base', 'knowledge_base_etl') THEN
+    RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+  END IF;
+
+  EXECUTE format(
+    'update public.%I as kb
+     set embedding = l.embedding::public.vector,
+         embedding_curto = l.embedding_curto::public.halfvec(256),
+         embedding_hash = l.embedding_hash
+     from jsonb_to_recordset($1) as l(kb_id text, descricao text, embedding text, embedding_curto text, embedding_hash text)
+     where kb.kb_id = l.kb_id
+     and kb.descricao = l.descricao',
+    tabela
+  ) USING linhas;
+
+  GET DIAGNOSTICS atualizados = ROW_COUNT;
+  RETURN atualizados;
+END;
+$function$
+;
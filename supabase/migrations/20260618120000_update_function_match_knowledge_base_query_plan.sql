@@ -0,0 +1,88 @@
+-- Ajustes de plano da match_knowledge_base:
+-- 1. Índice HNSW parcial só com as linhas ativas: chunks inativos deixam de ocupar as vagas do scan aproximado.
+-- 2. A distância completa é calculada uma única vez, com ORDER BY/LIMIT aplicados antes do threshold.
+-- 3. hnsw.ef_search passa a ser parâmetro da função e, com pgvector >= 0.8, as iterative index scans
+--    garantem candidatos suficientes mesmo com filter_topic. Em versões anteriores o GUC
+--    'hnsw.iterative_scan' não existe (o prefixo 'hnsw.' é reservado pela extensão e o set_config
+--    falharia), então a função é criada sem ele. Após atualizar o pgvector, reaplique esta função.
+
+CREATE INDEX idx_kb_embedding_curto_ativos ON public.knowledge_base USING hnsw (embedding_curto public.halfvec_cosine_ops) WHERE (ativo IS TRUE);
+
+drop index if exists "public"."idx_kb_embedding_curto";
+
+-- A assinatura muda (novo parâmetro ef_search), então a versão anterior precisa ser removida
+drop function if exists public.match_knowledge_base(public.vector, double precision, integer, text);
+
+set check_function_bodies = off;
+
+DO $migracao$
+DECLARE
+  scan_iterativo text := '-- pgvector < 0.8: sem iterative index scans';
+BEGIN
+  IF (
+    select string_to_array(split_part(extversion, '-', 1), '.')::int[] >= array[0, 8]
+    from pg_extension
+    where extname = 'vector'
+  ) THEN
+    scan_iterativo := $$perform set_config('hnsw.iterative_scan', 'relaxed_order', true);$$;
+  END IF;
+
+  EXECUTE format($ddl$
+CREATE OR REPLACE FUNCTION public.match_knowledge_base(query_embedding public.vector, match_threshold double precision, match_count integer, filter_topic text DEFAULT NULL::text, ef_search integer DEFAULT 40)
+ RETURNS TABLE(id text, topico text, eixo_tematico text, descricao text, similarity double precision)
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+  n_candidatos integer := greatest(match_count * 4, 40);
+BEGIN
+    -- Configurações locais à transação da chamada RPC
+    perform set_config('hnsw.ef_search', greatest(ef_search, n_candidatos)::text, true);
+    %s
+
+    return query
+    with candidatos as (
+      -- 1º estágio: vizinhos aproximados pelo prefixo halfvec (índice parcial idx_kb_embedding_curto_ativos)
+      select
+        kb.kb_id,
+        kb.topico,
+        kb.eixo_tematico,
+        kb.descricao,
+        kb.embedding
+      from public.knowledge_base kb
+      where kb.ativo is true
+      and (filter_topic is null or kb.topico = filter_topic)
+      order by kb.embedding_curto <=> public.subvector(query_embedding, 1, 256)::public.halfvec(256)
+      limit n_candidatos
+    ),
+    ranqueados as (
+      -- 2º estágio: distância exata com o vetor completo, calculada uma única vez
+      select
+        c.kb_id,
+        c.topico,
+        c.eixo_tematico,
+        c.descricao,
+        c.embedding <=> query_embedding as distancia
+      from candidatos c
+      order by distancia
+      limit match_count
+    )
+    select
+      r.kb_id,
+      r.topico,
+      r.eixo_tematico,
+      r.descricao,
+      1 - r.distancia as similarity
+    from ranqueados r
+    where 1 - r.distancia > match_threshold
+    order by r.distancia;
+  END;
+$function$
+  $ddl$, scan_iterativo);
+END
+$migracao$;
+
+grant execute on function public.match_knowledge_base(public.vector, double precision, integer, text, integer) to "anon";
+
+grant execute on function public.match_knowledge_base(public.vector, double precision, integer, text, integer) to "authenticated";
+
+grant execute on function public.match_knowledge_base(public.vector, double precision, integer, text, integer) to "service_role";
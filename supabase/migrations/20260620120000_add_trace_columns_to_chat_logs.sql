@@ -0,0 +1,12 @@
+-- Tracing por turno (src/core/tracing.py): o trace_id liga cada log aos spans exportados
+-- (log estruturado / OTLP) e 'duracoes_ms' guarda a duração de cada etapa do turno, em ms
+-- (ex: {"semantica": 412.3, "buscar_referencias_db": 85.1, "gerar_resposta.ttft": 930.4, "total": 4210.7}).
+
+alter table "public"."chat_logs" add column "trace_id" text;
+
+alter table "public"."chat_logs" add column "duracoes_ms" jsonb;
+
+comment on column "public"."chat_logs"."duracoes_ms" is 'Duração de cada etapa do turno em ms. p95 por etapa: select etapa, percentile_cont(0.95) within group (order by valor::float) from chat_logs, jsonb_each_text(duracoes_ms) as e(etapa, valor) group by etapa;';
+
+-- Leituras de latência são sempre por janela de tempo recente
+CREATE INDEX IF NOT EXISTS idx_chat_logs_created_at_duracoes ON public.chat_logs USING btree (created_at) WHERE duracoes_ms IS NOT NULL;
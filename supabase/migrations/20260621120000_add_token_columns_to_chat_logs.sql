@@ -0,0 +1,13 @@
+-- Tokens consumidos no turno (src/core/uso_tokens.py), somando embedding, transcrição e geração.
+-- 'tokens_por_etapa' guarda o detalhamento (ex: {"gerar_resposta": {"entrada": 5120, "saida": 410, ...}}).
+-- A entrada do embedding é estimada pelo texto, pois a API de embeddings não informa o uso.
+
+alter table "public"."chat_logs" add column "tokens_entrada" integer;
+
+alter table "public"."chat_logs" add column "tokens_saida" integer;
+
+alter table "public"."chat_logs" add column "tokens_cache" integer;
+
+alter table "public"."chat_logs" add column "tokens_raciocinio" integer;
+
+alter table "public"."chat_logs" add column "tokens_por_etapa" jsonb;
@@ -0,0 +1,120 @@
+-- Rollup horário de uso e desempenho, calculado pelo pg_cron a partir de 'chat_logs' e 'error_logs'.
+-- O dashboard público (GitHub Pages) passa a ler um JSON gerado desta tabela por
+-- scripts/exportar_estatisticas_publicas.py, em vez de consultar as tabelas brutas pelo navegador.
+
+create table if not exists "public"."metricas_uso_hora" (
+    "hora" timestamp with time zone not null primary key,
+    "turnos" integer not null default 0,
+    "sessoes" integer not null default 0,
+    "erros" integer not null default 0,
+    "taxa_erro" double precision,
+    -- p50/p95 por etapa do turno (chaves de chat_logs.duracoes_ms), ex: {"total": {"p50": 3100.5, "p95": 7420.0}}
+    "latencias_ms" jsonb not null default '{}'::jsonb,
+    "tokens_entrada" bigint not null default 0,
+    "tokens_saida" bigint not null default 0,
+    "tokens_cache" bigint not null default 0,
+    -- Fração dos tokens de entrada servidos pelo cache de contexto do Gemini
+    "taxa_cache_tokens" double precision,
+    "atualizado_em" timestamp with time zone not null default now()
+);
+
+-- Sem policies: apenas a service_role (script de exportação) lê a tabela
+alter table "public"."metricas_uso_hora" enable row level security;
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.atualizar_metricas_uso_hora(horas integer DEFAULT 3)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path = public
+AS $function$
+DECLARE
+    inicio timestamp with time zone := date_trunc('hour', now()) - make_interval(hours => horas);
+    linhas integer;
+BEGIN
+    -- Recalcula as últimas 'horas' horas (a hora corrente ainda parcial é refeita na próxima execução)
+    with turnos as (
+        select
+            date_trunc('hour', created_at) as hora,
+            count(*) as turnos,
+            count(distinct session_id) as sessoes,
+            coalesce(sum(tokens_entrada), 0) as tokens_entrada,
+            coalesce(sum(tokens_saida), 0) as tokens_saida,
+            coalesce(sum(tokens_cache), 0) as tokens_cache
+        from chat_logs
+        where created_at >= inicio
+        group by 1
+    ),
+    percentis as (
+        select
+            date_trunc('hour', c.created_at) as hora,
+            e.etapa,
+            round(percentile_cont(0.5) within group (order by e.valor::double precision)::numeric, 1) as p50,
+            round(percentile_cont(0.95) within group (order by e.valor::double precision)::numeric, 1) as p95
+        from chat_logs c, jsonb_each_text(c.duracoes_ms) as e(etapa, valor)
+        where c.created_at >= inicio
+        and c.duracoes_ms is not null
+        group by 1, 2
+    ),
+    latencias as (
+        select hora, jsonb_object_agg(etapa, jsonb_build_object('p50', p50, 'p95', p95)) as latencias_ms
+        from percentis
+        group by hora
+    ),
+    erros as (
+        select date_trunc('hour', created_at) as hora, count(*) as erros
+        from error_logs
+        where created_at >= inicio
+        group by 1
+    )
+    insert into metricas_uso_hora as m (hora, turnos, sessoes, erros, taxa_erro, latencias_ms, tokens_entrada, tokens_saida, tokens_cache, taxa_cache_tokens, atualizado_em)
+    select
+        coalesce(t.hora, e.hora),
+        coalesce(t.turnos, 0),
+        coalesce(t.sessoes, 0),
+        coalesce(e.erros, 0),
+        coalesce(e.erros, 0)::double precision / nullif(coalesce(t.turnos, 0) + coalesce(e.erros, 0), 0),
+        coalesce(l.latencias_ms, '{}'::jsonb),
+        coalesce(t.tokens_entrada, 0),
+        coalesce(t.tokens_saida, 0),
+        coalesce(t.tokens_cache, 0),
+        t.tokens_cache::double precision / nullif(t.tokens_entrada, 0),
+        now()
+    from turnos t
+    full join erros e on e.hora = t.hora
+    left join latencias l on l.hora = coalesce(t.hora, e.hora)
+    on conflict (hora) do update set
+        turnos = excluded.turnos,
+        sessoes = excluded.sessoes,
+        erros = excluded.erros,
+        taxa_erro = excluded.taxa_erro,
+        latencias_ms = excluded.latencias_ms,
+        tokens_entrada = excluded.tokens_entrada,
+        tokens_saida = excluded.tokens_saida,
+        tokens_cache = excluded.tokens_cache,
+        taxa_cache_tokens = excluded.taxa_cache_tokens,
+        atualizado_em = excluded.atualizado_em;
+
+    get diagnostics linhas = row_count;
+
+    -- Mesma janela de retenção dos logs de origem
+    delete from metricas_uso_hora where hora < now() - interval '12 months';
+
+    return linhas;
+END;
+$function$
+;
+
+revoke execute on function public.atualizar_metricas_uso_hora(integer) from public, anon, authenticated;
+
+grant execute on function public.atualizar_metricas_uso_hora(integer) to service_role;
+
+-- Backfill dos últimos 30 dias
+select public.atualizar_metricas_uso_hora(24 * 30);
+
+select cron.schedule(
+  'rollup-metricas-uso-hora',
+  '5 * * * *', -- Executa a cada hora, aos 5 minutos
+  $$ select public.atualizar_metricas_uso_hora(3); $$
+);
@@ -0,0 +1,21 @@
+-- Estado compacto das conversas (histórico, memória de recuperação e orçamento de tokens), em JSON,
+-- para que qualquer réplica do app retome a sessão pelo 'sid' da URL (SESSAO_ARMAZENAMENTO = 'postgres').
+-- O app grava no máximo uma vez a cada SESSAO_COALESCER_S por sessão; ver src/core/estado_sessao.py.
+
+create table if not exists "public"."estado_sessoes" (
+    "session_id" text not null primary key references "public"."sessions" ("session_id") on delete cascade,
+    "dados" jsonb not null,
+    "atualizado_em" timestamp with time zone not null default now(),
+    "expira_em" timestamp with time zone not null
+);
+
+create index if not exists estado_sessoes_expira_em_idx on "public"."estado_sessoes" using btree ("expira_em");
+
+-- Sem policies: apenas a service_role (o app) lê e grava o estado das conversas
+alter table "public"."estado_sessoes" enable row level security;
+
+select cron.schedule(
+  'expirar-estado-sessoes',
+  '*/15 * * * *', -- Executa a cada 15 minutos
+  $$ delete from public.estado_sessoes where expira_em < now(); $$
+);
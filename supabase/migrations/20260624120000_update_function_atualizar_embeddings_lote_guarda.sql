@@ -0,0 +1,35 @@
+-- A gravação em lote de scripts/gerar_embedding.py volta a ter a guarda que o antigo '.is_("embedding", "null")'
+-- dava à leitura dos pendentes: a linha só é atualizada se, além da 'descricao', o 'embedding_hash' ainda for o
+-- lido no início da execução. Assim, um embedding gravado por outra execução (ou por outro worker) entre a
+-- leitura e a gravação não é sobrescrito, e uma 'descricao' nula também é comparada corretamente.
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.atualizar_embeddings_lote(tabela text, linhas jsonb)
+ RETURNS integer
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+  atualizados integer;
+BEGIN
+  IF tabela NOT IN ('knowledge_base', 'knowledge_base_etl') THEN
+    RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+  END IF;
+
+  EXECUTE format(
+    'update public.%I as kb
+     set embedding = l.embedding::public.vector,
+         embedding_curto = l.embedding_curto::public.halfvec(256),
+         embedding_hash = l.embedding_hash
+     from jsonb_to_recordset($1) as l(kb_id text, descricao text, embedding text, embedding_curto text, embedding_hash text, embedding_hash_lido text)
+     where kb.kb_id = l.kb_id
+     and kb.descricao is not distinct from l.descricao
+     and kb.embedding_hash is not distinct from l.embedding_hash_lido',
+    tabela
+  ) USING linhas;
+
+  GET DIAGNOSTICS atualizados = ROW_COUNT;
+  RETURN atualizados;
+END;
+$function$
+;
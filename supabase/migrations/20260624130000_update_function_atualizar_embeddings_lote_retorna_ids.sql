@@ -0,0 +1,35 @@
+-- atualizar_embeddings_lote passa a devolver os kb_ids efetivamente atualizados, e não só a contagem:
+-- scripts/gerar_embedding.py registra no checkpoint apenas esses ids. As linhas barradas pela guarda
+-- (descricao editada ou embedding gravado por outra execução) ficam para a próxima execução.
+
+set check_function_bodies = off;
+
+-- O tipo de retorno muda (integer -> setof text), então a função é recriada
+DROP FUNCTION IF EXISTS public.atualizar_embeddings_lote(text, jsonb);
+
+CREATE FUNCTION public.atualizar_embeddings_lote(tabela text, linhas jsonb)
+ RETURNS SETOF text
+ LANGUAGE plpgsql
+AS $function$
+BEGIN
+  IF tabela NOT IN ('knowledge_base', 'knowledge_base_etl') THEN
+    RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+  END IF;
+
+  RETURN QUERY EXECUTE format(
+    'update public.%I as kb
+     set embedding = l.embedding::public.vector,
+         embedding_curto = l.embedding_curto::public.halfvec(256),
+         embedding_hash = l.embedding_hash
+     from jsonb_to_recordset($1) as l(kb_id text, descricao text, embedding text, embedding_curto text, embedding_hash text, embedding_hash_lido text)
+     where kb.kb_id = l.kb_id
+     and kb.descricao is not distinct from l.descricao
+     and kb.embedding_hash is not distinct from l.embedding_hash_lido
+     returning kb.kb_id',
+    tabela
+  ) USING linhas;
+END;
+$function$
+;
+
+grant execute on function "public"."atualizar_embeddings_lote"(text, jsonb) to "service_role";
@@ -0,0 +1,18 @@
+-- hash_chunks_topico passa a ignorar chunks com 'descricao' vazia, como scripts/gerar_digestos.py
+-- ('calcular_hash_chunks'). Antes, o string_agg só descartava descricao nula: um chunk ativo com
+-- descricao '' entrava no hash SQL mas não no do script, e o digesto do tópico nunca era considerado válido.
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.hash_chunks_topico(alvo text)
+ RETURNS text
+ LANGUAGE sql
+ STABLE
+AS $function$
+  select md5(coalesce(string_agg(kb_id || ':' || descricao, E'\n' order by kb_id collate "C"), ''))
+  from public.knowledge_base
+  where topico = alvo
+  and ativo is true
+  and coalesce(descricao, '') <> '';
+$function$
+;
@@ -0,0 +1,23 @@
+-- Versão do conteúdo da KB usada pelo snapshot local (src/core/db/snapshot.py): o app compara o
+-- 'versao_kb' do manifesto com esta função e volta ao Supabase assim que a KB muda, sem depender da
+-- idade do snapshot. Mesma fórmula de 'calcular_versao_kb' (chunks ativos com embedding; a descricao
+-- entra pelo md5, para que a função não precise ler os vetores).
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.versao_kb()
+ RETURNS text
+ LANGUAGE sql
+ STABLE
+AS $function$
+  select md5(coalesce(string_agg(
+    kb_id || ':' || coalesce(topico, '') || ':' || coalesce(eixo_tematico, '') || ':' || md5(coalesce(descricao, '')) || ':' || coalesce(embedding_hash, ''),
+    E'\n' order by kb_id collate "C"
+  ), ''))
+  from public.knowledge_base
+  where ativo is true
+  and embedding is not null;
+$function$
+;
+
+grant execute on function "public"."versao_kb"() to "service_role";
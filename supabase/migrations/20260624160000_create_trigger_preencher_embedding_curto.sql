@@ -0,0 +1,62 @@
+-- O 1º estágio da busca usa só 'embedding_curto'. Antes ele era preenchido apenas por scripts/gerar_embedding.py,
+-- então uma linha com 'embedding' gravado por outro caminho (SQL manual, tabela de ETL, scripts antigos) ficava
+-- com o prefixo nulo e sumia da busca vetorial. Agora um trigger deriva o prefixo do vetor completo em toda
+-- gravação, e 'atualizar_embeddings_lote' deixa de receber o prefixo.
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.preencher_embedding_curto()
+ RETURNS trigger
+ LANGUAGE plpgsql
+AS $function$
+BEGIN
+    -- Só vetores do modelo atual (1536 dimensões) têm prefixo Matryoshka válido
+    IF NEW.embedding IS NULL OR public.vector_dims(NEW.embedding) <> 1536 THEN
+        NEW.embedding_curto = NULL;
+    ELSE
+        NEW.embedding_curto = public.subvector(NEW.embedding, 1, 256)::public.halfvec(256);
+    END IF;
+    RETURN NEW;
+END;
+$function$
+;
+
+CREATE OR REPLACE TRIGGER "preencher_kb_embedding_curto" BEFORE INSERT OR UPDATE OF embedding, embedding_curto ON "public"."knowledge_base" FOR EACH ROW EXECUTE FUNCTION "public"."preencher_embedding_curto"();
+
+CREATE OR REPLACE TRIGGER "preencher_kb_etl_embedding_curto" BEFORE INSERT OR UPDATE OF embedding, embedding_curto ON "public"."knowledge_base_etl" FOR EACH ROW EXECUTE FUNCTION "public"."preencher_embedding_curto"();
+
+-- Linhas gravadas por fora do script desde a criação da coluna (o trigger calcula o prefixo)
+update "public"."knowledge_base"
+set embedding_curto = null
+where embedding is not null
+and embedding_curto is null;
+
+update "public"."knowledge_base_etl"
+set embedding_curto = null
+where embedding is not null
+and embedding_curto is null;
+
+CREATE OR REPLACE FUNCTION public.atualizar_embeddings_lote(tabela text, linhas jsonb)
+ RETURNS SETOF text
+ LANGUAGE plpgsql
+AS $function$
+BEGIN
+  IF tabela NOT IN ('knowledge_base', 'knowledge_base_etl') THEN
+    RAISE EXCEPTION 'Tabela não suportada: %', tabela;
+  END IF;
+
+  -- 'embedding_curto' é derivado pelo trigger 'preencher_embedding_curto'
+  RETURN QUERY EXECUTE format(
+    'update public.%I as kb
+     set embedding = l.embedding::public.vector,
+         embedding_hash = l.embedding_hash
+     from jsonb_to_recordset($1) as l(kb_id text, descricao text, embedding text, embedding_hash text, embedding_hash_lido text)
+     where kb.kb_id = l.kb_id
+     and kb.descricao is not distinct from l.descricao
+     and kb.embedding_hash is not distinct from l.embedding_hash_lido
+     returning kb.kb_id',
+    tabela
+  ) USING linhas;
+END;
+$function$
+;
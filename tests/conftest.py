@@ -1,6 +1,7 @@
 import sys
 import os
 import pytest
+import streamlit as st
 from unittest.mock import MagicMock, patch
 
 # Adiciona o diretório raiz do projeto ao PYTHONPATH
@@ -33,6 +34,26 @@ def set_dummy_env_vars(request):
         yield
 
 
+@pytest.fixture(autouse=True)
+def limpar_caches_streamlit():
+    """
+    Limpa os caches do Streamlit (st.cache_data / st.cache_resource), os caches em processo do core
+    (src.core.cache) e os clientes do Supabase e do Gemini antes de cada teste, para que clientes,
+    categorias e tópicos cacheados por um teste não vazem para o próximo.
+    """
+    from src.core.cache import limpar_caches
+    from src.core.db.client import get_db_client
+    from src.core.genai import cliente_gemini
+    from src.utils import audio_cacheado, get_current_branch, git_version
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    limpar_caches()
+    for funcao in (get_db_client, cliente_gemini, audio_cacheado, get_current_branch, git_version):
+        funcao.cache_clear()
+    yield
+
+
 @pytest.fixture(autouse=True)
 def mock_supabase_global(request):
     """
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+from google.genai.client import Client
+from supabase import create_client
+
+from benchmarks.kb_sintetica import gerar_kb_sintetica
+from benchmarks.servicos_fake import ConfiguracaoFake, ServidorGeminiFake, ServidorPostgrestFake, variaveis_ambiente
+from src.api import servidor
+from src.core import estado_sessao, pipeline
+from src.core.estado_sessao import ArmazenamentoMemoria, ArmazenamentoSQLite, GravadorCoalescido, serializar_estado
+
+pytestmark = pytest.mark.unit
+
+CHAVE = "chave-cliente-a"
+AUTORIZACAO = {"Authorization": f"Bearer {CHAVE}"}
+
+
+@pytest.fixture(autouse=True)
+def credenciais_api():
+    with patch.dict(os.environ, {"API_CHAVES": f"{CHAVE}, chave-cliente-b", "API_SEGREDO_SESSAO": "segredo-de-teste"}):
+        servidor._chaves_api.cache_clear()
+        servidor._segredo_sessao.cache_clear()
+        yield
+    servidor._chaves_api.cache_clear()
+    servidor._segredo_sessao.cache_clear()
+
+
+def _eventos_sse(texto: str) -> list[tuple[str, dict]]:
+    eventos = []
+    for bloco in texto.strip().split("\n\n"):
+        linhas = dict(linha.split(": ", 1) for linha in bloco.splitlines())
+        eventos.append((linhas["event"], json.loads(linhas["data"])))
+    return eventos
+
+
+async def _requisitar(metodo: str, caminho: str, headers: dict | None = AUTORIZACAO, **kwargs) -> httpx.Response:
+    kwargs["headers"] = headers
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=servidor.app), base_url="http://vox") as cliente:
+        return await cliente.request(metodo, caminho, **kwargs)
+
+
+@pytest.fixture
+def servicos_fake(monkeypatch):
+    """
+    Aponta o servidor para o Gemini e o PostgREST falsos, com os clientes reais (o conftest os substitui por mocks).
+    """
+    gravador = GravadorCoalescido(ArmazenamentoMemoria(), intervalo_s=3600)
+    monkeypatch.setattr(estado_sessao, "armazenamento_sessao", lambda: gravador)
+    monkeypatch.setattr(servidor, "armazenamento_sessao", lambda: gravador)
+    monkeypatch.setattr(pipeline, "armazenamento_sessao", lambda: gravador)
+    kb = gerar_kb_sintetica(200, total_topicos=5)
+    with ServidorGeminiFake(kb, ConfiguracaoFake(palavras_por_chunk=5, palavras_resposta=20)) as gemini, \
+         ServidorPostgrestFake(kb) as postgrest, \
+         patch.dict(os.environ, variaveis_ambiente(gemini, postgrest)), \
+         patch("google.genai.Client", Client), \
+         patch("supabase.create_client", create_client), \
+         patch("src.core.db.retrieval.USAR_SNAPSHOT_KB", False):
+        yield postgrest
+
+
+def test_chat_transmite_tokens_em_sse_e_retoma_a_sessao(servicos_fake):
+    resposta = asyncio.run(_requisitar("POST", "/v1/chat", json={"mensagem": "Como retificar meu nome?"}))
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/event-stream")
+    eventos = _eventos_sse(resposta.text)
+    nomes = [nome for nome, _ in eventos]
+    assert nomes[0] == "sessao" and nomes[-1] == "fim"
+    assert nomes.count("token") == 4
+    assert eventos[-1][1]["trace_id"]
+    assert eventos[-1][1]["degradacoes"] == []
+    session_id = eventos[0][1]["session_id"]
+    session_token = eventos[0][1]["session_token"]
+
+    # O turno seguinte, em qualquer worker, parte do histórico salvo
+    corpo = {"mensagem": "E onde faço isso?", "session_id": session_id, "session_token": session_token}
+    resposta = asyncio.run(_requisitar("POST", "/v1/chat", json=corpo))
+    assert _eventos_sse(resposta.text)[0][1]["session_id"] == session_id
+    estado = estado_sessao.armazenamento_sessao().carregar(session_id)
+    assert [m["parts"][0] for m in estado["hist_exibir"] if m["role"] == "user"] == ["Como retificar meu nome?", "E onde faço isso?"]
+    assert estado["orcamento_tokens"]["turnos"] == 2
+    assert len(servicos_fake.tabelas["chat_logs"]) == 2
+
+
+@pytest.mark.parametrize("cabecalhos", [None, {"Authorization": "Bearer chave-errada"}, {"Authorization": CHAVE}])
+def test_chat_exige_credencial_antes_de_ler_o_corpo(cabecalhos):
+    # Corpo inválido: a resposta é 401, não 400, porque o corpo nem chega a ser lido
+    resposta = asyncio.run(_requisitar("POST", "/v1/chat", headers=cabecalhos, content=b"{"))
+    assert resposta.status_code == 401
+    assert resposta.headers["www-authenticate"] == "Bearer"
+
+
+def test_chat_sem_chaves_configuradas_recusa(monkeypatch):
+    monkeypatch.setattr(servidor, "_chaves_api", lambda: ())
+    assert asyncio.run(_requisitar("POST", "/v1/chat", json={"mensagem": "oi"})).status_code == 503
+
+
+def test_chat_nao_retoma_sessao_sem_token_da_mesma_credencial(monkeypatch):
+    gravador = GravadorCoalescido(ArmazenamentoMemoria(), intervalo_s=3600)
+    gravador.salvar("sessao-do-app", serializar_estado({"hist_exibir": [{"role": "user", "parts": ["dado pessoal"]}]}))
+    monkeypatch.setattr(servidor, "carregar_sessao", lambda sid: (sid, gravador.carregar(sid)))
+    token_outra_chave = servidor.token_sessao("chave-cliente-b", "sessao-do-app")
+
+    for token in (None, "0" * 64, token_outra_chave):
+        corpo = {"mensagem": "oi", "session_id": "sessao-do-app", "session_token": token}
+        assert asyncio.run(_requisitar("POST", "/v1/chat", json=corpo)).status_code == 403
+
+    # Sem segredo configurado, nenhuma sessão é retomada pela API
+    monkeypatch.setattr(servidor, "_segredo_sessao", lambda: b"")
+    corpo = {"mensagem": "oi", "session_id": "sessao-do-app", "session_token": servidor.token_sessao(CHAVE, "sessao-do-app")}
+    assert asyncio.run(_requisitar("POST", "/v1/chat", json=corpo)).status_code == 403
+
+
+@pytest.mark.parametrize("corpo", [None, {"mensagem": ""}, {"mensagem": 42}, {"mensagem": "x" * 5000}])
+def test_chat_rejeita_corpo_invalido(corpo):
+    resposta = asyncio.run(_requisitar("POST", "/v1/chat", json=corpo))
+    assert resposta.status_code == 400
+
+
+def test_chat_sem_vaga_responde_503(monkeypatch):
+    monkeypatch.setattr(servidor, "_vagas", asyncio.Semaphore(0))
+    monkeypatch.setattr(servidor, "API_FILA_ESPERA_S", 0.01)
+
+    resposta = asyncio.run(_requisitar("POST", "/v1/chat", json={"mensagem": "oi"}))
+    assert resposta.status_code == 503
+    assert resposta.headers["retry-after"] == "1"
+
+
+def test_vaga_fica_ocupada_ate_o_turno_desconectado_terminar(monkeypatch):
+    vagas = asyncio.Semaphore(1)
+    monkeypatch.setattr(servidor, "_vagas", vagas)
+    monkeypatch.setattr(servidor, "carregar_sessao", lambda sid: ("sessao-1", None))
+
+    async def cenario():
+        desconectar, continuar, terminar = asyncio.Event(), asyncio.Event(), asyncio.Event()
+
+        class PipelineLento:
+            def iniciar_registro_sessao(self, session_id):
+                pass
+
+            async def executar(self, turno, callbacks):
+                callbacks.ao_token("a")
+                await continuar.wait()
+                callbacks.ao_token("b")
+                await terminar.wait()
+
+        monkeypatch.setattr(servidor, "_pipeline", PipelineLento())
+        mensagens = [{"type": "http.request", "body": json.dumps({"mensagem": "oi"}).encode()}]
+
+        async def receive():
+            if mensagens:
+                return mensagens.pop()
+            await desconectar.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(mensagem):
+            pass
+
+        escopo = {"type": "http", "method": "POST", "path": "/v1/chat", "headers": [(b"authorization", f"Bearer {CHAVE}".encode())]}
+        requisicao = asyncio.create_task(servidor.app(escopo, receive, send))
+        await asyncio.sleep(0.05)
+        desconectar.set()
+        await asyncio.sleep(0.01)
+        continuar.set()
+        await requisicao
+
+        # A resposta acabou, mas o turno segue em segundo plano com a vaga
+        assert vagas.locked()
+        terminar.set()
+        await asyncio.sleep(0.01)
+        assert not vagas.locked()
+        assert servidor._turnos_em_andamento == 0
+
+    asyncio.run(cenario())
+
+
+def test_health_e_ready(monkeypatch):
+    monkeypatch.setattr(servidor, "estado_aquecimento", lambda: {"iniciado": True, "pronto": False, "duracoes_ms": {}, "erros": {}})
+    assert asyncio.run(_requisitar("GET", "/health")).json()["status"] == "ok"
+    assert asyncio.run(_requisitar("GET", "/ready")).status_code == 503
+
+    monkeypatch.setattr(servidor, "estado_aquecimento", lambda: {"iniciado": True, "pronto": True, "duracoes_ms": {}, "erros": {}})
+    assert asyncio.run(_requisitar("GET", "/ready")).status_code == 200
+    assert asyncio.run(_requisitar("DELETE", "/health")).status_code == 405
+    assert asyncio.run(_requisitar("GET", "/nada")).status_code == 404
+
+
+@pytest.mark.parametrize("workers, backend, sobe", [(1, ArmazenamentoMemoria, True), (4, ArmazenamentoMemoria, False), (4, ArmazenamentoSQLite, True)])
+def test_varios_workers_exigem_estado_fora_do_processo(monkeypatch, tmp_path, workers, backend, sobe):
+    gravador = GravadorCoalescido(backend(tmp_path / "estado.sqlite3") if backend is ArmazenamentoSQLite else backend(), intervalo_s=3600)
+    monkeypatch.setattr(servidor, "armazenamento_sessao", lambda: gravador)
+    monkeypatch.setattr(servidor, "API_WORKERS", workers)
+    monkeypatch.setattr(servidor, "iniciar_aquecimento", lambda: None)
+    enviados = []
+
+    async def receive():
+        return {"type": "lifespan.startup"} if not enviados else {"type": "lifespan.shutdown"}
+
+    async def send(mensagem):
+        enviados.append(mensagem["type"])
+
+    asyncio.run(servidor.app({"type": "lifespan"}, receive, send))
+
+    assert enviados[0] == ("lifespan.startup.complete" if sobe else "lifespan.startup.failed")
+
+
+def test_servidor_nao_carrega_a_interface():
+    # O worker da API só precisa do core: nada de src.app (CSS, sidebar, prompts da UI)
+    resultado = subprocess.run(
+        [sys.executable, "-c", "import sys, src.api.servidor; print(sorted(m for m in sys.modules if m.startswith('src.app')))"],
+        capture_output=True, text=True, check=True,
+    )
+    assert resultado.stdout.strip() == "[]"
@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.core import aquecimento
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(monkeypatch):
+    monkeypatch.setattr(aquecimento, "_estado", {"iniciado": False, "pronto": False, "duracoes_ms": {}, "erros": {}})
+
+
+def test_topicos_mais_usados_soma_kb_count_por_topico():
+    cliente = MagicMock()
+    cliente.table.return_value.select.return_value.order.return_value.limit.return_value.execute.return_value.data = [
+        {"topico": "Saúde", "kb_count": 10},
+        {"topico": "Direitos", "kb_count": 8},
+        {"topico": "Direitos", "kb_count": 7},
+        {"topico": "Cultura", "kb_count": None},
+    ]
+    with patch.object(aquecimento, "get_db_client", return_value=cliente):
+        assert aquecimento.topicos_mais_usados(2) == ["Direitos", "Saúde"]
+
+
+def test_aquecer_mede_etapas_e_sinaliza_pronto_mesmo_com_falha(monkeypatch):
+    monkeypatch.setattr(aquecimento, "USAR_SNAPSHOT_KB", False)
+    with patch.object(aquecimento, "cliente_gemini") as cliente_gemini, \
+         patch.object(aquecimento, "get_db_client"), \
+         patch.object(aquecimento, "get_categorias_erro") as categorias, \
+         patch.object(aquecimento, "_precarregar_topicos") as precarregar:
+        estado = aquecimento.aquecer({"audio_saudacao": MagicMock(side_effect=RuntimeError("sem rede"))})
+
+    categorias.assert_called_once()
+    precarregar.assert_called_once()
+    cliente_gemini.return_value.models.embed_content.assert_called_once()
+    assert estado["pronto"] is True
+    assert estado["erros"] == {"audio_saudacao": "sem rede"}
+    assert set(estado["duracoes_ms"]) == {
+        "cliente_gemini", "cliente_supabase", "categorias_erro", "topicos_mais_usados", "embedding_descartavel", "audio_saudacao", "total",
+    }
+
+
+def test_iniciar_aquecimento_dispara_uma_vez():
+    with patch.object(aquecimento.threading, "Thread") as thread:
+        aquecimento.iniciar_aquecimento()
+        aquecimento.iniciar_aquecimento()
+
+    thread.assert_called_once()
+    assert aquecimento.estado_aquecimento()["iniciado"] is True
+    assert aquecimento.estado_aquecimento()["pronto"] is False
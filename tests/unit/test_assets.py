@@ -0,0 +1,51 @@
+import pytest
+
+from src.app import assets
+from src.app.assets import PacoteAssets, minificar_css, minificar_html, pacote_assets
+
+pytestmark = pytest.mark.unit
+
+
+def test_minificar_css_remove_comentarios_e_espacos():
+    css = "/* botão */\n.a > .b {\n    color: #fff;\n    margin: 0 auto;\n}\n"
+    assert minificar_css(css) == ".a>.b{color:#fff;margin:0 auto}"
+
+
+def test_minificar_html_junta_em_uma_linha():
+    html = '\n    <div>\n        <a href="x">Link  com   espaços</a>\n    </div>\n'
+    assert minificar_html(html) == '<div><a href="x">Link com espaços</a></div>'
+
+
+def test_pacote_e_montado_uma_vez_e_imutavel():
+    assets._montar_pacote.clear()
+    pacote = pacote_assets()
+
+    assert pacote is pacote_assets()
+    assert pacote.css_html.startswith("<style>") and "\n" not in pacote.css_html
+    assert pacote.saudacao
+    with pytest.raises(AttributeError):
+        pacote.css_html = ""
+
+
+def test_hot_reload_remonta_quando_arquivo_muda(monkeypatch, tmp_path):
+    css = tmp_path / "style.css"
+    css.write_text("body { color: red; }")
+    monkeypatch.setattr(assets, "CSS_PATH", str(css))
+    monkeypatch.setattr(assets, "ARQUIVOS_ORIGEM", (str(css),))
+    monkeypatch.setattr(assets, "ASSETS_HOT_RELOAD", True)
+    assets._montar_pacote.clear()
+
+    assert pacote_assets().css_html == "<style>body{color:red}</style>"
+    assert pacote_assets() is pacote_assets()
+
+    css.write_text("body { color: blue; }")
+    monkeypatch.setattr(assets.os.path, "getmtime", lambda caminho: 1e10)
+    assert pacote_assets().css_html == "<style>body{color:blue}</style>"
+
+    assets._montar_pacote.clear()
+
+
+def test_pacote_nao_aceita_novos_atributos():
+    pacote = PacoteAssets("", "", "", "")
+    with pytest.raises(AttributeError):
+        pacote.extra = 1
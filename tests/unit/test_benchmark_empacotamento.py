@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.empacotamento import CENARIOS, executar_benchmark
+
+pytestmark = pytest.mark.unit
+
+
+def test_empacotamento_do_topico_com_prefixo_cacheado_e_rapido():
+    relatorio = executar_benchmark(chunks=25, repeticoes=20)
+
+    assert set(relatorio["cenarios"]) == set(CENARIOS)
+    completo = relatorio["cenarios"]["vetor_completo_texto"]
+    prefixo = relatorio["cenarios"]["prefixo_cacheado"]
+    # Limite folgado para a CI; localmente o p95 fica em torno de 3 ms para 25 chunks
+    assert prefixo["latencia_ms"]["p95"] < 25.0
+    assert prefixo["latencia_ms"]["p50"] < completo["latencia_ms"]["p50"]
+    assert prefixo["bytes_vetores_turno"] * 4 < completo["bytes_vetores_turno"]
@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.kb_sintetica import ClienteSupabaseFake, gerar_consultas, gerar_kb_sintetica
+from benchmarks.recuperacao import CENARIOS, comparar_relatorios, executar_benchmark
+
+pytestmark = pytest.mark.unit
+
+
+def test_cliente_fake_responde_como_postgrest():
+    kb = gerar_kb_sintetica(200, total_topicos=5)
+    cliente = ClienteSupabaseFake(kb)
+    consulta = gerar_consultas(kb, 1, fracao_ruido=0.0)[0]
+
+    resultados = cliente.rpc(
+        "match_knowledge_base",
+        {"query_embedding": consulta["vetor"].tolist(), "match_threshold": -1.0, "match_count": 10, "filter_topic": None},
+    ).execute().data
+    assert [row["id"] for row in resultados] == consulta["relevantes"]
+
+    chunks = cliente.table("knowledge_base").select("kb_id, descricao, embedding").eq("topico", consulta["topico"]).limit(3).execute().data
+    assert 0 < len(chunks) <= 3
+    assert isinstance(chunks[0]["embedding"], str)
+    assert cliente.chamadas == 2
+
+
+def test_executar_benchmark_gera_relatorio_comparavel(monkeypatch):
+    # tracemalloc deixa o empacotamento lento; poucas consultas bastam para validar o relatório
+    monkeypatch.setattr("benchmarks.recuperacao.CONSULTAS_MEMORIA", 2)
+    relatorio = executar_benchmark(chunks=300, topicos=30, consultas=10, k=5)
+
+    assert set(relatorio["cenarios"]) == set(CENARIOS)
+    assert relatorio["cenarios"]["indice_exato"]["recall_at_k"] == 1.0
+    pipeline = relatorio["cenarios"]["pipeline_supabase"]
+    assert pipeline["latencia_ms"]["n"] == 10
+    assert sum(pipeline["estrategias"].values()) == 10
+    assert "busca_inicial" in pipeline["estagios_ms"]
+
+    linhas = comparar_relatorios(relatorio, relatorio)
+    assert any("pipeline_snapshot p95" in linha and "+0.0%" in linha for linha in linhas)
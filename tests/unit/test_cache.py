@@ -0,0 +1,74 @@
+import ast
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.core.cache import cache_ttl, limpar_caches
+
+pytestmark = pytest.mark.unit
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+
+def test_cache_ttl_reaproveita_ate_expirar():
+    consulta = MagicMock(side_effect=lambda topico: f"chunks de {topico}")
+    cacheada = cache_ttl(60)(lambda topico: consulta(topico))
+
+    with patch("src.core.cache.time.monotonic", return_value=100.0):
+        assert cacheada("Nome Social") == "chunks de Nome Social"
+        assert cacheada(topico="Nome Social") == "chunks de Nome Social"
+    assert consulta.call_count == 1
+
+    with patch("src.core.cache.time.monotonic", return_value=161.0):
+        cacheada("Nome Social")
+    assert consulta.call_count == 2
+
+
+def test_cache_ttl_ignora_argumentos_com_sublinhado():
+    consulta = MagicMock(return_value=["chunk"])
+
+    @cache_ttl(60)
+    def chunks_topico(_client, topico, limit=10):
+        return consulta(_client, topico, limit)
+
+    chunks_topico(MagicMock(), "Nome Social")
+    chunks_topico(MagicMock(), "Nome Social", 10)
+    chunks_topico(MagicMock(), "Nome Social", 5)
+
+    assert consulta.call_count == 2
+
+
+def test_cache_ttl_nao_guarda_excecoes_e_limpa():
+    consulta = MagicMock(side_effect=[ConnectionError("Supabase fora"), "ok", "ok de novo"])
+    cacheada = cache_ttl()(lambda: consulta())
+
+    with pytest.raises(ConnectionError):
+        cacheada()
+    assert cacheada() == "ok"
+    assert cacheada() == "ok"
+
+    limpar_caches()
+    assert cacheada() == "ok de novo"
+
+
+def test_cache_ttl_descarta_a_entrada_mais_antiga():
+    consulta = MagicMock(side_effect=lambda x: x)
+    cacheada = cache_ttl(max_entradas=2)(lambda x: consulta(x))
+
+    for x in (1, 2, 3, 1):
+        cacheada(x)
+
+    assert [c.args[0] for c in consulta.call_args_list] == [1, 2, 3, 1]
+
+
+def test_core_nao_importa_streamlit():
+    for arquivo in sorted((RAIZ / "src" / "core").rglob("*.py")):
+        for no in ast.walk(ast.parse(arquivo.read_text(encoding="utf-8"))):
+            if isinstance(no, ast.Import):
+                modulos = [alias.name for alias in no.names]
+            elif isinstance(no, ast.ImportFrom):
+                modulos = [no.module or ""]
+            else:
+                continue
+            assert not any(m.split(".")[0] == "streamlit" for m in modulos), arquivo
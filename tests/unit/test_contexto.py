@@ -0,0 +1,52 @@
+import pytest
+
+pytestmark = pytest.mark.unit
+
+from src.core.contexto import (empacotar_contexto, estimar_tokens, resumir_empacotamento, similaridade_cosseno)
+
+
+def test_estimar_tokens():
+    assert estimar_tokens("") == 0
+    assert estimar_tokens("abc") == 1
+    assert estimar_tokens("a" * 40) == 10
+
+
+def test_similaridade_cosseno():
+    assert similaridade_cosseno([1.0, 0.0], [1.0, 0.0]) == pytest.approx(1.0)
+    assert similaridade_cosseno([1.0, 0.0], [0.0, 1.0]) == pytest.approx(0.0)
+    assert similaridade_cosseno([1.0, 0.0], [1.0]) == 0.0
+
+
+def test_empacotar_descarta_quase_duplicatas():
+    """
+    Chunks com embeddings quase idênticos não devem entrar duas vezes no contexto.
+    """
+    chunks = [
+        {"kb_id": "vox-kb-0001", "descricao": "Retificação de nome no cartório", "similarity": 0.9, "embedding": [1.0, 0.0, 0.0]},
+        {"kb_id": "vox-kb-0002", "descricao": "Retificação do nome em cartório", "similarity": 0.89, "embedding": "[0.99,0.01,0.0]"},
+        {"kb_id": "vox-kb-0003", "descricao": "Atendimento no SUS", "similarity": 0.7, "embedding": [0.0, 1.0, 0.0]},
+    ]
+
+    texto, proveniencia = empacotar_contexto(chunks, [1.0, 0.2, 0.0])
+
+    assert "Retificação de nome no cartório" in texto
+    assert "Atendimento no SUS" in texto
+    assert "Retificação do nome em cartório" not in texto
+
+    descartado = next(item for item in proveniencia if item.get("descartado"))
+    assert descartado["kb_id"] == "vox-kb-0002"
+    assert descartado["motivo"] == "redundante"
+
+
+def test_empacotar_respeita_orcamento_de_tokens():
+    chunks = [{"kb_id": f"vox-kb-000{i}", "descricao": f"{i} " + "palavra " * 100} for i in range(1, 5)]
+    tokens_chunk = estimar_tokens(chunks[0]["descricao"])
+
+    texto, proveniencia = empacotar_contexto(chunks, orcamento_tokens=tokens_chunk * 2)
+    resumo = resumir_empacotamento(proveniencia)
+
+    assert resumo["chunks_usados"] == 2
+    assert resumo["chunks_descartados"] == 2
+    assert resumo["tokens_usados"] <= tokens_chunk * 2
+    assert resumo["tokens_economizados"] > 0
+    assert texto.count("\n---\n") == 1
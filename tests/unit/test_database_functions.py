@@ -1,10 +1,11 @@
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 
 pytestmark = pytest.mark.unit
 
-from src.config import SEMANTICA_THRESHOLD, TAMANHO_VETOR_SEMANTICO
+from src.config import HNSW_EF_SEARCH, SEMANTICA_THRESHOLD, TAMANHO_VETOR_SEMANTICO
 from src.core.database import (buscar_chunks_por_topico, buscar_referencias_db, get_categorias_erro, recuperar_contexto_inteligente, salvar_erro, salvar_report, salvar_sessao)
 
 
@@ -90,6 +91,7 @@ def test_buscar_referencias_db(mock_db_client):
             "match_threshold": SEMANTICA_THRESHOLD,
             "match_count": 10,
             "filter_topic": None,
+            "ef_search": HNSW_EF_SEARCH,
         },
     )
     assert res is not None
@@ -102,6 +104,19 @@ def test_buscar_chunks_por_topico(mock_db_client):
     assert isinstance(res, list)
 
 
+def test_buscar_chunks_por_topico_baixa_so_o_prefixo_curto(mock_db_client):
+    mock_db_client.table.return_value.select.return_value.eq.return_value.limit.return_value.execute.return_value = MagicMock(
+        data=[{"kb_id": "vox-kb-0001", "descricao": "Desc", "embedding_curto": "[0.5,0.25,0]"}]
+    )
+
+    res = buscar_chunks_por_topico("Topico Teste")
+
+    # Nada do vetor completo: só o prefixo halfvec, já convertido para float32 (uma vez, antes do cache)
+    mock_db_client.table.return_value.select.assert_called_with("kb_id, descricao, embedding_curto")
+    assert res[0]["embedding_curto"].dtype == np.float32
+    assert res[0]["embedding_curto"].tolist() == [0.5, 0.25, 0.0]
+
+
 # ==========================================
 # 3. Teste de Lógica Complexa (RAG)
 # ==========================================
@@ -138,3 +153,84 @@ def test_recuperar_contexto_inteligente(mock_db_client):
     assert "Desc B" in contexto
     assert "Tópicos mistos" in fonte
     assert len(ids) == 2
+
+
+def _configurar_topico_concentrado(mock_db_client):
+    mock_docs = MagicMock()
+    mock_docs.data = [
+        {"id": f"vox-kb-000{i}", "descricao": f"Desc {i}", "topico": "Nome Social", "similarity": 0.9}
+        for i in range(1, 4)
+    ]
+    mock_db_client.rpc.return_value.execute.return_value = mock_docs
+
+    mock_topico = MagicMock()
+    mock_topico.data = [{"kb_id": f"vox-kb-000{i}", "descricao": f"Desc {i}"} for i in range(1, 6)]
+    mock_db_client.table.return_value.select.return_value.eq.return_value.limit.return_value.execute.return_value = mock_topico
+
+
+def test_recuperar_contexto_reutiliza_query_proxima(mock_db_client):
+    """
+    Uma query praticamente idêntica à anterior deve reaproveitar o contexto sem consultar o banco.
+    """
+    _configurar_topico_concentrado(mock_db_client)
+    memoria = {}
+
+    vetor = [0.1] * TAMANHO_VETOR_SEMANTICO
+    primeiro = recuperar_contexto_inteligente(vetor, memoria)
+    assert memoria["topico"] == "Nome Social"
+
+    mock_db_client.rpc.reset_mock()
+    mock_db_client.table.reset_mock()
+
+    segundo = recuperar_contexto_inteligente([0.1001] * TAMANHO_VETOR_SEMANTICO, memoria)
+
+    assert segundo == primeiro
+    mock_db_client.rpc.assert_not_called()
+    mock_db_client.table.assert_not_called()
+
+
+def test_recuperar_contexto_reutiliza_topico_vencedor(mock_db_client):
+    """
+    Uma query distante que elege o mesmo tópico reaproveita a expansão já realizada.
+    """
+    _configurar_topico_concentrado(mock_db_client)
+    memoria = {}
+
+    vetor = [0.1] * TAMANHO_VETOR_SEMANTICO
+    contexto, fonte, _ = recuperar_contexto_inteligente(vetor, memoria)
+    assert "Contexto Completo" in fonte
+
+    mock_db_client.table.reset_mock()
+
+    vetor_distante = [0.1, -0.1] * (TAMANHO_VETOR_SEMANTICO // 2)
+    contexto_2, fonte_2, _ = recuperar_contexto_inteligente(vetor_distante, memoria)
+
+    assert (contexto_2, fonte_2) == (contexto, fonte)
+    mock_db_client.rpc.assert_called()
+    mock_db_client.table.assert_not_called()
+    assert memoria["vetor"] == vetor_distante
+
+
+def test_recuperar_contexto_serve_digesto_do_topico(mock_db_client):
+    """
+    Com um digesto atualizado para o tópico vencedor, os chunks brutos não devem ser buscados.
+    """
+    _configurar_topico_concentrado(mock_db_client)
+    mock_busca = mock_db_client.rpc.return_value.execute.return_value
+
+    mock_digesto = MagicMock()
+    mock_digesto.data = [{"topico": "Nome Social", "digesto": "Digesto compacto", "kb_ids": ["vox-kb-0001", "vox-kb-0002"]}]
+
+    def _rpc(nome, params):
+        rpc = MagicMock()
+        rpc.execute.return_value = mock_digesto if nome == "buscar_digesto_topico" else mock_busca
+        return rpc
+
+    mock_db_client.rpc.side_effect = _rpc
+
+    contexto, fonte, ids = recuperar_contexto_inteligente([0.1] * TAMANHO_VETOR_SEMANTICO)
+
+    assert contexto == "Digesto compacto"
+    assert "Digesto do Tópico" in fonte
+    assert [item["kb_id"] for item in ids] == ["vox-kb-0001", "vox-kb-0002"]
+    mock_db_client.table.assert_not_called()
@@ -0,0 +1,164 @@
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from postgrest import SyncPostgrestClient
+
+from benchmarks.kb_sintetica import gerar_kb_sintetica
+from benchmarks.servicos_fake import ServidorPostgrestFake
+from src.core import estado_sessao
+from src.core.estado_sessao import (
+    ArmazenamentoMemoria,
+    ArmazenamentoPostgres,
+    ArmazenamentoSessao,
+    ArmazenamentoSQLite,
+    GravadorCoalescido,
+    assinar_sid,
+    carregar_sessao,
+    retomar_sessao,
+    serializar_estado,
+)
+
+pytestmark = pytest.mark.unit
+
+ESTADO = {
+    "versao": 1,
+    "hist_exibir": [{"role": "model", "parts": ["Olá!"]}, {"role": "user", "parts": ["O que é PrEP?"]}],
+    "memoria_recuperacao": {"vetor": [0.25, -0.5], "contexto": "PrEP é...", "fonte": "Saúde", "topico": "Saúde"},
+    "orcamento_tokens": {"tokens": 1200, "turnos": 1},
+}
+
+
+def test_serializar_estado_extrai_so_o_estado_compacto():
+    session_state = {
+        "hist_exibir": ESTADO["hist_exibir"],
+        "memoria_recuperacao": {"vetor": (0.123456789,), "contexto": "x"},
+        "orcamento_tokens": {"tokens": 10},
+        "key_api": "segredo",
+    }
+    estado = serializar_estado(session_state)
+
+    assert set(estado) == {"versao", "hist_exibir", "memoria_recuperacao", "orcamento_tokens"}
+    assert estado["memoria_recuperacao"]["vetor"] == [0.1234568]
+    assert session_state["memoria_recuperacao"]["vetor"] == (0.123456789,)
+
+
+@pytest.mark.parametrize("criar", [ArmazenamentoMemoria, lambda ttl_s: ArmazenamentoSQLite(caminho=":memory:", ttl_s=ttl_s)])
+def test_backends_locais_salvam_sobrescrevem_e_expiram(criar, monkeypatch):
+    relogio = [1000.0]
+    monkeypatch.setattr(estado_sessao.time, "time", lambda: relogio[0])
+    backend = criar(ttl_s=60)
+
+    backend.salvar("s1", ESTADO)
+    backend.salvar("s1", {**ESTADO, "orcamento_tokens": {"tokens": 2400, "turnos": 2}})
+    backend.salvar("s2", ESTADO)
+    assert backend.carregar("s1")["orcamento_tokens"]["turnos"] == 2
+    assert backend.carregar("s2") == ESTADO
+
+    backend.excluir("s2")
+    assert backend.carregar("s2") is None
+
+    relogio[0] += 61
+    assert backend.carregar("s1") is None
+    assert backend.expirar() == 1
+
+
+
+def test_backend_incompleto_nao_instancia():
+    class ArmazenamentoSoLeitura(ArmazenamentoSessao):
+        def carregar(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        ArmazenamentoSoLeitura()
+
+
+def test_sqlite_compartilha_estado_entre_conexoes(tmp_path):
+    caminho = tmp_path / "estado.sqlite3"
+    ArmazenamentoSQLite(caminho).salvar("s1", ESTADO)
+
+    # Outra réplica no mesmo host abre o mesmo arquivo
+    assert ArmazenamentoSQLite(caminho).carregar("s1") == ESTADO
+
+
+def test_gravador_coalesce_gravacoes_da_mesma_sessao():
+    backend = MagicMock()
+    gravador = GravadorCoalescido(backend, intervalo_s=3600)
+
+    for turnos in range(1, 4):
+        gravador.salvar("s1", {**ESTADO, "orcamento_tokens": {"turnos": turnos}})
+    gravador.salvar("s2", ESTADO)
+
+    # Leituras enxergam o estado ainda não gravado
+    assert gravador.carregar("s1")["orcamento_tokens"] == {"turnos": 3}
+    backend.carregar.assert_not_called()
+
+    assert gravador.descarregar() == 2
+    assert backend.salvar.call_count == 2
+    backend.salvar.assert_any_call("s1", {**ESTADO, "orcamento_tokens": {"turnos": 3}})
+    assert gravador.descarregar() == 0
+
+
+def test_gravador_excluir_descarta_pendente_e_tolera_falha_do_backend():
+    backend = MagicMock()
+    backend.salvar.side_effect = RuntimeError("fora do ar")
+    gravador = GravadorCoalescido(backend, intervalo_s=3600)
+
+    gravador.salvar("s1", ESTADO)
+    gravador.excluir("s1")
+    assert gravador.descarregar() == 0
+    backend.excluir.assert_called_once_with("s1")
+
+    gravador.salvar("s2", ESTADO)
+    assert gravador.descarregar() == 1
+
+
+def test_carregar_sessao_ignora_sid_desconhecido_ou_malformado(monkeypatch):
+    gravador = GravadorCoalescido(ArmazenamentoMemoria(), intervalo_s=3600)
+    monkeypatch.setattr(estado_sessao, "armazenamento_sessao", lambda: gravador)
+    sid = str(uuid.uuid4())
+    gravador.salvar(sid, ESTADO)
+
+    assert carregar_sessao(sid) == (sid, ESTADO)
+    for invalido in (None, "", "../../etc", str(uuid.uuid4())):
+        novo, estado = carregar_sessao(invalido)
+        assert estado is None and novo != sid
+
+
+def test_retomar_sessao_exige_sid_assinado(monkeypatch):
+    gravador = GravadorCoalescido(ArmazenamentoMemoria(), intervalo_s=3600)
+    monkeypatch.setattr(estado_sessao, "armazenamento_sessao", lambda: gravador)
+    monkeypatch.setattr(estado_sessao, "_segredo_url", lambda: b"segredo-de-teste")
+    sid = str(uuid.uuid4())
+    gravador.salvar(sid, ESTADO)
+
+    assert retomar_sessao(assinar_sid(sid)) == (sid, ESTADO)
+    # O UUID sozinho (histórico do navegador, print, logs de proxy) ou com assinatura alterada não retoma a conversa
+    for invalido in (sid, f"{sid}.{'0' * 64}", f"{str(uuid.uuid4())}.{assinar_sid(sid).partition('.')[2]}"):
+        novo, estado = retomar_sessao(invalido)
+        assert estado is None and novo != sid
+
+    # Sem o segredo, o app não assina o 'sid' e nenhuma sessão é retomada pelo link
+    monkeypatch.setattr(estado_sessao, "_segredo_url", lambda: b"")
+    assert assinar_sid(sid) is None
+    assert retomar_sessao(f"{sid}.{'0' * 64}")[1] is None
+
+
+def test_postgres_faz_upsert_e_filtra_expirados():
+    with ServidorPostgrestFake(gerar_kb_sintetica(10, total_topicos=2)) as postgrest:
+        db = SyncPostgrestClient(f"{postgrest.url}/rest/v1")
+        with patch.object(ArmazenamentoPostgres, "_cliente", return_value=db):
+            backend = ArmazenamentoPostgres(ttl_s=60)
+            backend.salvar("s1", ESTADO)
+            backend.salvar("s1", {**ESTADO, "hist_exibir": []})
+
+            assert len(postgrest.tabelas["estado_sessoes"]) == 1
+            assert backend.carregar("s1")["hist_exibir"] == []
+
+            expirado = ArmazenamentoPostgres(ttl_s=-60)
+            expirado.salvar("s2", ESTADO)
+            assert backend.carregar("s2") is None
+            assert backend.expirar() == 1
+
+            backend.excluir("s1")
+            assert postgrest.tabelas["estado_sessoes"] == []
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from exportar_estatisticas_publicas import resumir_desempenho  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+def _hora(turnos, erros, p95_total, tokens_entrada=1000, tokens_cache=0):
+    latencias = {"total": {"p50": p95_total / 2, "p95": p95_total}} if p95_total else {}
+    return {"turnos": turnos, "sessoes": turnos, "erros": erros, "latencias_ms": latencias, "tokens_entrada": tokens_entrada, "tokens_cache": tokens_cache}
+
+
+def test_resumir_desempenho_pondera_percentis_pelo_volume():
+    resumo = resumir_desempenho([_hora(30, 0, 4000.0, tokens_cache=500), _hora(10, 2, 8000.0)])
+
+    assert resumo["turnos"] == 40
+    assert resumo["taxa_erro"] == round(2 / 42, 4)
+    assert resumo["taxa_cache_tokens"] == 0.25
+    assert resumo["latencias_ms"]["total"] == {"p50": 2500.0, "p95": 5000.0}
+
+
+def test_resumir_desempenho_ignora_horas_sem_percentis_e_periodo_vazio():
+    resumo = resumir_desempenho([_hora(3, 1, None), _hora(10, 0, 1000.0)])
+    assert resumo["latencias_ms"]["total"]["p95"] == 1000.0
+
+    vazio = resumir_desempenho([])
+    assert vazio["turnos"] == 0 and vazio["taxa_erro"] is None and vazio["latencias_ms"] == {}
@@ -1,41 +1,35 @@
 import pytest
-from contextlib import nullcontext
-from unittest.mock import MagicMock, patch
-import streamlit as st
+from unittest.mock import patch
+
+from src.core.genai import classificar_erro_gemini
 
-# Exceção personalizada para capturar o st.stop() nos testes
-class StopException(Exception):
-    pass
 
 @pytest.fixture
 def mock_streamlit():
-    """Mock de funções chaves do Streamlit utilizadas no fluxo de geração e erro."""
-    with patch("streamlit.spinner", return_value=nullcontext()), \
-         patch("streamlit.empty") as mock_empty, \
-         patch("streamlit.error") as mock_error, \
-         patch("streamlit.stop", side_effect=StopException) as mock_stop:
-        st.session_state["session_id"] = "test-session-id"
-        st.session_state["git_version_str"] = "test-git-version"
-        mock_placeholder = MagicMock()
-        mock_empty.return_value = mock_placeholder
-        yield {"empty": mock_empty, "placeholder": mock_placeholder, "error": mock_error, "stop": mock_stop}
+    """Mock do st.error, usado nas mensagens de falha da geração."""
+    with patch("streamlit.error") as mock_error:
+        yield {"error": mock_error}
 
 @pytest.mark.unit
-@patch("src.core.db.logs.salvar_erro")
-def test_gerar_resposta_quota_error(mock_salvar_erro, mock_streamlit):
-    from src.core.genai import gerar_resposta
-    
-    mock_chat = MagicMock()
-    # Simula o erro de cota 429
-    mock_chat.send_message_stream.side_effect = Exception("429 ResourceExhausted: Quota exceeded for model")
-    mock_salvar_erro.return_value = "ERR-429"
+@pytest.mark.parametrize(
+    "mensagem, tipo",
+    [
+        ("429 ResourceExhausted: Quota exceeded for model", "cota"),
+        ("503 Service Unavailable: Overloaded", "indisponivel"),
+        ("400 Request blocked by safety filters", "seguranca"),
+        ("Algum erro desconhecido de rede", "geral"),
+    ],
+)
+def test_classificar_erro_gemini(mensagem, tipo):
+    assert classificar_erro_gemini(Exception(mensagem)) == tipo
 
-    with pytest.raises(StopException):
-        gerar_resposta(mock_chat, "Olá", "contexto")
+@pytest.mark.unit
+def test_gerar_resposta_quota_error(mock_streamlit):
+    from src.app.ui import exibir_erro_geracao
+
+    # Simula o erro de cota 429
+    exibir_erro_geracao(classificar_erro_gemini(Exception("429 ResourceExhausted: Quota exceeded for model")), "ERR-429")
 
-    # Verifica se a função de salvar erro no banco foi acionada
-    mock_salvar_erro.assert_called_once()
-    
     # Verifica se a mensagem amigável de cota/limite foi renderizada no Streamlit
     args, kwargs = mock_streamlit["error"].call_args
     assert "limite de processamento temporário" in args[0]
@@ -43,20 +37,12 @@ def test_gerar_resposta_quota_error(mock_salvar_erro, mock_streamlit):
     assert kwargs.get("icon") == "⚠️"
 
 @pytest.mark.unit
-@patch("src.core.db.logs.salvar_erro")
-def test_gerar_resposta_service_unavailable(mock_salvar_erro, mock_streamlit):
-    from src.core.genai import gerar_resposta
-    
-    mock_chat = MagicMock()
-    # Simula o erro de serviço indisponível 503
-    mock_chat.send_message_stream.side_effect = Exception("503 Service Unavailable: Overloaded")
-    mock_salvar_erro.return_value = "ERR-503"
+def test_gerar_resposta_service_unavailable(mock_streamlit):
+    from src.app.ui import exibir_erro_geracao
 
-    with pytest.raises(StopException):
-        gerar_resposta(mock_chat, "Olá", "contexto")
+    # Simula o erro de serviço indisponível 503
+    exibir_erro_geracao(classificar_erro_gemini(Exception("503 Service Unavailable: Overloaded")), "ERR-503")
 
-    mock_salvar_erro.assert_called_once()
-    
     # Verifica se a mensagem de alta demanda/instabilidade foi renderizada no Streamlit
     args, kwargs = mock_streamlit["error"].call_args
     assert "demanda muito alta agora" in args[0]
@@ -64,20 +50,13 @@ def test_gerar_resposta_service_unavailable(mock_salvar_erro, mock_streamlit):
     assert kwargs.get("icon") == "⏳"
 
 @pytest.mark.unit
-@patch("src.core.db.logs.salvar_erro")
 @patch("src.app.ui.exibir_mensagem_erro")
-def test_gerar_resposta_general_error(mock_exibir_msg_erro, mock_salvar_erro, mock_streamlit):
-    from src.core.genai import gerar_resposta
-    
-    mock_chat = MagicMock()
-    # Simula um erro genérico desconhecido
-    mock_chat.send_message_stream.side_effect = Exception("Algum erro desconhecido de rede")
-    mock_salvar_erro.return_value = "ERR-999"
+def test_gerar_resposta_general_error(mock_exibir_msg_erro, mock_streamlit):
+    from src.app.ui import exibir_erro_geracao
 
-    with pytest.raises(StopException):
-        gerar_resposta(mock_chat, "Olá", "contexto")
+    # Simula um erro genérico desconhecido
+    exibir_erro_geracao(classificar_erro_gemini(Exception("Algum erro desconhecido de rede")), "ERR-999")
 
-    mock_salvar_erro.assert_called_once()
-    
     # Garante que exibiu o painel de erro comum via exibir_mensagem_erro
     mock_exibir_msg_erro.assert_called_once_with("ERR-999")
+    mock_streamlit["error"].assert_not_called()
@@ -0,0 +1,25 @@
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from gerar_digestos import calcular_hash_chunks  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+def test_hash_chunks_ignora_descricao_vazia_e_ordena_por_kb_id():
+    chunks = [
+        {"kb_id": "vox-kb-0002", "descricao": "Segundo"},
+        {"kb_id": "vox-kb-0003", "descricao": ""},
+        {"kb_id": "vox-kb-0004", "descricao": None},
+        {"kb_id": "vox-kb-0001", "descricao": "Primeiro"},
+    ]
+
+    # Mesma fórmula de public.hash_chunks_topico: só 'kb_id:descricao' com descricao não vazia
+    esperado = hashlib.md5("vox-kb-0001:Primeiro\nvox-kb-0002:Segundo".encode("utf-8")).hexdigest()
+    assert calcular_hash_chunks(chunks) == esperado
+    assert calcular_hash_chunks([]) == hashlib.md5(b"").hexdigest()
@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from gerar_embedding import Checkpoint, LimitadorAdaptativo, buscar_registros_pendentes, processar_lote, reindexar  # noqa: E402
+
+from src.config import TAMANHO_VETOR_SEMANTICO  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+LOTE = [
+    {"kb_id": "vox-kb-0001", "descricao": "Texto novo", "embedding_hash": None, "hash_esperado": "h1"},
+    {"kb_id": "vox-kb-0002", "descricao": "Texto editado", "embedding_hash": "h-antigo", "hash_esperado": "h2"},
+]
+
+
+def _cliente_gemini():
+    client = MagicMock()
+    client.models.embed_content.side_effect = lambda contents, **kwargs: MagicMock(
+        embeddings=[MagicMock(values=[0.1] * TAMANHO_VETOR_SEMANTICO) for _ in contents]
+    )
+    return client
+
+
+def test_processar_lote_grava_por_kb_id_com_guarda_do_estado_lido():
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value.data = ["vox-kb-0001", "vox-kb-0002"]
+
+    assert processar_lote(_cliente_gemini(), supabase, "knowledge_base", LOTE, LimitadorAdaptativo(1000.0)) == ["vox-kb-0001", "vox-kb-0002"]
+
+    supabase.table.assert_not_called()  # sem upsert
+    nome, parametros = supabase.rpc.call_args.args
+    assert nome == "atualizar_embeddings_lote"
+    linhas = parametros["linhas"]
+    assert [(l["kb_id"], l["descricao"], l["embedding_hash_lido"], l["embedding_hash"]) for l in linhas] == [
+        ("vox-kb-0001", "Texto novo", None, "h1"),
+        ("vox-kb-0002", "Texto editado", "h-antigo", "h2"),
+    ]
+    # O prefixo curto é derivado no banco, não enviado pelo script
+    assert all("embedding_curto" not in l for l in linhas)
+
+
+def test_checkpoint_registra_so_os_ids_gravados(tmp_path):
+    supabase = MagicMock()
+    # A RPC barrou a 2ª linha (descricao editada durante a execução)
+    supabase.rpc.return_value.execute.return_value.data = ["vox-kb-0001"]
+    pendentes = [dict(row) for row in LOTE], {"sem_embedding": 1, "sem_hash": 0, "alterados": 1, "atualizados": 0}
+    caminho = tmp_path / "checkpoint.json"
+
+    with (
+        patch("gerar_embedding.cliente_gemini", return_value=_cliente_gemini()),
+        patch("gerar_embedding.create_client", return_value=supabase),
+        patch("gerar_embedding.buscar_registros_pendentes", return_value=pendentes),
+    ):
+        reindexar(tamanho_lote=2, workers=1, requisicoes_por_segundo=1000.0, caminho_checkpoint=caminho)
+
+    # O checkpoint é mantido e a 2ª linha será refeita na próxima execução
+    assert Checkpoint(caminho).concluidos == {"vox-kb-0001": "h1"}
+
+
+def test_checkpoint_nao_pula_linha_editada_depois_de_gravada(tmp_path):
+    caminho = tmp_path / "checkpoint.json"
+    Checkpoint(caminho).registrar({"vox-kb-0001": "h1", "vox-kb-0002": "h2-anterior"})
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value.data = ["vox-kb-0002"]
+    # A 1ª linha segue como gravada; a 2ª foi editada de novo depois de entrar no checkpoint
+    pendentes = [dict(row) for row in LOTE], {"sem_embedding": 1, "sem_hash": 0, "alterados": 1, "atualizados": 0}
+
+    with (
+        patch("gerar_embedding.cliente_gemini", return_value=_cliente_gemini()),
+        patch("gerar_embedding.create_client", return_value=supabase),
+        patch("gerar_embedding.buscar_registros_pendentes", return_value=pendentes),
+    ):
+        reindexar(tamanho_lote=2, workers=1, requisicoes_por_segundo=1000.0, caminho_checkpoint=caminho)
+
+    linhas = supabase.rpc.call_args.args[1]["linhas"]
+    assert [l["kb_id"] for l in linhas] == ["vox-kb-0002"]
+    # Sem falhas, o checkpoint é descartado ao final
+    assert not caminho.exists()
+
+
+def test_embedding_sem_hash_e_reindexado():
+    supabase = MagicMock()
+    consulta = supabase.table.return_value.select.return_value
+    consulta.order.return_value.range.return_value.execute.return_value.data = [
+        {"kb_id": "vox-kb-0001", "descricao": "Texto antigo", "embedding_hash": None},
+    ]
+    consulta.is_.return_value.order.return_value.range.return_value.execute.return_value.data = []
+
+    pendentes, delta = buscar_registros_pendentes(supabase, "knowledge_base")
+
+    # Embedding anterior à coluna 'embedding_hash': não se sabe de qual texto veio, então é refeito
+    assert [row["kb_id"] for row in pendentes] == ["vox-kb-0001"]
+    assert delta == {"sem_embedding": 0, "sem_hash": 1, "alterados": 0, "atualizados": 0}
@@ -0,0 +1,44 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from src.app.ui import _markdown_congelado
+
+pytestmark = pytest.mark.unit
+
+
+def _app_historico():
+    from src.app.ui import exibir_historico_chat
+
+    historico = [{"role": "user" if i % 2 == 0 else "model", "parts": [f"mensagem {i}"]} for i in range(45)]
+    exibir_historico_chat(historico)
+
+
+def test_markdown_congelado_e_memoizado():
+    pagina = (("user", "Oi"), ("model", "Olá!"))
+    texto = _markdown_congelado(pagina)
+    assert "🧑‍💻 **Você**\n\nOi" in texto
+    assert "🤖 **Vox**\n\nOlá!" in texto
+    assert _markdown_congelado(pagina) is texto
+
+
+def test_historico_desenha_so_a_janela_e_revela_paginas_sob_demanda():
+    app = AppTest.from_function(_app_historico).run()
+    assert not app.exception
+
+    # 45 mensagens: as 20 últimas completas, as 25 anteriores escondidas
+    assert len(app.chat_message) == 20
+    assert app.chat_message[0].markdown[0].value == "mensagem 25"
+    botao = app.button(key="btn_historico_anteriores")
+    assert botao.label.endswith("(25)")
+
+    # Primeira página: mensagens 20..24 (páginas alinhadas de 20 em 20), ainda restam 20 escondidas
+    app = botao.click().run()
+    assert len(app.chat_message) == 20
+    assert "mensagem 20" in app.markdown[0].value and "mensagem 24" in app.markdown[0].value
+    assert app.button(key="btn_historico_anteriores").label.endswith("(20)")
+
+    app = app.button(key="btn_historico_anteriores").click().run()
+    assert not [b for b in app.button if b.key == "btn_historico_anteriores"]
+
+    app = app.button(key="btn_historico_ocultar").click().run()
+    assert app.button(key="btn_historico_anteriores").label.endswith("(25)")
@@ -0,0 +1,117 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.core.pipeline import (
+    CallbacksPipeline,
+    Etapa,
+    EtapaNormalizacao,
+    EtapaSequencial,
+    Turno,
+    TurnoEmSegundoPlano,
+    VoxPipeline,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class EtapaFake(Etapa):
+    """
+    Etapa que anota sua execução no turno e, opcionalmente, emite trechos, conclui ou falha.
+    """
+
+    def __init__(self, nome, trechos=(), erro=None, span=None, conclui=False):
+        self.nome = nome
+        self.conclui = conclui
+        self.span = span
+        self.trechos = trechos
+        self.erro = erro
+
+    async def executar(self, turno, callbacks):
+        turno.memoria.setdefault("ordem", []).append(self.nome)
+        if self.erro:
+            raise self.erro
+        for trecho in self.trechos:
+            turno.resposta += trecho
+            callbacks.ao_token(trecho)
+        if self.conclui:
+            callbacks.ao_concluir(turno)
+
+
+class CallbacksGravados(CallbacksPipeline):
+    def __init__(self):
+        self.eventos = []
+
+    def ao_token(self, texto):
+        self.eventos.append(("token", texto))
+
+    def ao_concluir(self, turno):
+        self.eventos.append(("fim", turno.resposta))
+
+    def ao_erro(self, turno):
+        self.eventos.append(("erro", turno.tipo_erro))
+
+
+def test_pipeline_executa_etapas_em_ordem_e_entrega_os_tokens():
+    pipeline = VoxPipeline([
+        EtapaFake("a"),
+        EtapaSequencial("semantica", [EtapaFake("b", span="semantica.embedding"), EtapaFake("c")]),
+        EtapaFake("geracao", trechos=["Olá", ", mundo"]),
+        EtapaFake("fim", conclui=True),
+    ])
+    callbacks = CallbacksGravados()
+
+    turno = asyncio.run(pipeline.executar(Turno("sessao-1", "oi"), callbacks))
+
+    assert turno.memoria["ordem"] == ["a", "b", "c", "geracao", "fim"]
+    assert callbacks.eventos == [("token", "Olá"), ("token", ", mundo"), ("fim", "Olá, mundo")]
+    # O grupo e as etapas com span aparecem no trace do turno
+    assert {"semantica", "semantica.embedding"} <= set(turno.trace.duracoes())
+
+
+@patch("src.core.pipeline.salvar_erro", return_value="ERR-429")
+def test_pipeline_registra_e_classifica_falhas(mock_salvar_erro):
+    pipeline = VoxPipeline([EtapaFake("geracao", erro=Exception("429 ResourceExhausted")), EtapaFake("fim", conclui=True)])
+    callbacks = CallbacksGravados()
+
+    turno = asyncio.run(pipeline.executar(Turno("sessao-1", "oi"), callbacks))
+
+    mock_salvar_erro.assert_called_once()
+    assert turno.memoria["ordem"] == ["geracao"]
+    assert (turno.error_id, turno.tipo_erro) == ("ERR-429", "cota")
+    assert callbacks.eventos == [("erro", "cota")]
+
+
+def test_turno_nao_altera_o_historico_da_sessao():
+    historico = [{"role": "user", "parts": ["oi"]}]
+    turno = Turno("sessao-1", "tudo bem?", historico)
+    turno.historico.append({"role": "model", "parts": ["olá"]})
+
+    assert len(historico) == 1
+
+
+def test_normalizacao_limpa_a_pergunta():
+    turno = Turno("sessao-1", "  Café\x00   com\t\tleite  ")
+
+    asyncio.run(EtapaNormalizacao().executar(turno, CallbacksPipeline()))
+
+    assert turno.prompt == "Café com leite"
+
+
+def test_turno_em_segundo_plano_entrega_eventos_a_outra_thread():
+    pipeline = VoxPipeline([EtapaFake("geracao", trechos=["a", "b"]), EtapaFake("fim", conclui=True)])
+
+    execucao = TurnoEmSegundoPlano(Turno("sessao-1", "oi"), pipeline)
+    eventos = list(execucao.eventos())
+
+    assert [tipo for tipo, _ in eventos] == ["token", "token", "fim"]
+    assert eventos[-1][1].resposta == "ab"
+
+
+def test_etapa_sem_executar_nao_instancia():
+    class EtapaIncompleta(Etapa):
+        nome = "incompleta"
+
+    with pytest.raises(TypeError):
+        EtapaIncompleta()
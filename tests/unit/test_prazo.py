@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.config import TAMANHO_VETOR_SEMANTICO
+from src.core.database import buscar_referencias_db, recuperar_contexto_inteligente
+from src.core.genai import classificar_erro_gemini, gerar_resposta_stream
+from src.core.pipeline import FONTE_SEM_KB, CallbacksPipeline, EtapaMontagem, Turno
+from src.core.prazo import PrazoTurno, executar_com_prazo
+from src.core.semantica import buscar_contexto
+
+pytestmark = pytest.mark.unit
+
+VETOR = [0.1] * TAMANHO_VETOR_SEMANTICO
+
+
+@pytest.fixture
+def mock_db_client():
+    """
+    Cliente Supabase falso cuja busca vetorial elege um único tópico (expansão do tópico).
+    """
+    with patch("src.core.db.client.get_db_client") as mock_get:
+        mock_client = MagicMock()
+        mock_get.return_value = mock_client
+
+        mock_docs = MagicMock()
+        mock_docs.data = [
+            {"kb_id": f"vox-kb-000{i}", "descricao": f"Desc {i}", "topico": "Nome Social", "similarity": 0.9}
+            for i in range(1, 4)
+        ]
+        mock_client.rpc.return_value.execute.return_value = mock_docs
+        yield mock_client
+
+
+def _lento(segundos, retorno=None):
+    def chamada(*args, **kwargs):
+        time.sleep(segundos)
+        return retorno
+    return chamada
+
+
+def test_executar_com_prazo_respeita_o_timeout():
+    assert executar_com_prazo(1.0, lambda x: x * 2, 21) == 42
+
+    with pytest.raises(TimeoutError):
+        executar_com_prazo(0.05, _lento(0.5))
+    with pytest.raises(TimeoutError):
+        executar_com_prazo(0.0, lambda: None)
+
+
+def test_executor_saturado_falha_na_hora():
+    with patch("src.core.prazo._vagas_chamadas", threading.BoundedSemaphore(1)):
+        with pytest.raises(TimeoutError):
+            executar_com_prazo(0.05, _lento(0.3))
+
+        # A única vaga segue ocupada pela chamada vencida: a próxima nem é enviada
+        chamada = MagicMock()
+        inicio = time.monotonic()
+        with pytest.raises(TimeoutError):
+            executar_com_prazo(1.0, chamada)
+        assert time.monotonic() - inicio < 0.1
+        chamada.assert_not_called()
+
+        time.sleep(0.4)
+        assert executar_com_prazo(1.0, lambda: "ok") == "ok"
+
+
+def test_recuperacao_abandonada_nao_altera_a_memoria():
+    def recuperar_lento(vetor, memoria, prazo):
+        time.sleep(0.3)
+        memoria["contexto"] = "contexto do turno vencido"
+        return "contexto do turno vencido", "Fonte", []
+
+    memoria = {"contexto": "contexto atual"}
+    prazo = PrazoTurno(ttft_s=0.05, reserva_geracao_s=0.0)
+    with patch("src.core.semantica.recuperar_contexto_inteligente", recuperar_lento):
+        assert asyncio.run(buscar_contexto(VETOR, memoria, prazo)) == (None, None, None)
+        time.sleep(0.4)
+
+    assert prazo.degradacoes == ["recuperacao"]
+    assert memoria == {"contexto": "contexto atual"}
+
+
+def test_recuperacao_no_prazo_atualiza_a_memoria():
+    def recuperar(vetor, memoria, prazo):
+        memoria["contexto"] = "novo"
+        return "novo", "Fonte", []
+
+    memoria = {"contexto": "antigo"}
+    with patch("src.core.semantica.recuperar_contexto_inteligente", recuperar):
+        assert asyncio.run(buscar_contexto(VETOR, memoria, PrazoTurno()))[1] == "novo"
+
+    assert memoria == {"contexto": "novo"}
+
+
+def test_busca_vetorial_lenta_corta_a_recuperacao(mock_db_client):
+    mock_db_client.rpc.return_value.execute.side_effect = _lento(0.5)
+    prazo = PrazoTurno(ttft_s=0.1, reserva_geracao_s=0.0)
+
+    assert buscar_referencias_db(VETOR, prazo=prazo) == []
+    assert prazo.degradacoes == ["recuperacao"]
+
+
+def test_prazo_curto_nao_expande_o_topico(mock_db_client):
+    prazo = PrazoTurno(ttft_s=0.5, reserva_geracao_s=0.0)
+
+    contexto, fonte, ids = recuperar_contexto_inteligente(VETOR, prazo=prazo)
+
+    # Sem tempo para a expansão: ficam os chunks da busca vetorial
+    assert prazo.degradacoes == ["expansao_topico"]
+    assert "Desc 1" in contexto
+    assert fonte == "Busca por similaridade (Prazo, Vencedor: Nome Social)"
+    assert len(ids) == 3
+    mock_db_client.table.assert_not_called()
+
+
+def test_expansao_lenta_cai_nos_top_k(mock_db_client):
+    mock_db_client.table.return_value.select.return_value.eq.return_value.limit.return_value.execute.side_effect = _lento(1.0, MagicMock(data=[]))
+    prazo = PrazoTurno(ttft_s=0.4, reserva_geracao_s=0.0)
+
+    with patch("src.core.db.retrieval.USAR_DIGESTOS_TOPICO", False), patch("src.core.db.retrieval.PRAZO_MINIMO_EXPANSAO_S", 0.1):
+        inicio = time.monotonic()
+        contexto, fonte, ids = recuperar_contexto_inteligente(VETOR, prazo=prazo)
+
+    assert time.monotonic() - inicio < 0.9
+    assert prazo.degradacoes == ["expansao_topico"]
+    assert "Desc 1" in contexto
+    assert fonte == "Busca por similaridade (Prazo, Vencedor: Nome Social)"
+
+
+def test_recuperacao_cortada_avisa_o_modelo():
+    turno = Turno("sessao-1", "Como retificar meu nome?")
+    turno.trace = MagicMock()
+    turno.prazo.degradar("recuperacao", "teste")
+
+    with patch("src.core.pipeline.criar_chat"):
+        asyncio.run(EtapaMontagem().executar(turno, CallbacksPipeline()))
+
+    assert turno.fonte == FONTE_SEM_KB
+    assert "não pôde ser consultada" in turno.prompt_modelo
+    assert "Como retificar meu nome?" in turno.prompt_modelo
+
+
+@pytest.mark.parametrize("espera_abertura, espera_chunk", [(0.0, 0.5), (0.5, 0.0)])
+def test_primeiro_token_fora_do_prazo(espera_abertura, espera_chunk):
+    async def stream_lento():
+        await asyncio.sleep(espera_chunk)
+        yield MagicMock(text="tarde demais", usage_metadata=None)
+
+    chat = MagicMock()
+
+    async def send_message_stream(prompt):
+        # A chamada pode travar já na conexão, antes de devolver o stream
+        await asyncio.sleep(espera_abertura)
+        return stream_lento()
+
+    chat.send_message_stream = send_message_stream
+    prazo = PrazoTurno(ttft_s=0.05, reserva_geracao_s=0.05)
+
+    async def consumir():
+        return [texto async for texto in gerar_resposta_stream(chat, "oi", prazo)]
+
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError) as erro:
+        asyncio.run(consumir())
+    assert time.monotonic() - inicio < 0.4
+    assert classificar_erro_gemini(erro.value) == "indisponivel"
@@ -0,0 +1,52 @@
+import pytest
+
+from benchmarks.replay import anonimizar_prompt, comparar_execucoes
+
+pytestmark = pytest.mark.unit
+
+
+def test_anonimizar_prompt_remove_dados_pessoais():
+    prompt = (
+        "Olá, meu nome é Maria da Silva. Meu CPF é 123.456.789-09, e-mail maria.silva@exemplo.com.br, "
+        "telefone (11) 98765-4321 e CEP 01310-100. Protocolo 2024001, veja https://exemplo.com/x"
+    )
+    anonimo = anonimizar_prompt(prompt)
+
+    for dado in ("Maria", "Silva", "123.456.789-09", "maria.silva", "98765-4321", "01310-100", "2024001", "https://"):
+        assert dado not in anonimo
+    for marcador in ("[NOME]", "[CPF]", "[EMAIL]", "[TELEFONE]", "[CEP]", "[NUMERO]", "[URL]"):
+        assert marcador in anonimo
+
+
+def test_anonimizar_prompt_preserva_pergunta_sem_pii():
+    prompt = "Como funciona   a eleição de 2026 para vereador?"
+    assert anonimizar_prompt(prompt) == "Como funciona a eleição de 2026 para vereador?"
+
+
+def _resultado(id_, ms, fonte, kb_ids, entrada=100):
+    return {"id": id_, "etapas_ms": {"embedding": ms, "total": ms * 2}, "fonte": fonte, "kb_ids": kb_ids, "tokens": {"entrada": entrada}}
+
+
+def test_comparar_execucoes_reporta_latencia_tokens_e_contexto():
+    a = [_resultado("p1", 100, "Contexto Completo: X", ["1", "2"]), _resultado("p2", 200, "Fragmentos", ["3"])]
+    b = [_resultado("p1", 50, "Contexto Completo: X", ["1", "2"], entrada=50), _resultado("p2", 100, "Digesto", ["3", "4"], entrada=50)]
+
+    comparacao = comparar_execucoes(a, b)
+
+    assert comparacao["prompts"] == 2
+    assert comparacao["etapas_ms"]["embedding"]["delta_p50_pct"] == -50.0
+    assert comparacao["tokens"]["entrada"] == {"a": 200, "b": 100, "delta_pct": -50.0}
+    assert comparacao["contexto"]["identicos"] == 1
+    assert comparacao["contexto"]["fonte_alterada"] == 1
+    assert comparacao["contexto"]["jaccard_medio"] == 0.75
+    assert comparacao["contexto"]["exemplos"][0]["apenas_b"] == ["4"]
+
+
+def test_comparar_execucoes_ignora_prompts_com_erro():
+    a = [_resultado("p1", 100, "F", ["1"]), {"id": "p2", "etapas_ms": {"total": 1}, "tokens": {}, "erro": "Timeout"}]
+    b = [_resultado("p1", 100, "F", ["1"]), _resultado("p2", 100, "F", ["1"])]
+
+    comparacao = comparar_execucoes(a, b)
+
+    assert comparacao["erros"] == {"a": 1, "b": 0}
+    assert comparacao["contexto"]["identicos"] == 1
@@ -0,0 +1,79 @@
+import pytest
+from google.genai import errors, types
+from google.genai.client import Client
+from postgrest import SyncPostgrestClient
+
+from benchmarks.kb_sintetica import gerar_kb_sintetica
+from benchmarks.servicos_fake import ConfiguracaoFake, ServidorGeminiFake, ServidorPostgrestFake
+from src.config import MODELO_SEMANTICO_NOME, SEMANTICA_THRESHOLD, TAMANHO_VETOR_SEMANTICO
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return gerar_kb_sintetica(300, total_topicos=10)
+
+
+def _cliente_gemini(servidor: ServidorGeminiFake) -> Client:
+    # google.genai.Client é substituído por um mock no conftest; aqui usamos a classe real
+    return Client(api_key="fake", http_options=types.HttpOptions(base_url=servidor.url))
+
+
+def test_gemini_fake_embeddings_e_streaming(kb):
+    with ServidorGeminiFake(kb, ConfiguracaoFake(palavras_por_chunk=5, palavras_resposta=20)) as servidor:
+        client = _cliente_gemini(servidor)
+
+        embedding = client.models.embed_content(
+            model=MODELO_SEMANTICO_NOME,
+            contents="Como retificar meu nome?",
+            config=types.EmbedContentConfig(output_dimensionality=TAMANHO_VETOR_SEMANTICO),
+        ).embeddings[0].values
+        assert len(embedding) == TAMANHO_VETOR_SEMANTICO
+
+        chat = client.chats.create(model="gemini-fake", config=types.GenerateContentConfig(system_instruction="Vox"))
+        chunks = [chunk.text for chunk in chat.send_message_stream("Como retificar meu nome?")]
+        assert len(chunks) == 4
+        assert "".join(chunks).startswith("Resposta simulada do Vox")
+
+
+def test_gemini_fake_injeta_erro_429(kb):
+    with ServidorGeminiFake(kb, ConfiguracaoFake(taxa_429=1.0)) as servidor:
+        client = _cliente_gemini(servidor)
+        with pytest.raises(errors.APIError) as erro:
+            client.models.generate_content(model="gemini-fake", contents="oi")
+        assert erro.value.code == 429
+        assert servidor.contadores == {429: 1}
+
+
+def test_postgrest_fake_busca_e_logs(kb):
+    with ServidorGeminiFake(kb) as gemini, ServidorPostgrestFake(kb) as postgrest:
+        client = _cliente_gemini(gemini)
+        vetor = client.models.embed_content(model=MODELO_SEMANTICO_NOME, contents="pergunta").embeddings[0].values
+        db = SyncPostgrestClient(f"{postgrest.url}/rest/v1")
+
+        resultados = db.rpc(
+            "match_knowledge_base",
+            {"query_embedding": vetor, "match_threshold": SEMANTICA_THRESHOLD, "match_count": 10, "filter_topic": None},
+        ).execute().data
+        assert resultados
+        topico = resultados[0]["topico"]
+
+        chunks = db.table("knowledge_base").select("kb_id, descricao, embedding").eq("topico", topico).limit(3).execute().data
+        assert 0 < len(chunks) <= 3
+        assert chunks[0]["embedding"].startswith("[")
+
+        log = db.table("chat_logs").insert({"session_id": "sessao-teste", "prompt": "oi"}).execute().data
+        assert log[0]["chat_id"] == 1
+        db.table("chat_logs").delete().eq("session_id", "sessao-teste").execute()
+        assert db.table("chat_logs").select("chat_id").execute().data == []
+
+
+def test_cliente_gemini_usa_base_url(monkeypatch, mock_gemini_global):
+    from src.core.genai import cliente_gemini
+
+    monkeypatch.setenv("GEMINI_BASE_URL", "http://127.0.0.1:8081")
+    cliente_gemini()
+
+    _, kwargs = mock_gemini_global["client_cls"].call_args
+    assert kwargs["http_options"].base_url == "http://127.0.0.1:8081"
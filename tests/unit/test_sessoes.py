@@ -0,0 +1,83 @@
+import gc
+import weakref
+
+import pytest
+
+from src.core import sessoes
+from src.core.genai import historico_para_gemini
+from src.core.sessoes import RegistroSessoes, estimar_bytes
+
+pytestmark = pytest.mark.unit
+
+
+class HistoricoFake(list):
+    """
+    Lista que aceita referência fraca (list não aceita), para conferir que o registro não a mantém viva.
+    """
+
+
+def test_historico_para_gemini_ignora_saudacao_e_preserva_turnos():
+    historico = [
+        {"role": "model", "parts": ["Olá! Sou o Vox."]},
+        {"role": "user", "parts": ["O que é PrEP?"]},
+        {"role": "model", "parts": ["PrEP é a profilaxia pré-exposição."]},
+        {"role": "user", "parts": ["Onde consigo?"]},
+    ]
+    conteudos = historico_para_gemini(historico)
+
+    assert [c.role for c in conteudos] == ["user", "model", "user"]
+    assert conteudos[0].parts[0].text == "O que é PrEP?"
+    assert historico_para_gemini(historico[:1]) == []
+
+
+def test_registro_expira_sessoes_ociosas_e_libera_memoria(monkeypatch):
+    relogio = [1000.0]
+    monkeypatch.setattr(sessoes.time, "monotonic", lambda: relogio[0])
+    registro = RegistroSessoes()
+
+    historico = [{"role": "user", "parts": ["oi"]}]
+    memoria = {"vetor": [0.1] * 1536, "contexto": "texto"}
+    audios = {1: b"mp3" * 1000}
+    registro.tocar("ociosa", hist_exibir=historico, memoria_recuperacao=memoria, audio_tts=audios)
+    relogio[0] += 100
+    registro.tocar("ativa", hist_exibir=[], memoria_recuperacao={"contexto": "x"})
+
+    assert registro.expirar(ttl_s=50) == ["ociosa"]
+    assert memoria == {} and audios == {}
+    assert historico == [{"role": "user", "parts": ["oi"]}]
+    assert registro.metricas()["sessoes"] == 1
+
+
+def test_expirar_se_devido_respeita_intervalo(monkeypatch):
+    relogio = [0.0]
+    monkeypatch.setattr(sessoes.time, "monotonic", lambda: relogio[0])
+    registro = RegistroSessoes()
+    registro.tocar("s1", memoria_recuperacao={"contexto": "x"})
+
+    relogio[0] = sessoes.SESSAO_TTL_OCIOSA_S + 1
+    assert registro.expirar_se_devido(intervalo_s=relogio[0] + 1) == []
+    assert registro.expirar_se_devido(intervalo_s=1) == ["s1"]
+
+
+def test_metricas_estimam_memoria_por_sessao():
+    registro = RegistroSessoes()
+    registro.tocar("pequena", hist_exibir=[])
+    registro.tocar("grande", hist_exibir=[{"role": "user", "parts": ["x" * 10_000]}])
+
+    metricas = registro.metricas()
+    assert metricas["sessoes"] == 2
+    assert metricas["bytes_maximo"] > 10_000 > metricas["bytes_total"] - metricas["bytes_maximo"]
+    assert estimar_bytes("x" * 10_000) > 10_000
+
+
+def test_registro_nao_segura_o_historico():
+    registro = RegistroSessoes()
+    historico = HistoricoFake([{"role": "user", "parts": ["x" * 10_000]}])
+    referencia = weakref.ref(historico)
+    registro.tocar("s1", hist_exibir=historico)
+
+    # A sessão do Streamlit terminou: o histórico pode ser coletado, e a métrica continua com o último tamanho
+    del historico
+    gc.collect()
+    assert referencia() is None
+    assert registro.metricas()["bytes_total"] > 10_000
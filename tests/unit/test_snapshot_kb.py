@@ -0,0 +1,94 @@
+import json
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+from exportar_snapshot_kb import escrever_snapshot  # noqa: E402
+
+from src.config import TAMANHO_VETOR_CURTO, TAMANHO_VETOR_SEMANTICO  # noqa: E402
+from src.core.db.snapshot import ARQUIVO_MANIFESTO, ARQUIVO_METADADOS, abrir_snapshot, calcular_versao_kb, carregar_snapshot_kb  # noqa: E402
+
+
+def _vetor(eixo: int) -> list[float]:
+    vetor = [0.0] * TAMANHO_VETOR_SEMANTICO
+    vetor[eixo] = 1.0
+    return vetor
+
+
+@pytest.fixture
+def registros():
+    return [
+        {"kb_id": "vox-kb-0001", "topico": "Saúde", "eixo_tematico": "SUS", "descricao": "Processo transexualizador", "embedding": _vetor(0)},
+        {"kb_id": "vox-kb-0002", "topico": "Saúde", "eixo_tematico": "SUS", "descricao": "Nome social no cartão SUS", "embedding": str(_vetor(1))},
+        {"kb_id": "vox-kb-0003", "topico": "Direitos", "eixo_tematico": "Cartório", "descricao": "Retificação de nome", "embedding": _vetor(2)},
+    ]
+
+
+def test_snapshot_busca_e_chunks_por_topico(tmp_path, registros):
+    escrever_snapshot(registros, tmp_path)
+    snapshot = abrir_snapshot(tmp_path)
+
+    assert snapshot is not None
+    assert len(snapshot) == 3
+
+    consulta = _vetor(0)
+    consulta[1] = 0.5
+    resultados = snapshot.buscar(consulta, threshold=0.1, limit=10)
+
+    assert [r["id"] for r in resultados] == ["vox-kb-0001", "vox-kb-0002"]
+    assert resultados[0]["similarity"] > resultados[1]["similarity"]
+    assert snapshot.buscar(consulta, threshold=0.1, limit=10, filter_topic="Direitos") == []
+
+    chunks = snapshot.chunks_por_topico("Saúde", limit=25)
+    assert [c["kb_id"] for c in chunks] == ["vox-kb-0001", "vox-kb-0002"]
+    assert len(chunks[0]["embedding_curto"]) == TAMANHO_VETOR_CURTO
+
+
+def test_snapshot_corrompido_volta_para_o_supabase(tmp_path, registros):
+    versao = escrever_snapshot(registros, tmp_path)
+    (tmp_path / versao / ARQUIVO_METADADOS).write_text("{}", encoding="utf-8")
+
+    assert abrir_snapshot(tmp_path) is None
+
+
+def test_snapshot_ausente(tmp_path):
+    assert abrir_snapshot(tmp_path) is None
+
+
+def test_versao_kb_depende_do_conteudo_e_nao_da_ordem(registros):
+    versao = calcular_versao_kb(registros)
+
+    assert calcular_versao_kb(list(reversed(registros))) == versao
+    registros[2]["descricao"] = "Retificação de nome e gênero"
+    assert calcular_versao_kb(registros) != versao
+
+
+@pytest.mark.parametrize(
+    "versao_banco, usa_snapshot",
+    [("mesma", True), ("outra", False), (None, True)],
+)
+def test_snapshot_conferido_com_a_versao_da_kb_no_banco(tmp_path, registros, versao_banco, usa_snapshot):
+    versao = escrever_snapshot(registros, tmp_path)
+    versao_kb = json.loads((tmp_path / versao / ARQUIVO_MANIFESTO).read_text(encoding="utf-8"))["versao_kb"]
+    assert versao_kb == calcular_versao_kb(registros)
+
+    client = MagicMock()
+    if versao_banco is None:
+        client.rpc.return_value.execute.side_effect = ConnectionError("Supabase fora do ar")
+    else:
+        client.rpc.return_value.execute.return_value.data = versao_kb if versao_banco == "mesma" else "f" * 32
+
+    with (
+        patch("src.core.db.snapshot.abrir_snapshot", lambda: abrir_snapshot(tmp_path)),
+        patch("src.core.db.client.get_db_client", return_value=client),
+    ):
+        snapshot = carregar_snapshot_kb()
+
+    client.rpc.assert_called_once_with("versao_kb", {})
+    assert (snapshot is not None) == usa_snapshot
@@ -0,0 +1,105 @@
+"""
+Perfil de importação dos módulos carregados por vox_ai.py na inicialização do app.
+
+Roda 'python -X importtime' em um processo limpo e imprime os módulos mais caros
+(visível com 'pytest -s' ou quando o teste falha). Falha se um módulo que deveria ser
+importado sob demanda voltar a ser importado na inicialização, ou se o total estourar o limite. Também confere que o core
+e o servidor ASGI importam sem carregar o Streamlit.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.unit
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+MODULOS_APP = (
+    "src.config",
+    "src.app.assets",
+    "src.app.ui",
+    "src.core.aquecimento",
+    "src.core.database",
+    "src.core.estado_sessao",
+    "src.core.genai",
+    "src.core.pipeline",
+    "src.core.prazo",
+    "src.core.semantica",
+    "src.core.sessoes",
+    "src.core.tracing",
+    "src.core.uso_tokens",
+    "src.utils",
+)
+# Importados só no primeiro uso (botão "Ouvir" e primeira chamada ao banco)
+MODULOS_SOB_DEMANDA = ("gtts", "supabase", "postgrest", "gotrue", "storage3", "realtime")
+# Módulos que não dependem da UI: o Streamlit só é carregado pelo app (src/app, vox_ai.py)
+MODULOS_SEM_STREAMLIT = (
+    "src.config",
+    "src.core.aquecimento",
+    "src.core.database",
+    "src.core.estado_sessao",
+    "src.core.pipeline",
+    "src.core.sessoes",
+    "src.api.servidor",
+    "src.utils",
+)
+# Limite folgado: pega regressões grosseiras sem depender da velocidade da máquina
+LIMITE_TOTAL_S = 8.0
+TOP_RELATORIO = 15
+
+
+def _perfil_importacao() -> tuple[dict[str, tuple[int, int]], int]:
+    """
+    Importa MODULOS_APP em um processo novo.
+
+    Returns:
+        tuple: {módulo: (próprio_us, acumulado_us)} e o tempo total de importação, em µs.
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(MODULOS_APP)}"],
+        cwd=RAIZ,
+        env={**os.environ, "PYTHONPATH": str(RAIZ)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    perfil = {}
+    total_us = 0
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, modulo = linha.removeprefix("import time:").split("|")
+        perfil[modulo.strip()] = (int(proprio), int(acumulado))
+        # Só os imports de primeiro nível somam no total (os aninhados já estão no acumulado deles)
+        if not modulo.startswith("  "):
+            total_us += int(acumulado)
+    return perfil, total_us
+
+
+def test_perfil_de_importacao_da_inicializacao():
+    perfil, total_us = _perfil_importacao()
+
+    print(f"\n⏱️ Importação dos módulos do app: {total_us / 1e6:.2f}s (top {TOP_RELATORIO} por tempo acumulado)")
+    for modulo, (proprio, acumulado) in sorted(perfil.items(), key=lambda item: item[1][1], reverse=True)[:TOP_RELATORIO]:
+        print(f"  {acumulado / 1000:9.1f} ms acumulado | {proprio / 1000:8.1f} ms próprio | {modulo}")
+
+    importados_cedo = sorted(modulo for modulo in perfil if modulo.split(".")[0] in MODULOS_SOB_DEMANDA)
+    assert not importados_cedo, f"Módulos que deveriam ser importados sob demanda: {importados_cedo}"
+    assert total_us / 1e6 < LIMITE_TOTAL_S
+
+
+def test_core_importa_sem_streamlit():
+    resultado = subprocess.run(
+        [sys.executable, "-c", f"import sys, {', '.join(MODULOS_SEM_STREAMLIT)}; print('streamlit' in sys.modules)"],
+        cwd=RAIZ,
+        env={**os.environ, "PYTHONPATH": str(RAIZ)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert resultado.stdout.strip() == "False"
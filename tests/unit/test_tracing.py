@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from src.core import tracing
+from src.core.tracing import registrar_span, span, trace_atual, trace_turno
+
+pytestmark = pytest.mark.unit
+
+
+def test_span_fora_de_turno_nao_registra_nada():
+    with span("semantica"):
+        pass
+    assert trace_atual() is None
+
+
+def test_trace_turno_acumula_duracoes_por_etapa():
+    @span("buscar_referencias_db")
+    def buscar():
+        return "ok"
+
+    with trace_turno("sessao-1") as trace:
+        assert trace_atual() is trace
+        with span("semantica"):
+            assert buscar() == "ok"
+            assert buscar() == "ok"
+        registrar_span("gerar_resposta.ttft", 120.0)
+
+    assert trace_atual() is None
+    assert [nome for nome, _ in trace.spans] == ["buscar_referencias_db", "buscar_referencias_db", "semantica", "gerar_resposta.ttft"]
+
+    duracoes = trace.duracoes()
+    assert duracoes["gerar_resposta.ttft"] == 120.0
+    assert duracoes["semantica"] >= duracoes["buscar_referencias_db"] >= 0
+    assert duracoes["total"] >= duracoes["semantica"]
+
+
+def test_span_registra_erro_e_propaga_excecao(caplog):
+    caplog.set_level(logging.INFO, logger="Vox AI.tracing")
+    with trace_turno("sessao-2") as trace:
+        with pytest.raises(ValueError), span("salvar_log_chat"):
+            raise ValueError("falha")
+
+    assert trace.spans[0][0] == "salvar_log_chat"
+    assert '"erro": "ValueError"' in caplog.text
+    assert trace.trace_id in caplog.text
+
+
+def test_turnos_em_contextos_distintos_nao_se_misturam():
+    with trace_turno("sessao-a") as externo:
+        with trace_turno("sessao-b") as interno:
+            with span("semantica"):
+                pass
+        assert trace_atual() is externo
+
+    assert len(interno.spans) == 1 and not externo.spans
+    assert externo.trace_id != interno.trace_id
+
+
+def test_otlp_desabilitado_sem_endpoint(monkeypatch):
+    monkeypatch.delenv("OTEL_EXPORTER_OTLP_ENDPOINT", raising=False)
+    tracing._tracer_otlp.cache_clear()
+    assert tracing._tracer_otlp() is None
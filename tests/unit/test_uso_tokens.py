@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import uso_tokens
+from src.core.tracing import trace_turno
+from src.core.uso_tokens import contabilizar_turno, estrategia_da_fonte, registrar_uso, resumo_uso_tokens
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def agregado_limpo(monkeypatch):
+    monkeypatch.setattr(uso_tokens, "_agregado", {})
+
+
+def _uso(entrada, saida, cache=None, raciocinio=None):
+    return SimpleNamespace(prompt_token_count=entrada, candidates_token_count=saida, cached_content_token_count=cache, thoughts_token_count=raciocinio)
+
+
+def test_estrategia_da_fonte_remove_nome_do_topico():
+    assert estrategia_da_fonte("Contexto Completo: Saúde") == "Contexto Completo"
+    assert estrategia_da_fonte("Tópicos mistos (Vencedor: Saúde)") == "Tópicos mistos"
+    assert estrategia_da_fonte("Busca por similaridade (Fragmentos)") == "Busca por similaridade"
+    assert estrategia_da_fonte(None) == "Sem contexto"
+
+
+def test_registrar_uso_fora_de_turno_e_ignorado():
+    registrar_uso("gerar_resposta", "gemini", _uso(10, 5))
+    assert resumo_uso_tokens() == []
+
+
+def test_contabilizar_turno_soma_etapas_e_agrega_por_modelo_e_estrategia():
+    orcamento = {}
+    with trace_turno("sessao-1") as trace:
+        registrar_uso("semantica.embedding", "embedding", None, texto_entrada="a" * 40)
+        registrar_uso("gerar_resposta", "gemini", _uso(1000, 200, cache=300, raciocinio=50))
+        trace.fonte = "Contexto Completo: Saúde"
+
+    tokens = contabilizar_turno(trace, orcamento)
+
+    assert tokens["entrada"] == 1000 + trace.uso_tokens[0]["entrada"]
+    assert trace.uso_tokens[0]["estimado"] is True
+    assert tokens["por_etapa"]["gerar_resposta"] == {"entrada": 1000, "saida": 200, "cache": 300, "raciocinio": 50}
+    assert orcamento == {"tokens": tokens["entrada"] + 200 + 50, "turnos": 1}
+
+    resumo = {(linha["modelo"], linha["estrategia"]): linha for linha in resumo_uso_tokens()}
+    assert resumo[("gemini", "Contexto Completo")]["chamadas"] == 1
+    assert resumo[("gemini", "Contexto Completo")]["saida"] == 200
+    assert ("embedding", "Contexto Completo") in resumo
+
+
+def test_orcamento_brando_sinaliza_sessao_sem_bloquear(monkeypatch, caplog):
+    monkeypatch.setattr(uso_tokens, "ORCAMENTO_TOKENS_SESSAO", 1500)
+    orcamento = {}
+
+    for _ in range(3):
+        with trace_turno("sessao-cara") as trace:
+            registrar_uso("gerar_resposta", "gemini", _uso(900, 100))
+        contabilizar_turno(trace, orcamento)
+
+    assert orcamento["excedido"] is True
+    assert orcamento["tokens"] == 3000
+    assert caplog.text.count("ultrapassou o orçamento") == 1
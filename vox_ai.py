@@ -2,137 +2,183 @@
 Inicializa e orquestra a interface web do Vox AI construída com Streamlit.
 
 Gerencia o fluxo de interação com o usuário (chat), incluindo suporte a entrada por
-texto e áudio (com transcrição via IA), inicializa a sessão do usuário, realiza a busca
-semântica de contexto (RAG) no banco de dados Supabase e chama o modelo Gemini para gerar
-a resposta final de maneira assistida e personalizada.
+texto e áudio (com transcrição via IA), inicializa a sessão do usuário e entrega cada
+pergunta ao pipeline do turno (src/core/pipeline.py), que faz a busca semântica de contexto
+(RAG), chama o modelo Gemini e grava os logs. Este script é só o adaptador de interface:
+desenha o que o pipeline entrega.
 
 Fluxo de Execução Principal:
-1. Configuração inicial da página e carregamento do estilo CSS personalizado.
-2. Inicialização de identificadores únicos de sessão.
+1. Configuração inicial da página, aquecimento do processo (src/core/aquecimento.py) e carregamento do estilo CSS personalizado.
+2. Inicialização de identificadores únicos de sessão, retomando o estado salvo quando a URL traz o 'sid' assinado (src/core/estado_sessao.py).
 3. Carregamento da barra lateral (sidebar) contendo informações e créditos do projeto.
 4. Conexão/Autenticação com a API do Google GenAI.
 5. Captura de entrada do usuário (campo de chat ou gravação de voz).
-6. Processamento semântico de contexto relevante para o prompt.
-7. Solicitação de resposta do modelo e exibição em fluxo contínuo (streaming).
-8. Persistência de logs da conversa e tratamento centralizado de erros no banco de dados.
+6. Disparo do turno no pipeline, em segundo plano, antes de desenhar o histórico.
+7. Exibição da resposta em fluxo contínuo (streaming), à medida que os trechos chegam.
+8. Tratamento centralizado de erros (os logs da conversa são gravados pelo pipeline).
 """
 
-import uuid
-
 import streamlit as st
 
 import startup_patch
 
-from data.prompts.ui_content import SAUDACAO, SIDEBAR_BODY, SIDEBAR_FOOTER
+from src.app.assets import pacote_assets
 from src.app.ui import (
+    RespostaEmTela,
     carregar_css,
     carregar_sidebar,
+    configurar_api_gemini,
     configurar_pagina,
     stream_resposta,
+    exibir_botao_audio,
+    exibir_erro_geracao,
     exibir_historico_chat,
     exibir_mensagem_erro,
-)
-from src.config import logger
-from src.core.database import salvar_erro, salvar_log_chat, salvar_sessao
-from src.core.genai import (
-    configurar_api_gemini,
-    gerar_resposta,
     inicializar_chat_modelo,
-    transcrever_audio,
 )
-from src.core.semantica import semantica
-from src.utils import git_version
+from src.config import logger
+from src.core.aquecimento import iniciar_aquecimento
+from src.core.database import salvar_erro
+from src.core.estado_sessao import assinar_sid, retomar_sessao
+from src.core.genai import transcrever_audio
+from src.core.pipeline import Turno, TurnoEmSegundoPlano, registrar_sessao_em_segundo_plano
+from src.core.sessoes import registro_sessoes
+from src.core.tracing import Trace, trace_turno
+from src.utils import audio_cacheado, git_version
 
 configurar_pagina()
+# Na primeira execução do processo, aquece clientes e caches (e o áudio da saudação) em segundo plano
+iniciar_aquecimento({"audio_saudacao": lambda: audio_cacheado(pacote_assets().saudacao)})
 carregar_css()
 
+estado_salvo = None
 if "session_id" not in st.session_state:
-    st.session_state.session_id = str(uuid.uuid4())
-    salvar_sessao(st.session_state.session_id)
-
-carregar_sidebar(SIDEBAR_BODY, SIDEBAR_FOOTER)
+    # O 'sid' assinado da URL identifica a sessão entre réplicas e recarregamentos da página
+    st.session_state.session_id, estado_salvo = retomar_sessao(st.query_params.get("sid"))
+    if estado_salvo is None:
+        # O registro corre em segundo plano; os logs do pipeline esperam por ele
+        registrar_sessao_em_segundo_plano(st.session_state.session_id)
+    # Na URL vai só o 'sid' assinado; sem o segredo de assinatura, a conversa não é retomada pelo link
+    sid_assinado = assinar_sid(st.session_state.session_id)
+    if sid_assinado:
+        st.query_params["sid"] = sid_assinado
+    else:
+        st.query_params.pop("sid", None)
+
+assets = pacote_assets()
+carregar_sidebar(assets.sidebar_body, assets.sidebar_footer)
 
 st.session_state.key_api = configurar_api_gemini()
 
-inicializar_chat_modelo()
-
-exibir_historico_chat(st.session_state.hist_exibir)
-
-if "key_api" in st.session_state:
-    if "primeira_vez" not in st.session_state:
-        mensagem_boas_vindas = SAUDACAO
-        st.session_state.hist_exibir.append(
-            {"role": "model", "parts": [mensagem_boas_vindas]}
+inicializar_chat_modelo(estado_salvo)
+
+
+def iniciar_turno(prompt: str, trace: Trace | None = None) -> TurnoEmSegundoPlano:
+    """
+    Dispara o turno no pipeline, em segundo plano, com o estado da sessão.
+    """
+    return TurnoEmSegundoPlano(
+        Turno(
+            st.session_state.session_id,
+            prompt,
+            st.session_state.hist_exibir,
+            st.session_state.setdefault("memoria_recuperacao", {}),
+            st.session_state.setdefault("orcamento_tokens", {}),
+            trace,
         )
-        st.session_state.primeira_vez = True
-
-        with st.chat_message("assistant", avatar="🤖"):
-            msg_placeholder = st.empty()
-            msg_placeholder.write_stream(stream_resposta(mensagem_boas_vindas))
-            st.rerun()
-    prompt = st.chat_input("Digite aqui...")
-
-    with st.popover("🎙️", use_container_width=False):
-        audio_val = st.audio_input("Fale sua pergunta")
-
-    prompt_final = None
-
-    if prompt:
-        prompt_final = prompt
-    elif audio_val:
-        if (
-            "ultimo_audio_id" not in st.session_state
-            or st.session_state.ultimo_audio_id != audio_val.name
-        ):
-            with st.spinner("Ouvindo e transcrevendo... 🎧"):
-                texto_transcrito = transcrever_audio(audio_val)
+    )
+
+
+@st.fragment
+def painel_chat() -> None:
+    """
+    Painel da conversa (histórico, entrada por texto/áudio e resposta), isolado em um fragmento:
+    enviar uma mensagem reexecuta apenas este painel, sem refazer página, CSS e sidebar.
+    O turno termina sem st.rerun(), pois a pergunta e a resposta já foram desenhadas nesta execução.
+    """
+    # Atividade registrada aqui, pois os turnos reexecutam só o fragmento
+    registro_sessoes.tocar(
+        st.session_state.session_id,
+        hist_exibir=st.session_state.hist_exibir,
+        memoria_recuperacao=st.session_state.setdefault("memoria_recuperacao", {}),
+        audio_tts=st.session_state.setdefault("audio_tts", {}),
+    )
+    registro_sessoes.expirar_se_devido()
+
+    # A pergunta digitada já está no estado antes do campo ser desenhado: o turno parte agora,
+    # e o embedding corre enquanto o histórico é desenhado
+    prompt_final = st.session_state.get("entrada_chat") if "key_api" in st.session_state else None
+    execucao = iniciar_turno(prompt_final) if prompt_final else None
+
+    exibir_historico_chat(st.session_state.hist_exibir)
+
+    if "key_api" in st.session_state:
+        if "primeira_vez" not in st.session_state:
+            mensagem_boas_vindas = pacote_assets().saudacao
+            st.session_state.hist_exibir.append(
+                {"role": "model", "parts": [mensagem_boas_vindas]}
+            )
+            st.session_state.primeira_vez = True
+
+            # Exibida com efeito de digitação só nesta execução; nas seguintes, vem do histórico
+            with st.chat_message("assistant", avatar="🤖"):
+                msg_placeholder = st.empty()
+                msg_placeholder.write_stream(stream_resposta(mensagem_boas_vindas))
+                exibir_botao_audio(mensagem_boas_vindas, len(st.session_state.hist_exibir) - 1)
+
+        st.chat_input("Digite aqui...", key="entrada_chat")
+
+        with st.popover("🎙️", use_container_width=False):
+            audio_val = st.audio_input("Fale sua pergunta")
+
+        if execucao is None and audio_val:
+            if (
+                "ultimo_audio_id" not in st.session_state
+                or st.session_state.ultimo_audio_id != audio_val.name
+            ):
+                # O trace começa na transcrição e continua no pipeline
+                with trace_turno(st.session_state.session_id) as trace:
+                    with st.spinner("Ouvindo e transcrevendo... 🎧"):
+                        try:
+                            texto_transcrito = transcrever_audio(audio_val)
+                        except Exception as e:
+                            st.error(f"Erro na transcrição: {e}")
+                            texto_transcrito = None
                 if texto_transcrito:
                     prompt_final = texto_transcrito
                     st.session_state.ultimo_audio_id = audio_val.name
+                    execucao = iniciar_turno(prompt_final, trace)
 
-    if prompt_final:
-        st.session_state.prompt = prompt_final
-        st.session_state.hist_exibir.append({"role": "user", "parts": [prompt_final]})
-
-        with st.chat_message("user", avatar="🧑‍💻"):
-            st.markdown(prompt_final)
-
-        try:
-
-            tema_match, descricao_match, ids_referencia = semantica(prompt_final)
-
-            info_adicional_contexto = ""
-            if tema_match:
-                info_adicional_contexto = descricao_match
-            else:
-                descricao_match = "N/A"
-
-            with st.chat_message("assistant", avatar="🤖"):
-                resposta = gerar_resposta(
-                    inicializar_chat_modelo(), prompt_final, info_adicional_contexto
-                )
+        if execucao:
+            st.session_state.prompt = prompt_final
+            st.session_state.hist_exibir.append({"role": "user", "parts": [prompt_final]})
 
-            st.session_state.hist_exibir.append({"role": "model", "parts": [resposta]})
+            with st.chat_message("user", avatar="🧑‍💻"):
+                st.markdown(prompt_final)
 
             try:
-                if isinstance(resposta, list):
-                    resposta_log = " ".join(resposta)
-                else:
-                    resposta_log = str(resposta)
-
-                salvar_log_chat(
-                    st.session_state.session_id,
-                    git_version(),
-                    prompt_final,
-                    resposta_log,
-                    ids_referencia,
-                )
-
-            except Exception as e_log:
-                logger.error(f"Falha silenciosa ao registrar log de conversa: {e_log}", exc_info=True)
-
-            st.rerun()
-
-        except Exception as e:
-            error_id = salvar_erro(st.session_state.session_id, git_version(), e)
-            exibir_mensagem_erro(error_id)
\ No newline at end of file
+                with st.chat_message("assistant", avatar="🤖"):
+                    tela = RespostaEmTela()
+                    eventos = execucao.eventos()
+                    with st.spinner("🧠 Thinking about it..."):
+                        evento = next(eventos, None)
+
+                    while evento:
+                        tipo, dados = evento
+                        if tipo == "token":
+                            tela.adicionar(dados)
+                        elif tipo == "fim":
+                            st.session_state.hist_exibir.append({"role": "model", "parts": [dados.resposta]})
+                            exibir_botao_audio(dados.resposta, len(st.session_state.hist_exibir) - 1)
+                        elif tipo == "erro":
+                            tela.limpar()
+                            exibir_erro_geracao(dados.tipo_erro, dados.error_id)
+                        evento = next(eventos, None)
+
+            except Exception as e:
+                logger.error(f"Falha inesperada no turno: {e}", exc_info=True)
+                error_id = salvar_erro(st.session_state.session_id, git_version(), e)
+                exibir_mensagem_erro(error_id)
+
+
+painel_chat()